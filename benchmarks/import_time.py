@@ -0,0 +1,120 @@
+########################################
+############ Python Modules ############
+########################################
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+
+#########################################
+######### Benchmark Functions ###########
+#########################################
+ROOT = Path(__file__).resolve().parents[1]    # Directory of the Streamlit app (Welcome.py)
+PAGES = ["Welcome.py"] + sorted(str(page.relative_to(ROOT)) for page in (ROOT / "pages").glob("*.py"))
+
+# Code run in a fresh interpreter to time the first run of a page (cold start of a container)
+PAGE_CODE = """
+import time
+start = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file({page!r}, default_timeout=600)
+at.run()
+print(time.perf_counter() - start)
+"""
+
+
+def run_python(code, importtime=False):
+    """
+    Run Python code in a fresh interpreter in the app directory.
+
+    Args:
+        code (str): The Python code to run.
+        importtime (bool, optional): Whether to run Python with -X importtime. Defaults to False.
+
+    Returns:
+        subprocess.CompletedProcess: The finished process (stdout and stderr as text).
+    """
+    cmd = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", code]
+    return subprocess.run(cmd, cwd=ROOT, capture_output=True, text=True, check=True)
+
+
+def import_time(module, repeat=5, top=10):
+    """
+    Measure the cold import time of a module.
+
+    Args:
+        module (str): The name of the module (e.g., "functions").
+        repeat (int, optional): The number of fresh interpreters. Defaults to 5.
+        top (int, optional): The number of slowest imports to report. Defaults to 10.
+
+    Returns:
+        tuple: The median import time in seconds and the slowest imports (cumulative seconds, module).
+    """
+    times = []
+    slowest = {}
+    for _ in range(repeat):
+        # -X importtime writes "import time: self [us] | cumulative [us] | module" lines to stderr
+        result = run_python(f"import {module}", importtime=True)
+        for line in result.stderr.splitlines():
+            if not line.startswith("import time:") or "cumulative" in line:
+                continue
+            _, cumulative, name = line[len("import time:"):].split("|")
+            name = name.rstrip()
+            if name.strip() == module:
+                times.append(int(cumulative) / 1e6)
+            # Only the top-level imports of each package (two spaces of indentation)
+            elif len(name) - len(name.lstrip()) <= 3:
+                slowest.setdefault(name.strip(), []).append(int(cumulative) / 1e6)
+    slowest = sorted(((statistics.median(t), name) for name, t in slowest.items()), reverse=True)[:top]
+    return statistics.median(times), slowest
+
+
+def page_time(page, repeat=3):
+    """
+    Measure the time of the first run of a page in a fresh interpreter (imports and script).
+    The user folders created by the runs are deleted afterwards.
+
+    Args:
+        page (str): The path of the page relative to the app directory.
+        repeat (int, optional): The number of fresh interpreters. Defaults to 3.
+
+    Returns:
+        float: The median time in seconds.
+    """
+    temp_dirs = [ROOT / "temp_files", Path("/dev/shm/reinvent_ui")]
+    before = {temp_dir: set(os.listdir(temp_dir)) if temp_dir.is_dir() else set() for temp_dir in temp_dirs}
+    try:
+        times = [float(run_python(PAGE_CODE.format(page=page)).stdout.split()[-1]) for _ in range(repeat)]
+    finally:
+        for temp_dir in temp_dirs:
+            if temp_dir.is_dir():
+                for folder in set(os.listdir(temp_dir)) - before[temp_dir]:
+                    if folder.startswith("user_"):
+                        shutil.rmtree(temp_dir / folder, ignore_errors=True)
+    return statistics.median(times)
+
+
+#########################################
+################# Main ##################
+#########################################
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cold start benchmark: import time of functions.py and first run of each page.")
+    parser.add_argument("--repeat", type=int, default=5, help="Number of fresh interpreters per measurement")
+    parser.add_argument("--top", type=int, default=10, help="Number of slowest imports to show")
+    parser.add_argument("--no-pages", action="store_true", help="Only measure the import of functions.py")
+    args = parser.parse_args()
+    os.environ.setdefault("STREAMLIT_BROWSER_GATHER_USAGE_STATS", "false")
+
+    median, slowest = import_time("functions", repeat=args.repeat, top=args.top)
+    print(f"import functions: {median * 1000:.0f} ms (median of {args.repeat})")
+    for seconds, name in slowest:
+        print(f"  {seconds * 1000:8.0f} ms  {name}")
+
+    if not args.no_pages:
+        print("\nFirst run of the pages:")
+        for page in PAGES:
+            print(f"  {page_time(page, repeat=max(1, args.repeat // 2)) * 1000:8.0f} ms  {page}")
@@ -0,0 +1,185 @@
+########################################
+############ Python Modules ############
+########################################
+import argparse
+import sys
+import timeit
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]    # Directory of the Streamlit app (Welcome.py)
+sys.path.insert(0, str(ROOT))
+import transforms
+
+
+#########################################
+####### Reference Implementations #######
+#########################################
+# Transformer functions of functions.py before the vectorized transforms module (reference for timing and results)
+def legacy_hard_sigmoid(x, k):
+    return (k * x > 0).astype(np.float32)
+
+
+def legacy_stable_sigmoid(x, k, base_10=True):
+    h = k * x
+    if base_10:
+        h = h * np.log(10)
+    hp_idx = h >= 0
+    y = np.zeros_like(x)
+    y[hp_idx] = 1.0 / (1.0 + np.exp(-h[hp_idx]))
+    y[~hp_idx] = np.exp(h[~hp_idx]) / (1.0 + np.exp(h[~hp_idx]))
+    return y.astype(np.float32)
+
+
+def legacy_sigmoid(values, k, low, high):
+    values = np.array(values, dtype=np.float32)
+    x = values - (high + low) / 2
+    if (high - low) == 0:
+        return legacy_hard_sigmoid(x, 10.0 * k)
+    return legacy_stable_sigmoid(x, 10.0 * k / (high - low))
+
+
+def legacy_reverse_sigmoid(values, k, low, high):
+    return 1.0 - legacy_sigmoid(values, k, low, high)
+
+
+def legacy_double_sigmoid(x, x_left, x_right, k, k_left, k_right):
+    x_center = (x_right - x_left) / 2 + x_left
+    xl = x[x < x_center] - x_left
+    xr = x[x >= x_center] - x_right
+    if k == 0:
+        sigmoid_left = legacy_hard_sigmoid(xl, k_left)
+        sigmoid_right = 1 - legacy_hard_sigmoid(xr, k_right)
+    else:
+        sigmoid_left = legacy_stable_sigmoid(xl, k_left / k)
+        sigmoid_right = 1 - legacy_stable_sigmoid(xr, k_right / k)
+    d_sigmoid = np.zeros_like(x)
+    d_sigmoid[x < x_center] = sigmoid_left
+    d_sigmoid[x >= x_center] = sigmoid_right
+    return d_sigmoid
+
+
+def legacy_step(values, low, high):
+    return np.array([1.0 if low <= x <= high else 0.0 for x in values], dtype=float)
+
+
+def legacy_left_step(values, low):
+    return np.array([1.0 if x <= low else 0.0 for x in values], dtype=float)
+
+
+def legacy_right_step(values, high):
+    return np.array([1.0 if x >= high else 0.0 for x in values], dtype=float)
+
+
+#########################################
+######### Benchmark Functions ###########
+#########################################
+# Transformer name: (legacy function, vectorized function, parameters) - parameters as in the scoring components
+CASES = {
+    "sigmoid": (legacy_sigmoid, transforms.sigmoid, (0.5, 200.0, 500.0)),
+    "reverse_sigmoid": (legacy_reverse_sigmoid, transforms.reverse_sigmoid, (0.5, 2.0, 5.0)),
+    "double_sigmoid": (legacy_double_sigmoid, transforms.double_sigmoid, (20.0, 140.0, 100.0, 10.0, 10.0)),
+    "step": (legacy_step, transforms.step, (1.0, 5.0)),
+    "left_step": (legacy_left_step, transforms.left_step, (3.0,)),
+    "right_step": (legacy_right_step, transforms.right_step, (3.0,)),
+}
+
+# The list comprehensions of the legacy steps take about 3 s per 10^6 values
+SLOW_LEGACY = {"step", "left_step", "right_step"}
+
+
+def best_time(func, repeat=3):
+    """
+    Measure the best wall time of a function call.
+
+    Args:
+        func (callable): The function to call (no arguments).
+        repeat (int, optional): The number of calls. Defaults to 3.
+
+    Returns:
+        float: The best time in seconds.
+    """
+    return min(timeit.repeat(func, number=1, repeat=repeat))
+
+
+def peak_memory(func):
+    """
+    Measure the peak memory allocated during a function call (NumPy arrays are traced by tracemalloc).
+
+    Args:
+        func (callable): The function to call (no arguments).
+
+    Returns:
+        int: The peak allocated memory in bytes (temporary and returned arrays).
+    """
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        func()
+        return tracemalloc.get_traced_memory()[1] - before
+    finally:
+        tracemalloc.stop()
+
+
+def benchmark(name, values, repeat=3, legacy=True):
+    """
+    Time the legacy and the vectorized transformer (new output array and in place) on the same values,
+    and measure the memory allocated by the legacy and the in-place calls.
+
+    Args:
+        name (str): The name of the transformer (key of CASES).
+        values (np.ndarray): The input values.
+        repeat (int, optional): The number of calls per measurement. Defaults to 3.
+        legacy (bool, optional): Whether to time the legacy implementation. Defaults to True.
+
+    Returns:
+        dict: The times in seconds (legacy, vectorized, in place), the peak memory in bytes
+              (legacy_memory, in_place_memory) and whether the results are equal.
+    """
+    legacy_func, func, params = CASES[name]
+    result = {"legacy": None, "legacy_memory": None, "equal": None}
+    if legacy:
+        expected = legacy_func(values, *params)
+        result["legacy"] = best_time(lambda: legacy_func(values, *params), repeat=1 if name in SLOW_LEGACY else repeat)
+        result["equal"] = bool(np.allclose(func(values, *params), expected, atol=1e-6, equal_nan=True))
+        if name not in SLOW_LEGACY:
+            result["legacy_memory"] = peak_memory(lambda: legacy_func(values, *params))
+    result["vectorized"] = best_time(lambda: func(values, *params), repeat=repeat)
+    out = np.empty(values.shape, dtype=np.float32)
+    result["in_place"] = best_time(lambda: func(values, *params, out=out), repeat=repeat)
+    result["in_place_memory"] = peak_memory(lambda: func(values, *params, out=out))
+    return result
+
+
+#########################################
+################# Main ##################
+#########################################
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Micro-benchmark of the transformer functions: legacy vs vectorized (transforms.py).")
+    parser.add_argument("--sizes", type=float, nargs="+", default=[1e6, 1e7], help="Number of values per benchmark")
+    parser.add_argument("--repeat", type=int, default=3, help="Number of calls per measurement (best time)")
+    parser.add_argument("--transforms", nargs="+", choices=list(CASES), default=list(CASES), help="Transformers to benchmark")
+    parser.add_argument("--max-legacy-steps", type=float, default=1e7,
+                        help="Largest size for the legacy step functions (Python loops)")
+    parser.add_argument("--dtype", choices=["float32", "float64"], default="float32", help="Data type of the input values")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    for size in map(int, args.sizes):
+        # Raw values around the transformer thresholds, with some invalid molecules (NaN)
+        values = rng.normal(100.0, 150.0, size).astype(args.dtype)
+        values[rng.random(size) < 0.01] = np.nan
+        print(f"\n{size:,} values ({args.dtype}), memory: peak bytes allocated per value (the legacy output included)")
+        print(f"  {'transform':<16} {'legacy':>10} {'vectorized':>11} {'in place':>10} {'speedup':>8} {'Mvalues/s':>10} "
+              f"{'B/value':>8} {'in place':>8}  equal")
+        for name in args.transforms:
+            legacy = name not in SLOW_LEGACY or size <= args.max_legacy_steps
+            result = benchmark(name, values, repeat=args.repeat, legacy=legacy)
+            legacy_ms = f"{result['legacy'] * 1000:8.1f}ms" if legacy else f"{'-':>10}"
+            speedup = f"{result['legacy'] / result['in_place']:7.1f}x" if legacy else f"{'-':>8}"
+            legacy_memory = f"{result['legacy_memory'] / size:8.1f}" if result["legacy_memory"] is not None else f"{'-':>8}"
+            print(f"  {name:<16} {legacy_ms} {result['vectorized'] * 1000:9.1f}ms {result['in_place'] * 1000:8.1f}ms {speedup} "
+                  f"{size / result['in_place'] / 1e6:10.0f} {legacy_memory} {result['in_place_memory'] / size:8.1f}  "
+                  f"{result['equal'] if legacy else '-'}")
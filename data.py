@@ -1,3 +1,6 @@
+from types import MappingProxyType
+
+
 #########################
 ##### Reinvent Data ##### 
 #########################
@@ -370,6 +373,8 @@ state_dict_UI = {
     "use_cuda":          "Scoring_use_cuda",
     "smi_files":         "Scoring_smiles_file",
     "output_csv":        "Scoring_output_csv",
+    "shards":            "Scoring_shards",
+    "num_shards":        "Scoring_num_shards",
     
     # # Scoring Components
     # "comps":             "Scoring_scor_components",
@@ -678,6 +683,7 @@ state_dict_reset = {
     "smi_file_name":       {"key": "Scoring_smiles_file", "value": "to_score"},
     "smi_file":            {"key": "Scoring_smi_file", "value": None},
     "output_csv":          {"key": "Scoring_output_csv", "value": "scored"},
+    "num_shards":          {"key": "Scoring_num_shards", "value": 10},
     
     # Scoring Components
     # #"comps":               {"key": "Scoring_scor_components", "value": []},
@@ -996,4 +1002,42 @@ chem_tokens = {
     # Mol2mol (scaffold-generic)
     "Mol2mol (scaffold-generic)": '#, =, -, /, \, (, ), [, ], 1, 2, 3, 4, 5, 6, 7, 8, Br, C, Cl, F, I, N, O, S, [C@@H], [C@@], [C@H], [C@], [N+], [N@+], [N@@+], [O-], [O], [S@@], [S@], [n+], [n-], [nH], c, n, o, s'
   }
-}
\ No newline at end of file
+}
+
+
+### Frozen lookup tables (built once per process and shared by all sessions)
+def freeze(obj):
+    """
+    Return a read-only copy of nested dictionaries (MappingProxyType) and lists (tuples).
+    Values that change during a session are kept in a per-session overlay (see functions.session_dict_UI).
+    """
+    if isinstance(obj, dict):
+        return MappingProxyType({key: freeze(value) for key, value in obj.items()})
+    if isinstance(obj, list):
+        return tuple(freeze(value) for value in obj)
+    return obj
+
+
+# Keys of the UI state of all run modes (to initialize the change_param_dict)
+state_keys_UI = tuple(state_dict_UI[run_mode][param] for run_mode in state_dict_UI.keys() for param in state_dict_UI[run_mode].keys())
+
+# Token lists of the molecule generators
+chem_token_lists = freeze({
+  "Reinvent": chem_tokens["Reinvent"].split(", "),
+  "LibInvent": chem_tokens["LibInvent"]["Scaffold"].split(", ") + chem_tokens["LibInvent"]["Decorator"].split(", "),
+  "LinkInvent": chem_tokens["LinkInvent"]["Warheads"].split(", ") + chem_tokens["LinkInvent"]["Linker"].split(", "),
+  "Mol2Mol": {mol2mol: tokens.split(", ") for mol2mol, tokens in chem_tokens["Mol2Mol"].items()}
+})
+
+# Default values of the widgets of all run modes (key: value) to save only the changed values of a UI state
+state_defaults = freeze({entry["key"]: entry["value"] for run_mode in state_dict_reset.keys() for entry in state_dict_reset[run_mode].values()})
+
+# Run mode of a widget key from its first part (e.g., "SL_num_stages" or "Staged Learning (SL)_S1_chk")
+state_key_modes = freeze({**{prefix: prefix for prefix in run_mode_prefix.values()}, **run_mode_prefix})
+
+state_dict_UI = freeze(state_dict_UI)
+state_dict_reset = freeze(state_dict_reset)
+scoring_component = freeze(scoring_component)
+transformer_defaults = freeze(transformer_defaults)
+transformers_def_param = freeze(transformers_def_param)
+chem_tokens = freeze(chem_tokens)
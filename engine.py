@@ -0,0 +1,406 @@
+########################################
+############ Python Modules ############
+########################################
+import argparse
+import csv
+import gzip
+import itertools
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from data import state_defaults, run_mode_prefix
+from input_files import input_toml, input_file_name, bash_script_text
+
+
+###########################################
+########### Input File Engine #############
+###########################################
+UI_STATE_FILE = "reinvent_UI_state.json"    # UI state of the generated input files (as saved by the REINVENT UI)
+UI_STATE_SCHEMA_VERSION = 2                 # Schema version of the UI state (see functions.save_state)
+
+
+def state_values(state):
+    """
+    Return the widget values of a UI state (the format written by functions.save_state,
+    or a legacy UI state with all widget values).
+
+    Args:
+        state (dict): The UI state.
+
+    Returns:
+        dict: The widget values (key: value).
+    """
+    if "schema_version" in state:
+        return dict(state["values"])
+    return {key: value for key, value in state.items() if key not in ("change_param_dict", "user_folder", "scratch_folder")}
+
+
+def read_state(state_file):
+    """
+    Read a UI state file (JSON, optionally gzip compressed).
+
+    Args:
+        state_file (str): The path to the UI state file.
+
+    Returns:
+        dict: The widget values (key: value).
+    """
+    with open(state_file, "rb") as f:
+        content = f.read()
+    if content[:2] == b"\x1f\x8b":
+        content = gzip.decompress(content)
+    return state_values(json.loads(content.decode()))
+
+
+def _is_integer(spec):
+    """
+    Check if a parameter range (dict with min and max) only contains integers (e.g., batch size).
+    """
+    return spec.get("integer", isinstance(spec["min"], int) and isinstance(spec["max"], int))
+
+
+def _range_value(spec, u):
+    """
+    Map a number u in [0, 1] to the value of a parameter range (linear or logarithmic scale).
+    """
+    low, high = spec["min"], spec["max"]
+    value = low * (high / low) ** u if spec.get("log") else low + (high - low) * u
+    return int(round(value)) if _is_integer(spec) else float(f"{value:.12g}")
+
+
+def sweep_values(spec):
+    """
+    Return the values of a parameter of a grid sweep.
+
+    Args:
+        spec (list or dict): The list of values, or a range as dictionary with the keys 
+                             min, max, num (number of values, default 2), log (logarithmic scale, default False)
+                             and integer (default True if min and max are integers).
+
+    Returns:
+        list: The values of the parameter.
+    """
+    if isinstance(spec, dict):
+        num = int(spec.get("num", 2))
+        values = [_range_value(spec, i / max(num - 1, 1)) for i in range(num)]
+        return list(dict.fromkeys(values))      # rounded integer ranges may contain duplicates
+    return list(spec)
+
+
+def latin_hypercube(grid, n_samples, seed=None):
+    """
+    Latin hypercube sampling of a parameter grid: the range (or list of values) of each parameter is split 
+    into n_samples strata and each stratum is sampled exactly once.
+
+    Args:
+        grid (dict): Widget keys with their list of values or range (see sweep_values).
+        n_samples (int): The number of samples.
+        seed (int, optional): The seed of the random number generator. Defaults to None.
+
+    Returns:
+        list: The widget values of each sample.
+    """
+    rng = random.Random(seed)
+    points = [{} for _ in range(n_samples)]
+    for key, spec in grid.items():
+        strata = list(range(n_samples))
+        rng.shuffle(strata)
+        for point, stratum in zip(points, strata):
+            u = (stratum + rng.random()) / n_samples
+            if isinstance(spec, dict):
+                point[key] = _range_value(spec, u)
+            else:
+                values = list(spec)
+                point[key] = values[min(int(u * len(values)), len(values) - 1)]
+    return points
+
+
+def parameter_grid(grid, method="grid", n_samples=None, seed=None):
+    """
+    Expand a parameter grid into a list of widget values.
+
+    Args:
+        grid (dict or list): Widget keys with their list of values or range (see sweep_values),
+                             or a list of dictionaries (one per input file).
+        method (str, optional): "grid" (all combinations) or "lhs" (Latin hypercube samples). Defaults to "grid".
+        n_samples (int, optional): The number of Latin hypercube samples. Defaults to None.
+        seed (int, optional): The seed of the Latin hypercube sampling. Defaults to None.
+
+    Returns:
+        list: The widget values of each input file.
+    """
+    if isinstance(grid, list):
+        return [dict(values) for values in grid]
+    if method == "lhs":
+        return latin_hypercube(grid, n_samples, seed=seed)
+    keys = list(grid.keys())
+    return [dict(zip(keys, combination)) for combination in itertools.product(*[sweep_values(grid[key]) for key in keys])]
+
+
+def write_input_files(values, output_folder, uploads=None):
+    """
+    Write the input files of a UI state into the output folder: the TOML input file, the bash run script 
+    (if enabled) and the UI state. The files are generated by input_files.py, the same code as in the UI.
+    Missing widget values are taken from the default UI state (data.state_defaults), as when the UI state is loaded in the UI.
+
+    Args:
+        values (dict): The widget values (key: value), e.g. of a UI state.
+        output_folder (str): The folder of the generated files.
+        uploads (dict, optional): The values of uploaded files (see input_files.input_toml). Defaults to None.
+
+    Returns:
+        dict: The output folder, the generated files and the error (None if successful).
+    """
+    Path(output_folder).mkdir(parents=True, exist_ok=True)
+    output_folder = str(Path(output_folder).resolve())
+    state = {**state_defaults, **values}
+    files = []
+    error = None
+    try:
+        prefix = run_mode_prefix[state.get("run_mode", "Reinforcement Learning (RL)")]
+        toml_file = os.path.join(output_folder, f"{input_file_name(state)}.toml")
+        with open(toml_file, "w") as f:
+            f.write(input_toml(state, uploads))
+        files.append(toml_file)
+        script = bash_script_text(state, prefix)
+        if script is not None:
+            script_file = os.path.join(output_folder, f"run_script_{prefix}.sh")
+            with open(script_file, "w") as f:
+                f.write(script)
+            files.append(script_file)
+        state_file = os.path.join(output_folder, UI_STATE_FILE)
+        with open(state_file, "w") as f:
+            json.dump({"schema_version": UI_STATE_SCHEMA_VERSION, "values": values}, f, separators=(",", ":"))
+        files.append(state_file)
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    return {"folder": output_folder, "files": sorted(files), "error": error}
+
+
+def _write_job(job):
+    """
+    Write the input files of one job (engine worker function).
+    """
+    values, folder, uploads = job
+    return write_input_files(values, folder, uploads)
+
+
+def generate(jobs, max_workers=None, uploads=None):
+    """
+    Generate the input files of several UI states in parallel.
+    The worker processes are started with the spawn method (never forked from a running Streamlit server),
+    with one worker the input files are generated in the calling process.
+
+    Args:
+        jobs (list): List of (widget values, output folder) tuples.
+        max_workers (int, optional): The number of worker processes. Defaults to None (number of CPUs).
+        uploads (dict, optional): The values of uploaded files of all jobs (see input_files.input_toml). Defaults to None.
+
+    Returns:
+        list: The results of write_input_files (same order as the jobs).
+    """
+    max_workers = min(max_workers or os.cpu_count() or 1, max(len(jobs), 1))
+    jobs = [(values, folder, uploads) for values, folder in jobs]
+    if max_workers == 1:
+        return [_write_job(job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        return list(pool.map(_write_job, jobs, chunksize=max(len(jobs) // (4 * max_workers), 1)))
+
+
+def sweep_jobs(base_values, points, output_dir):
+    """
+    Create the jobs of a parameter sweep (base UI state with the values of each sweep point).
+
+    Args:
+        base_values (dict): The widget values of the base UI state.
+        points (list): The widget values of each sweep point (see parameter_grid).
+        output_dir (str): The directory of the output folders (run_0001, run_0002, ...).
+
+    Returns:
+        list: List of (widget values, output folder) tuples.
+    """
+    points = points or [{}]
+    return [({**base_values, **point}, os.path.join(output_dir, f"run_{i+1:04d}")) for i, point in enumerate(points)]
+
+
+###########################################
+########### Parameter Sweeps ##############
+###########################################
+SLURM_DEFAULTS = {
+    "job_name": "reinvent_sweep",
+    "partition": "cdd_gpuq",
+    "nodes": 1,
+    "gpus_per_node": 1,
+    "time": "00-12:00:00",
+    "max_parallel": None,       # Maximal number of array tasks running at the same time (None = no limit)
+    "conda_env": "reinvent4",
+    "logfile": "logfile",
+}
+
+
+def array_ranges(indices):
+    """
+    Format array indices as SLURM array ranges (e.g., [1, 2, 3, 5] -> "1-3,5").
+    """
+    ranges = []
+    for _, group in itertools.groupby(enumerate(sorted(indices)), lambda x: x[1] - x[0]):
+        group = [index for _, index in group]
+        ranges.append(f"{group[0]}-{group[-1]}" if len(group) > 1 else str(group[0]))
+    return ",".join(ranges)
+
+
+def slurm_array_script(toml_files, **options):
+    """
+    Generate the SLURM job array script of a sweep: array task i runs the TOML input file of the folder run_<i>.
+
+    Args:
+        toml_files (dict): The name of the TOML input file of each array index (run folder) to run.
+        **options: The SLURM and run options (see SLURM_DEFAULTS).
+
+    Returns:
+        str: The bash script.
+    """
+    options = {**SLURM_DEFAULTS, **{key: value for key, value in options.items() if value is not None}}
+    array = array_ranges(toml_files) + (f"%{options['max_parallel']}" if options["max_parallel"] else "")
+    entries = "".join(f'    [{index}]="{toml_file}"\n' for index, toml_file in sorted(toml_files.items()))
+    return (
+        "#!/bin/bash\n"
+        f"#SBATCH --job-name={options['job_name']}\n"
+        f"#SBATCH --partition={options['partition']}\n"
+        f"#SBATCH --nodes={options['nodes']}\n"
+        f"#SBATCH --gpus-per-node={options['gpus_per_node']}\n"
+        f"#SBATCH --time={options['time']}\n"
+        f"#SBATCH --array={array}\n"
+        "#SBATCH --output=slurm-%A_%a.out\n\n"
+        "# TOML input file of each array task (parameters of each task in manifest.csv)\n"
+        "declare -A TOML_FILES=(\n"
+        f"{entries}"
+        ")\n\n"
+        "# run folder of this array task\n"
+        'RUN_DIR=$(printf "run_%04d" "$SLURM_ARRAY_TASK_ID")\n'
+        'cd "${SLURM_SUBMIT_DIR}/${RUN_DIR}" || exit 1\n\n'
+        "# activate the conda environment where the reinvent4 package is installed\n"
+        f"conda activate {options['conda_env']}\n\n"
+        "# run the reinvent calculation\n"
+        f'reinvent -l {options["logfile"]}.log "${{TOML_FILES[$SLURM_ARRAY_TASK_ID]}}"\n'
+    )
+
+
+def write_manifest(manifest_file, jobs, points, results):
+    """
+    Write the manifest of a sweep (CSV file): array index, run folder, status, TOML input file and swept parameters.
+
+    Args:
+        manifest_file (str): The path to the manifest file.
+        jobs (list): The jobs of the sweep (see sweep_jobs).
+        points (list): The swept widget values of each job.
+        results (list): The results of the jobs (see write_input_files).
+    """
+    keys = list(dict.fromkeys(key for point in points for key in point))
+    with open(manifest_file, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["array_index", "folder", "status", "toml_file"] + keys)
+        for i, ((_, folder), point, result) in enumerate(zip(jobs, points, results)):
+            tomls = [os.path.basename(file) for file in result["files"] if file.endswith(".toml")]
+            status = "error" if result["error"] or not tomls else "ok"
+            writer.writerow([i + 1, os.path.basename(folder), status, tomls[0] if tomls else ""] 
+                            + [point.get(key, "") for key in keys])
+
+
+def build_sweep(base_values, grid, output_dir, method="grid", n_samples=None, seed=None, slurm=None, 
+                zip_file=None, max_workers=None, uploads=None):
+    """
+    Generate a parameter sweep: one input folder per grid point (or Latin hypercube sample), the manifest CSV file,
+    optionally one SLURM job array script running all input files and a zip file of the whole sweep.
+
+    Args:
+        base_values (dict): The widget values of the base UI state.
+        grid (dict or list): The parameter grid (see parameter_grid).
+        output_dir (str): The directory of the sweep.
+        method (str, optional): "grid" or "lhs" (see parameter_grid). Defaults to "grid".
+        n_samples (int, optional): The number of Latin hypercube samples. Defaults to None.
+        seed (int, optional): The seed of the Latin hypercube sampling. Defaults to None.
+        slurm (dict, optional): The options of the SLURM job array script (see SLURM_DEFAULTS). Defaults to None (no script).
+        zip_file (str, optional): The path to the zip file of the sweep (outside of output_dir). Defaults to None (no zip file).
+        max_workers (int, optional): The number of worker processes. Defaults to None (number of CPUs).
+        uploads (dict, optional): The values of uploaded files (see input_files.input_toml). Defaults to None.
+
+    Returns:
+        dict: The results of the jobs and the paths to the manifest, script and zip files.
+    """
+    output_dir = os.path.abspath(output_dir)
+    os.makedirs(output_dir, exist_ok=True)
+    points = parameter_grid(grid, method=method, n_samples=n_samples, seed=seed) if grid else [{}]
+    jobs = sweep_jobs(base_values, points, output_dir)
+    results = generate(jobs, max_workers=max_workers, uploads=uploads)
+    sweep = {"results": results, "manifest": os.path.join(output_dir, "manifest.csv"), "script": None, "zip": None}
+    write_manifest(sweep["manifest"], jobs, points, results)
+
+    if slurm is not None:
+        # TOML input file of each successful run (the file name itself may be swept)
+        toml_files = {i + 1: os.path.basename(file) for i, result in enumerate(results) if not result["error"]
+                      for file in result["files"] if file.endswith(".toml")}
+        if toml_files:
+            sweep["script"] = os.path.join(output_dir, "run_sweep.sh")
+            with open(sweep["script"], "w") as f:
+                f.write(slurm_array_script(toml_files, **slurm))
+            os.chmod(sweep["script"], 0o755)
+
+    if zip_file is not None:
+        zip_base = os.path.splitext(os.path.abspath(zip_file))[0]
+        sweep["zip"] = shutil.make_archive(zip_base, "zip", root_dir=os.path.dirname(output_dir), 
+                                           base_dir=os.path.basename(output_dir))
+    return sweep
+
+
+#########################################
+################# Main ##################
+#########################################
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate REINVENT input files from UI states without Streamlit (headless).")
+    parser.add_argument("state", help="UI state file (.json or .json.gz) saved in the REINVENT UI")
+    parser.add_argument("-o", "--output", default="reinvent_inputs", help="Output directory")
+    parser.add_argument("-g", "--grid", help="""Parameter grid (JSON file): widget keys with lists of values or ranges 
+                                                ({"min": 1e-5, "max": 1e-3, "num": 5, "log": true}),
+                                                or a list of widget values (one input file each)""")
+    parser.add_argument("--lhs", type=int, metavar="N", help="Draw N Latin hypercube samples of the grid instead of all combinations")
+    parser.add_argument("--seed", type=int, default=None, help="Seed of the Latin hypercube sampling")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="Number of worker processes (default: number of CPUs)")
+    slurm = parser.add_argument_group("SLURM job array")
+    slurm.add_argument("--slurm", action="store_true", help="Write one SLURM job array script (run_sweep.sh) for all input files")
+    for option, value in SLURM_DEFAULTS.items():
+        slurm.add_argument(f"--{option.replace('_', '-')}", type=type(value) if value is not None else int, default=None, 
+                           help=f"(default: {value})")
+    parser.add_argument("--zip", action="store_true", help="Bundle the sweep into a zip file (<output>.zip)")
+    args = parser.parse_args(argv)
+
+    grid = None
+    if args.grid:
+        with open(args.grid) as f:
+            grid = json.load(f)
+    output = os.path.abspath(args.output)
+    sweep = build_sweep(read_state(args.state), grid, output, method="lhs" if args.lhs else "grid", n_samples=args.lhs, 
+                        seed=args.seed, slurm={option: getattr(args, option) for option in SLURM_DEFAULTS} if args.slurm else None,
+                        zip_file=output + ".zip" if args.zip else None, max_workers=args.workers)
+    results = sweep["results"]
+    failed = 0
+    for result in results:
+        if result["error"]:
+            failed += 1
+            print(f"FAILED {result['folder']}: {result['error']}")
+        else:
+            print(f"{result['folder']}: {', '.join(os.path.basename(file) for file in result['files'])}")
+    print(f"{len(results) - failed} of {len(results)} input folders generated.")
+    for name in ("manifest", "script", "zip"):
+        if sweep[name]:
+            print(f"{name.capitalize()}: {sweep[name]}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,21 +3,40 @@
 ########################################
 import numpy as np
 import pandas as pd 
-import rdkit
-from rdkit import Chem
-from rdkit.Chem import rdDepictor
-from rdkit.Chem.Draw import rdMolDraw2D
 import streamlit as st 
+# RDKit is imported inside the functions using it (faster start-up of the pages)
 import zipfile
 import io
 import os 
 import base64
 import json
+import gzip
 import shutil
+import stat
+import tempfile
+import time
+import logging
+import hashlib
+import secrets
+import re
+import threading
+import importlib
+import sys
+import types
+import itertools
+import operator
+from collections import OrderedDict, ChainMap, Counter
+from collections.abc import Mapping
+from functools import lru_cache
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
 from datetime import datetime
 from datetime import timedelta
 from data import * 
+from transforms import * 
+from input_files import *
 
 # Path for Parent Working Directory (Dir: reinvent4)
 pwd = os.getcwd()                            
@@ -25,55 +44,514 @@ pwd = os.getcwd()
 #########################################
 ######### Python Functions ##############
 #########################################
-def clean_folder(base_dir, age_limit=1):
+logger = logging.getLogger(__name__)
+
+JANITOR_INTERVAL = 3600         # Seconds between two clean ups of the temp_files folder
+JANITOR_QUOTA = None            # Maximal size (bytes) of the user folders (None = no quota)
+JANITOR_MIN_AGE = 3600          # Seconds a folder is protected from the quota (active sessions)
+
+
+def folder_datetime(folder_path):
+    """
+    Return the creation time of a user folder from its name (user_YYYY-MM-DD-HH-MM-SS[_...]). 
+    If the name has no timestamp, the modification time of the folder is used.
+    """
+    try:
+        return datetime.strptime(os.path.basename(folder_path).split("_")[1], "%Y-%m-%d-%H-%M-%S")
+    except (IndexError, ValueError):
+        return datetime.fromtimestamp(os.path.getmtime(folder_path))
+
+
+def folder_size(folder_path, seen=None):
+    """
+    Return the size (bytes) of all files in a folder. Hardlinked files (e.g., uploads shared through the blob store) 
+    are counted once: files whose inode is in seen are skipped and the counted inodes are added to seen.
+    """
+    seen = set() if seen is None else seen
+    size = 0
+    for root, _, files in os.walk(folder_path):
+        for file in files:
+            try:
+                file_stat = os.lstat(os.path.join(root, file))
+            except OSError:
+                continue
+            if file_stat.st_nlink > 1:
+                inode = (file_stat.st_dev, file_stat.st_ino)
+                if inode in seen:
+                    continue
+                seen.add(inode)
+            size += file_stat.st_size
+    return size
+
+
+def remove_readonly(func, path, exc_info):
+    """
+    Error handler of shutil.rmtree: make a read-only file (e.g., a hardlinked blob) writable and retry,
+    since read-only files cannot be deleted on Windows. Other errors are logged and ignored.
+    """
+    try:
+        os.chmod(path, stat.S_IWRITE)
+        func(path)
+    except OSError as e:
+        logger.warning("Could not delete %s: %s", path, e)
+
+
+def clean_folder(base_dir, age_limit=1, quota=None):
     """
-    Clean up folders older than a specified time (e.g., 1 day).
+    Clean up user folders older than a specified time (e.g., 1 day). If a disk quota is given, 
+    the oldest folders are also deleted until the user folders fit into the quota.
+    The timing and the number of deleted folders/bytes are logged.
 
     Args:
         base_dir (str): The base directory containing folders to clean.
         age_limit (int): The age limit in days for folders to be deleted. Defaults to 1 day.
+        quota (int, optional): The maximal size (bytes) of all user folders. Defaults to None (no quota).
 
     Returns:
-        None
+        dict: The number of deleted folders, freed bytes and deleted blobs.
     """
+    start = time.perf_counter()
     now = datetime.now()
-    for folder in os.listdir(base_dir):
-        folder_path = os.path.join(base_dir, folder)
-        if os.path.isdir(folder_path):
-            # Extract timestamp from folder name
-            folder_time = folder.split("_")[-1]  # Assuming "user_TIMESTAMP"
-            folder_datetime = datetime.strptime(folder_time, "%Y-%m-%d-%H-%M-%S")
-            # Check folder age
-            if now - folder_datetime > timedelta(days=age_limit):
-                shutil.rmtree(folder_path)
-                st.write(f"Deleted old folder: {folder_path}")
+    # Only user sub-folders are cleaned (e.g., the depiction cache is kept), oldest first
+    folders = sorted((folder_datetime(os.path.join(base_dir, folder)), os.path.join(base_dir, folder)) 
+                     for folder in os.listdir(base_dir) 
+                     if folder.startswith("user_") and os.path.isdir(os.path.join(base_dir, folder)))
+    stats = {"folders": 0, "bytes": 0, "blobs": 0}
+    kept = []
+    # Inodes already counted (a blob linked into several folders is counted once)
+    seen = set()
+    for folder_time, folder_path in folders:
+        if now - folder_time > timedelta(days=age_limit):
+            stats["bytes"] += folder_size(folder_path, seen)
+            shutil.rmtree(folder_path, onerror=remove_readonly)
+            stats["folders"] += 1
+        else:
+            kept.append((folder_time, folder_path))
+
+    # Disk quota (evict the oldest folders first)
+    if quota is not None:
+        seen = set()
+        sizes = [folder_size(folder_path, seen) for _, folder_path in kept]
+        total = sum(sizes)
+        for (folder_time, folder_path), size in zip(kept, sizes):
+            if total <= quota:
+                break
+            if now - folder_time < timedelta(seconds=JANITOR_MIN_AGE):
+                continue
+            shutil.rmtree(folder_path, onerror=remove_readonly)
+            total -= size
+            stats["bytes"] += size
+            stats["folders"] += 1
+
+    # Delete the uploaded files that are no longer used by any user folder
+    if stats["folders"]:
+        stats["blobs"] = gc_blobs(os.path.join(base_dir, "blobs"))
+    logger.info("Cleaned %s: deleted %d folders (%d bytes) and %d blobs in %.3f s", 
+                base_dir, stats["folders"], stats["bytes"], stats["blobs"], time.perf_counter() - start)
+    return stats
+
+
+class TempJanitor(threading.Thread):
+    """
+    Background thread cleaning up the temp_files folder at a regular interval (see clean_folder).
+
+    Args:
+        base_dir (str): The base directory containing folders to clean.
+        interval (float): The number of seconds between two clean ups.
+        age_limit (int): The age limit in days for folders to be deleted.
+        quota (int, optional): The maximal size (bytes) of all user folders. 
+    """
+    def __init__(self, base_dir, interval=JANITOR_INTERVAL, age_limit=1, quota=JANITOR_QUOTA):
+        super().__init__(name="temp-janitor", daemon=True)
+        self.base_dir = base_dir
+        self.interval = interval
+        self.age_limit = age_limit
+        self.quota = quota
+        self.stop_event = threading.Event()
+
+    def run(self):
+        while True:
+            try:
+                clean_folder(self.base_dir, age_limit=self.age_limit, quota=self.quota)
+            except Exception:
+                logger.exception("Clean up of %s failed", self.base_dir)
+            if self.stop_event.wait(self.interval):
+                break
+
+    def stop(self):
+        """
+        Stop the janitor after the current clean up.
+        """
+        self.stop_event.set()
+
+
+@st.cache_resource
+def start_janitor(base_dir, interval=JANITOR_INTERVAL, age_limit=1, quota=JANITOR_QUOTA):
+    """
+    Start the background janitor of the temp_files folder (once per server process).
+
+    Args:
+        base_dir (str): The base directory containing folders to clean.
+        interval (float, optional): The number of seconds between two clean ups. Defaults to JANITOR_INTERVAL.
+        age_limit (int, optional): The age limit in days for folders to be deleted. Defaults to 1 day.
+        quota (int, optional): The maximal size (bytes) of all user folders. Defaults to JANITOR_QUOTA.
+
+    Returns:
+        TempJanitor: The running janitor thread.
+    """
+    janitor = TempJanitor(base_dir, interval=interval, age_limit=age_limit, quota=quota)
+    janitor.start()
+    return janitor
+
+
+def file_digest(file, block_size=1024*1024):
+    """
+    Compute the SHA-256 hash of a file by reading it in blocks.
+
+    Args:
+        file (str or UploadedFile): The path to the file or a file-like object (e.g., an uploaded file).
+        block_size (int, optional): The number of bytes read per block. Defaults to 1 MB.
+
+    Returns:
+        str: The hexadecimal SHA-256 hash of the file content.
+    """
+    sha256 = hashlib.sha256()
+    if hasattr(file, "read"):
+        file.seek(0)
+        for block in iter(lambda: file.read(block_size), b""):
+            sha256.update(block)
+        file.seek(0)
+    else:
+        with open(file, "rb") as f:
+            for block in iter(lambda: f.read(block_size), b""):
+                sha256.update(block)
+    return sha256.hexdigest()
+
+
+WORKSPACE_QUOTA = 5 * 1024**3      # Maximal size (bytes) of the files of one session (None = no quota)
+WORKSPACE_SCRATCH = os.environ.get("REINVENT_UI_SCRATCH", "/dev/shm") or None   # In-memory file system (tmpfs) for small files, e.g. TOML files (None = disk only)
+WORKSPACE_USAGE_TTL = 60           # Seconds the measured size of a workspace is reused by has_space (uploads are added in between)
+
+
+def private_folder(path):
+    """
+    Create a folder only accessible by the current user (mode 0700), e.g. in the shared /dev/shm.
+    An existing folder is only used if it is a real folder of the current user.
+
+    Args:
+        path (str): The path of the folder.
+
+    Returns:
+        str: The path of the folder or None if the folder belongs to another user.
+    """
+    try:
+        os.mkdir(path, mode=0o700)
+    except FileExistsError:
+        pass
+    folder_stat = os.lstat(path)
+    if (not stat.S_ISDIR(folder_stat.st_mode)) or (hasattr(os, "getuid") and folder_stat.st_uid != os.getuid()):
+        logger.warning("Scratch folder %s is not a folder of the current user, the scratch folders are disabled", path)
+        return None
+    os.chmod(path, 0o700)
+    return path
+
+
+class WorkspaceManager:
+    """
+    Allocate the user folders (workspaces) of the sessions in the temp_files folder. 
+    Each workspace gets a unique name (user_YYYY-MM-DD-HH-MM-SS_<random hex>), 
+    its size is checked against a quota and small files can be written to an in-memory scratch folder.
+    The scratch folders are only accessible by the user running the server (mode 0700).
+
+    Args:
+        base_dir (str): The base directory of the workspaces.
+        quota (int, optional): The maximal size (bytes) of a workspace. Defaults to WORKSPACE_QUOTA.
+        scratch_root (str, optional): The tmpfs directory for scratch folders. Defaults to WORKSPACE_SCRATCH.
+    """
+    def __init__(self, base_dir, quota=WORKSPACE_QUOTA, scratch_root=WORKSPACE_SCRATCH):
+        self.base_dir = base_dir
+        self.quota = quota
+        self.scratch_root = None
+        # Measured size of the workspaces (workspace: [bytes, time of the measurement])
+        self._usage = {}
+        self._lock = threading.Lock()
+        Path(base_dir).mkdir(exist_ok=True)
+        if scratch_root and os.path.isdir(scratch_root) and os.access(scratch_root, os.W_OK):
+            self.scratch_root = private_folder(os.path.join(scratch_root, "reinvent_ui"))
+
+    def allocate(self):
+        """
+        Create a new workspace with a unique name and return its path.
+        """
+        while True:
+            timestamp = datetime.now().strftime("%Y-%m-%d-%H-%M-%S")
+            path = os.path.join(self.base_dir, f"user_{timestamp}_{secrets.token_hex(4)}")
+            try:
+                os.mkdir(path)
+                return path
+            except FileExistsError:
+                continue
+
+    def scratch(self, workspace):
+        """
+        Return the in-memory scratch folder of a workspace (the workspace itself if no tmpfs is available).
+        """
+        if self.scratch_root is None:
+            return workspace
+        path = os.path.join(self.scratch_root, os.path.basename(workspace))
+        Path(path).mkdir(mode=0o700, exist_ok=True)
+        return path
+
+    def usage(self, workspace):
+        """
+        Return the size (bytes) of the files of a workspace (including its scratch folder).
+        """
+        size = folder_size(workspace)
+        if self.scratch_root is not None:
+            size += folder_size(os.path.join(self.scratch_root, os.path.basename(workspace)))
+        return size
+
+    def has_space(self, workspace, size):
+        """
+        Check if a file of a given size (bytes) still fits into the quota of a workspace.
+        The workspace is only walked every WORKSPACE_USAGE_TTL seconds, the accepted files are added in between.
+        """
+        if self.quota is None:
+            return True
+        with self._lock:
+            now = time.monotonic()
+            usage = self._usage.get(workspace)
+            if (usage is None) or (now - usage[1] > WORKSPACE_USAGE_TTL):
+                # Expired measurements (e.g., of closed sessions) are dropped
+                self._usage = {path: entry for path, entry in self._usage.items() if now - entry[1] <= WORKSPACE_USAGE_TTL}
+                usage = self._usage[workspace] = [self.usage(workspace), now]
+            if usage[0] + size > self.quota:
+                return False
+            usage[0] += size
+            return True
+
+
+@st.cache_resource
+def get_workspace_manager(base_dir, quota=WORKSPACE_QUOTA, scratch_root=WORKSPACE_SCRATCH):
+    """
+    Return the workspace manager of a base directory (shared by all sessions).
+    """
+    return WorkspaceManager(base_dir, quota=quota, scratch_root=scratch_root)
+
+
+def user_workspace(base_dir):
+    """
+    Return the workspace (user folder) of the session, allocated on the first run of the session.
+    The paths of the workspace and of its scratch folder are stored in st.session_state 
+    ("user_folder" and "scratch_folder").
+
+    Args:
+        base_dir (str): The base directory of the workspaces (temp_files folder).
+
+    Returns:
+        str: The path of the user folder.
+    """
+    manager = get_workspace_manager(base_dir)
+    if "user_folder" not in st.session_state:
+        st.session_state.user_folder = manager.allocate()
+    # Re-create the folders if they were cleaned up during the session
+    Path(st.session_state.user_folder).mkdir(exist_ok=True)
+    st.session_state.scratch_folder = manager.scratch(st.session_state.user_folder)
+    return st.session_state.user_folder
+
+
+BLOB_STORE_DIR = os.path.join(pwd, "temp_files", "blobs")    # Shared content-addressed store of uploaded files
+UPLOAD_BLOBS_MAX = 256                                       # Number of uploads whose blob path is remembered
+_upload_blobs = OrderedDict()                                # file_id of an upload: blob path
+# Held while a blob is stored and linked or checked and deleted (the janitor thread runs gc_blobs)
+BLOB_LOCK = threading.RLock()
+
+
+def blob_path(digest, blob_dir=BLOB_STORE_DIR):
+    """
+    Return the path of a blob in the blob store (blob_dir/<first 2 characters of hash>/<hash>).
+    """
+    return os.path.join(blob_dir, digest[:2], digest)
+
+
+def store_blob(file, blob_dir=BLOB_STORE_DIR, block_size=1024*1024):
+    """
+    Store a file in the content-addressed blob store, where files are named by their SHA-256 hash. 
+    The file is hashed in blocks first and only written if the store does not contain it yet.
+    Blobs are read-only since they are shared between the user folders (hardlinks).
+
+    Args:
+        file (UploadedFile): A file-like object (e.g., an uploaded file).
+        blob_dir (str, optional): The directory of the blob store. Defaults to BLOB_STORE_DIR.
+        block_size (int, optional): The number of bytes read per block. Defaults to 1 MB.
+
+    Returns:
+        str: The path of the blob.
+    """
+    path = blob_path(file_digest(file, block_size=block_size), blob_dir)
+    if not os.path.exists(path):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        # Write into a temporary file first (concurrent uploads of the same file are safe)
+        fd, temp_path = tempfile.mkstemp(dir=Path(path).parent, suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for block in iter(lambda: file.read(block_size), b""):
+                    f.write(block)
+            os.chmod(temp_path, 0o444)
+            os.replace(temp_path, path)
+        finally:
+            file.seek(0)
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+    return path
+
+
+def link_blob(path, dest):
+    """
+    Hardlink a blob into a (user) folder. If hardlinks are not supported (e.g., other file system), the blob is copied.
+
+    Args:
+        path (str): The path of the blob.
+        dest (str): The destination path.
+
+    Returns:
+        str: The destination path.
+    """
+    if os.path.exists(dest):
+        if os.path.samefile(path, dest):
+            return dest
+        os.remove(dest)
+    try:
+        os.link(path, dest)
+    except OSError:
+        shutil.copyfile(path, dest)
+    return dest
+
+
+def link_upload(file, dest, blob=None, blob_dir=BLOB_STORE_DIR):
+    """
+    Store an uploaded file in the blob store (if needed) and hardlink it into a (user) folder.
+    The blob lock is held until the blob is linked, so gc_blobs cannot delete an unreferenced blob in between.
+
+    Args:
+        file (UploadedFile): A file-like object (e.g., an uploaded file).
+        dest (str): The destination path.
+        blob (str, optional): The path of the blob if the upload was already stored. Defaults to None.
+        blob_dir (str, optional): The directory of the blob store. Defaults to BLOB_STORE_DIR.
+
+    Returns:
+        str: The path of the blob.
+    """
+    with BLOB_LOCK:
+        if (blob is None) or (not os.path.exists(blob)):
+            blob = store_blob(file, blob_dir)
+        link_blob(blob, dest)
+    return blob
+
+
+def blob_refcount(path):
+    """
+    Return the number of user folders referencing a blob (number of hardlinks besides the blob itself).
+    """
+    return os.stat(path).st_nlink - 1
+
+
+def gc_blobs(blob_dir=BLOB_STORE_DIR):
+    """
+    Delete the blobs that are no longer referenced by any user folder.
+
+    Args:
+        blob_dir (str, optional): The directory of the blob store. Defaults to BLOB_STORE_DIR.
+
+    Returns:
+        int: The number of deleted blobs.
+    """
+    deleted = 0
+    if not os.path.isdir(blob_dir):
+        return deleted
+    for prefix in os.listdir(blob_dir):
+        prefix_path = os.path.join(blob_dir, prefix)
+        if not os.path.isdir(prefix_path):
+            continue
+        for blob in os.listdir(prefix_path):
+            path = os.path.join(prefix_path, blob)
+            if blob.endswith(".part"):
+                continue
+            with BLOB_LOCK:
+                if os.path.exists(path) and (blob_refcount(path) == 0):
+                    # Blobs are read-only (os.remove fails for read-only files on Windows)
+                    os.chmod(path, stat.S_IWRITE)
+                    os.remove(path)
+                    deleted += 1
+    return deleted
 
 
 ###########################################
 ###### Streamlit Functions (v1.40) ######
 ###########################################
-def save_state(state, file_name):
+STATE_SCHEMA_VERSION = 2
+# Session state entries that are not widget values (not saved in a UI state)
+STATE_INTERNAL_KEYS = {"change_param_dict", "state_overlay", "zip_bundle", "sweep_zip", "scoring_shards", "scoring_preview", "descriptor_cache", "summary_rescore", "toml_sections", "user_folder", "scratch_folder"}
+
+
+def is_default_state(key, value, defaults):
+    """
+    Check if a widget value is its default value (not saved in a UI state).
+    Data editors without edits are also considered as default.
+    """
+    if (key in defaults) and (defaults[key] == value):
+        return True
+    if isinstance(value, dict) and (set(value.keys()) <= {"edited_rows", "added_rows", "deleted_rows"}):
+        return not any(value.values())
+    return False
+
+
+def ui_state_values(state):
+    """
+    Return the widget values of a state dictionary that differ from their default values (content of a UI state).
+
+    Args:
+        state (dict): The state dictionary containing UI widget values.
+
+    Returns:
+        dict: The changed widget values (key: value).
+    """
+    # Default values of data.py and of the widgets added during the session (e.g., scoring components)
+    defaults = dict(state_defaults)
+    for overlay in state.get("state_overlay", {}).get("state_dict_reset", {}).values():
+        defaults.update({entry["key"]: entry["value"] for entry in overlay.values()})
+    return {key: value for key, value in state.items() 
+            if (key not in STATE_INTERNAL_KEYS) and isinstance(value, (str, int, float, bool, list, dict, type(None))) 
+            and not is_default_state(key, value, defaults)}
+
+
+def save_state(state, file_name, compress=False):
     """
     Save the values of the widgets of the UI app into a JSON file.
+    Only the values that differ from the default values (state_dict_reset) are saved, 
+    together with the schema version of the UI state.
 
     Args:
         state (dict): The state dictionary containing UI widget values.
         file_name (str): The name of the file to save the state to.
+        compress (bool, optional): Whether to compress the JSON file with gzip. Defaults to False.
 
     Returns:
-        str: The JSON string representation of the state.    
+        str or bytes: The JSON string representation of the state (gzip compressed bytes if compress).    
     """
-    del state["change_param_dict"]
+    json_str = json.dumps({"schema_version": STATE_SCHEMA_VERSION, "values": ui_state_values(state)}, separators=(",", ":"))
+    data = gzip.compress(json_str.encode()) if compress else json_str
     UI_file_path = Path(state["user_folder"]) / file_name
-    with open(UI_file_path, 'w') as json_file:
-        json.dump(state, json_file, indent=4)
-    json_str = json.dumps(state, indent=4)
-    return json_str
+    with open(UI_file_path, "wb" if compress else "w") as json_file:
+        json_file.write(data)
+    return data
 
 
 def load_state(state_file):
     """
-    Load the values of the widgets of the UI from a JSON file.
+    Load the values of the widgets of the UI from a JSON file (optionally gzip compressed).
+    UI states saved with a schema version only contain the changed values, 
+    so they are applied on top of the default values of all widgets.
 
     Args:
         state_file (UploadedFile): The uploaded file containing the state in JSON format.
@@ -82,24 +560,18 @@ def load_state(state_file):
         dict: The state dictionary containing UI widget values.  
     """
     file_content = state_file.getvalue()
+    if file_content[:2] == b"\x1f\x8b":
+        file_content = gzip.decompress(file_content)
     state_dict = json.loads(file_content.decode())
+    if "schema_version" in state_dict:
+        state_dict = {**state_defaults, **state_dict["values"]}
 
     # Check what kind of run modes are available in the loaded UI state. 
-    state_dict_modes = set()
-    for key in state_dict.keys():
-        if key.startswith("Scoring"):
-            state_dict_modes.add("Scoring")
-        elif key.startswith("Sampling"):
-            state_dict_modes.add("Sampling")
-        elif key.startswith("TL"):
-            state_dict_modes.add("TL")
-        elif key.startswith("RL"):
-            state_dict_modes.add("RL")
-        elif key.startswith("SL"):
-            state_dict_modes.add("SL")
+    state_dict_modes = {state_key_modes[key.split("_", 1)[0]] for key in state_dict.keys() 
+                        if (key.split("_", 1)[0] in state_key_modes) and not is_default_state(key, state_dict[key], state_defaults)}
     # Inform the user about the run modes contained in the loaded UI and the current selected run mode. 
     st.info(f"""
-            * The loaded UI state contains parameters for the following run modes: {", ".join(list(state_dict_modes))}\n 
+            * The loaded UI state contains parameters for the following run modes: {", ".join(sorted(state_dict_modes))}\n 
             * The current selected run mode: **{st.session_state["run_mode"]}**
             """, 
             icon="ℹ️") 
@@ -123,19 +595,19 @@ def change_param(parameter, change_param_dict, state_dict, state, key, add_key=F
         any: The updated parameter.
     """
     if add_key:
-        if key not in state_dict_UI[st.session_state["run_mode"]].keys():
-            state_dict_UI[st.session_state["run_mode"]][key] = key
+        state_UI = session_dict_UI()
+        if key not in state_UI:
+            state_UI[key] = key
         if key not in change_param_dict.keys():
             change_param_dict[key] = True
         
     if (state != None) & (change_param_dict != None):
         if (state) & (change_param_dict[key]):
-            try:
+            if key in state_dict:
                 parameter = state_dict[key]
-                del st.session_state[key]
-                st.session_state[key] = state_dict[key]
-            except:
-               pass
+                if key in st.session_state:
+                    del st.session_state[key]
+                    st.session_state[key] = state_dict[key]
             change_param_dict[key] = False 
 
     return parameter
@@ -151,26 +623,130 @@ def reset_values(run_mode):
     Returns:
         None
     """
-    for key in state_dict_reset[run_mode].keys():
-        key, value = state_dict_reset[run_mode][key]["key"], state_dict_reset[run_mode][key]["value"]
+    for entry in session_dict_reset(run_mode).values():
+        key, value = entry["key"], entry["value"]
         # del st.session_state[key]
         st.session_state[key] = value
     st.rerun()
 
 
+def session_overlay(table, run_mode=None):
+    """
+    Return the session view of a UI state table of data.py (state_dict_UI or state_dict_reset) for a run mode.
+    The tables of data.py are read-only and shared by all sessions. The keys added during a session 
+    (e.g., scoring components, stages) are stored in an overlay dictionary in st.session_state.
+
+    Args:
+        table (str): The name of the table ("state_dict_UI" or "state_dict_reset").
+        run_mode (str, optional): The run mode. Defaults to the current run mode (st.session_state["run_mode"]).
+
+    Returns:
+        ChainMap: The session overlay (written to) in front of the read-only table of data.py.
+    """
+    run_mode = st.session_state["run_mode"] if run_mode is None else run_mode
+    overlays = st.session_state.setdefault("state_overlay", {})
+    overlay = overlays.setdefault(table, {}).setdefault(run_mode, {})
+    return ChainMap(overlay, {"state_dict_UI": state_dict_UI, "state_dict_reset": state_dict_reset}[table][run_mode])
+
+
+def session_dict_UI(run_mode=None):
+    """
+    Return the session view of state_dict_UI for a run mode (see session_overlay).
+    """
+    return session_overlay("state_dict_UI", run_mode)
+
+
+def session_dict_reset(run_mode=None):
+    """
+    Return the session view of state_dict_reset for a run mode (see session_overlay).
+    """
+    return session_overlay("state_dict_reset", run_mode)
+
+
+def init_change_param_dict():
+    """
+    Return a new change_param_dict (all UI state keys of data.py and of the session set to True).
+
+    Returns:
+        dict: The change parameter dictionary.
+    """
+    change_param_dict = dict.fromkeys(state_keys_UI, True)
+    for overlay in st.session_state.get("state_overlay", {}).get("state_dict_UI", {}).values():
+        change_param_dict.update(dict.fromkeys(overlay.values(), True))
+    return change_param_dict
+
+
+class TomlDocument:
+    """
+    In-memory builder of a TOML input file. The lines are collected in memory, 
+    written to disk once (save) and shown to the user as one code block (show).
+
+    Args:
+        path (str or Path): The path of the TOML input file.
+    """
+    def __init__(self, path):
+        self.path = Path(path)
+        self.lines = []
+
+    def write(self, text, empty_line=False):
+        """
+        Add a text (one or several lines) to the document.
+        """
+        # Clean text from backslashes (Markdown escapes)
+        self.lines.append(text[1:] if text.startswith("\\") else text)
+        if empty_line:
+            self.lines.append("\n")
+
+    def text(self):
+        """
+        Return the content of the document.
+        """
+        return "".join(self.lines)
+
+    def save(self):
+        """
+        Write the document to its file.
+        """
+        with open(self.path, "w") as f:
+            f.write(self.text())
+        return self.path
+
+    def show(self, col):
+        """
+        Show the document as one code block in a Streamlit column.
+        """
+        col.code(self.text(), language="toml")
+
+
+def toml_sections():
+    """
+    Return the cache of the TOML sections of the session (see input_files.section_cache), 
+    so a rerun only generates the sections whose widget values changed.
+
+    Returns:
+        dict: The cache of the TOML sections.
+    """
+    return st.session_state.setdefault("toml_sections", {})
+
+
 def write_show(text, file, col, empty_line=False, display=True):
     """
-    Write a text into a file and display it to the user.
+    Write a text into a file (or a TOML document) and display it to the user.
+    For a TomlDocument, the text is only added to the document (displayed with TomlDocument.show).
 
     Args:
         text (str): The text to write and display.
-        file (str): The file path to write the text to.
+        file (str or TomlDocument): The file path or the TOML document to write the text to.
         col (streamlit.columns): The Streamlit column to display the text in.
         empty_line (bool, optional): Whether to add an empty line after the text. Defaults to False.
 
     Returns:
         None
     """
+    if isinstance(file, TomlDocument):
+        file.write(text, empty_line=empty_line)
+        return
+
     # Clean text from backslashes
     text_clean = text[1:] if text.startswith("\\") else text
     # Display text to user
@@ -188,6 +764,7 @@ def write_show(text, file, col, empty_line=False, display=True):
 def save_uploaded_file(uploaded_file, save_folder): 
     """ 
     Save an uploaded file to a specified folder (e.g., User's temp folder). 
+    The file is stored once in the shared blob store and hardlinked into the folder.
 
     Args:
         uploaded_file (UploadedFile): The file uploaded through the Streamlit file uploader.
@@ -198,47 +775,33 @@ def save_uploaded_file(uploaded_file, save_folder):
     """ 
     save_path = os.path.join(save_folder, uploaded_file.name) 
     try: 
-        with open(save_path, "wb") as f: 
-            f.write(uploaded_file.getbuffer()) 
-            return save_path 
+        # The same upload is only hashed once (the script re-runs after every widget change)
+        file_id = getattr(uploaded_file, "file_id", None)
+        blob = _upload_blobs.get(file_id)
+        if (blob is not None) and os.path.exists(save_path) and os.path.samefile(blob, save_path):
+            return save_path
+        # Quota of the user folder 
+        manager = get_workspace_manager(str(Path(save_folder).parent))
+        if not manager.has_space(save_folder, uploaded_file.size):
+            st.error(f"Error saving file: the quota of your workspace ({manager.quota / 1024**3:.1f} GB) is exceeded.")
+            return None
+        blob = link_upload(uploaded_file, save_path, blob=blob)
+        if file_id is not None:
+            _upload_blobs[file_id] = blob
+            while len(_upload_blobs) > UPLOAD_BLOBS_MAX:
+                _upload_blobs.popitem(last=False)
+        return save_path
     except Exception as e: 
         st.error(f"Error saving file: {e}") 
         return None
 
 
-def write_scor_component(component, toml_input, col, stages=False):
-    """
-    Write the headers for a scoring component to the TOML input file.
-
-    Args:
-        component (str): The name of the scoring component.
-        toml_input (str): The TOML input file path.
-        col (streamlit.columns): The Streamlit column to show the headers for the user in.
-        stages (bool, optional): Whether the scoring component is for stages. Defaults to False.
-
-    Returns:
-        None
-    """
-    if stages:
-        write_show(f'\# {component}: {scoring_component_entries[component]}\n', toml_input, col)
-        write_show('[[stage.scoring.component]]\n', toml_input, col)
-        write_show(f'[stage.scoring.component.{scoring_keys[component]}]\n', toml_input, col) 
-        write_show(f'[[stage.scoring.component.{scoring_keys[component]}.endpoint]]\n', toml_input, col)
-    else:
-        write_show(f'\# {component}: {scoring_component_entries[component]}\n', toml_input, col)
-        write_show('[[scoring.component]]\n', toml_input, col)
-        write_show(f'[scoring.component.{scoring_keys[component]}]\n', toml_input, col) 
-        write_show(f'[[scoring.component.{scoring_keys[component]}.endpoint]]\n', toml_input, col)
-
-
-def trans_para_input(toml_input, col, state_dict, state, low_value=0.0, high_value=10.0, step=1.0, key=None, 
+def trans_para_input(state_dict, state, low_value=0.0, high_value=10.0, step=1.0, key=None, 
                      default=None, advanced=False, gen_scoring_file=False):
     """
-    Take the parameters of the transformer as input from the user and write them to the TOML input file.
+    Take the parameters of the transformer as input from the user (written by input_files.transformer_toml).
 
     Args:
-        toml_input (str): The TOML input file path.
-        col (streamlit.columns): The Streamlit column to write the parameters in.
         state_dict (dict): The loaded UI state (JSON format) converted into dict. 
         state (bool): Whether a UI state was uploaded or not (Uploaded = True, Not Uploaded = False). 
         low_value (int, optional): The default lower threshold value. Defaults to 0.
@@ -266,22 +829,20 @@ def trans_para_input(toml_input, col, state_dict, state, low_value=0.0, high_val
     if use_transformer:
         # Add default values for the transformer parameters to the reset dictionary
         if not gen_scoring_file:
-            state_dict_reset[st.session_state["run_mode"]][f"{key}_trans_type"] = {"key": f"{key}_trans_type", "value": default}  # reset value
+            session_dict_reset()[f"{key}_trans_type"] = {"key": f"{key}_trans_type", "value": default}  # reset value
         # Widget for the transformer parameters
         trans_type = st.selectbox(label="Select type of transformer", options=["Sigmoid", "Reverse_Sigmoid", "Double_Sigmoid", 
                                                                                "Right_Step", "Left_Step", "Step", "Value_Mapping"], 
                                                                       index=type_index[default], key=f"{key}_trans_type",
                                                                       help="Use Value_Mapping only for MMP.")
         trans_type = change_param(trans_type, st.session_state["change_param_dict"], state_dict, state, f"{key}_trans_type", add_key=True) if not gen_scoring_file else trans_type # UI State
-    else: 
-        write_show('\n', toml_input, col)
-    
+
     ## Transformer parameters based on the selected type
     if trans_type == "Sigmoid" or trans_type == "Reverse_Sigmoid":
         # Add default values for the transformer parameters to the reset dictionary
         if not gen_scoring_file:
-            state_dict_reset[st.session_state["run_mode"]][f"{key}_trans_lower"] = {"key": f"{key}_trans_lower", "value": low_value}  # reset value
-            state_dict_reset[st.session_state["run_mode"]][f"{key}_trans_upper"] = {"key": f"{key}_trans_upper", "value": high_value}  # reset value
+            session_dict_reset()[f"{key}_trans_lower"] = {"key": f"{key}_trans_lower", "value": low_value}  # reset value
+            session_dict_reset()[f"{key}_trans_upper"] = {"key": f"{key}_trans_upper", "value": high_value}  # reset value
         # Widget for the transformer parameters
         lower_threshold = st.number_input(label="Lower threshold", value=low_value, min_value=None, max_value=None, step=step, key=f"{key}_trans_lower", help="shifts the center of the sigmoid function")
         lower_threshold = change_param(lower_threshold, st.session_state["change_param_dict"], state_dict, state, f"{key}_trans_lower", add_key=True) if not gen_scoring_file else lower_threshold # UI State
@@ -292,15 +853,11 @@ def trans_para_input(toml_input, col, state_dict, state, low_value=0.0, high_val
             k_factor = change_param(k_factor, st.session_state["change_param_dict"], state_dict, state, f"{key}_trans_k", add_key=True) if not gen_scoring_file else k_factor # UI State
         else:
             k_factor = 0.5
-        write_show(f'transform.type = "{trans_type}"\n', toml_input, col)
-        write_show(f'transform.low = {lower_threshold}\n', toml_input, col)
-        write_show(f'transform.high = {upper_threshold}\n', toml_input, col)
-        write_show(f'transform.k = {k_factor:.2f}\n', toml_input, col, empty_line=True)
     elif trans_type == "Double_Sigmoid":
         # Add default values for the transformer parameters to the reset dictionary
         if not gen_scoring_file:
-            state_dict_reset[st.session_state["run_mode"]][f"{key}_trans_lower"] = {"key": f"{key}_trans_lower", "value": low_value}  # reset value
-            state_dict_reset[st.session_state["run_mode"]][f"{key}_trans_upper"] = {"key": f"{key}_trans_upper", "value": high_value}  # reset value
+            session_dict_reset()[f"{key}_trans_lower"] = {"key": f"{key}_trans_lower", "value": low_value}  # reset value
+            session_dict_reset()[f"{key}_trans_upper"] = {"key": f"{key}_trans_upper", "value": high_value}  # reset value
         # Widget for the transformer parameters
         lower_threshold = st.number_input(label="Lower threshold", value=low_value, min_value=None, max_value=None, step=step, key=f"{key}_trans_lower", help="shifts the center of the left sigmoid function")
         lower_threshold = change_param(lower_threshold, st.session_state["change_param_dict"], state_dict, state, f"{key}_trans_lower", add_key=True) if not gen_scoring_file else lower_threshold # UI State
@@ -317,57 +874,40 @@ def trans_para_input(toml_input, col, state_dict, state, low_value=0.0, high_val
             coef_div = 100.0
             coef_si = 10.0
             coef_se = 10.0
-        write_show(f'transform.type = "{trans_type}"\n', toml_input, col)
-        write_show(f'transform.low = {lower_threshold}\n', toml_input, col)
-        write_show(f'transform.high = {upper_threshold}\n', toml_input, col)
-        write_show(f'transform.coef_div = {coef_div:.2f}\n', toml_input, col)
-        write_show(f'transform.coef_si = {coef_si:.2f}\n', toml_input, col)
-        write_show(f'transform.coef_se = {coef_se:.2f}\n', toml_input, col, empty_line=True)
     elif trans_type == "Step":
         # Add default values for the transformer parameters to the reset dictionary
         if not gen_scoring_file:
-            state_dict_reset[st.session_state["run_mode"]][f"{key}_trans_lower"] = {"key": f"{key}_trans_lower", "value": low_value}  # reset value
-            state_dict_reset[st.session_state["run_mode"]][f"{key}_trans_upper"] = {"key": f"{key}_trans_upper", "value": high_value}  # reset value
+            session_dict_reset()[f"{key}_trans_lower"] = {"key": f"{key}_trans_lower", "value": low_value}  # reset value
+            session_dict_reset()[f"{key}_trans_upper"] = {"key": f"{key}_trans_upper", "value": high_value}  # reset value
         # Widget for the transformer parameters
         lower_threshold = st.number_input(label="Lower threshold", value=low_value, min_value=None, max_value=None, step=step, key=f"{key}_trans_lower")
         lower_threshold = change_param(lower_threshold, st.session_state["change_param_dict"], state_dict, state, f"{key}_trans_lower", add_key=True) if not gen_scoring_file else lower_threshold # UI State
         upper_threshold = st.number_input(label="Upper threshold", value=high_value, min_value=None, max_value=None, step=step, key=f"{key}_trans_upper")
         upper_threshold = change_param(upper_threshold, st.session_state["change_param_dict"], state_dict, state, f"{key}_trans_upper", add_key=True) if not gen_scoring_file else upper_threshold # UI State
-        write_show(f'transform.type = "{trans_type}"\n', toml_input, col)
-        write_show(f'transform.high = {upper_threshold}\n', toml_input, col)
-        write_show(f'transform.low = {lower_threshold}\n', toml_input, col, empty_line=True)
     elif trans_type == "Left_Step":
         # Add default values for the transformer parameters to the reset dictionary
         if not gen_scoring_file:
-            state_dict_reset[st.session_state["run_mode"]][f"{key}_trans_lower"] = {"key": f"{key}_trans_lower", "value": low_value}  # reset value
+            session_dict_reset()[f"{key}_trans_lower"] = {"key": f"{key}_trans_lower", "value": low_value}  # reset value
         # Widget for the transformer parameters
         lower_threshold = st.number_input(label="Lower threshold", value=low_value, min_value=None, max_value=None, step=step, key=f"{key}_trans_lower")
         lower_threshold = change_param(lower_threshold, st.session_state["change_param_dict"], state_dict, state, f"{key}_trans_lower", add_key=True) if not gen_scoring_file else lower_threshold # UI State
-        write_show(f'transform.type = "{trans_type}"\n', toml_input, col)
-        write_show(f'transform.low = {lower_threshold}\n', toml_input, col, empty_line=True)
     elif trans_type == "Right_Step":
         # Add default values for the transformer parameters to the reset dictionary
         if not gen_scoring_file:
-            state_dict_reset[st.session_state["run_mode"]][f"{key}_trans_upper"] = {"key": f"{key}_trans_upper", "value": high_value}  # reset value
+            session_dict_reset()[f"{key}_trans_upper"] = {"key": f"{key}_trans_upper", "value": high_value}  # reset value
         # Widget for the transformer parameters
         upper_threshold = st.number_input(label="Upper threshold", value=high_value, min_value=None, max_value=None, step=step, key=f"{key}_trans_upper")
         upper_threshold = change_param(upper_threshold, st.session_state["change_param_dict"], state_dict, state, f"{key}_trans_upper", add_key=True) if not gen_scoring_file else upper_threshold # UI State
-        write_show(f'transform.type = "{trans_type}"\n', toml_input, col)
-        write_show(f'transform.high = {upper_threshold}\n', toml_input, col, empty_line=True)
     elif trans_type == "Value_Mapping":
         # Add default values for the transformer parameters to the reset dictionary
         if not gen_scoring_file:
-            state_dict_reset[st.session_state["run_mode"]][f"{key}_trans_{comp}_threshold"] = {"key": f"{key}_trans_{comp}_threshold", "value": 0.5}        # reset value
-            state_dict_reset[st.session_state["run_mode"]][f"{key}_trans_No_{comp}_threshold"] = {"key": f"{key}_trans_No_{comp}_threshold", "value": 0.0}  # reset value
+            session_dict_reset()[f"{key}_trans_{comp}_threshold"] = {"key": f"{key}_trans_{comp}_threshold", "value": 0.5}        # reset value
+            session_dict_reset()[f"{key}_trans_No_{comp}_threshold"] = {"key": f"{key}_trans_No_{comp}_threshold", "value": 0.0}  # reset value
         # Widget for the transformer parameters
         Comp_threshold = st.number_input(label=f"'{comp}' threshold", value=high_value, min_value=None, max_value=None, step=step, key=f"{key}_trans_{comp}_threshold")
         Comp_threshold = change_param(Comp_threshold, st.session_state["change_param_dict"], state_dict, state, f"{key}_trans_{comp}_threshold", add_key=True) if not gen_scoring_file else Comp_threshold # UI State
         No_comp_threshold = st.number_input(label=f"'No {comp}' threshold", value=low_value, min_value=None, max_value=None, step=step, key=f"{key}_trans_No_{comp}_threshold")
         No_comp_threshold = change_param(No_comp_threshold, st.session_state["change_param_dict"], state_dict, state, f"{key}_trans_No_{comp}_threshold", add_key=True) if not gen_scoring_file else No_comp_threshold # UI State
-        write_show(f'transform.type = "value_mapping"\n', toml_input, col)
-        write_show(f'[scoring.component.{comp}.endpoint.transform.mapping]\n', toml_input, col)
-        write_show(f'{comp} = {Comp_threshold}\n', toml_input, col)
-        write_show(f'"No {comp}" = {No_comp_threshold}\n', toml_input, col, empty_line=True)
 
 
 def smarts_table(comp, key, with_status=True):
@@ -429,14 +969,14 @@ def smarts_table(comp, key, with_status=True):
     return edited_data
 
 
-def scoring_components(toml_input, col, state_dict, state, stages=False, num_stage=None, modus="Basic", 
-                       needed_files=None, uploaded_files=None, gen_scoring_file=False, key=None):
+def scoring_components(state_dict, state, stages=False, num_stage=None, modus="Basic", needed_files=None, 
+                       uploaded_files=None, uploads=None, gen_scoring_file=False, key=None):
     """
     Display and configure scoring components in a Streamlit app.
 
+    The scoring function is written by input_files.scoring_toml from the widget values.
+
     Args:
-        toml_input (str): The TOML input file path.
-        col (streamlit.columns): The Streamlit column to place the scoring components in.
         state_dict (dict): The loaded UI state (JSON format) converted into dict. 
         state (bool): Whether a UI state was uploaded or not (Uploaded = True, Not Uploaded = False). 
         stages (bool, optional): Whether the scoring components are for stages. Defaults to False.
@@ -444,12 +984,16 @@ def scoring_components(toml_input, col, state_dict, state, stages=False, num_sta
         modus (str, optional): The mode of the UI, either "Advanced" or "Basic". Defaults to "Basic".
         needed_files (dict, optional): A dictionary to track the needed files. Defaults to None.
         uploaded_files (dict, optional): A dictionary to track the uploaded files. Defaults to None.
+        uploads (dict, optional): The values of uploaded files and selected table rows used in the TOML input file 
+                                  (key of the widget they replace: value), filled by the widgets. Defaults to None.
         gen_scoring_file (bool, optional): Whether to generate a scoring file. Defaults to False.
         key (str, optional): A unique key for Streamlit widgets. Defaults to None.
 
     Returns:
         None
     """
+    uploads = {} if uploads is None else uploads
+
     ## Define functions for input widgets (shape_weight & color_weight) that depend on each other
     def color_to_shape():
         st.session_state[f"{key}_{comp}_shape_weight_{i}"] = 1.0 - st.session_state[f"{key}_{comp}_color_weight_{i}"] 
@@ -459,12 +1003,12 @@ def scoring_components(toml_input, col, state_dict, state, stages=False, num_sta
 
     ## Add default values for the scoring components to the reset dictionary
     if not gen_scoring_file:
-        #state_dict_reset[st.session_state["run_mode"]][f"{key}_scor_components"] = {"key": f"{key}_scor_components", "value": []}        # reset value
-        state_dict_reset[st.session_state["run_mode"]][f"{key}_weight"] = {"key": f"{key}_weight", "value": "geometric"}        # reset value
-        state_dict_reset[st.session_state["run_mode"]][f"{key}_parallel"] = {"key": f"{key}_parallel", "value": "true"}         # reset value
-        #state_dict_reset[st.session_state["run_mode"]][f"{key}_scoring_file"] = {"key": f"{key}_scoring_file", "value": False}  # reset value
-        state_dict_reset[st.session_state["run_mode"]][f"{key}_scoring_filename"] = {"key": f"{key}_scoring_filename", "value": "scoring_file"}  # reset value
-        state_dict_reset[st.session_state["run_mode"]][f"{key}_scoring_filetype"] = {"key": f"{key}_scoring_filetype", "value": "json"}  # reset value
+        #session_dict_reset()[f"{key}_scor_components"] = {"key": f"{key}_scor_components", "value": []}        # reset value
+        session_dict_reset()[f"{key}_weight"] = {"key": f"{key}_weight", "value": "geometric"}        # reset value
+        session_dict_reset()[f"{key}_parallel"] = {"key": f"{key}_parallel", "value": "true"}         # reset value
+        #session_dict_reset()[f"{key}_scoring_file"] = {"key": f"{key}_scoring_file", "value": False}  # reset value
+        session_dict_reset()[f"{key}_scoring_filename"] = {"key": f"{key}_scoring_filename", "value": "scoring_file"}  # reset value
+        session_dict_reset()[f"{key}_scoring_filetype"] = {"key": f"{key}_scoring_filetype", "value": "json"}  # reset value
 
     ## Widget for the scoring components
     if not gen_scoring_file:
@@ -485,32 +1029,10 @@ def scoring_components(toml_input, col, state_dict, state, stages=False, num_sta
         filename = change_param(filename, st.session_state["change_param_dict"], state_dict, state, f"{key}_scoring_filename", add_key=True) if not gen_scoring_file else filename # UI State
         filetype = st.selectbox(options=["json", "toml"], label="File format", index=0, key=f"{key}_scoring_filetype")
         filetype = change_param(filetype, st.session_state["change_param_dict"], state_dict, state, f"{key}_scoring_filetype", add_key=True) if not gen_scoring_file else filetype  # UI State
-        if stages:
-            scoring_file = st.file_uploader(f"Upload Scoring File (S{num_stage})", type=[filetype])
-            if scoring_file:
-                filename = scoring_file.name[:-5]
-            write_show(f'\# Scoring Components (S{num_stage})\n', toml_input, col)
-            write_show(f"[stage.scoring]\n", toml_input, col)
-            write_show(f'type = "{scoring_weight}_mean"\n', toml_input, col)
-            if modus == "Advanced":
-                write_show(f'parallel = {run_parallel}\n', toml_input, col)
-            else:
-                write_show(f'parallel = false\n', toml_input, col)
-            write_show(f'filename = "{filename}.{filetype}"\n', toml_input, col)
-            write_show(f'filetype = "{filetype}"\n', toml_input, col, empty_line=True)
-        else:
-            scoring_file = st.file_uploader("Upload Scoring File", type=[filetype])
-            if scoring_file:
-                filename = scoring_file.name[:-5]
-            write_show('\# Scoring Components Parameters\n', toml_input, col)
-            write_show(f"[scoring]\n", toml_input, col)
-            write_show(f'type = "{scoring_weight}_mean"\n', toml_input, col)
-            if modus == "Advanced":
-                write_show(f'parallel = {run_parallel}\n', toml_input, col)
-            else:
-                write_show(f'parallel = false\n', toml_input, col)
-            write_show(f'filename = "{filename}.{filetype}"\n', toml_input, col)
-            write_show(f'filetype = "{filetype}"\n', toml_input, col, empty_line=True)
+        label = f"Upload Scoring File (S{num_stage})" if stages else "Upload Scoring File"
+        scoring_file = st.file_uploader(label, type=[filetype])
+        if scoring_file:
+            uploads[f"{key}_scoring_filename"] = scoring_file.name[:-5]
 
         if scoring_file == None: 
             return "Must Be Added!"
@@ -518,27 +1040,6 @@ def scoring_components(toml_input, col, state_dict, state, stages=False, num_sta
             return scoring_file
 
     else:
-        if stages:
-            if num_stage == None:
-                write_show(f'\# Scoring Components\n', toml_input, col)
-            else:
-                write_show(f'\# Scoring Components (S{num_stage})\n', toml_input, col)
-            write_show(f"[stage.scoring]\n", toml_input, col)
-            write_show(f'type = "{scoring_weight}_mean"\n', toml_input, col)
-            if modus == "Advanced":
-                write_show(f'parallel = {run_parallel}\n', toml_input, col, empty_line=True)
-            else:
-                write_show(f'parallel = false\n', toml_input, col, empty_line=True)
-        else:
-            if not gen_scoring_file:
-                write_show('\# Scoring Components Parameters\n', toml_input, col)
-                write_show(f"[scoring]\n", toml_input, col)
-                write_show(f'type = "{scoring_weight}_mean"\n', toml_input, col)
-                if modus == "Advanced":
-                    write_show(f'parallel = {run_parallel}\n', toml_input, col, empty_line=True)
-                else:
-                    write_show(f'parallel = false\n', toml_input, col, empty_line=True)
-
         ## Select scoring components
         scor_components = st.multiselect("Select scoring components", scor_comp, default=None, key=f"{key}_scor_components", placeholder="Choose an option")
         scor_components = change_param(scor_components, st.session_state["change_param_dict"], state_dict, state, f"{key}_scor_components", add_key=True) if not gen_scoring_file else scor_components # UI State 
@@ -552,9 +1053,9 @@ def scoring_components(toml_input, col, state_dict, state, stages=False, num_sta
             if comp == "PMI":                    
                 # Reset values
                 if not gen_scoring_file:
-                    state_dict_reset[st.session_state["run_mode"]][f"{key}_{comp}_name_{i}"] = {"key": f"{key}_{comp}_name_{i}", "value": "ScoringComponent"}  # reset value
-                    state_dict_reset[st.session_state["run_mode"]][f"{key}_{comp}_weight_{i}"] = {"key": f"{key}_{comp}_weight_{i}", "value": 1.0}             # reset value
-                    state_dict_reset[st.session_state["run_mode"]][f"{key}_{comp}_prop_{i}"] = {"key": f"{key}_{comp}_prop_{i}", "value": "npr1"}              # reset value
+                    session_dict_reset()[f"{key}_{comp}_name_{i}"] = {"key": f"{key}_{comp}_name_{i}", "value": "ScoringComponent"}  # reset value
+                    session_dict_reset()[f"{key}_{comp}_weight_{i}"] = {"key": f"{key}_{comp}_weight_{i}", "value": 1.0}             # reset value
+                    session_dict_reset()[f"{key}_{comp}_prop_{i}"] = {"key": f"{key}_{comp}_prop_{i}", "value": "npr1"}              # reset value
                 with st.popover("PMI Parameters"):
                     # Input Widgets
                     comp_name = st.text_input(label="Name of scoring component in output file", value='ScoringComponent', key=f"{key}_{comp}_name_{i}")
@@ -563,51 +1064,35 @@ def scoring_components(toml_input, col, state_dict, state, stages=False, num_sta
                     comp_weight = change_param(comp_weight, st.session_state["change_param_dict"], state_dict, state, f"{key}_{comp}_weight_{i}", add_key=True) if not gen_scoring_file else comp_weight # UI State
                     pmi_property = st.selectbox(f"Type of PMI Propertiy", ["npr1", "npr2"], index=0, key=f"{key}_{comp}_prop_{i}", help="npr1 - First Normalised PMI (i.e. I₁ / I₃) \n\n npr2 - Second Normalised PMI (i.e. I₂ / I₃) ")
                     pmi_property = change_param(pmi_property, st.session_state["change_param_dict"], state_dict, state, f"{key}_{comp}_prop_{i}", add_key=True) if not gen_scoring_file else pmi_property # UI State
-                    # Write to TOML file and Display to user
-                    write_scor_component(comp, toml_input, col, stages=stages)
-                    write_show(f'name = "{comp_name}"\n', toml_input, col)
-                    write_show(f'weight = {float(comp_weight):.2f}\n', toml_input, col)
-                    write_show(f'params.property = "{pmi_property}"\n', toml_input, col)
-                    trans_para_input(toml_input, col, state_dict, state, low_value=transformers_def_param[comp]["low_value"], high_value=transformers_def_param[comp]["high_value"], 
+                    trans_para_input(state_dict, state, low_value=transformers_def_param[comp]["low_value"], high_value=transformers_def_param[comp]["high_value"], 
                                      step=1, key=f"{key}_{comp}_{i}", default=transformers_def_param[comp]["default_transformer"], advanced=advanced, gen_scoring_file=gen_scoring_file)
 
             ## CustomAlerts Parameters
             elif comp == "CustomAlerts":
-                default_SMARTS = "[*;r8],,[*;r9],,[*;r10],,[*;r11],,[*;r12],,[*;r13],,[*;r14],,[*;r15],,[*;r16],,[*;r17],,[#8][#8],,[#6;+],,[#16][#16],,[#7;!n][S;!$(S(=O)=O)],,[#7;!n][#7;!n],,C#C,,C(=[O,S])[O,S],,[#7;!n][C;!$(C(=[O,N])[N,O])][#16;!s],,[#7;!n][C;!$(C(=[O,N])[N,O])][#7;!n],,[#7;!n][C;!$(C(=[O,N])[N,O])][#8;!o],,[#8;!o][C;!$(C(=[O,N])[N,O])][#16;!s],,[#8;!o][C;!$(C(=[O,N])[N,O])][#8;!o],,[#16;!s][C;!$(C(=[O,N])[N,O])][#16;!s]"
                 # Reset values
                 if not gen_scoring_file:
-                    state_dict_reset[st.session_state["run_mode"]][f"{key}_{comp}_name_{i}"] = {"key": f"{key}_{comp}_name_{i}", "value": "ScoringComponent"}  # reset value
-                    state_dict_reset[st.session_state["run_mode"]][f"{key}_{comp}_weight_{i}"] = {"key": f"{key}_{comp}_weight_{i}", "value": 1.0}             # reset value
-                    state_dict_reset[st.session_state["run_mode"]][f"{key}_{comp}_smarts_{i}"] = {"key": f"{key}_{comp}_smarts_{i}", "value": default_SMARTS}  # reset value
+                    session_dict_reset()[f"{key}_{comp}_name_{i}"] = {"key": f"{key}_{comp}_name_{i}", "value": "ScoringComponent"}  # reset value
+                    session_dict_reset()[f"{key}_{comp}_weight_{i}"] = {"key": f"{key}_{comp}_weight_{i}", "value": 1.0}             # reset value
+                    session_dict_reset()[f"{key}_{comp}_smarts_{i}"] = {"key": f"{key}_{comp}_smarts_{i}", "value": CUSTOM_ALERTS_SMARTS}  # reset value
                 with st.popover("CustomAlerts Parameters"):
                     # Input Widgets
                     comp_name = st.text_input(label="Name of scoring component in output file", value='ScoringComponent', key=f"{key}_{comp}_name_{i}")
                     comp_name = change_param(comp_name, st.session_state["change_param_dict"], state_dict, state, f"{key}_{comp}_name_{i}", add_key=True) if not gen_scoring_file else comp_name  # UI State
                     comp_weight = st.number_input(label="Weight of scoring component", value=1.0, min_value=0.0, max_value=None, step=0.1, key=f"{key}_{comp}_weight_{i}")
                     comp_weight = change_param(comp_weight, st.session_state["change_param_dict"], state_dict, state, f"{key}_{comp}_weight_{i}", add_key=True) if not gen_scoring_file else comp_weight # UI State
-                    smarts_text = st.text_input(label="List of undesired SMARTS patterns", value=default_SMARTS, key=f"{key}_{comp}_smarts_{i}",
+                    smarts_text = st.text_input(label="List of undesired SMARTS patterns", value=CUSTOM_ALERTS_SMARTS, key=f"{key}_{comp}_smarts_{i}",
                                                 help="The user could type in specific SMARTS pattern (must be separated with 2 commas ',,'), or choose form the pre-defined table of SMARTS pattern below.")
                     smarts_text = change_param(smarts_text, st.session_state["change_param_dict"], state_dict, state, f"{key}_{comp}_smarts_{i}", add_key=True) if not gen_scoring_file else smarts_text # UI State
                     smarts_df = smarts_table(comp, str(i))
-                    if len(smarts_df[smarts_df["Status"] == True]) > 0: 
-                        smarts_pattern = smarts_text.split(',,') + list(smarts_df[smarts_df["Status"] == True]["SMARTS"]) if smarts_text != '' else list(smarts_df[smarts_df["Status"] == True]["SMARTS"])
-                    else:
-                        smarts_pattern = f"{[f'{smart}' for smart in smarts_text.split(',,')]}"
-                    # Write to TOML file and Display to user
-                    write_scor_component(comp, toml_input, col, stages=stages)
-                    write_show(f'name = "{comp_name}"\n', toml_input, col)
-                    write_show(f'weight = {float(comp_weight):.2f}\n', toml_input, col)
-                    write_show(f'params.smarts = {smarts_pattern}\n', toml_input, col, empty_line=True, display=False)
-                    col.text(f"params.smarts = {smarts_pattern}")
-                    col.write("\n")
+                    uploads[f"{key}_{comp}_smarts_table_{i}"] = list(smarts_df[smarts_df["Status"] == True]["SMARTS Pattern"])
 
             ## GroupCount Parameters
             elif comp == "GroupCount":
                 # Reset values
                 if not gen_scoring_file:
-                    state_dict_reset[st.session_state["run_mode"]][f"{key}_{comp}_name_{i}"] = {"key": f"{key}_{comp}_name_{i}", "value": "ScoringComponent"}  # reset value
-                    state_dict_reset[st.session_state["run_mode"]][f"{key}_{comp}_weight_{i}"] = {"key": f"{key}_{comp}_weight_{i}", "value": 1.0}             # reset value
-                    state_dict_reset[st.session_state["run_mode"]][f"{key}_{comp}_smarts_{i}"] = {"key": f"{key}_{comp}_smarts_{i}", "value": "[CX3]=[OX1]"}   # reset value
+                    session_dict_reset()[f"{key}_{comp}_name_{i}"] = {"key": f"{key}_{comp}_name_{i}", "value": "ScoringComponent"}  # reset value
+                    session_dict_reset()[f"{key}_{comp}_weight_{i}"] = {"key": f"{key}_{comp}_weight_{i}", "value": 1.0}             # reset value
+                    session_dict_reset()[f"{key}_{comp}_smarts_{i}"] = {"key": f"{key}_{comp}_smarts_{i}", "value": "[CX3]=[OX1]"}   # reset value
                 with st.popover("GroupCount Parameters"):
                     # Input Widgets
                     comp_name = st.text_input(label="Name of scoring component in output file", value='ScoringComponent', key=f"{key}_{comp}_name_{i}")
@@ -618,22 +1103,17 @@ def scoring_components(toml_input, col, state_dict, state, stages=False, num_sta
                                                 help="Count how many times the SMARTS pattern is found")
                     smarts_text = change_param(smarts_text, st.session_state["change_param_dict"], state_dict, state, f"{key}_{comp}_smarts_{i}", add_key=True) if not gen_scoring_file else smarts_text # UI State
                     smarts_df = smarts_table(comp, str(i), with_status=False)
-                    # Write to TOML file and Display to user
-                    write_scor_component(comp, toml_input, col, stages=stages)
-                    write_show(f'name = "{comp_name}"\n', toml_input, col)
-                    write_show(f'weight = {float(comp_weight):.2f}\n', toml_input, col)
-                    write_show(f'params.smarts = "{smarts_text}"\n', toml_input, col)
-                    trans_para_input(toml_input, col, state_dict, state, low_value=transformers_def_param[comp]["low_value"], high_value=transformers_def_param[comp]["high_value"], 
+                    trans_para_input(state_dict, state, low_value=transformers_def_param[comp]["low_value"], high_value=transformers_def_param[comp]["high_value"], 
                                      step=1, key=f"{key}_{comp}_{i}", default=transformers_def_param[comp]["default_transformer"], advanced=advanced, gen_scoring_file=gen_scoring_file)
 
             ## MatchingSubstructure Parameters
             elif comp == "MatchingSubstructure":
                 # Reset values
                 if not gen_scoring_file:
-                    state_dict_reset[st.session_state["run_mode"]][f"{key}_{comp}_name_{i}"] = {"key": f"{key}_{comp}_name_{i}", "value": "ScoringComponent"}  # reset value
-                    state_dict_reset[st.session_state["run_mode"]][f"{key}_{comp}_weight_{i}"] = {"key": f"{key}_{comp}_weight_{i}", "value": 1.0}             # reset value
-                    state_dict_reset[st.session_state["run_mode"]][f"{key}_{comp}_smarts_{i}"] = {"key": f"{key}_{comp}_smarts_{i}", "value": "[CX3]=[OX1]"}   # reset value
-                    state_dict_reset[st.session_state["run_mode"]][f"{key}_{comp}_chirality_{i}"] = {"key": f"{key}_{comp}_chirality_{i}", "value": "false"}   # reset value
+                    session_dict_reset()[f"{key}_{comp}_name_{i}"] = {"key": f"{key}_{comp}_name_{i}", "value": "ScoringComponent"}  # reset value
+                    session_dict_reset()[f"{key}_{comp}_weight_{i}"] = {"key": f"{key}_{comp}_weight_{i}", "value": 1.0}             # reset value
+                    session_dict_reset()[f"{key}_{comp}_smarts_{i}"] = {"key": f"{key}_{comp}_smarts_{i}", "value": "[CX3]=[OX1]"}   # reset value
+                    session_dict_reset()[f"{key}_{comp}_chirality_{i}"] = {"key": f"{key}_{comp}_chirality_{i}", "value": "false"}   # reset value
                 with st.popover("MatchingSubstructure Parameters"):
                     # Input Widgets
                     comp_name = st.text_input(label="Name of scoring component in output file", value='ScoringComponent', key=f"{key}_{comp}_name_{i}")
@@ -646,31 +1126,25 @@ def scoring_components(toml_input, col, state_dict, state, stages=False, num_sta
                     smarts_df = smarts_table(comp, str(i), with_status=False)
                     use_chirality = st.selectbox(options=["true", "false"], label="Check for chirality?", index=1, key=f"{key}_{comp}_chirality_{i}")
                     use_chirality = change_param(use_chirality, st.session_state["change_param_dict"], state_dict, state, f"{key}_{comp}_chirality_{i}", add_key=True) if not gen_scoring_file else use_chirality # UI State
-                    # Write to TOML file and Display to user
-                    write_scor_component(comp, toml_input, col, stages=stages)
-                    write_show(f'name = "{comp_name}"\n', toml_input, col)
-                    write_show(f'weight = {float(comp_weight):.2f}\n', toml_input, col)
-                    write_show(f'params.smarts = "{smarts_text}"\n', toml_input, col)
-                    write_show(f'params.use_chirality = {use_chirality}\n', toml_input, col, empty_line=True)
 
             ## TanimotoSimilarity Parameters
             elif comp == "TanimotoSimilarity":
                 # Reset values
                 if not gen_scoring_file:
-                    state_dict_reset[st.session_state["run_mode"]][f"{key}_{comp}_name_{i}"] = {"key": f"{key}_{comp}_name_{i}", "value": "ScoringComponent"}  # reset value
-                    state_dict_reset[st.session_state["run_mode"]][f"{key}_{comp}_weight_{i}"] = {"key": f"{key}_{comp}_weight_{i}", "value": 1.0}             # reset value
-                    state_dict_reset[st.session_state["run_mode"]][f"{key}_{comp}_smiles_{i}"] = {"key": f"{key}_{comp}_smiles_{i}", "value": "CC(=O)OC1=CC=CC=C1C(=O)O,,CC(=O)OC1=CC=CC=C1C(=O)O"}   # reset value
-                    state_dict_reset[st.session_state["run_mode"]][f"{key}_{comp}_upload_{i}"] = {"key": f"{key}_{comp}_upload_{i}", "value": False}           # reset value
-                    state_dict_reset[st.session_state["run_mode"]][f"{key}_{comp}_radius_{i}"] = {"key": f"{key}_{comp}_radius_{i}", "value": 1}               # reset value
-                    state_dict_reset[st.session_state["run_mode"]][f"{key}_{comp}_counts_{i}"] = {"key": f"{key}_{comp}_counts_{i}", "value": "true"}          # reset value
-                    state_dict_reset[st.session_state["run_mode"]][f"{key}_{comp}_features_{i}"] = {"key": f"{key}_{comp}_features_{i}", "value": "true"}      # reset value
+                    session_dict_reset()[f"{key}_{comp}_name_{i}"] = {"key": f"{key}_{comp}_name_{i}", "value": "ScoringComponent"}  # reset value
+                    session_dict_reset()[f"{key}_{comp}_weight_{i}"] = {"key": f"{key}_{comp}_weight_{i}", "value": 1.0}             # reset value
+                    session_dict_reset()[f"{key}_{comp}_smiles_{i}"] = {"key": f"{key}_{comp}_smiles_{i}", "value": REFERENCE_SMILES}   # reset value
+                    session_dict_reset()[f"{key}_{comp}_upload_{i}"] = {"key": f"{key}_{comp}_upload_{i}", "value": False}           # reset value
+                    session_dict_reset()[f"{key}_{comp}_radius_{i}"] = {"key": f"{key}_{comp}_radius_{i}", "value": 1}               # reset value
+                    session_dict_reset()[f"{key}_{comp}_counts_{i}"] = {"key": f"{key}_{comp}_counts_{i}", "value": "true"}          # reset value
+                    session_dict_reset()[f"{key}_{comp}_features_{i}"] = {"key": f"{key}_{comp}_features_{i}", "value": "true"}      # reset value
                 with st.popover("TanimotoSimilarity Parameters"):
                     # Input Widgets
                     comp_name = st.text_input(label="Name of scoring component in output file", value='ScoringComponent', key=f"{key}_{comp}_name_{i}")
                     comp_name = change_param(comp_name, st.session_state["change_param_dict"], state_dict, state, f"{key}_{comp}_name_{i}", add_key=True) if not gen_scoring_file else comp_name # UI State
                     comp_weight = st.number_input(label="Weight of scoring component", value=1.0, min_value=0.0, max_value=None, step=0.1, key=f"{key}_{comp}_weight_{i}")
                     comp_weight = change_param(comp_weight, st.session_state["change_param_dict"], state_dict, state, f"{key}_{comp}_weight_{i}", add_key=True) if not gen_scoring_file else comp_weight # UI State
-                    smiles_text = st.text_input(label="List of SMILES to match against", value="CC(=O)OC1=CC=CC=C1C(=O)O,,CC(=O)OC1=CC=CC=C1C(=O)O", 
+                    smiles_text = st.text_input(label="List of SMILES to match against", value=REFERENCE_SMILES, 
                                                 key=f"{key}_{comp}_smiles_{i}", help="Must be separated with 2 commas ',,'")
                     smiles_text = change_param(smiles_text, st.session_state["change_param_dict"], state_dict, state, f"{key}_{comp}_smiles_{i}", add_key=True) if not gen_scoring_file else smiles_text # UI State
                     upload = st.toggle("Read SMILES from a SMILES file?", value=False, key=f"{key}_{comp}_upload_{i}")
@@ -682,45 +1156,32 @@ def scoring_components(toml_input, col, state_dict, state, stages=False, num_sta
                             file_name = smiles_upload.name
                             if (".sdf" in file_name): 
                                 smiles_file = convert_sdf_smi(smiles_file)
-                            smiles_list = read_smiles(smiles_file)
-                            smiles_list = smiles_list # smiles_text.split(',,') + smiles_list if smiles_text != "" else smiles_list
-                        else:
-                            smiles_list = smiles_text.split(',,')
-                    else:
-                        smiles_list = smiles_text.split(',,')
+                            uploads[f"{key}_{comp}_smiles_{i}"] = read_smiles(smiles_file)
                     radius = st.number_input(label="Morgan fingerprint radius", value=1, min_value=0, max_value=None, step=1, key=f"{key}_{comp}_radius_{i}")
                     radius = change_param(radius, st.session_state["change_param_dict"], state_dict, state, f"{key}_{comp}_radius_{i}", add_key=True) if not gen_scoring_file else radius # UI State
                     use_counts = st.selectbox(options=["true", "false"], label="Use counts", index=0, key=f"{key}_{comp}_counts_{i}")
                     use_counts = change_param(use_counts, st.session_state["change_param_dict"], state_dict, state, f"{key}_{comp}_counts_{i}", add_key=True) if not gen_scoring_file else use_counts # UI State
                     use_features = st.selectbox(options=["true", "false"], label="Use features", index=0, key=f"{key}_{comp}_features_{i}")
                     use_features = change_param(use_features, st.session_state["change_param_dict"], state_dict, state, f"{key}_{comp}_features_{i}", add_key=True) if not gen_scoring_file else use_features # UI State
-                    # Write to TOML file and Display to user
-                    write_scor_component(comp, toml_input, col, stages=stages)
-                    write_show(f'name = "{comp_name}"\n', toml_input, col)
-                    write_show(f'weight = {float(comp_weight):.2f}\n', toml_input, col)
-                    write_show(f'params.smiles = {smiles_list}\n', toml_input, col)
-                    write_show(f'params.radius = {radius}\n', toml_input, col)
-                    write_show(f'params.use_counts = {use_counts}\n', toml_input, col)
-                    write_show(f'params.use_features = {use_features}\n', toml_input, col, empty_line=True)
             
             ## MMP Parameters
             elif comp == "MMP":
                 # Reset values
                 if not gen_scoring_file:
-                    state_dict_reset[st.session_state["run_mode"]][f"{key}_{comp}_name_{i}"] = {"key": f"{key}_{comp}_name_{i}", "value": "ScoringComponent"}  # reset value
-                    state_dict_reset[st.session_state["run_mode"]][f"{key}_{comp}_weight_{i}"] = {"key": f"{key}_{comp}_weight_{i}", "value": 1.0}             # reset value
-                    state_dict_reset[st.session_state["run_mode"]][f"{key}_{comp}_smiles_{i}"] = {"key": f"{key}_{comp}_smiles_{i}", "value": "CC(=O)OC1=CC=CC=C1C(=O)O,,CC(=O)OC1=CC=CC=C1C(=O)O"}   # reset value
-                    state_dict_reset[st.session_state["run_mode"]][f"{key}_{comp}_upload_{i}"] = {"key": f"{key}_{comp}_upload_{i}", "value": False}           # reset value
-                    state_dict_reset[st.session_state["run_mode"]][f"{key}_{comp}_num_of_cuts_{i}"] = {"key": f"{key}_{comp}_num_of_cuts_{i}", "value": 1}               # reset value
-                    state_dict_reset[st.session_state["run_mode"]][f"{key}_{comp}_max_variable_heavies_{i}"] = {"key": f"{key}_{comp}_max_variable_heavies_{i}", "value": 40}          # reset value
-                    state_dict_reset[st.session_state["run_mode"]][f"{key}_{comp}_max_variable_ratio_{i}"] = {"key": f"{key}_{comp}_max_variable_ratio_{i}", "value": 0.33}      # reset value
+                    session_dict_reset()[f"{key}_{comp}_name_{i}"] = {"key": f"{key}_{comp}_name_{i}", "value": "ScoringComponent"}  # reset value
+                    session_dict_reset()[f"{key}_{comp}_weight_{i}"] = {"key": f"{key}_{comp}_weight_{i}", "value": 1.0}             # reset value
+                    session_dict_reset()[f"{key}_{comp}_smiles_{i}"] = {"key": f"{key}_{comp}_smiles_{i}", "value": REFERENCE_SMILES}   # reset value
+                    session_dict_reset()[f"{key}_{comp}_upload_{i}"] = {"key": f"{key}_{comp}_upload_{i}", "value": False}           # reset value
+                    session_dict_reset()[f"{key}_{comp}_num_of_cuts_{i}"] = {"key": f"{key}_{comp}_num_of_cuts_{i}", "value": 1}               # reset value
+                    session_dict_reset()[f"{key}_{comp}_max_variable_heavies_{i}"] = {"key": f"{key}_{comp}_max_variable_heavies_{i}", "value": 40}          # reset value
+                    session_dict_reset()[f"{key}_{comp}_max_variable_ratio_{i}"] = {"key": f"{key}_{comp}_max_variable_ratio_{i}", "value": 0.33}      # reset value
                 with st.popover("MMP Parameters"):
                     # Input Widgets
                     comp_name = st.text_input(label="Name of scoring component in output file", value='ScoringComponent', key=f"{key}_{comp}_name_{i}")
                     comp_name = change_param(comp_name, st.session_state["change_param_dict"], state_dict, state, f"{key}_{comp}_name_{i}", add_key=True) if not gen_scoring_file else comp_name # UI State
                     comp_weight = st.number_input(label="Weight of scoring component", value=1.0, min_value=0.0, max_value=None, step=0.1, key=f"{key}_{comp}_weight_{i}")
                     comp_weight = change_param(comp_weight, st.session_state["change_param_dict"], state_dict, state, f"{key}_{comp}_weight_{i}", add_key=True)  if not gen_scoring_file else comp_weight # UI State
-                    smiles_text = st.text_input(label="List of reference SMILES to be similar to", value="CC(=O)OC1=CC=CC=C1C(=O)O,,CC(=O)OC1=CC=CC=C1C(=O)O", 
+                    smiles_text = st.text_input(label="List of reference SMILES to be similar to", value=REFERENCE_SMILES, 
                                                 key=f"{key}_{comp}_smiles_{i}", help="SMILES must be comma-separated with 2 commas (,,)")
                     smiles_text = change_param(smiles_text, st.session_state["change_param_dict"], state_dict, state, f"{key}_{comp}_smiles_{i}", add_key=True)  if not gen_scoring_file else smiles_text # UI State
                     upload = st.toggle("Read SMILES from a SMILES file?", value=False, key=f"{key}_{comp}_upload_{i}")
@@ -732,43 +1193,30 @@ def scoring_components(toml_input, col, state_dict, state, stages=False, num_sta
                             file_name = smiles_upload.name
                             if (".sdf" in file_name): 
                                 smiles_file = convert_sdf_smi(smiles_file)
-                            smiles_list = read_smiles(smiles_file)
-                            smiles_list = smiles_list #smiles_text.split(',,') + smiles_list if smiles_text != "" else smiles_list
-                        else:
-                            smiles_list = smiles_text.split(',,')
-                    else:
-                        smiles_list = smiles_text.split(',,')
+                            uploads[f"{key}_{comp}_smiles_{i}"] = read_smiles(smiles_file)
                     num_of_cuts = st.number_input(label="Number of bonds to cut in fragmentation", value=1, min_value=0, max_value=None, step=1, key=f"{key}_{comp}_num_of_cuts_{i}")
                     num_of_cuts = change_param(num_of_cuts, st.session_state["change_param_dict"], state_dict, state, f"{key}_{comp}_num_of_cuts_{i}", add_key=True) if not gen_scoring_file else num_of_cuts # UI State
                     max_variable_heavies = st.number_input(label="Max heavy atom change in MMPs", value=40, min_value=0, max_value=None, step=1, key=f"{key}_{comp}_max_variable_heavies_{i}")
                     max_variable_heavies = change_param(max_variable_heavies, st.session_state["change_param_dict"], state_dict, state, f"{key}_{comp}_max_variable_heavies_{i}", add_key=True) if not gen_scoring_file else max_variable_heavies # UI State
                     max_variable_ratio = st.number_input(label="Max ratio of heavy atoms in MMPs", value=0.33, min_value=0.0, max_value=1.0, step=0.01, key=f"{key}_{comp}_max_variable_ratio_{i}")
                     max_variable_ratio = change_param(max_variable_ratio, st.session_state["change_param_dict"], state_dict, state, f"{key}_{comp}_max_variable_ratio_{i}", add_key=True) if not gen_scoring_file else max_variable_ratio # UI State
-                    # Write to TOML file and Display to user
-                    write_scor_component(comp, toml_input, col, stages=stages)
-                    write_show(f'name = "{comp_name}"\n', toml_input, col)
-                    write_show(f'weight = {float(comp_weight):.2f}\n', toml_input, col)
-                    write_show(f'params.reference_smiles = {smiles_list}\n', toml_input, col)
-                    write_show(f'params.num_of_cuts = {num_of_cuts}\n', toml_input, col)
-                    write_show(f'params.max_variable_heavies = {max_variable_heavies}\n', toml_input, col)
-                    write_show(f'params.max_variable_ratio = {max_variable_ratio}\n', toml_input, col)
-                    trans_para_input(toml_input, col, state_dict, state, low_value=transformers_def_param[comp]["low_value"], high_value=transformers_def_param[comp]["high_value"], 
+                    trans_para_input(state_dict, state, low_value=transformers_def_param[comp]["low_value"], high_value=transformers_def_param[comp]["high_value"], 
                                      step=1, key=f"{key}_{comp}_{i}", default=transformers_def_param[comp]["default_transformer"], advanced=advanced, gen_scoring_file=gen_scoring_file)
 
             ## ROCSSimilarity Parameters
             elif comp == "ROCSSimilarity":
                 # Reset values
                 if not gen_scoring_file:
-                    state_dict_reset[st.session_state["run_mode"]][f"{key}_{comp}_name_{i}"] = {"key": f"{key}_{comp}_name_{i}", "value": "ScoringComponent"}                     # reset value
-                    state_dict_reset[st.session_state["run_mode"]][f"{key}_{comp}_weight_{i}"] = {"key": f"{key}_{comp}_weight_{i}", "value": 1.0}                                # reset value
-                    state_dict_reset[st.session_state["run_mode"]][f"{key}_{comp}_color_weight_{i}"] = {"key": f"{key}_{comp}_color_weight_{i}", "value": 0.5}                    # reset value
-                    state_dict_reset[st.session_state["run_mode"]][f"{key}_{comp}_shape_weight_{i}"] = {"key": f"{key}_{comp}_shape_weight_{i}", "value": 0.5}                    # reset value
-                    state_dict_reset[st.session_state["run_mode"]][f"{key}_{comp}_custom_cff_{i}"] = {"key": f"{key}_{comp}_custom_cff_{i}", "value": "path/to/ROCs/forcefield"}  # reset value
-                    state_dict_reset[st.session_state["run_mode"]][f"{key}_{comp}_similarity_measure_{i}"] = {"key": f"{key}_{comp}_similarity_measure_{i}", "value": "Tanimoto"} # reset value
-                    state_dict_reset[st.session_state["run_mode"]][f"{key}_{comp}_max_stereocenters_{i}"] = {"key": f"{key}_{comp}_max_stereocenters_{i}", "value": 4}            # reset value
-                    state_dict_reset[st.session_state["run_mode"]][f"{key}_{comp}_ewindow_{i}"] = {"key": f"{key}_{comp}_ewindow_{i}", "value": 10}
-                    state_dict_reset[st.session_state["run_mode"]][f"{key}_{comp}_maxconfs_{i}"] = {"key": f"{key}_{comp}_maxconfs_{i}", "value": 200}
-                    state_dict_reset[st.session_state["run_mode"]][f"{key}_{comp}_rocs_input_{i}"] = {"key": f"{key}_{comp}_rocs_input_{i}", "value": "YOUR_ROCS_QUERY.sdf"}
+                    session_dict_reset()[f"{key}_{comp}_name_{i}"] = {"key": f"{key}_{comp}_name_{i}", "value": "ScoringComponent"}                     # reset value
+                    session_dict_reset()[f"{key}_{comp}_weight_{i}"] = {"key": f"{key}_{comp}_weight_{i}", "value": 1.0}                                # reset value
+                    session_dict_reset()[f"{key}_{comp}_color_weight_{i}"] = {"key": f"{key}_{comp}_color_weight_{i}", "value": 0.5}                    # reset value
+                    session_dict_reset()[f"{key}_{comp}_shape_weight_{i}"] = {"key": f"{key}_{comp}_shape_weight_{i}", "value": 0.5}                    # reset value
+                    session_dict_reset()[f"{key}_{comp}_custom_cff_{i}"] = {"key": f"{key}_{comp}_custom_cff_{i}", "value": "path/to/ROCs/forcefield"}  # reset value
+                    session_dict_reset()[f"{key}_{comp}_similarity_measure_{i}"] = {"key": f"{key}_{comp}_similarity_measure_{i}", "value": "Tanimoto"} # reset value
+                    session_dict_reset()[f"{key}_{comp}_max_stereocenters_{i}"] = {"key": f"{key}_{comp}_max_stereocenters_{i}", "value": 4}            # reset value
+                    session_dict_reset()[f"{key}_{comp}_ewindow_{i}"] = {"key": f"{key}_{comp}_ewindow_{i}", "value": 10}
+                    session_dict_reset()[f"{key}_{comp}_maxconfs_{i}"] = {"key": f"{key}_{comp}_maxconfs_{i}", "value": 200}
+                    session_dict_reset()[f"{key}_{comp}_rocs_input_{i}"] = {"key": f"{key}_{comp}_rocs_input_{i}", "value": "YOUR_ROCS_QUERY.sdf"}
                 with st.popover("ROCSSimilarity Parameters"):
                     # Input Widgets
                     comp_name = st.text_input(label="Name of scoring component in output file", value='ScoringComponent', key=f"{key}_{comp}_name_{i}")
@@ -796,35 +1244,22 @@ def scoring_components(toml_input, col, state_dict, state, stages=False, num_sta
                     sdf_upload = st.file_uploader(f"Upload SDF or SQ File ({key}-{comp}-{i})", type=["sq", "sdf"], help="Structures Data File (.sdf) and .SQ Files are the **ONLY** accepted format.")
                     needed_files[f"SDF File ({key}-{comp}-{i})"] = False          
                     if sdf_upload:
-                        rocs_input = sdf_upload.name
+                        uploads[f"{key}_{comp}_rocs_input_{i}"] = sdf_upload.name
                         sdf_upload = save_uploaded_file(sdf_upload, Path(st.session_state["user_folder"]))
                         uploaded_files[f"SDF File ({key}-{comp}-{i})"] = sdf_upload
                         needed_files[f"SDF File ({key}-{comp}-{i})"] = True                
-                    # Write to TOML file and Display to user
-                    write_scor_component(comp, toml_input, col, stages=stages)
-                    write_show(f'name = "{comp_name}"\n', toml_input, col)
-                    write_show(f'weight = {float(comp_weight):.2f}\n', toml_input, col)
-                    write_show(f'params.color_weight = {color_weight:.2f}\n', toml_input, col)
-                    write_show(f'params.shape_weight = {shape_weight:.2f}\n', toml_input, col)
-                    if modus == "Advanced":
-                        write_show(f'params.custom_cff = {custom_cff}\n', toml_input, col)
-                    write_show(f'params.similarity_measure = "{similarity_measure}"\n', toml_input, col)
-                    write_show(f'params.max_stereocenters = {max_stereocenters}\n', toml_input, col)
-                    write_show(f'params.ewindow = {ewindow}\n', toml_input, col)
-                    write_show(f'params.maxconfs = {maxconfs}\n', toml_input, col)
-                    write_show(f'params.rocs_input = "{rocs_input}"\n', toml_input, col)
-                    trans_para_input(toml_input, col, state_dict, state, low_value=transformers_def_param[comp]["low_value"], high_value=transformers_def_param[comp]["high_value"], 
+                    trans_para_input(state_dict, state, low_value=transformers_def_param[comp]["low_value"], high_value=transformers_def_param[comp]["high_value"], 
                                      step=1, key=f"{key}_{comp}_{i}", default=transformers_def_param[comp]["default_transformer"], advanced=advanced, gen_scoring_file=gen_scoring_file)
 
             ## DockStream Parameters
             elif comp == "DockStream":
                 # Reset values
                 if not gen_scoring_file:
-                    state_dict_reset[st.session_state["run_mode"]][f"{key}_{comp}_name_{i}"] = {"key": f"{key}_{comp}_name_{i}", "value": "ScoringComponent"}                                             # reset value
-                    state_dict_reset[st.session_state["run_mode"]][f"{key}_{comp}_weight_{i}"] = {"key": f"{key}_{comp}_weight_{i}", "value": 1.0}                                                        # reset value
-                    state_dict_reset[st.session_state["run_mode"]][f"{key}_{comp}_config_path_{i}"] = {"key": f"{key}_{comp}_config_path_{i}", "value": "./dockstream_config.json"}                       # reset value
-                    state_dict_reset[st.session_state["run_mode"]][f"{key}_{comp}_docker_path_{i}"] = {"key": f"{key}_{comp}_docker_path_{i}", "value": "/apps/miniforge3/envs/DockerStream/docker.py"}   # reset value
-                    state_dict_reset[st.session_state["run_mode"]][f"{key}_{comp}_python_path_{i}"] = {"key": f"{key}_{comp}_python_path_{i}", "value": "/apps/anaconda/anaconda3/bin/python"}            # reset value
+                    session_dict_reset()[f"{key}_{comp}_name_{i}"] = {"key": f"{key}_{comp}_name_{i}", "value": "ScoringComponent"}                                             # reset value
+                    session_dict_reset()[f"{key}_{comp}_weight_{i}"] = {"key": f"{key}_{comp}_weight_{i}", "value": 1.0}                                                        # reset value
+                    session_dict_reset()[f"{key}_{comp}_config_path_{i}"] = {"key": f"{key}_{comp}_config_path_{i}", "value": "./dockstream_config.json"}                       # reset value
+                    session_dict_reset()[f"{key}_{comp}_docker_path_{i}"] = {"key": f"{key}_{comp}_docker_path_{i}", "value": "/apps/miniforge3/envs/DockerStream/docker.py"}   # reset value
+                    session_dict_reset()[f"{key}_{comp}_python_path_{i}"] = {"key": f"{key}_{comp}_python_path_{i}", "value": "/apps/anaconda/anaconda3/bin/python"}            # reset value
                 with st.popover("DockStream Parameters"):
                     # Input Widgets
                     comp_name = st.text_input(label="Name of scoring component in output file", value='ScoringComponent', key=f"{key}_{comp}_name_{i}")
@@ -843,7 +1278,7 @@ def scoring_components(toml_input, col, state_dict, state, stages=False, num_sta
                     needed_files[f"Docking Config ({key}-{comp}-{i})"] = False    
                     needed_files[f"Docking Grid ({key}-{comp}-{i})"] = False          
                     if config_upload:
-                        config_path = config_upload.name
+                        uploads[f"{key}_{comp}_config_path_{i}"] = config_upload.name
                         config_upload = save_uploaded_file(config_upload, Path(st.session_state["user_folder"]))
                         uploaded_files[f"Docking Config ({key}-{comp}-{i})"] = config_upload
                         needed_files[f"Docking Config ({key}-{comp}-{i})"] = True   
@@ -851,26 +1286,19 @@ def scoring_components(toml_input, col, state_dict, state, stages=False, num_sta
                         grid_upload = save_uploaded_file(grid_upload, Path(st.session_state["user_folder"]))
                         uploaded_files[f"Docking Grid ({key}-{comp}-{i})"] = grid_upload
                         needed_files[f"Docking Grid ({key}-{comp}-{i})"] = True         
-                    # Write to TOML file and Display to user
-                    write_scor_component(comp, toml_input, col, stages=stages)
-                    write_show(f'name = "{comp_name}"\n', toml_input, col)
-                    write_show(f'weight = {float(comp_weight):.2f}\n', toml_input, col)
-                    write_show(f'params.configuration_path = "{config_path}"\n', toml_input, col)
-                    write_show(f'params.docker_script_path = "{docker_path}"\n', toml_input, col)
-                    write_show(f'params.docker_python_path = "{python_path}"\n', toml_input, col)
-                    trans_para_input(toml_input, col, state_dict, state, low_value=transformers_def_param[comp]["low_value"], high_value=transformers_def_param[comp]["high_value"], 
+                    trans_para_input(state_dict, state, low_value=transformers_def_param[comp]["low_value"], high_value=transformers_def_param[comp]["high_value"], 
                                      step=1, key=f"{key}_{comp}_{i}", default=transformers_def_param[comp]["default_transformer"], advanced=advanced, gen_scoring_file=gen_scoring_file)
-                
+            
             ## AutoQSAR Parameters 
             elif comp == "AutoQSAR":
                 # Reset values
                 if not gen_scoring_file:
-                    state_dict_reset[st.session_state["run_mode"]][f"{key}_{comp}_name_{i}"] = {"key": f"{key}_{comp}_name_{i}", "value": "ScoringComponent"}        # reset value
-                    state_dict_reset[st.session_state["run_mode"]][f"{key}_{comp}_weight_{i}"] = {"key": f"{key}_{comp}_weight_{i}", "value": 1.0}           # reset value
-                    state_dict_reset[st.session_state["run_mode"]][f"{key}_{comp}_autoqsar_path_{i}"] = {"key": f"{key}_{comp}_autoqsar_path_{i}", "value": "/apps/schrodinger/advsuite2024-1/utilities/autoqsar"}       # reset value
-                    state_dict_reset[st.session_state["run_mode"]][f"{key}_{comp}_model_name_{i}"] = {"key": f"{key}_{comp}_model_name_{i}", "value": "autoqsar_model.qzip"}   # reset value
-                    state_dict_reset[st.session_state["run_mode"]][f"{key}_{comp}_pred_col_{i}"] = {"key": f"{key}_{comp}_pred_col_{i}", "value": "r_autoqsar_Pred_Y"}      # reset value
-                    state_dict_reset[st.session_state["run_mode"]][f"{key}_{comp}_cache_dir_{i}"] = {"key": f"{key}_{comp}_cache_dir_{i}", "value": "./"}       # reset value
+                    session_dict_reset()[f"{key}_{comp}_name_{i}"] = {"key": f"{key}_{comp}_name_{i}", "value": "ScoringComponent"}        # reset value
+                    session_dict_reset()[f"{key}_{comp}_weight_{i}"] = {"key": f"{key}_{comp}_weight_{i}", "value": 1.0}           # reset value
+                    session_dict_reset()[f"{key}_{comp}_autoqsar_path_{i}"] = {"key": f"{key}_{comp}_autoqsar_path_{i}", "value": "/apps/schrodinger/advsuite2024-1/utilities/autoqsar"}       # reset value
+                    session_dict_reset()[f"{key}_{comp}_model_name_{i}"] = {"key": f"{key}_{comp}_model_name_{i}", "value": "autoqsar_model.qzip"}   # reset value
+                    session_dict_reset()[f"{key}_{comp}_pred_col_{i}"] = {"key": f"{key}_{comp}_pred_col_{i}", "value": "r_autoqsar_Pred_Y"}      # reset value
+                    session_dict_reset()[f"{key}_{comp}_cache_dir_{i}"] = {"key": f"{key}_{comp}_cache_dir_{i}", "value": "./"}       # reset value
                 with st.popover("AutoQSAR Parameters"):
                     # Input Widgets
                     comp_name = st.text_input(label="Name of scoring component in output file", value='ScoringComponent', key=f"{key}_{comp}_name_{i}")
@@ -889,30 +1317,22 @@ def scoring_components(toml_input, col, state_dict, state, stages=False, num_sta
                     model_upload = st.file_uploader(f"Upload AutoQSAR model ({key}-{comp}-{i})", type=["qzip"], help="Qzip is the **ONLY** accepted format.")
                     needed_files[f"AutoQSAR Model ({key}-{comp}-{i})"] = False          
                     if model_upload:
-                        model_name = model_upload.name
+                        uploads[f"{key}_{comp}_model_name_{i}"] = model_upload.name
                         model_upload = save_uploaded_file(model_upload, Path(st.session_state["user_folder"]))
                         uploaded_files[f"AutoQSAR Model ({key}-{comp}-{i})"] = model_upload
                         needed_files[f"AutoQSAR Model ({key}-{comp}-{i})"] = True     
-                    # Write to TOML file and Display to user
-                    write_scor_component(comp, toml_input, col, stages=stages)
-                    write_show(f'name = "{comp_name}"\n', toml_input, col)
-                    write_show(f'weight = {float(comp_weight):.2f}\n', toml_input, col)
-                    write_show(f'params.autoqsar_exec = "{autoqsar_path}"\n', toml_input, col)
-                    write_show(f'params.model_file = "{model_name}"\n', toml_input, col)
-                    write_show(f'params.cache_dir = "{cache_dir}"\n', toml_input, col)
-                    write_show(f'params.pred_col = "{pred_col}"\n', toml_input, col)
-                    trans_para_input(toml_input, col, state_dict, state, low_value=transformers_def_param[comp]["low_value"], high_value=transformers_def_param[comp]["high_value"], 
+                    trans_para_input(state_dict, state, low_value=transformers_def_param[comp]["low_value"], high_value=transformers_def_param[comp]["high_value"], 
                                      step=1, key=f"{key}_{comp}_{i}", default=transformers_def_param[comp]["default_transformer"], advanced=advanced, gen_scoring_file=gen_scoring_file)
-                
+            
             ## DeepQSAR Parameters
             elif comp == "DeepQSAR":
                 # Reset values
                 if not gen_scoring_file:
-                    state_dict_reset[st.session_state["run_mode"]][f"{key}_{comp}_name_{i}"] = {"key": f"{key}_{comp}_name_{i}", "value": "ScoringComponent"}        # reset value
-                    state_dict_reset[st.session_state["run_mode"]][f"{key}_{comp}_weight_{i}"] = {"key": f"{key}_{comp}_weight_{i}", "value": 1.0}           # reset value
-                    state_dict_reset[st.session_state["run_mode"]][f"{key}_{comp}_deepautoqsar_path_{i}"] = {"key": f"{key}_{comp}_deepautoqsar_path_{i}", "value": "/apps/schrodinger/advsuite2024-1/run"}       # reset value
-                    state_dict_reset[st.session_state["run_mode"]][f"{key}_{comp}_model_name_{i}"] = {"key": f"{key}_{comp}_model_name_{i}", "value": "deepqsar_model.qzip"}   # reset value
-                    state_dict_reset[st.session_state["run_mode"]][f"{key}_{comp}_cache_dir_{i}"] = {"key": f"{key}_{comp}_cache_dir_{i}", "value": "./"}       # reset value
+                    session_dict_reset()[f"{key}_{comp}_name_{i}"] = {"key": f"{key}_{comp}_name_{i}", "value": "ScoringComponent"}        # reset value
+                    session_dict_reset()[f"{key}_{comp}_weight_{i}"] = {"key": f"{key}_{comp}_weight_{i}", "value": 1.0}           # reset value
+                    session_dict_reset()[f"{key}_{comp}_deepautoqsar_path_{i}"] = {"key": f"{key}_{comp}_deepautoqsar_path_{i}", "value": "/apps/schrodinger/advsuite2024-1/run"}       # reset value
+                    session_dict_reset()[f"{key}_{comp}_model_name_{i}"] = {"key": f"{key}_{comp}_model_name_{i}", "value": "deepqsar_model.qzip"}   # reset value
+                    session_dict_reset()[f"{key}_{comp}_cache_dir_{i}"] = {"key": f"{key}_{comp}_cache_dir_{i}", "value": "./"}       # reset value
                 with st.popover("DeepQSAR Parameters"):
                     # Input Widgets
                     comp_name = st.text_input(label="Name of scoring component in output file", value='ScoringComponent', key=f"{key}_{comp}_name_{i}")
@@ -929,27 +1349,20 @@ def scoring_components(toml_input, col, state_dict, state, stages=False, num_sta
                     model_upload = st.file_uploader(f"Upload DeepQSAR model ({key}-{comp}-{i})", type=["qzip"], help="Qzip is the **ONLY** accepted format.")
                     needed_files[f"DeepQSAR Model ({key}-{comp}-{i})"] = False          
                     if model_upload:
-                        model_name = model_upload.name
+                        uploads[f"{key}_{comp}_model_name_{i}"] = model_upload.name
                         model_upload = save_uploaded_file(model_upload, Path(st.session_state["user_folder"]))
                         uploaded_files[f"DeepQSAR Model ({key}-{comp}-{i})"] = model_upload
                         needed_files[f"DeepQSAR Model ({key}-{comp}-{i})"] = True     
-                    # Write to TOML file and Display to user
-                    write_scor_component(comp, toml_input, col, stages=stages)
-                    write_show(f'name = "{comp_name}"\n', toml_input, col)
-                    write_show(f'weight = {float(comp_weight):.2f}\n', toml_input, col)
-                    write_show(f'params.deepautoqsar_exec = "{deepautoqsar_path}"\n', toml_input, col)
-                    write_show(f'params.model_file = "{model_name}"\n', toml_input, col)
-                    write_show(f'params.cache_dir = "{cache_dir}"\n', toml_input, col)
-                    trans_para_input(toml_input, col, state_dict, state, low_value=transformers_def_param[comp]["low_value"], high_value=transformers_def_param[comp]["high_value"], 
+                    trans_para_input(state_dict, state, low_value=transformers_def_param[comp]["low_value"], high_value=transformers_def_param[comp]["high_value"], 
                                      step=1, key=f"{key}_{comp}_{i}", default=transformers_def_param[comp]["default_transformer"], advanced=advanced, gen_scoring_file=gen_scoring_file)
-                
+            
             ## pADME Parameters
             elif comp == "pADME":
                 # Reset values
                 if not gen_scoring_file:
-                    state_dict_reset[st.session_state["run_mode"]][f"{key}_{comp}_name_{i}"] = {"key": f"{key}_{comp}_name_{i}", "value": "ScoringComponent"}        # reset value
-                    state_dict_reset[st.session_state["run_mode"]][f"{key}_{comp}_weight_{i}"] = {"key": f"{key}_{comp}_weight_{i}", "value": 1.0}           # reset value
-                    state_dict_reset[st.session_state["run_mode"]][f"{key}_{comp}_padme_model_{i}"] = {"key": f"{key}_{comp}_padme_model_{i}", "value": list(transformers_def_param[comp].keys())[0]}       # reset value
+                    session_dict_reset()[f"{key}_{comp}_name_{i}"] = {"key": f"{key}_{comp}_name_{i}", "value": "ScoringComponent"}        # reset value
+                    session_dict_reset()[f"{key}_{comp}_weight_{i}"] = {"key": f"{key}_{comp}_weight_{i}", "value": 1.0}           # reset value
+                    session_dict_reset()[f"{key}_{comp}_padme_model_{i}"] = {"key": f"{key}_{comp}_padme_model_{i}", "value": list(transformers_def_param[comp].keys())[0]}       # reset value
                 with st.popover("pADME Parameters"):
                     # Input Widgets
                     comp_name = st.text_input(label="Name of scoring component in output file", value='ScoringComponent', key=f"{key}_{comp}_name_{i}")
@@ -959,22 +1372,17 @@ def scoring_components(toml_input, col, state_dict, state, stages=False, num_sta
                     padme_models = st.selectbox(label="Select pADME model", options=PADME_models, index=0, key=f"{key}_{comp}_padme_model_{i}", 
                                                 help="**Note**: The user must ensure that REINVENT has access to the user-defined ADME models.")
                     padme_models = change_param(padme_models, st.session_state["change_param_dict"], state_dict, state, f"{key}_{comp}_padme_model_{i}", add_key=True) if not gen_scoring_file else padme_models # UI State
-                    # Write to TOML file and Display to user
-                    write_scor_component(comp, toml_input, col, stages=stages)
-                    write_show(f'name = "{comp_name}"\n', toml_input, col)
-                    write_show(f'weight = {float(comp_weight):.2f}\n', toml_input, col)
-                    write_show(f'params.property_name = "{padme_models}"\n', toml_input, col)
-                    trans_para_input(toml_input, col, state_dict, state, low_value=transformers_def_param[comp][padme_models]["low_value"], high_value=transformers_def_param[comp][padme_models]["high_value"], 
+                    trans_para_input(state_dict, state, low_value=transformers_def_param[comp][padme_models]["low_value"], high_value=transformers_def_param[comp][padme_models]["high_value"], 
                                      step=1, key=f"{key}_{comp}_{i}", default=transformers_def_param[comp][padme_models]["default_transformer"], advanced=advanced, gen_scoring_file=gen_scoring_file)
 
             ## ReactionFilter Parameters
             elif comp == "ReactionFilter":
                 # Reset values
                 if not gen_scoring_file:
-                    state_dict_reset[st.session_state["run_mode"]][f"{key}_{comp}_name_{i}"] = {"key": f"{key}_{comp}_name_{i}", "value": "ScoringComponent"}     # reset value
-                    state_dict_reset[st.session_state["run_mode"]][f"{key}_{comp}_weight_{i}"] = {"key": f"{key}_{comp}_weight_{i}", "value": 1.0}                # reset value
-                    state_dict_reset[st.session_state["run_mode"]][f"{key}_{comp}_filter_type_{i}"] = {"key": f"{key}_{comp}_filter_type_{i}", "value": "IdenticalMurckoScaffold"}         # reset value
-                    state_dict_reset[st.session_state["run_mode"]][f"{key}_{comp}_reaction_smarts_{i}"] = {"key": f"{key}_{comp}_reaction_smarts_{i}", "value": "[F, Cl]"}         # reset value
+                    session_dict_reset()[f"{key}_{comp}_name_{i}"] = {"key": f"{key}_{comp}_name_{i}", "value": "ScoringComponent"}     # reset value
+                    session_dict_reset()[f"{key}_{comp}_weight_{i}"] = {"key": f"{key}_{comp}_weight_{i}", "value": 1.0}                # reset value
+                    session_dict_reset()[f"{key}_{comp}_filter_type_{i}"] = {"key": f"{key}_{comp}_filter_type_{i}", "value": "IdenticalMurckoScaffold"}         # reset value
+                    session_dict_reset()[f"{key}_{comp}_reaction_smarts_{i}"] = {"key": f"{key}_{comp}_reaction_smarts_{i}", "value": "[F, Cl]"}         # reset value
                 with st.popover("ReactionFilter Parameters"):
                     # Input Widgets
                     comp_name = st.text_input(label="Name of scoring component in output file", value='ScoringComponent', key=f"{key}_{comp}_name_{i}")
@@ -986,37 +1394,27 @@ def scoring_components(toml_input, col, state_dict, state, stages=False, num_sta
                     reaction_smarts = st.text_input(label="RDKit reaction SMARTS", value="[F, Cl]", key=f"{key}_{comp}_reaction_smarts_{i}")
                     reaction_smarts = change_param(reaction_smarts, st.session_state["change_param_dict"], state_dict, state, f"{key}_{comp}_reaction_smarts_{i}", add_key=True) if not gen_scoring_file else reaction_smarts # UI State
                     smarts_df = smarts_table(comp, str(i))
-                    if len(smarts_df[smarts_df["Status"] == True]) > 0: 
-                        smarts_pattern = reaction_smarts.split(',,') + list(smarts_df[smarts_df["Status"] == True]["SMARTS"]) if reaction_smarts != '' else list(smarts_df[smarts_df["Status"] == True]["SMARTS"])
-                    else:
-                        smarts_pattern = f"{[f'{smart}' for smart in reaction_smarts.split(',,')]}"
-                    # Write to TOML file and Display to user
-                    write_scor_component(comp, toml_input, col, stages=stages)
-                    write_show(f'name = "{comp_name}"\n', toml_input, col)
-                    write_show(f'weight = {float(comp_weight):.2f}\n', toml_input, col)
-                    write_show(f'params.type = "{filter_type}"\n', toml_input, col)
-                    write_show(f'params.reaction_smarts = "{smarts_pattern}"\n', toml_input, col, empty_line=True, display=False)
-                    col.text(f'params.reaction_smarts = "{smarts_pattern}"')
-                    col.write("\n")
+                    uploads[f"{key}_{comp}_smarts_table_{i}"] = list(smarts_df[smarts_df["Status"] == True]["SMARTS Pattern"])
 
             ## All other scoring components 
             else:
                 # Reset values
                 if not gen_scoring_file:
-                    state_dict_reset[st.session_state["run_mode"]][f"{key}_{comp}_name_{i}"] = {"key": f"{key}_{comp}_name_{i}", "value": "ScoringComponent"}     # reset value
-                    state_dict_reset[st.session_state["run_mode"]][f"{key}_{comp}_weight_{i}"] = {"key": f"{key}_{comp}_weight_{i}", "value": 1.0}                # reset value
+                    session_dict_reset()[f"{key}_{comp}_name_{i}"] = {"key": f"{key}_{comp}_name_{i}", "value": "ScoringComponent"}     # reset value
+                    session_dict_reset()[f"{key}_{comp}_weight_{i}"] = {"key": f"{key}_{comp}_weight_{i}", "value": 1.0}                # reset value
                 with st.popover(f"{comp} Parameters"):
                     # Input Widgets
                     comp_name = st.text_input(label="Name of scoring component in output file", value='ScoringComponent', key=f"{key}_{comp}_name_{i}")
                     comp_name = change_param(comp_name, st.session_state["change_param_dict"], state_dict, state, f"{key}_{comp}_name_{i}", add_key=True) if not gen_scoring_file else comp_name # UI State
                     comp_weight = st.number_input(label="Weight of scoring component", value=1.0, min_value=0.0, max_value=None, step=0.1, key=f"{key}_{comp}_weight_{i}")
                     comp_weight = change_param(comp_weight, st.session_state["change_param_dict"], state_dict, state, f"{key}_{comp}_weight_{i}", add_key=True) if not gen_scoring_file else comp_weight # UI State
-                    # Write to TOML file and Display to user
-                    write_scor_component(comp, toml_input, col, stages=stages)
-                    write_show(f'name = "{comp_name}"\n', toml_input, col)
-                    write_show(f'weight = {float(comp_weight):.2f}\n', toml_input, col)
-                    trans_para_input(toml_input, col, state_dict, state, low_value=transformers_def_param[comp]["low_value"], high_value=transformers_def_param[comp]["high_value"], 
+                    trans_para_input(state_dict, state, low_value=transformers_def_param[comp]["low_value"], high_value=transformers_def_param[comp]["high_value"], 
                                      step=1, key=f"{key}_{comp}_{i}", default=transformers_def_param[comp]["default_transformer"], advanced=advanced, gen_scoring_file=gen_scoring_file)
+
+        ## Local preview of the scores (CPU) for a set of molecules
+        if (not gen_scoring_file) and scor_components:
+            with st.popover("Preview Scores"):
+                scoring_preview_ui(key, scor_components, scoring_weight)
         
     return None
 
@@ -1210,13 +1608,11 @@ def similarity_function(toml_input, col):
     write_show(f'pairs.max_cardinality = {int(pairs_max_cardinality)}\n', toml_input, col, empty_line=True)
 
 
-def diversity_filter(col_write, file_write, state_dict, state, global_DF=True, num_stage=None, key=None):
+def diversity_filter(state_dict, state, global_DF=True, num_stage=None, key=None):
     """
-    Display and configure diversity filter parameters in a Streamlit app.
+    Display and configure diversity filter parameters in a Streamlit app (written by input_files.diversity_filter_toml).
 
     Args:
-        col_write (streamlit.columns): The Streamlit column to write the filter parameters.
-        file_write (str): The file to write the filter parameters to.
         state_dict (dict): The loaded UI state (JSON format) converted into dict. 
         state (bool): Whether a UI state was uploaded or not (Uploaded = True, Not Uploaded = False). 
         global_DF (bool, optional): Whether the filter is global. Defaults to True.
@@ -1250,26 +1646,14 @@ def diversity_filter(col_write, file_write, state_dict, state, global_DF=True, n
                                                             changes in the molecule.""",
                                                     key=f"{key}_penalty")
             penalty_multiplier = change_param(penalty_multiplier, st.session_state["change_param_dict"], state_dict, state, f"{key}_penalty")  # UI State
-        write_show('\# Diversity Filter Parameters\n', file_write, col_write)
-        write_show('[diversity_filter]\n', file_write, col_write)
-        write_show(f'type = "{div_type}"\n', file_write, col_write)
-        write_show(f'bucket_size = {int(bucket_size)}\n', file_write, col_write)
-        if div_type == "ScaffoldSimilarity":
-            write_show(f'minscore = {float(minscore)}\n', file_write, col_write)
-            write_show(f'minsimilarity = {float(minsimilarity)}\n', file_write, col_write, empty_line=True)
-        elif div_type == "PenalizeSameSmiles":
-            write_show(f'minscore = {float(minscore)}\n', file_write, col_write)
-            write_show(f'penalty_multiplier = {float(penalty_multiplier)}\n', file_write, col_write, empty_line=True)
-        else:
-            write_show(f'minscore = {float(minscore)}\n', file_write, col_write, empty_line=True)
     ## Separate Diversity Filters for Stages
     else:
         ## Add default values for the scoring components to the reset dictionary
-        state_dict_reset[st.session_state["run_mode"]][f"{key}_type"] = {"key": f"{key}_type", "value": "IdenticalMurckoScaffold"}        # reset value
-        state_dict_reset[st.session_state["run_mode"]][f"{key}_bucket"] = {"key": f"{key}_bucket", "value": 25}         # reset value
-        state_dict_reset[st.session_state["run_mode"]][f"{key}_minscore"] = {"key": f"{key}_minscore", "value": 0.4}  # reset value
-        state_dict_reset[st.session_state["run_mode"]][f"{key}_minsimilarity"] = {"key": f"{key}_minsimilarity", "value": 0.4}  # reset value
-        state_dict_reset[st.session_state["run_mode"]][f"{key}_penalty"] = {"key": f"{key}_penalty", "value": 0.5}  # reset value
+        session_dict_reset()[f"{key}_type"] = {"key": f"{key}_type", "value": "IdenticalMurckoScaffold"}        # reset value
+        session_dict_reset()[f"{key}_bucket"] = {"key": f"{key}_bucket", "value": 25}         # reset value
+        session_dict_reset()[f"{key}_minscore"] = {"key": f"{key}_minscore", "value": 0.4}  # reset value
+        session_dict_reset()[f"{key}_minsimilarity"] = {"key": f"{key}_minsimilarity", "value": 0.4}  # reset value
+        session_dict_reset()[f"{key}_penalty_multiplier"] = {"key": f"{key}_penalty_multiplier", "value": 0.5}  # reset value
         ## Input Widgets 
         with st.popover(f"Diversity Filter Parameters (S{num_stage})"):
             div_type = st.selectbox(f"Select similarity criteria", ["IdenticalMurckoScaffold", "IdenticalTopologicalScaffold", "ScaffoldSimilarity", "PenalizeSameSmiles"], index=0, key=f"{key}_type")
@@ -1289,24 +1673,12 @@ def diversity_filter(col_write, file_write, state_dict, state, global_DF=True, n
                                                         help="""This option avoids generating the same molecule again and again. 
                                                              It is especially useful when the user wants to make only small 
                                                              changes in the molecule.""")
-                penalty_multiplier = change_param(penalty_multiplier, st.session_state["change_param_dict"], state_dict, state, f"{key}_penalty", add_key=True)  # UI State
-            write_show(f'\# Diversity Filter Parameters (S{num_stage})\n', file_write, col_write)
-            write_show('[stage.diversity_filter]\n', file_write, col_write)
-            write_show(f'type = "{div_type}"\n', file_write, col_write)
-            write_show(f'bucket_size = {int(bucket_size)}\n', file_write, col_write)
-            if div_type == "ScaffoldSimilarity":
-                write_show(f'minscore = {float(minscore)}\n', file_write, col_write)
-                write_show(f'minsimilarity = {float(minsimilarity)}\n', file_write, col_write, empty_line=True)
-            elif div_type == "PenalizeSameSmiles":
-                write_show(f'minscore = {float(minscore)}\n', file_write, col_write)
-                write_show(f'penalty_multiplier = {float(penalty_multiplier)}\n', file_write, col_write, empty_line=True)
-            else:
-                write_show(f'minscore = {float(minscore)}\n', file_write, col_write, empty_line=True)
+                penalty_multiplier = change_param(penalty_multiplier, st.session_state["change_param_dict"], state_dict, state, f"{key}_penalty_multiplier", add_key=True)  # UI State
 
 
 def copy_file_tempdir(uploaded_file, temp_dir):
     """
-    Copy an uploaded file to a temporary directory.
+    Copy an uploaded file to a temporary directory (hardlink of the shared blob store).
 
     Args:
         uploaded_file (UploadedFile): The uploaded file to copy.
@@ -1315,15 +1687,95 @@ def copy_file_tempdir(uploaded_file, temp_dir):
     Returns:
         None
     """
-    path = os.path.join(temp_dir, uploaded_file.name)
-    with open(path, "wb") as f:
-            f.write(uploaded_file.getvalue())
+    link_upload(uploaded_file, os.path.join(temp_dir, uploaded_file.name))
+
+
+ZIP_SPOOL_MAX_SIZE = 64 * 1024 * 1024    # Zip bundles larger than this are spooled to disk
+ZIP_COMPRESSION = {"Store": zipfile.ZIP_STORED, "Deflate": zipfile.ZIP_DEFLATED}
+
+
+@lru_cache(maxsize=256)
+def _path_digest(path, size, mtime_ns):
+    """
+    Cached SHA-256 hash of a file on disk (the size and modification time invalidate the cache).
+    """
+    return file_digest(path)
+
+
+def member_key(file):
+    """
+    Return a cache key of a file that changes with its content, without reading uploaded files.
+    Files on disk are identified by their content hash (only re-hashed if their size or modification time changed), 
+    uploaded files by their upload ID and size (a new upload gets a new ID).
+
+    Args:
+        file (str or UploadedFile): The path to the file or an uploaded file.
+
+    Returns:
+        tuple: The cache key of the file.
+    """
+    if isinstance(file, (str, Path)):
+        file_stat = os.stat(file)
+        return ("path", _path_digest(str(file), file_stat.st_size, file_stat.st_mtime_ns))
+    if getattr(file, "file_id", None) is not None:
+        return ("upload", file.file_id, file.size)
+    return ("content", file_digest(file))
+
+
+def build_zip_bundle(members, compression=zipfile.ZIP_STORED, block_size=1024*1024):
+    """
+    Stream files into a zip archive held in a spooled temporary file 
+    (in memory up to ZIP_SPOOL_MAX_SIZE, on disk above).
+
+    Args:
+        members (list): List of (name in the archive, file path or uploaded file) tuples.
+        compression (int, optional): The zipfile compression method. Defaults to zipfile.ZIP_STORED.
+        block_size (int, optional): The number of bytes copied per block for uploaded files. Defaults to 1 MB.
+
+    Returns:
+        SpooledTemporaryFile: The zip archive (positioned at the start).
+    """
+    bundle = tempfile.SpooledTemporaryFile(max_size=ZIP_SPOOL_MAX_SIZE)
+    with zipfile.ZipFile(bundle, "w", compression=compression) as zip_file:
+        for name, file in members:
+            if isinstance(file, (str, Path)):
+                zip_file.write(file, arcname=name)
+            else:
+                file.seek(0)
+                with zip_file.open(name, "w", force_zip64=True) as member:
+                    shutil.copyfileobj(file, member, block_size)
+                file.seek(0)
+    bundle.seek(0)
+    return bundle
+
+
+def zip_bundle(members, compression=zipfile.ZIP_STORED):
+    """
+    Return the bytes of the zip archive of the members, rebuilt (and read) only if a member 
+    (or the compression method) changed since the last run of the session (see member_key).
+
+    Args:
+        members (list): List of (name in the archive, file path or uploaded file) tuples.
+        compression (int, optional): The zipfile compression method. Defaults to zipfile.ZIP_STORED.
+
+    Returns:
+        bytes: The zip archive.
+    """
+    key = (compression,) + tuple((name, member_key(file)) for name, file in members)
+    cached = st.session_state.get("zip_bundle")
+    if (cached is None) or (cached[0] != key):
+        # Streamlit 1.40 needs the bytes of the zip file, the spooled file is read once per change
+        with build_zip_bundle(members, compression) as bundle:
+            cached = (key, bundle.read())
+        st.session_state["zip_bundle"] = cached
+    return cached[1]
 
 
 def download_files(uploaded_files, col):
     """
     Provide download buttons for uploaded files, including the TOML input file and model file.
-    If multiple files are uploaded, create a zip file containing all files and provide a download button for it.
+    If multiple files are uploaded, provide a download button for a zip file containing all files.
+    The zip file is cached and only rebuilt if one of its files changed. Missing files are skipped.
 
     Args:
         uploaded_files (dict): A dictionary containing the uploaded files.
@@ -1341,65 +1793,61 @@ def download_files(uploaded_files, col):
             help=os.path.basename(uploaded_files["TOML Input"])
         )
 
-    # Check if other files are uploaded and create a zip file
-    if len([file for file in uploaded_files.values() if (file != None)]) > 1:
-        # Create an in-memory buffer to store the zip file
-        zip_buffer = io.BytesIO()
-        # Zip the uploaded files
-        with zipfile.ZipFile(zip_buffer, 'w') as zip_file:
-            # Zip the toml input file 
-            with open(uploaded_files["TOML Input"], "r") as toml:
-                zip_file.writestr(os.path.basename(uploaded_files["TOML Input"]), toml.read())
-            # Zip the other uploaded files
-            for uploaded_file in list(uploaded_files.keys())[1:]:
-                if uploaded_files[uploaded_file] != None:
-                    # Write each uploaded file into the zip file
-                    if isinstance(uploaded_files[uploaded_file], str):
-                        if "Model" in uploaded_file:
-                            file = open(uploaded_files[uploaded_file], "rb")
-                        else:
-                            file = open(uploaded_files[uploaded_file], "r")
-                        file_name = os.path.basename(uploaded_files[uploaded_file])
-                        file_content = file.read()
-                        zip_file.writestr(file_name, file_content)
-                        col.download_button(
-                            label=f"Download {uploaded_file}",
-                            data=file_content,
-                            file_name=file_name,
-                            help=file_name
-                            )
-                        file.close()  
-                    else:
-                        zip_file.writestr(uploaded_files[uploaded_file].name, uploaded_files[uploaded_file].getvalue())
-                        col.download_button(
-                            f"Download {uploaded_file}", 
-                            uploaded_files[uploaded_file].getvalue(), 
-                            file_name=uploaded_files[uploaded_file].name, 
-                            help=uploaded_files[uploaded_file].name
-                            )
-
-        # Ensure buffer's pointer is at the start
-        zip_buffer.seek(0)
+    # Download buttons of the other uploaded files (the files are passed as handles, without extra copies)
+    members = [(os.path.basename(uploaded_files["TOML Input"]), uploaded_files["TOML Input"])]
+    for uploaded_file in list(uploaded_files.keys())[1:]:
+        file = uploaded_files[uploaded_file]
+        if file == None:
+            continue
+        if isinstance(file, str):
+            if not os.path.isfile(file):
+                continue
+            file_name = os.path.basename(file)
+            with open(file, "rb" if ("Model" in uploaded_file) or file.endswith(".zip") else "r") as f:
+                col.download_button(
+                    label=f"Download {uploaded_file}",
+                    data=f,
+                    file_name=file_name,
+                    help=file_name
+                    )
+        else:
+            file_name = file.name
+            col.download_button(
+                f"Download {uploaded_file}", 
+                file, 
+                file_name=file_name, 
+                help=file_name
+                )
+        members.append((file_name, file))
+
+    # Zip file of all files
+    if len(members) > 1:
+        compression = col.radio("Zip Compression", list(ZIP_COMPRESSION.keys()), index=0, horizontal=True, key="zip_compression",
+                                help="""**Store** only packs the files (fast, model checkpoints are already compressed). 
+                                        **Deflate** compresses the files (smaller zip file for text files).""")
+        bundle = zip_bundle(members, ZIP_COMPRESSION[compression])
         # list of files contained in the zip file 
         files_list = ""
-        for i, fi in enumerate(zip_file.namelist()):
+        for i, (fi, _) in enumerate(members):
             files_list += f"{i+1}. {fi}\n\n"
         # Download button to download the zip file
         col.download_button(
             label="Download all Files as Zip File",
-            data=zip_buffer,
+            data=bundle,
             file_name="reinvent_calc.zip",
             mime="application/zip",
             help=f"Files in Zip File:\n\n {files_list}"
         )
     
 
-def bash_script(key, state_dict, state):
+def bash_script(key, state_dict, state, num_shards=None):
     """
     Generate a bash script for running a calculation, optionally on an HPC cluster.
+    For sharded calculations, the script runs one input file per shard (as SLURM job array on a cluster).
 
     Args:
         key (str): A unique key for Streamlit widgets.
+        num_shards (int, optional): The number of shards (see scoring_shards). Defaults to None (no shards).
 
     Returns:
         str: The path to the generated bash script, or None if the script is not enabled.
@@ -1430,35 +1878,9 @@ def bash_script(key, state_dict, state):
             time = st.text_input("Set a time limit for the total run time of the job (DD-HH:MM:SS)", value="00-12:00:00", key=key+"_time") 
             time = change_param(time, st.session_state["change_param_dict"], state_dict, state, key+"_time")  # UI State
 
-        text = ""
+        text = bash_script_text(st.session_state, key, num_shards=num_shards)
         with open(bash_file, "w") as fout:
-
-            if cluster_calc:
-                fout.write("#!/bin/bash\n")
-                text += "#!/bin/bash\n"
-                fout.write(f"#SBATCH --job-name={job_name}\n")
-                text += f"#SBATCH --job-name={job_name}\n"
-                fout.write(f"#SBATCH --partition={partition_name}\n")
-                text += f"#SBATCH --partition={partition_name}\n"
-                fout.write(f"#SBATCH --nodes={num_nodes}\n")
-                text += f"#SBATCH --nodes={num_nodes}\n"
-                fout.write(f"#SBATCH --gpus-per-node={gpus_per_node}\n")
-                text += f"#SBATCH --gpus-per-node={gpus_per_node}\n"
-                fout.write(f"#SBATCH --time={time}\n\n")
-                text += f"#SBATCH --time={time}\n\n"
-
-            else:
-                fout.write("#!/bin/bash\n\n")
-                text += "#!/bin/bash\n\n"
-
-            fout.write("# activate the conda environment where the reinvent4 package is installed\n")
-            text += "# activate the conda environment where the reinvent4 package is installed\n"
-            fout.write(f"conda activate {conda_env}\n\n")
-            text += f"conda activate {conda_env}\n\n"
-            fout.write("# run the reinvent calculation\n")
-            text += "# run the reinvent calculation\n"
-            fout.write(f"reinvent -l {logfile_name}.log {inputfile_name}.toml")
-            text += f"reinvent -l {logfile_name}.log {inputfile_name}.toml"
+            fout.write(text)
 
         st.code(text, language="bash")
         return bash_file
@@ -1467,30 +1889,271 @@ def bash_script(key, state_dict, state):
         return None
 
 
-def SMILES_file(key, run_mode, title="SMILES", mol_gen=None, mol2mol=None):
+def shard_name(name, index, num_shards):
     """
-    Handle the upload and processing of a SMILES or SDF file, including conversion and visualization.
+    Name of the file of a shard (e.g., shard_name("scored.csv", 1, 10) -> "scored_shard_001.csv").
+    """
+    path = Path(name)
+    return f"{path.stem}_shard_{index:0{shard_width(num_shards)}d}{path.suffix}"
+
+
+def count_lines(file_path, block_size=1024*1024, max_lines=None):
+    """
+    Count the lines of a text file (read in binary blocks, a last line without line break is counted).
 
     Args:
-        key (str): A unique key for Streamlit widgets.
-        run_mode (str): The run mode, e.g., "Reinforcement Learning (RL)".
-        title (str, optional): The title for Upload widget. Defaults to "SMILES".
-        mol_gen (str, optional): The molecule generator, e.g., "Reinvent". Defaults to None.
-        mol2mol (str, optional): The specific Mol2Mol mode. Defaults to None.
+        file_path (str): The path to the file.
+        block_size (int, optional): The number of bytes read per block. Defaults to 1 MB.
+        max_lines (int, optional): Stop counting after max_lines lines. Defaults to None (count all lines).
 
     Returns:
-        tuple: The path to the temporary SMILES file and its name, or (None, None) if no file is uploaded.
+        int: The number of lines (at most max_lines).
     """
-    smi_file = st.file_uploader(f"Upload {title} File", type=["smi", "sdf"], 
-                                help="SMILES (.smi) and Structures Data File (.sdf) are the **ONLY** accepted format.")
-    if smi_file:
-        # Name of smiles file 
-        smi_name = smi_file.name
+    count = 0
+    last = b"\n"
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            count += block.count(b"\n")
+            last = block[-1:]
+            if (max_lines is not None) and (count >= max_lines):
+                return max_lines
+    count += (last != b"\n")
+    return count if max_lines is None else min(count, max_lines)
+
+
+def shard_smiles_file(smi_file, num_shards, shard_dir, smi_name=None):
+    """
+    Split a SMILES file into contiguous shards of balanced size (number of lines differs by at most one).
+    The file is read twice: the lines are counted in blocks (see count_lines), then copied into the shards. 
+    Contiguous shards keep the order of the merged output file (see merge_shards_script).
 
-        # Save uploaded .smi of .sdf into the temp_files folder
-        smi_temp = save_uploaded_file(smi_file, Path(st.session_state["user_folder"]))
+    Args:
+        smi_file (str): The path to the SMILES file.
+        num_shards (int): The number of shards (shards are empty if there are less lines than shards).
+        shard_dir (str): The folder of the shard files.
+        smi_name (str, optional): The name of the SMILES file used for the shard names. Defaults to the name of smi_file.
 
-        # Convert to .smi if the file is .sdf 
+    Returns:
+        list: The paths to the shard files (in order).
+    """
+    num_lines = count_lines(smi_file)
+    sizes = [num_lines // num_shards + (i < num_lines % num_shards) for i in range(num_shards)]
+    shard_files = [os.path.join(shard_dir, shard_name(smi_name or os.path.basename(smi_file), i + 1, num_shards)) 
+                   for i in range(num_shards)]
+    with open(smi_file, "rb") as fin:
+        for shard_file, size in zip(shard_files, sizes):
+            with open(shard_file, "wb") as fout:
+                fout.writelines(itertools.islice(fin, size))
+    return shard_files
+
+
+def merge_shards_script(output_csv, num_shards):
+    """
+    Generate the bash script concatenating the output CSV files of the shards (in order, header of the first shard).
+
+    Args:
+        output_csv (str): The name of the merged output CSV file.
+        num_shards (int): The number of shards.
+
+    Returns:
+        str: The bash script.
+    """
+    stem = Path(output_csv).stem
+    width = shard_width(num_shards)
+    return (
+        "#!/bin/bash\n\n"
+        f"# merge the output files of the {num_shards} shards (in order) into {output_csv}\n"
+        f'head -n 1 "{shard_name(output_csv, 1, num_shards)}" > "{output_csv}" || exit 1\n'
+        f'for SHARD in $(seq -f "%0{width}g" 1 {num_shards}); do\n'
+        f'    SHARD_CSV="{stem}_shard_$SHARD.csv"\n'
+        '    if [ ! -f "$SHARD_CSV" ]; then\n'
+        '        echo "Missing output file of shard $SHARD: $SHARD_CSV" >&2\n'
+        "        exit 1\n"
+        "    fi\n"
+        f'    tail -n +2 "$SHARD_CSV" >> "{output_csv}"\n'
+        "done\n"
+    )
+
+
+def scoring_shards(values, uploads, smi_file, num_shards, shard_dir, toml_name):
+    """
+    Split the SMILES file of a scoring run into shards and write one TOML input file per shard 
+    (own SMILES, output CSV and JSON file) and the merge script, bundled in one zip file.
+    The TOML input files of the shards are generated by input_files.input_toml with the file names of the shard.
+    The shards are only rebuilt if the SMILES file, the number of shards or the TOML input file changed.
+
+    Args:
+        values (dict): The widget values of the scoring run.
+        uploads (dict): The values of uploaded files used in the TOML input file (see input_files.input_toml).
+        smi_file (str): The path to the SMILES file (at least num_shards lines).
+        num_shards (int): The number of shards.
+        shard_dir (str): The folder of the shard files (the zip file is written next to it).
+        toml_name (str): The name of the TOML input file of the scoring run (without extension).
+
+    Returns:
+        str: The path to the zip file.
+    """
+    toml_text = input_toml(values, uploads)
+    key = (member_key(smi_file), num_shards, hashlib.sha256(toml_text.encode()).hexdigest())
+    cached = st.session_state.get("scoring_shards")
+    if (cached is not None) and (cached[0] == key) and os.path.isfile(cached[1]):
+        return cached[1]
+
+    shutil.rmtree(shard_dir, ignore_errors=True)
+    os.makedirs(shard_dir)
+    smiles_name = smiles_file_name(values, "Scoring_smiles_file", "to_score", uploads)
+    output_csv = f'{values.get("Scoring_output_csv", "scored")}.csv'
+    json_file = f'{values.get("Scoring_json_file", "Scoring_input")}.json'
+    shard_files = shard_smiles_file(smi_file, num_shards, shard_dir, smi_name=smiles_name)
+    for i, shard_file in enumerate(shard_files):
+        shard_values = {**values, 
+                        "Scoring_output_csv": Path(shard_name(output_csv, i + 1, num_shards)).stem, 
+                        "Scoring_json_file": Path(shard_name(json_file, i + 1, num_shards)).stem}
+        shard_uploads = {**uploads, "Scoring_smiles_file": os.path.basename(shard_file)}
+        with open(os.path.join(shard_dir, shard_name(f"{toml_name}.toml", i + 1, num_shards)), "w") as f:
+            f.write(input_toml(shard_values, shard_uploads))
+    with open(os.path.join(shard_dir, SHARD_MERGE_SCRIPT), "w") as f:
+        f.write(merge_shards_script(output_csv, num_shards))
+
+    zip_path = f"{shard_dir}.zip"
+    with zipfile.ZipFile(zip_path, "w", compression=zipfile.ZIP_DEFLATED) as zip_file:
+        for file in sorted(os.listdir(shard_dir)):
+            zip_file.write(os.path.join(shard_dir, file), arcname=file)
+    st.session_state["scoring_shards"] = (key, zip_path)
+    return zip_path
+
+
+def parse_sweep_spec(text, value):
+    """
+    Parse the values of a sweep parameter: comma separated values (e.g., "64, 128, 256") 
+    or a range "min:max:num" with an optional logarithmic scale "min:max:num:log" (e.g., "1e-5:1e-3:5:log").
+
+    Args:
+        text (str): The text entered by the user.
+        value (int or float): The current value of the parameter (defines the type of the values).
+
+    Returns:
+        list or dict: The values or the range of the parameter (see engine.sweep_values), or None if the text is invalid.
+    """
+    cast = int if isinstance(value, int) else float
+    try:
+        if ":" in text:
+            parts = [part.strip() for part in text.split(":")]
+            if (len(parts) not in (3, 4)) or ((len(parts) == 4) and (parts[3] != "log")):
+                return None
+            spec = {"min": cast(float(parts[0])), "max": cast(float(parts[1])), "num": int(parts[2]), "log": len(parts) == 4}
+            if (spec["num"] < 1) or (spec["log"] and (spec["min"] <= 0 or spec["max"] <= 0)):
+                return None
+            return spec
+        values = [cast(float(part)) for part in text.split(",") if part.strip()]
+        return values or None
+    except ValueError:
+        return None
+
+
+def parameter_sweep(key, uploads=None):
+    """
+    Generate a parameter sweep of the current UI state: one input folder per grid point (or Latin hypercube sample),
+    a manifest CSV file and one SLURM job array script running all input files, bundled in one zip file.
+    The input files are generated by the engine (engine.py) with the same code as the UI (input_files.py).
+
+    Args:
+        key (str): The run mode (or its prefix) of the swept parameters.
+        uploads (dict, optional): The values of uploaded files used in the TOML input file (see input_files.input_toml). Defaults to None.
+
+    Returns:
+        None
+    """
+    from engine import SLURM_DEFAULTS, build_sweep, sweep_values
+
+    # Numerical widgets of the run mode (widgets without key are only known by their default value)
+    prefix = run_mode_prefix.get(key, key)
+    values = {**state_defaults, **{name: value for name, value in st.session_state.items()}}
+    candidates = sorted(name for name, value in values.items() if name.startswith((f"{prefix}_", f"{prefix}-")) 
+                        and isinstance(value, (int, float)) and not isinstance(value, bool))
+    parameters = st.multiselect("Sweep Parameters", candidates, key="sweep_parameters", 
+                                help="Numerical parameters of the current run mode (e.g., batch size, sigma, learning rate).")
+    grid = {}
+    for parameter in parameters:
+        value = values[parameter]
+        text = st.text_input(f"{parameter} (current: {value})", value=str(value), key=f"sweep_values_{parameter}", 
+                             help="Comma separated values (e.g., 64, 128, 256) or a range min:max:num[:log] (e.g., 1e-5:1e-3:5:log).")
+        spec = parse_sweep_spec(text, value)
+        if spec is None:
+            st.error(f"Invalid values of {parameter}: {text}", icon="🚨")
+            return None
+        grid[parameter] = spec
+    if not grid:
+        return None
+
+    method = st.radio("Sampling", ["Grid", "Latin Hypercube"], index=0, horizontal=True, key="sweep_method", 
+                      help="**Grid**: all combinations of the values. **Latin Hypercube**: a fixed number of samples covering the ranges.")
+    n_samples, seed = None, None
+    if method == "Latin Hypercube":
+        n_samples = st.number_input("Number of Samples", min_value=1, max_value=None, value=20, step=1, key="sweep_samples")
+        seed = st.number_input("Random Seed", min_value=0, max_value=None, value=0, step=1, key="sweep_seed")
+        num_runs = n_samples
+    else:
+        num_runs = int(np.prod([len(sweep_values(spec)) for spec in grid.values()]))
+    st.caption(f"Number of input files: **{num_runs}**")
+
+    slurm = None
+    if st.toggle("SLURM Job Array Script", value=True, key="sweep_slurm"):
+        slurm = {}
+        for option, default in SLURM_DEFAULTS.items():
+            label = option.replace("_", " ").capitalize()
+            if option == "max_parallel":
+                slurm[option] = st.number_input("Maximal number of running tasks (0 = no limit)", min_value=0, value=0, step=1, 
+                                                key=f"sweep_{option}") or None
+            elif isinstance(default, int):
+                slurm[option] = st.number_input(label, min_value=1, value=default, step=1, key=f"sweep_{option}")
+            else:
+                slurm[option] = st.text_input(label, value=default, key=f"sweep_{option}")
+
+    if st.button("Generate Sweep"):
+        sweep_dir = os.path.join(st.session_state["user_folder"], "reinvent_sweep")
+        shutil.rmtree(sweep_dir, ignore_errors=True)
+        with st.spinner(f"Generating {num_runs} input files ..."):
+            # Generated in the server process (no worker processes started from the Streamlit server)
+            sweep = build_sweep(ui_state_values(dict(st.session_state)), grid, sweep_dir, 
+                                method="lhs" if method == "Latin Hypercube" else "grid", n_samples=n_samples, seed=seed, 
+                                slurm=slurm, zip_file=sweep_dir + ".zip", max_workers=1, uploads=uploads)
+        failed = [os.path.basename(result["folder"]) for result in sweep["results"] if result["error"]]
+        if failed:
+            st.warning(f"The input files of {len(failed)} runs could not be generated: {', '.join(failed)}", icon="⚠️")
+        st.session_state["sweep_zip"] = sweep["zip"]
+
+    sweep_zip = st.session_state.get("sweep_zip")
+    if sweep_zip and os.path.isfile(sweep_zip):
+        with open(sweep_zip, "rb") as f:
+            st.download_button(label="Download Sweep as Zip File", data=f, file_name=os.path.basename(sweep_zip), 
+                               mime="application/zip", help="Input folders (run_0001, ...), manifest.csv and run_sweep.sh")
+
+
+def SMILES_file(key, run_mode, title="SMILES", mol_gen=None, mol2mol=None):
+    """
+    Handle the upload and processing of a SMILES or SDF file, including conversion and visualization.
+
+    Args:
+        key (str): A unique key for Streamlit widgets.
+        run_mode (str): The run mode, e.g., "Reinforcement Learning (RL)".
+        title (str, optional): The title for Upload widget. Defaults to "SMILES".
+        mol_gen (str, optional): The molecule generator, e.g., "Reinvent". Defaults to None.
+        mol2mol (str, optional): The specific Mol2Mol mode. Defaults to None.
+
+    Returns:
+        tuple: The path to the temporary SMILES file and its name, or (None, None) if no file is uploaded.
+    """
+    smi_file = st.file_uploader(f"Upload {title} File", type=["smi", "sdf"], 
+                                help="SMILES (.smi) and Structures Data File (.sdf) are the **ONLY** accepted format.")
+    if smi_file:
+        # Name of smiles file 
+        smi_name = smi_file.name
+
+        # Save uploaded .smi of .sdf into the temp_files folder
+        smi_temp = save_uploaded_file(smi_file, Path(st.session_state["user_folder"]))
+
+        # Convert to .smi if the file is .sdf 
         if (".sdf" in smi_file.name): 
             smi_temp = convert_sdf_smi(smi_temp)
             smi_name = os.path.basename(smi_temp)
@@ -1510,15 +2173,14 @@ def SMILES_file(key, run_mode, title="SMILES", mol_gen=None, mol2mol=None):
             df["SMILES"] = warheads_modified
             df["Warhead1 SMILES"] = warheads1
             df["Warhead2 SMILES"] = warheads2
-            df["Warhead1 Structure"] = df["Warhead1 SMILES"].apply(smi_to_png)
-            df["Warhead2 Structure"] = df["Warhead2 SMILES"].apply(smi_to_png)
+            df = add_structure_columns(df, {"Warhead1 SMILES": "Warhead1 Structure", "Warhead2 SMILES": "Warhead2 Structure"})
         else:
             df = pd.read_csv(smi_temp, names=["SMILES"], header=None)
-            df["Structure"] = df["SMILES"].apply(smi_to_png)
+            df = add_structure_columns(df, {"SMILES": "Structure"})
 
         # Check the tokens if supported 
         if run_mode in ["RL", "SL", "TL", "Sampling"]:
-            check_smiles(list(df["SMILES"]), run_mode, mol_gen, mol2mol=mol2mol)
+            check_smiles(list(df["SMILES"]), run_mode, mol_gen, mol2mol=mol2mol, key=key)
         
         # Visualize molecules 
         show_mols = st.toggle("Show Molecules", key=f"{key}_show_mols", value=False, help="Show the SMILES and structures of the different molecules.")
@@ -1542,56 +2204,1281 @@ def SMILES_file(key, run_mode, title="SMILES", mol_gen=None, mol2mol=None):
         return None, None
 
 
+def _table_reader(data):
+    """
+    Return the columns, the number of rows and a reader function of a table (DataFrame or Arrow file).
+
+    Args:
+        data (pd.DataFrame or str): The DataFrame or the path to an Arrow (IPC) file.
+
+    Returns:
+        tuple: The column names, the number of rows and a function reading columns (and optionally rows at given positions).
+    """
+    if isinstance(data, pd.DataFrame):
+        def read(columns, rows=None):
+            return data[columns] if rows is None else data[columns].iloc[rows]
+        return list(data.columns), len(data), read
+
+    import pyarrow as pa
+    # Memory-mapped (zero-copy) table, only the selected columns/rows are materialized
+    table = pa.ipc.open_file(pa.memory_map(data, "r")).read_all()
+    def read(columns, rows=None):
+        selected = table.select(columns)
+        if rows is None:
+            return compact_dtypes(selected.to_pandas())
+        df = compact_dtypes(selected.take(pa.array(rows, type=pa.int64())).to_pandas())
+        df.index = rows
+        return df
+    return table.column_names, table.num_rows, read
+
+
+# Operators of the row filter of the structure tables
+FILTER_OPERATORS = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le,
+    "contains": None,
+}
+
+
+def filter_mask(column, op, value):
+    """
+    Compare a column with a value entered by the user (no expression evaluation).
+
+    Args:
+        column (pd.Series): The column to filter.
+        op (str): The operator (key of FILTER_OPERATORS).
+        value (str): The value as entered (converted to a number for numeric columns).
+
+    Returns:
+        pd.Series: The boolean mask of the matching rows.
+
+    Raises:
+        ValueError: If the operator is unknown or the value is not a number for a numeric column.
+    """
+    if op not in FILTER_OPERATORS:
+        raise ValueError(f"unknown operator '{op}'")
+    if op == "contains":
+        return column.astype(str).str.contains(value, regex=False, na=False)
+    if pd.api.types.is_bool_dtype(column):
+        if value.strip().lower() not in ("true", "false"):
+            raise ValueError(f"'{value}' is not a boolean (True or False) for column '{column.name}'")
+        value = value.strip().lower() == "true"
+    elif pd.api.types.is_numeric_dtype(column):
+        try:
+            value = float(value)
+        except ValueError:
+            raise ValueError(f"'{value}' is not a number for the numeric column '{column.name}'") from None
+    return FILTER_OPERATORS[op](column, value).fillna(False).astype(bool)
+
+
+def structure_table(data, structure_cols, key, page_size=20, sort_by=None):
+    """
+    Show a table with structure images in a paginated table. 
+    Sorting and filtering are applied on all rows, but only the rows of the current page are depicted 
+    and the next page is rendered into the depiction cache in the background.
+    For Arrow files, only the columns needed for filtering, sorting and the current page are read.
+
+    Args:
+        data (pd.DataFrame or str): The DataFrame or the path to an Arrow (IPC) file containing the SMILES columns.
+        structure_cols (dict): Mapping of the SMILES columns to the names of the structure columns.
+        key (str): A unique key for Streamlit widgets.
+        page_size (int, optional): The default number of rows per page. Defaults to 20.
+        sort_by (str, optional): The column used for sorting by default. Defaults to None (no sorting).
+
+    Returns:
+        None
+    """
+    data_columns, num_rows, read = _table_reader(data)
+
+    # Columns shown in the table 
+    columns = data_columns + [col for col in structure_cols.values() if col not in data_columns]
+    cols = st.multiselect(label="Select Columns", options=columns, default=columns, placeholder="Choose columns...", 
+                          help="Choose the columns you want to have in your table.", key=f"{key}_cols") 
+
+    # Filtering & sorting (all rows)
+    col1, col2, col3 = st.columns([2, 1, 2], vertical_alignment="bottom")
+    filter_options = [None] + data_columns
+    filter_col = col1.selectbox("Filter Rows by", filter_options, index=0, key=f"{key}_filter_col")
+    filter_op = col2.selectbox("Operator", list(FILTER_OPERATORS), index=0, key=f"{key}_filter_op", disabled=filter_col is None)
+    filter_value = col3.text_input("Value", value="", key=f"{key}_filter_value", placeholder="e.g. 0.5", disabled=filter_col is None,
+                                   help="Value compared with the selected column on all rows (numbers for numeric columns).")
+    col1, col2 = st.columns([5, 1], vertical_alignment="bottom")
+    sort_options = [None] + data_columns
+    sort_col = col1.selectbox("Sort by", sort_options, index=sort_options.index(sort_by) if sort_by in sort_options else 0, 
+                              key=f"{key}_sort_col")
+    ascending = col2.toggle("Ascending", value=True, key=f"{key}_ascending")
+    rows = np.arange(num_rows)
+    filtering = filter_col is not None and filter_value != ""
+    key_cols = list(dict.fromkeys([col for col in (filter_col if filtering else None, sort_col) if col is not None]))
+    if key_cols:
+        view = read(key_cols).reset_index(drop=True)
+        # Categorical columns (e.g., step) are filtered and sorted by their values
+        for col in view.select_dtypes(include="category").columns:
+            view[col] = view[col].astype(view[col].cat.categories.dtype)
+        if filtering:
+            try:
+                view = view[filter_mask(view[filter_col], filter_op, filter_value)]
+            except ValueError as e:
+                st.error(f"Invalid filter: {e}", icon="🚨")
+        if sort_col is not None:
+            view = view.sort_values(by=sort_col, ascending=ascending, kind="stable")
+        rows = view.index.to_numpy()
+
+    # Pagination
+    col1, col2, col3 = st.columns([1, 1, 2], vertical_alignment="bottom")
+    page_sizes = sorted({10, 20, 50, 100, page_size})
+    page_size = col1.selectbox("Rows per Page", page_sizes, index=page_sizes.index(page_size), key=f"{key}_page_size")
+    num_pages = max(1, -(-len(rows) // page_size))
+    page = col2.number_input(f"Page (of {num_pages})", min_value=1, max_value=num_pages, value=1, step=1, key=f"{key}_page")
+    page = min(page, num_pages)
+    start, stop = (page - 1) * page_size, min(page * page_size, len(rows))
+    col3.write(f"Rows **{min(start + 1, len(rows))}-{stop}** of **{len(rows)}**" + (f" (filtered from {num_rows})" if len(rows) != num_rows else ""))
+
+    # Read and depict only the rows of the current page (selected structure columns)
+    depict = {smi_col: struc_col for smi_col, struc_col in structure_cols.items() if struc_col in cols}
+    page_cols = list(dict.fromkeys([col for col in cols if col in data_columns] + list(depict.keys())))
+    page_df = read(page_cols, rows[start:stop]).copy()
+    if depict:
+        page_df = add_structure_columns(page_df, depict)
+        # Render the next page in the background 
+        next_rows = rows[stop:stop + page_size]
+        if len(next_rows) > 0:
+            next_df = read(list(depict.keys()), next_rows)
+            prefetch_depictions([smi for smi_col in depict for smi in next_df[smi_col]])
+
+    st.dataframe(page_df[[col for col in cols if col in page_df.columns]], 
+                 column_config={struc_col: st.column_config.ImageColumn(width="medium") for struc_col in depict.values()})
+
+
+@st.cache_data(max_entries=64)
+def transformer_plot(x, y, title, figsize=(4, 3), xlim=None, center=None, center_label=None, legend_loc=None):
+    """
+    Plot a transformer function (Tools page). matplotlib is only imported when a plot is drawn, 
+    and the plots are cached per parameters (unchanged plots are not drawn again on a rerun).
+
+    Args:
+        x (np.ndarray): The x-values.
+        y (np.ndarray): The values of the transformer function.
+        title (str): The title of the plot.
+        figsize (tuple, optional): The size of the figure in inches. Defaults to (4, 3).
+        xlim (tuple, optional): The limits of the x-axis. Defaults to None.
+        center (float, optional): The x-value of a vertical line at the center of the function. Defaults to None.
+        center_label (str, optional): The legend label of the vertical line. Defaults to None.
+        legend_loc (str, optional): The location of the legend (None = no legend). Defaults to None.
+
+    Returns:
+        bytes: The plot as PNG image.
+    """
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    fig = plt.figure(figsize=figsize)
+    plt.plot(x, y) # Plot the graph
+    plt.xlabel("x") # Add X-label
+    plt.ylabel("f(x)") # Add Y-label
+    plt.title(title) # Add title
+    if xlim is not None:
+        plt.xlim(xlim)
+    if center is not None:
+        plt.vlines(center, 0.0, 1.0, color="red", linestyles="--", label=center_label) # draw a vertical line at the center of the function 
+    plt.grid(True) # Grid
+    if legend_loc is not None:
+        plt.legend(loc=legend_loc, prop={'size': 7})
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png", bbox_inches="tight", dpi=200)
+    plt.close(fig)
+    return buffer.getvalue()
+
+
+#####################################
+##### Results Summary Functions ##### 
+#####################################
+# Maximum number of rows of a results summary kept in memory (larger files are sampled)
+SUMMARY_MAX_ROWS = 100000
+# Number of rows read per chunk from the results summary 
+SUMMARY_CHUNK_SIZE = 100000
+# Columns of the results summary stored as categorical columns (lower case)
+SUMMARY_CATEGORICAL_COLUMNS = ["step", "stage", "smiles_state"]
+
+
+def iter_summary_chunks(csv_file, chunksize=SUMMARY_CHUNK_SIZE):
+    """
+    Read a results summary (CSV) in chunks with compact numeric dtypes (float32 instead of float64).
+
+    Args:
+        csv_file (str or UploadedFile): The path to the CSV file or the uploaded file.
+        chunksize (int, optional): The number of rows per chunk. Defaults to SUMMARY_CHUNK_SIZE.
+
+    Yields:
+        pd.DataFrame: The chunks of the results summary.
+    """
+    if hasattr(csv_file, "seek"):
+        csv_file.seek(0)
+    for chunk in pd.read_csv(csv_file, index_col=False, chunksize=chunksize):
+        float_cols = chunk.select_dtypes(include="float64").columns
+        chunk[float_cols] = chunk[float_cols].astype(np.float32)
+        yield chunk
+
+
+def compact_dtypes(df):
+    """
+    Convert the step/stage columns of a results summary into categorical columns.
+
+    Args:
+        df (pd.DataFrame): The results summary.
+
+    Returns:
+        pd.DataFrame: The results summary with categorical columns.
+    """
+    columns = [col for col in df.columns if col.lower() in SUMMARY_CATEGORICAL_COLUMNS]
+    for col in columns:
+        # Integer columns are stored as float64 in the Arrow files (e.g., step 1.0 -> 1)
+        if pd.api.types.is_float_dtype(df[col]) and (df[col].dropna() % 1 == 0).all():
+            df[col] = df[col].astype("Int64")
+    return df.astype({col: "category" for col in columns})
+
+
+def update_aggregates(aggregates, chunk):
+    """
+    Update the aggregates (number of rows, count/sum/min/max of numeric columns and the value counts 
+    of categorical columns) of a results summary with a new chunk.
+
+    Args:
+        aggregates (dict): The aggregates of the previous chunks (an empty dict for the first chunk).
+        chunk (pd.DataFrame): The new chunk of the results summary.
+
+    Returns:
+        dict: The updated aggregates.
+    """
+    aggregates["rows"] = aggregates.get("rows", 0) + len(chunk)
+    numeric = aggregates.setdefault("numeric", {})
+    counts = aggregates.setdefault("counts", {})
+    for col in chunk.columns:
+        if col.lower() in SUMMARY_CATEGORICAL_COLUMNS:
+            col_counts = counts.setdefault(col, {})
+            for value, count in chunk[col].value_counts(sort=False).items():
+                col_counts[str(value)] = col_counts.get(str(value), 0) + int(count)
+        elif pd.api.types.is_numeric_dtype(chunk[col]) and not pd.api.types.is_bool_dtype(chunk[col]):
+            values = chunk[col].to_numpy(dtype=np.float64)
+            values = values[~np.isnan(values)]
+            if len(values) == 0:
+                continue
+            col_stats = numeric.setdefault(col, [0, 0.0, np.inf, -np.inf])
+            col_stats[0] += len(values)
+            col_stats[1] += float(values.sum())
+            col_stats[2] = min(col_stats[2], float(values.min()))
+            col_stats[3] = max(col_stats[3], float(values.max()))
+    return aggregates
+
+
+def read_summary_csv(csv_file, max_rows=SUMMARY_MAX_ROWS, chunksize=SUMMARY_CHUNK_SIZE, seed=0):
+    """
+    Read a results summary (CSV) in chunks. Only the aggregates of all rows and a bounded random sample 
+    of the rows (in file order) are kept in memory.
+
+    Args:
+        csv_file (str or UploadedFile): The path to the CSV file or the uploaded file.
+        max_rows (int, optional): The maximum number of rows kept in memory. Defaults to SUMMARY_MAX_ROWS.
+        chunksize (int, optional): The number of rows per chunk. Defaults to SUMMARY_CHUNK_SIZE.
+        seed (int, optional): The seed of the random sample. Defaults to 0.
+
+    Returns:
+        tuple: The (sampled) results summary and the aggregates of all rows (incl. "sampled" flag).
+    """
+    rng = np.random.default_rng(seed)
+    aggregates = {}
+    sample = None
+    sample_keys = None
+    for chunk in iter_summary_chunks(csv_file, chunksize=chunksize):
+        update_aggregates(aggregates, chunk)
+        # Bottom-k sampling: keep the rows with the smallest random keys (uniform sample of all rows)
+        chunk_keys = rng.random(len(chunk))
+        if sample is None:
+            sample, sample_keys = chunk, chunk_keys
+        else:
+            sample = pd.concat([sample, chunk])
+            sample_keys = np.concatenate([sample_keys, chunk_keys])
+        if len(sample) > max_rows:
+            keep = np.sort(np.argpartition(sample_keys, max_rows)[:max_rows])
+            sample, sample_keys = sample.iloc[keep], sample_keys[keep]
+
+    if sample is None:
+        sample = pd.read_csv(csv_file, index_col=False, nrows=0)
+    aggregates["sampled"] = aggregates.get("rows", 0) > len(sample)
+    aggregates["sample_rows"] = len(sample)
+    return compact_dtypes(sample), aggregates
+
+
+def summary_statistics(aggregates):
+    """
+    Convert the aggregates of a results summary into a table of statistics (count, mean, min, max).
+
+    Args:
+        aggregates (dict): The aggregates of the results summary.
+
+    Returns:
+        pd.DataFrame: The statistics of the numeric columns.
+    """
+    stats = {col: {"count": count, "mean": total / count, "min": vmin, "max": vmax} 
+             for col, (count, total, vmin, vmax) in aggregates.get("numeric", {}).items()}
+    return pd.DataFrame.from_dict(stats, orient="index", columns=["count", "mean", "min", "max"])
+
+
+def summary_info(aggregates):
+    """
+    Show the number of rows, whether the table is sampled and the statistics of all rows of a results summary.
+
+    Args:
+        aggregates (dict): The aggregates of the results summary.
+
+    Returns:
+        None
+    """
+    if aggregates["sampled"]:
+        st.info(f"""The results summary contains **{aggregates['rows']}** rows. The table shows a random **sample of {aggregates['sample_rows']} rows**, 
+                while the statistics below are computed from all rows.""", icon="ℹ️")
+    else:
+        st.write(f"Number of rows contained in the results summary: **{aggregates['rows']}**.")
+    with st.expander("Statistics (all rows)"):
+        st.dataframe(summary_statistics(aggregates))
+        for col, col_counts in aggregates.get("counts", {}).items():
+            st.dataframe(pd.Series(col_counts, name="Number of rows").rename_axis(col))
+
+
+class SummarySchemaError(ValueError):
+    """
+    Columns of a results summary contain values that do not fit the type of the Arrow schema.
+    """
+    def __init__(self, columns):
+        super().__init__(f"Columns {', '.join(repr(col) for col in columns)} contain values that do not match the type of their first rows.")
+        self.columns = list(columns)
+
+
+def summary_schema(chunk, string_cols=()):
+    """
+    Build the Arrow schema of a results summary from its first chunk: numeric columns are stored as float64
+    (integer columns may contain empty values in later chunks), boolean columns as bool and all others as string.
+
+    Args:
+        chunk (pd.DataFrame): The first chunk of the results summary.
+        string_cols (iterable, optional): Columns stored as string regardless of their type. Defaults to ().
+
+    Returns:
+        pa.Schema: The schema of the Arrow file.
+    """
+    import pyarrow as pa
+
+    fields = []
+    for col in chunk.columns:
+        if col in string_cols:
+            fields.append(pa.field(col, pa.string()))
+        elif pd.api.types.is_bool_dtype(chunk[col]):
+            fields.append(pa.field(col, pa.bool_()))
+        elif pd.api.types.is_numeric_dtype(chunk[col]):
+            fields.append(pa.field(col, pa.float64()))
+        else:
+            fields.append(pa.field(col, pa.string()))
+    return pa.schema(fields)
+
+
+def summary_table(chunk, schema):
+    """
+    Convert a chunk of a results summary into an Arrow table with the given schema.
+
+    Args:
+        chunk (pd.DataFrame): The chunk of the results summary.
+        schema (pa.Schema): The schema of the Arrow file (see summary_schema).
+
+    Returns:
+        pa.Table: The chunk as Arrow table.
+
+    Raises:
+        SummarySchemaError: If numeric or boolean columns contain other values (all mismatched columns of the chunk).
+    """
+    import pyarrow as pa
+
+    arrays = []
+    mismatched = []
+    for field in schema:
+        values = chunk[field.name] if field.name in chunk.columns else pd.Series(None, index=chunk.index, dtype=object)
+        if pa.types.is_floating(field.type):
+            numbers = pd.to_numeric(values, errors="coerce")
+            if (numbers.isna() & values.notna()).any():
+                mismatched.append(field.name)
+                continue
+            arrays.append(pa.array(numbers.to_numpy(dtype=np.float64, na_value=np.nan), type=pa.float64(), from_pandas=True))
+        elif pa.types.is_boolean(field.type):
+            try:
+                arrays.append(pa.array(values.astype("boolean"), type=pa.bool_()))
+            except (TypeError, ValueError):
+                mismatched.append(field.name)
+        else:
+            try:
+                arrays.append(pa.array(values, type=pa.string(), from_pandas=True))
+            except (pa.ArrowInvalid, pa.ArrowTypeError):
+                # Mixed values (e.g., numbers in the first rows of a text column)
+                text = values.astype(object).where(values.notna(), None)
+                arrays.append(pa.array([v if v is None else str(v) for v in text], type=pa.string()))
+    if mismatched:
+        raise SummarySchemaError(mismatched)
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+
+def _write_summary_arrow(csv_file, arrow_file, prepare, chunksize, string_cols):
+    """
+    Write a results summary (CSV) in chunks into an Arrow (IPC) file (see summary_arrow).
+    After the first chunk that does not fit the schema, the remaining chunks are only checked (not written), 
+    so all mismatched columns are found in the same pass.
+
+    Returns:
+        dict: The aggregates of the results summary.
+
+    Raises:
+        SummarySchemaError: If columns contain values that do not fit the schema (all mismatched columns of the file).
+    """
+    import pyarrow as pa
+
+    aggregates = {}
+    writer = None
+    mismatched = {}
+    try:
+        for chunk in iter_summary_chunks(csv_file, chunksize=chunksize):
+            if prepare is not None:
+                chunk = prepare(chunk)
+            update_aggregates(aggregates, chunk)
+            if writer is None:
+                schema = summary_schema(chunk, string_cols)
+                writer = pa.ipc.new_file(arrow_file, schema)
+            try:
+                table = summary_table(chunk, schema)
+            except SummarySchemaError as e:
+                mismatched.update(dict.fromkeys(e.columns))
+                continue
+            if not mismatched:
+                writer.write_table(table)
+        if writer is None:
+            header = pd.read_csv(csv_file, index_col=False, nrows=0)
+            writer = pa.ipc.new_file(arrow_file, summary_schema(header, header.columns))
+    finally:
+        if writer is not None:
+            writer.close()
+    if mismatched:
+        raise SummarySchemaError(mismatched)
+    return aggregates
+
+
+def summary_arrow(csv_file, cache_dir, prepare=None, chunksize=SUMMARY_CHUNK_SIZE):
+    """
+    Convert a results summary (CSV) into an Arrow (IPC) file, which is memory-mapped for later reads.
+    The file is created once per content (SHA-256 hash of the upload) in the cache folder, 
+    together with a JSON file containing the aggregates of all rows.
+
+    Args:
+        csv_file (str or UploadedFile): The path to the CSV file or the uploaded file.
+        cache_dir (str): The folder for the cached files (e.g., the user folder).
+        prepare (callable, optional): A function applied on each chunk before writing (e.g., split_warheads). Defaults to None.
+        chunksize (int, optional): The number of rows per chunk. Defaults to SUMMARY_CHUNK_SIZE.
+
+    Returns:
+        tuple: The path to the Arrow file and the aggregates of the results summary.
+    """
+    name = file_digest(csv_file)[:16] + (f"_{prepare.__name__}" if prepare is not None else "")
+    arrow_file = os.path.join(cache_dir, f"summary_{name}.arrow")
+    aggregates_file = os.path.join(cache_dir, f"summary_{name}.json")
+    if os.path.exists(arrow_file) and os.path.exists(aggregates_file):
+        with open(aggregates_file, "r") as f:
+            return arrow_file, json.load(f)
+
+    # The schema is fixed by the first chunk: if columns turn out to contain text, the file is written 
+    # a second time with all of them as string columns (the first pass finds all mismatched columns)
+    try:
+        aggregates = _write_summary_arrow(csv_file, f"{arrow_file}.tmp", prepare, chunksize, set())
+    except SummarySchemaError as e:
+        aggregates = _write_summary_arrow(csv_file, f"{arrow_file}.tmp", prepare, chunksize, set(e.columns))
+    os.replace(f"{arrow_file}.tmp", arrow_file)
+
+    aggregates["sampled"] = False
+    aggregates["sample_rows"] = aggregates.get("rows", 0)
+    with open(aggregates_file, "w") as f:
+        json.dump(aggregates, f)
+    return arrow_file, aggregates
+
+
+def load_summary(csv_file, cache_dir, prepare=None):
+    """
+    Load a results summary (CSV): as cached Arrow file if pyarrow is available, 
+    otherwise as DataFrame streamed in chunks (large files are sampled).
+
+    Args:
+        csv_file (str or UploadedFile): The path to the CSV file or the uploaded file.
+        cache_dir (str): The folder for the cached files (e.g., the user folder).
+        prepare (callable, optional): A function applied on each chunk (e.g., split_warheads). Defaults to None.
+
+    Returns:
+        tuple: The path to the Arrow file (or the DataFrame) and the aggregates of the results summary.
+    """
+    try:
+        import pyarrow
+    except ImportError:
+        df, aggregates = read_summary_csv(csv_file)
+        return (prepare(df) if prepare is not None else df), aggregates
+    return summary_arrow(csv_file, cache_dir, prepare=prepare)
+
+
+def export_parquet(data, col=st):
+    """
+    Provide a download button for a results summary as Parquet file. 
+    For cached Arrow files, the Parquet file is written once next to the Arrow file.
+
+    Args:
+        data (pd.DataFrame or str): The DataFrame or the path to the Arrow (IPC) file.
+        col (streamlit.columns, optional): The Streamlit column to place the download button in. Defaults to st.
+
+    Returns:
+        None
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        return
+
+    if isinstance(data, pd.DataFrame):
+        buffer = io.BytesIO()
+        data.to_parquet(buffer, index=False)
+        parquet_data, file_name = buffer.getvalue(), "results_summary.parquet"
+    else:
+        parquet_file = f"{data[:-6]}.parquet"
+        if not os.path.exists(parquet_file):
+            if not col.button("Prepare Parquet Export", help="Convert the results summary into a Parquet file."):
+                return
+            pq.write_table(pa.ipc.open_file(pa.memory_map(data, "r")).read_all(), f"{parquet_file}.tmp")
+            os.replace(f"{parquet_file}.tmp", parquet_file)
+        with open(parquet_file, "rb") as f:
+            parquet_data, file_name = f.read(), "results_summary.parquet"
+    col.download_button(label="Download as Parquet", data=parquet_data, file_name=file_name, 
+                        mime="application/vnd.apache.parquet", help="The parsed results summary as Parquet file.")
+
+
+def split_warheads(df, column="Warheads"):
+    """
+    Split the warheads of LinkInvent ("warhead1|warhead2") into two columns (Warhead1 and Warhead2).
+
+    Args:
+        df (pd.DataFrame): The DataFrame containing the warheads.
+        column (str, optional): The name of the column containing the warheads. Defaults to "Warheads".
+
+    Returns:
+        pd.DataFrame: The DataFrame with the additional columns "Warhead1" and "Warhead2".
+    """
+    warheads = df[column].str.split("|", n=1, expand=True)
+    df["Warhead1"] = warheads[0]
+    df["Warhead2"] = warheads[1]
+    df[column] = df[column].str.replace("(*)", "[*]", regex=False).str.replace("|*", "|[*]", regex=False)
+    return df
+
+
+#################################
+##### Parallel Computations ##### 
+#################################
+# Number of worker processes for the parallel computations (None = number of CPUs)
+MAX_WORKERS = None
+# Start method of the worker processes. The Streamlit server is multithreaded: a forked worker could 
+# inherit a lock held by another thread and deadlock, so the workers are started from a clean process.
+WORKER_START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+# Modules imported once by the fork server (the worker functions are top-level functions of this module)
+WORKER_PRELOAD = ["functions"]
+# Popen module of the start method (multiprocessing.popen_<name>) and its method reading the preparation data
+WORKER_POPEN = {"forkserver": ("popen_forkserver", "_launch"), 
+                "spawn": ("popen_spawn_win32", "__init__") if sys.platform == "win32" else ("popen_spawn_posix", "_launch")}
+
+
+def _without_main(get_preparation_data):
+    """
+    Wrap multiprocessing.spawn.get_preparation_data: the started process does not import the main module.
+    Streamlit runs the page scripts as "__main__", which a new worker would otherwise execute again.
+    """
+    def preparation_data(name):
+        data = get_preparation_data(name)
+        data.pop("init_main_from_path", None)
+        data.pop("init_main_from_name", None)
+        return data
+    return preparation_data
+
+
+def _without_main_method(popen_class, name):
+    """
+    Return a copy of a method of a multiprocessing Popen class (the method starting the process) whose module global 
+    spawn is replaced by a private namespace with the preparation data without the main module (see _without_main).
+    The multiprocessing modules are not modified, so other threads and contexts still start processes unchanged.
+    """
+    method = getattr(popen_class, name)
+    module = sys.modules[popen_class.__module__]
+    spawn = types.SimpleNamespace(**vars(module.spawn))
+    spawn.get_preparation_data = _without_main(module.spawn.get_preparation_data)
+    return types.FunctionType(method.__code__, {**vars(module), "spawn": spawn}, method.__name__, 
+                              method.__defaults__, method.__closure__)
+
+
+_popen_module, _popen_method = WORKER_POPEN[WORKER_START_METHOD]
+_WorkerPopenBase = importlib.import_module(f"multiprocessing.{_popen_module}").Popen
+
+
+class WorkerPopen(_WorkerPopenBase):
+    """
+    Popen of the worker processes (forkserver or spawn): the started process does not import the main module.
+    """
+
+
+setattr(WorkerPopen, _popen_method, _without_main_method(_WorkerPopenBase, _popen_method))
+
+
+class WorkerProcess(multiprocessing.get_context(WORKER_START_METHOD).Process):
+    """
+    Worker process (forkserver or spawn) started without importing the main module (the page script).
+    The worker functions have to be defined in an importable module (e.g., this module).
+    """
+    @staticmethod
+    def _Popen(process_obj):
+        return WorkerPopen(process_obj)
+
+
+class WorkerContext(type(multiprocessing.get_context(WORKER_START_METHOD))):
+    """
+    Multiprocessing context of the worker processes (see WorkerProcess).
+    """
+    Process = WorkerProcess
+
+
+def worker_context():
+    """
+    Return the multiprocessing context for process pools started from a Streamlit page.
+
+    Returns:
+        WorkerContext: The context (forkserver or spawn start method).
+    """
+    context = WorkerContext()
+    if WORKER_START_METHOD == "forkserver":
+        context.set_forkserver_preload(WORKER_PRELOAD)
+    return context
+
+
+@st.cache_resource
+def get_process_pool(max_workers=MAX_WORKERS):
+    """
+    Return a process pool shared by all sessions of the Streamlit server process.
+    The workers are started with the forkserver (or spawn) method, see worker_context.
+
+    Args:
+        max_workers (int, optional): Number of worker processes. Defaults to the number of CPUs.
+
+    Returns:
+        ProcessPoolExecutor: The shared process pool.
+    """
+    return ProcessPoolExecutor(max_workers=max_workers, mp_context=worker_context())
+
+
+def parallel_map(func, chunks, max_workers=MAX_WORKERS, progress_text=None):
+    """
+    Apply a function to chunks of data on the shared process pool and return the results in input order.
+    Falls back to a serial computation if the process pool is not usable.
+
+    Args:
+        func (callable): A top-level (picklable) function that is applied to each chunk.
+        chunks (list): The chunks of data.
+        max_workers (int, optional): Number of worker processes. Defaults to the number of CPUs.
+        progress_text (str, optional): Text of the progress bar shown in the UI. Defaults to None (no progress bar).
+
+    Returns:
+        list: The results of the function for each chunk (same order as the chunks).
+    """
+    results = [None] * len(chunks)
+    progress_bar = st.progress(0.0, text=progress_text) if (progress_text and len(chunks) > 1) else None
+    try:
+        pool = get_process_pool(max_workers)
+        futures = {pool.submit(func, chunk): i for i, chunk in enumerate(chunks)}
+        for done, future in enumerate(as_completed(futures)):
+            results[futures[future]] = future.result()
+            if progress_bar is not None:
+                progress_bar.progress((done + 1) / len(chunks), text=f"{progress_text} ({done + 1}/{len(chunks)})")
+    except (BrokenProcessPool, OSError, RuntimeError):
+        # Recreate the pool with the next call and finish the remaining chunks serially
+        get_process_pool.clear()
+        for i, chunk in enumerate(chunks):
+            if results[i] is None:
+                results[i] = func(chunk)
+    if progress_bar is not None:
+        progress_bar.empty()
+    return results
+
+
+def _iter_chunks(iterable, chunk_size):
+    """
+    Group the items of an iterable (e.g., a generator) into lists of a given size.
+
+    Args:
+        iterable (iterable): The items.
+        chunk_size (int): The number of items per chunk.
+
+    Yields:
+        list: The chunks.
+    """
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def split_chunks(items, chunk_size):
+    """
+    Split a list into chunks of a given size.
+
+    Args:
+        items (list): The list to split.
+        chunk_size (int): The number of items per chunk.
+
+    Returns:
+        list: The list of chunks.
+    """
+    return [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
+
+
 #####################################
 ##### Cheminformatics Functions ##### 
 #####################################
-def smi_to_png(smi: str) -> str:
+# Depiction cache: upper limit (in bytes) of the rendered images kept in memory,
+# folder for the on-disk copy of the cache (None = no persistence to disk) and its upper limit (in bytes).
+DEPICTION_CACHE_MAX_BYTES = 256 * 1024 * 1024
+DEPICTION_CACHE_DIR = os.path.join(pwd, "temp_files", "depictions")
+DEPICTION_CACHE_MAX_DISK_BYTES = 1024 * 1024 * 1024
+
+
+class DepictionCache:
+    """
+    Thread-safe LRU cache for molecule depictions, bounded by the total size of the stored images.
+
+    Entries are keyed by the canonical SMILES plus the render options, so the same molecule
+    written in different ways is only rendered once. Optionally, every depiction is also
+    written as PNG file into a cache folder, which is used to fill the cache after a restart.
+    The cache folder is bounded as well: when it grows beyond max_disk_bytes, the least recently 
+    used files (modification time, refreshed on every read) are deleted.
+
+    Args:
+        max_bytes (int): Maximum total size (in bytes) of the depictions kept in memory.
+        cache_dir (str, optional): Folder for the on-disk copy of the cache. Defaults to None (memory only).
+        max_disk_bytes (int, optional): Maximum total size (in bytes) of the cache folder. Defaults to DEPICTION_CACHE_MAX_DISK_BYTES.
+    """
+    def __init__(self, max_bytes=DEPICTION_CACHE_MAX_BYTES, cache_dir=None, max_disk_bytes=DEPICTION_CACHE_MAX_DISK_BYTES):
+        self.max_bytes = max_bytes
+        self.cache_dir = cache_dir
+        self.max_disk_bytes = max_disk_bytes
+        self.current_bytes = 0
+        self.disk_bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_lock = threading.Lock()
+        if cache_dir is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+            self.prune_disk()
+
+    def _disk_path(self, key):
+        digest = hashlib.sha256(repr(key).encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, digest[:2], f"{digest}.png")
+
+    def get(self, key):
+        """
+        Return the cached depiction (data URI) for a key, or None if the key is not cached.
+        """
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+
+        if self.cache_dir is not None:
+            disk_path = self._disk_path(key)
+            if os.path.exists(disk_path):
+                try:
+                    with open(disk_path, "rb") as f:
+                        uri = f"data:image/png;base64,{base64.b64encode(f.read()).decode('utf-8')}"
+                    os.utime(disk_path)     # Recently used (LRU order of the cache folder)
+                except OSError:
+                    return None
+                self._insert(key, uri)
+                return uri
+        return None
+
+    def put(self, key, png_data):
+        """
+        Store a rendered PNG image and return it as data URI.
+        """
+        uri = f"data:image/png;base64,{base64.b64encode(png_data).decode('utf-8')}"
+        self._insert(key, uri)
+
+        if self.cache_dir is not None:
+            disk_path = self._disk_path(key)
+            try:
+                os.makedirs(os.path.dirname(disk_path), exist_ok=True)
+                # Write into a temporary file first, so concurrent readers never see partial images
+                tmp_path = f"{disk_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(png_data)
+                os.replace(tmp_path, disk_path)
+            except OSError:
+                return uri
+            with self._disk_lock:
+                self.disk_bytes += len(png_data)
+                prune = self.disk_bytes > self.max_disk_bytes
+            if prune:
+                self.prune_disk()
+        return uri
+
+    def prune_disk(self, fraction=0.8):
+        """
+        Measure the cache folder and, if it is larger than max_disk_bytes, delete the least recently used 
+        files until it is below a fraction of the limit.
+
+        Args:
+            fraction (float, optional): The size after pruning relative to max_disk_bytes. Defaults to 0.8.
+
+        Returns:
+            int: The number of deleted files.
+        """
+        with self._disk_lock:
+            files = []
+            for root, _, names in os.walk(self.cache_dir):
+                for name in names:
+                    path = os.path.join(root, name)
+                    try:
+                        file_stat = os.stat(path)
+                    except OSError:
+                        continue
+                    files.append((file_stat.st_mtime, file_stat.st_size, path))
+            total = sum(size for _, size, _ in files)
+            deleted = 0
+            if total > self.max_disk_bytes:
+                target = self.max_disk_bytes * fraction
+                for _, size, path in sorted(files):
+                    if total <= target:
+                        break
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        continue
+                    total -= size
+                    deleted += 1
+            self.disk_bytes = total
+        return deleted
+
+    def _insert(self, key, uri):
+        size = len(uri)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self.current_bytes -= len(self._entries.pop(key))
+            self._entries[key] = uri
+            self.current_bytes += size
+            # Evict the least recently used depictions until the cache fits into its budget
+            while self.current_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.current_bytes -= len(evicted)
+
+    def clear(self):
+        """
+        Remove all depictions from the in-memory cache.
+        """
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+
+@st.cache_resource
+def get_depiction_cache():
+    """
+    Return the depiction cache shared by all sessions of the Streamlit server process.
+
+    Returns:
+        DepictionCache: The shared depiction cache.
+    """
+    return DepictionCache(max_bytes=DEPICTION_CACHE_MAX_BYTES, cache_dir=DEPICTION_CACHE_DIR, max_disk_bytes=DEPICTION_CACHE_MAX_DISK_BYTES)
+
+
+@lru_cache(maxsize=100000)
+def canonical_smiles(smi):
+    """
+    Return the canonical SMILES of a molecule (memoized).
+
+    Args:
+        smi (str): The SMILES string representing the molecule.
+
+    Returns:
+        str: The canonical SMILES string, or None if the SMILES can not be parsed.
+    """
+    from rdkit import Chem
+    mol = Chem.MolFromSmiles(smi)
+    if mol is None:
+        return None
+    return Chem.MolToSmiles(mol)
+
+
+def render_png(smi, size=(300, 300), highlight=None, style="default"):
+    """
+    Render a molecule into a PNG image.
+
+    Args:
+        smi (str): The SMILES string representing the molecule.
+        size (tuple, optional): Width and height of the image in pixels. Defaults to (300, 300).
+        highlight (str, optional): SMARTS pattern of the substructure to highlight. Defaults to None.
+        style (str, optional): Drawing style ("default", "bw" or "transparent"). Defaults to "default".
+
+    Returns:
+        bytes: The PNG image of the molecule.
+    """
+    from rdkit import Chem
+    from rdkit.Chem import rdDepictor
+    from rdkit.Chem.Draw import rdMolDraw2D
+    mol = Chem.MolFromSmiles(smi)
+    if mol is None:
+        raise ValueError("Invalid SMILES string.")
+
+    # Generate 2D coordinates for drawing
+    rdDepictor.Compute2DCoords(mol)
+
+    # Atoms matching the highlight pattern
+    highlight_atoms = []
+    if highlight:
+        pattern = Chem.MolFromSmarts(highlight)
+        if pattern is not None:
+            highlight_atoms = sorted({atom for match in mol.GetSubstructMatches(pattern) for atom in match})
+
+    # Initialize the drawer
+    drawer = rdMolDraw2D.MolDraw2DCairo(int(size[0]), int(size[1]))
+    if style == "bw":
+        drawer.drawOptions().useBWAtomPalette()
+    elif style == "transparent":
+        drawer.drawOptions().clearBackground = False
+    drawer.DrawMolecule(mol, highlightAtoms=highlight_atoms)
+    drawer.FinishDrawing()
+
+    # Get PNG binary
+    return drawer.GetDrawingText()
+
+
+def smi_to_png(smi: str, size=(300, 300), highlight=None, style="default") -> str:
     """
     Convert a SMILES string to a PNG image and return it as a data URI.
+    The depictions are cached (keyed by canonical SMILES and render options) across reruns and sessions.
     
     Args:
         smi (str): The SMILES string representing the molecule.
+        size (tuple, optional): Width and height of the image in pixels. Defaults to (300, 300).
+        highlight (str, optional): SMARTS pattern of the substructure to highlight. Defaults to None.
+        style (str, optional): Drawing style ("default", "bw" or "transparent"). Defaults to "default".
     
     Returns:
         str: A data URI containing the PNG image of the molecule.
     """
     try:
-        mol = Chem.MolFromSmiles(smi)
-        if mol is None:
+        canonical = canonical_smiles(smi)
+        if canonical is None:
             raise ValueError("Invalid SMILES string.")
 
-        # Generate 2D coordinates for drawing
-        rdDepictor.Compute2DCoords(mol)
+        cache = get_depiction_cache()
+        cache_key = (canonical, tuple(size), highlight, style)
+        uri = cache.get(cache_key)
+        if uri is None:
+            uri = cache.put(cache_key, render_png(canonical, size=size, highlight=highlight, style=style))
 
-        # Initialize the drawer
-        drawer = rdMolDraw2D.MolDraw2DCairo(300, 300)
-        drawer.DrawMolecule(mol)
-        drawer.FinishDrawing()
-
-        # Get PNG binary and convert to base64
-        png_data = drawer.GetDrawingText()
-        data = base64.b64encode(png_data).decode("utf-8")
-
-        return f"data:image/png;base64,{data}"
+        return uri
 
     except Exception as e:
         st.error(f"An error occurred: {e}")
 
 
-def convert_sdf_smi(sdf_file):
+def _render_png_chunk(args):
+    """
+    Render a chunk of SMILES into PNG images (worker function of smi_to_png_batch).
+
+    Args:
+        args (tuple): The SMILES of the chunk and the render options (size, highlight, style).
+
+    Returns:
+        list: The PNG images (None for SMILES that could not be rendered).
+    """
+    smiles_chunk, size, highlight, style = args
+    images = []
+    for smi in smiles_chunk:
+        try:
+            images.append(render_png(smi, size=size, highlight=highlight, style=style))
+        except Exception:
+            images.append(None)
+    return images
+
+
+def _missing_depictions(smiles, cache, size, highlight, style):
+    """
+    Look up a list of SMILES in the depiction cache.
+
+    Args:
+        smiles (list): The SMILES strings.
+        cache (DepictionCache): The depiction cache.
+        size (tuple): Width and height of the images in pixels.
+        highlight (str): SMARTS pattern of the substructure to highlight.
+        style (str): Drawing style.
+
+    Returns:
+        tuple: The cached images (None if missing), the missing depictions (cache key -> (canonical SMILES, indices)) 
+               and the number of invalid SMILES.
+    """
+    images = [None] * len(smiles)
+    missing = {}
+    num_invalid = 0
+    for i, smi in enumerate(smiles):
+        canonical = canonical_smiles(smi) if isinstance(smi, str) else None
+        if canonical is None:
+            num_invalid += 1
+            continue
+        cache_key = (canonical, tuple(size), highlight, style)
+        if cache_key in missing:
+            missing[cache_key][1].append(i)
+            continue
+        uri = cache.get(cache_key)
+        if uri is None:
+            # The canonical SMILES is rendered (the same image for every way of writing the molecule)
+            missing[cache_key] = (canonical, [i])
+        else:
+            images[i] = uri
+    return images, missing, num_invalid
+
+
+def smi_to_png_batch(smiles, size=(300, 300), highlight=None, style="default", max_workers=MAX_WORKERS, chunk_size=256, 
+                     progress_text="Rendering structures"):
+    """
+    Convert a list of SMILES strings to PNG images (data URIs) in parallel.
+    Cached depictions are reused, duplicates are rendered only once and the missing depictions 
+    are rendered in chunks on the shared process pool.
+
+    Args:
+        smiles (iterable): The SMILES strings.
+        size (tuple, optional): Width and height of the images in pixels. Defaults to (300, 300).
+        highlight (str, optional): SMARTS pattern of the substructure to highlight. Defaults to None.
+        style (str, optional): Drawing style ("default", "bw" or "transparent"). Defaults to "default".
+        max_workers (int, optional): Number of worker processes. Defaults to the number of CPUs.
+        chunk_size (int, optional): Number of molecules rendered per task. Defaults to 256.
+        progress_text (str, optional): Text of the progress bar. Defaults to "Rendering structures".
+
+    Returns:
+        list: Data URIs of the images in input order (None for invalid SMILES).
+    """
+    smiles = list(smiles)
+    cache = get_depiction_cache()
+    images, missing, num_invalid = _missing_depictions(smiles, cache, size, highlight, style)
+
+    if missing:
+        keys = list(missing.keys())
+        chunks = [(chunk, size, highlight, style) for chunk in split_chunks([missing[k][0] for k in keys], chunk_size)]
+        # Small batches are rendered directly (starting the workers would take longer)
+        if len(chunks) == 1:
+            rendered = [_render_png_chunk(chunks[0])]
+        else:
+            rendered = parallel_map(_render_png_chunk, chunks, max_workers=max_workers, progress_text=progress_text)
+        for cache_key, png_data in zip(keys, (png for chunk in rendered for png in chunk)):
+            if png_data is None:
+                num_invalid += len(missing[cache_key][1])
+                continue
+            uri = cache.put(cache_key, png_data)
+            for i in missing[cache_key][1]:
+                images[i] = uri
+
+    if num_invalid > 0:
+        st.warning(f"{num_invalid} molecule(s) could not be depicted (invalid SMILES).")
+    return images
+
+
+def prefetch_depictions(smiles, size=(300, 300), highlight=None, style="default", max_workers=MAX_WORKERS, chunk_size=64):
+    """
+    Render a list of SMILES into the depiction cache in a background thread (e.g., the next page of a table).
+
+    Args:
+        smiles (iterable): The SMILES strings.
+        size (tuple, optional): Width and height of the images in pixels. Defaults to (300, 300).
+        highlight (str, optional): SMARTS pattern of the substructure to highlight. Defaults to None.
+        style (str, optional): Drawing style ("default", "bw" or "transparent"). Defaults to "default".
+        max_workers (int, optional): Number of worker processes. Defaults to the number of CPUs.
+        chunk_size (int, optional): Number of molecules rendered per task. Defaults to 64.
+
+    Returns:
+        threading.Thread: The started background thread.
+    """
+    # The shared resources are resolved in the script thread, the background thread does not use Streamlit
+    cache = get_depiction_cache()
+    pool = get_process_pool(max_workers)
+    smiles = list(smiles)
+
+    def prefetch():
+        _, missing, _ = _missing_depictions(smiles, cache, size, highlight, style)
+        keys = list(missing.keys())
+        try:
+            futures = [pool.submit(_render_png_chunk, (chunk, size, highlight, style)) 
+                       for chunk in split_chunks([missing[k][0] for k in keys], chunk_size)]
+            rendered = [png for future in futures for png in future.result()]
+        except (BrokenProcessPool, OSError, RuntimeError):
+            return
+        for cache_key, png_data in zip(keys, rendered):
+            if png_data is not None:
+                cache.put(cache_key, png_data)
+
+    thread = threading.Thread(target=prefetch, daemon=True)
+    thread.start()
+    return thread
+
+
+def add_structure_columns(df, columns, **kwargs):
+    """
+    Add columns of structure images for one or several SMILES columns of a DataFrame.
+    All columns are rendered in a single batch, e.g., the warheads and linkers of LinkInvent.
+
+    Args:
+        df (pd.DataFrame): The DataFrame containing the SMILES columns.
+        columns (dict): Mapping of the SMILES columns to the names of the structure columns.
+        **kwargs: Further arguments passed to smi_to_png_batch.
+
+    Returns:
+        pd.DataFrame: The DataFrame with the structure columns.
+    """
+    smiles_cols = list(columns.keys())
+    images = smi_to_png_batch([smi for col in smiles_cols for smi in df[col]], **kwargs)
+    for n, col in enumerate(smiles_cols):
+        df[columns[col]] = images[n * len(df):(n + 1) * len(df)]
+    return df
+
+
+def iter_sdf_records(sdf_file):
+    """
+    Read an SDF file record by record (without parsing the molecules).
+
+    Args:
+        sdf_file (str or UploadedFile): The path to the SDF file or a file-like object (e.g., an uploaded file).
+
+    Yields:
+        str: The text of each record (up to the "$$$$" delimiter).
+    """
+    if hasattr(sdf_file, "read"):
+        sdf_file.seek(0)
+        lines = io.TextIOWrapper(sdf_file, encoding="utf-8", errors="replace")
+    else:
+        lines = open(sdf_file, "r", encoding="utf-8", errors="replace")
+    try:
+        record = []
+        for line in lines:
+            if line.startswith("$$$$"):
+                yield "".join(record)
+                record = []
+            else:
+                record.append(line)
+        if "".join(record).strip():
+            yield "".join(record)
+    finally:
+        if hasattr(sdf_file, "read"):
+            # Keep the uploaded file open (detach the text wrapper)
+            lines.detach()
+        else:
+            lines.close()
+
+
+def _records_to_smiles(records):
+    """
+    Convert SDF records into SMILES strings (worker function of convert_sdf_smi).
+
+    Args:
+        records (list): The texts of the SDF records.
+
+    Returns:
+        list: The SMILES strings (None for records that could not be parsed).
+    """
+    from rdkit import Chem
+    smiles = []
+    for record in records:
+        mol = Chem.MolFromMolBlock(record)
+        smiles.append(Chem.MolToSmiles(mol) if mol is not None else None)
+    return smiles
+
+
+def convert_sdf_smi(sdf_file, smi_file=None, max_workers=MAX_WORKERS, chunk_size=1000, parallel=True):
     """
-    Convert an SDF file to a SMILES file.
+    Convert an SDF file to a SMILES file. The SDF file is streamed record by record, the records are 
+    (optionally) parsed on the shared process pool and the SMILES are written incrementally. 
+    Records that can not be parsed are skipped and counted.
 
     Args:
-        sdf_file (str): The path to the SDF file.
+        sdf_file (str or UploadedFile): The path to the SDF file or the uploaded file.
+        smi_file (str, optional): The path to the SMILES file. Defaults to the path (or the name of the uploaded file) 
+            of the SDF file with the extension ".smi".
+        max_workers (int, optional): Number of worker processes. Defaults to the number of CPUs.
+        chunk_size (int, optional): Number of records parsed per task. Defaults to 1000.
+        parallel (bool, optional): Whether to parse the records on worker processes. Defaults to True.
 
     Returns:
         str: The path to the generated SMILES file.
     """
     try:
-        df = rdkit.Chem.PandasTools.LoadSDF(sdf_file, molColName='Molecule', smilesName='SMILES')
-        smi_file = f'{sdf_file[:-4]}.smi'
-        df.to_csv(smi_file, columns=["SMILES"], index=False, header=False)
+        if smi_file is None:
+            sdf_path = sdf_file if isinstance(sdf_file, (str, os.PathLike)) else sdf_file.name
+            smi_file = f'{os.path.splitext(sdf_path)[0]}.smi'
+
+        num_mols = 0
+        num_failed = 0
+        status = st.empty()
+
+        def write_smiles(fout, smiles):
+            nonlocal num_mols, num_failed
+            for smi in smiles:
+                if smi is None:
+                    num_failed += 1
+                else:
+                    fout.write(f"{smi}\n")
+                    num_mols += 1
+            status.caption(f"Converted molecules: {num_mols} (failed: {num_failed})")
+
+        with open(smi_file, "w") as fout:
+            chunks = _iter_chunks(iter_sdf_records(sdf_file), chunk_size)
+            if parallel:
+                # Keep a bounded number of chunks in flight and write the results in input order
+                pool = get_process_pool(max_workers)
+                pending = []
+                max_pending = 2 * (max_workers or os.cpu_count() or 1)
+                try:
+                    for chunk in chunks:
+                        pending.append(pool.submit(_records_to_smiles, chunk))
+                        if len(pending) >= max_pending:
+                            write_smiles(fout, pending.pop(0).result())
+                    for future in pending:
+                        write_smiles(fout, future.result())
+                except (BrokenProcessPool, OSError, RuntimeError):
+                    get_process_pool.clear()
+                    parallel = None
+            else:
+                for chunk in chunks:
+                    write_smiles(fout, _records_to_smiles(chunk))
+
+        status.empty()
+        if parallel is None:
+            # The process pool is not usable, convert the SDF file serially
+            return convert_sdf_smi(sdf_file, smi_file=smi_file, chunk_size=chunk_size, parallel=False)
+        if num_failed > 0:
+            st.warning(f"{num_failed} record(s) of the SDF file could not be parsed and were skipped ({num_mols} molecules converted).")
         return smi_file
     
     except Exception as e:
@@ -1627,6 +3514,7 @@ def convert_smiles_smarts(pattern, convert_to="smarts"):
     Returns:
         str: The converted SMARTS or SMILES string, or "Invalid structure" if the conversion fails.
     """
+    from rdkit import Chem
     if convert_to == "smarts": 
         try:
             mol = Chem.MolFromSmiles(pattern)
@@ -1648,26 +3536,18 @@ def convert_smiles_smarts(pattern, convert_to="smarts"):
             st.error(f"An error occured during conversion of SMARTS to SMILES: {e}") 
 
 
-def check_smiles(list_smiles, run_mode, mol_gen, mol2mol="Mol2mol (high, medium, low similarities)"):
+def vocabulary_tokens(mol_gen, mol2mol="Mol2mol (high, medium, low similarities)"):
     """
-    Check a list of SMILES strings for unsupported tokens based on the selected molecule generator.
+    Return the tokens supported by a molecule generator (vocabulary of the prior model).
 
     Args:
-        list_smiles (list): A list of SMILES strings to check.
-        run_mode (str): The run mode (e.g., "Scoring").
         mol_gen (str): The molecule generator (e.g., "Reinvent").
         mol2mol (str, optional): The specific Mol2Mol mode. Defaults to "Mol2mol (high, medium, low similarities)".
 
     Returns:
-        None
+        list: The supported tokens.
     """
-    if mol_gen == "Reinvent":
-        tokens_list = chem_tokens["Reinvent"].split(", ")
-    elif mol_gen == "LibInvent":
-        tokens_list = chem_tokens["LibInvent"]["Scaffold"].split(", ") + chem_tokens["LibInvent"]["Decorator"].split(", ")
-    elif mol_gen == "LinkInvent":
-        tokens_list = chem_tokens["LinkInvent"]["Warheads"].split(", ") + chem_tokens["LinkInvent"]["Linker"].split(", ")
-    elif mol_gen == "Mol2Mol": 
+    if mol_gen == "Mol2Mol": 
         if mol2mol in ["mol2mol_similarity", "mol2mol_medium_similarity", "mol2mol_high_similarity"]:
             mol2mol = "Mol2mol (high, medium, low similarities)"
         elif mol2mol == "mol2mol_mmp":
@@ -1676,209 +3556,827 @@ def check_smiles(list_smiles, run_mode, mol_gen, mol2mol="Mol2mol (high, medium,
             mol2mol = "Mol2mol (scaffold)"
         elif mol2mol == "mol2mol_scaffold_generic":
             mol2mol = "Mol2mol (scaffold-generic)"
-        tokens_list = chem_tokens["Mol2Mol"][mol2mol].split(", ")
-
-    if run_mode != "Scoring":
-        line = 0 
-        for smile in list_smiles:
-            i = 0
-            while i < len(smile):
-                if smile[i] in tokens_list:
-                    if smile[i:i+2] in tokens_list:
-                        i += 2
-                    elif smile[i:i+3] in tokens_list:
-                        i += 3
-                    elif smile[i:i+4] in tokens_list:
-                        i += 4
-                    elif smile[i:i+5] in tokens_list:
-                        i += 5
-                    elif smile[i:i+6] in tokens_list:
-                        i += 6
-                    else:
-                        i += 1
-                elif smile[i:i+2] in tokens_list:
-                    i += 2
-                elif smile[i:i+3] in tokens_list:
-                    i += 3
-                elif smile[i:i+4] in tokens_list:
-                    i += 4
-                elif smile[i:i+5] in tokens_list:
-                    i += 5
-                elif smile[i:i+6] in tokens_list:
-                    i += 6
-                else: 
-                    st.warning(f"""**Warning!!!**\n\n A non-supported token was found in line {line+1} (Token: '{smile[i]}').
-                               \n\n Either select the correct molecule generator **OR** correct your SMILES.""")
-                    break
-            line += 1 
+        return list(chem_token_lists["Mol2Mol"][mol2mol])
+    return list(chem_token_lists[mol_gen])
 
 
-#################################
-##### Transformer Functions ##### 
-##############################################################################################
-# Transformer functions used in the REINVENT4 (V4.0). 
-# Source: (https://github.com/MolecularAI/REINVENT4/blob/main/reinvent/scoring/transforms/)
-##############################################################################################
-def hard_sigmoid(x: np.ndarray, k: float) -> np.ndarray:
+def smiles_token_regex(token_lists=chem_token_lists):
     """
-    Apply a hard sigmoid function to the input array.
+    Build the regular expression that splits SMILES strings into the tokens of the REINVENT tokenizer: 
+    bracket atoms, two-digit ring bonds, the multi-character tokens of the generator vocabularies 
+    (longest first) and single characters.
 
     Args:
-        x (np.ndarray): Input array.
-        k (float): Scaling factor.
+        token_lists (Mapping, optional): The token lists of the molecule generators. Defaults to chem_token_lists.
 
     Returns:
-        np.ndarray: Transformed array with hard sigmoid applied.
+        re.Pattern: The compiled regular expression.
     """
-    return (k * x > 0).astype(np.float32)
+    tokens = set()
+    for token_list in token_lists.values():
+        for tokens_generator in (token_list.values() if isinstance(token_list, Mapping) else [token_list]):
+            tokens.update(tokens_generator)
+    # Bracket atoms and ring bond numbers ("10" stands for "%10") are matched by the generic patterns
+    multi_char = sorted((token for token in tokens if len(token) > 1 and not token.startswith("[") and not token.isdigit()), 
+                        key=lambda token: (-len(token), token))
+    return re.compile("(" + "|".join([r"\[[^\]\n]*\]", r"%\d{2}", *map(re.escape, multi_char), "."]) + ")")
 
 
-def stable_sigmoid(x: np.ndarray, k: float, base_10: bool = True) -> np.ndarray:
+# Tokens of a SMILES string as split by the REINVENT tokenizer (built from the generator vocabularies)
+SMILES_TOKEN_REGEX = smiles_token_regex()
+
+
+@lru_cache(maxsize=None)
+def vocabulary_set(mol_gen, mol2mol="Mol2mol (high, medium, low similarities)"):
     """
-    Apply a stable sigmoid function to the input array.
+    Return the tokens supported by a molecule generator as set (cached per generator).
+    Two-digit ring bonds are listed without the percent sign in the vocabularies (e.g., "10" for "%10").
 
     Args:
-        x (np.ndarray): Input array.
-        k (float): Scaling factor.
-        base_10 (bool): Whether to use base 10 for the logarithm. Defaults to True.
+        mol_gen (str): The molecule generator (e.g., "Reinvent").
+        mol2mol (str, optional): The specific Mol2Mol mode. Defaults to "Mol2mol (high, medium, low similarities)".
 
     Returns:
-        np.ndarray: Transformed array with stable sigmoid applied.
+        frozenset: The supported tokens.
     """
-    h = k * x
-    if base_10:
-        h = h * np.log(10)
-    hp_idx = h >= 0
-    y = np.zeros_like(x)
-    y[hp_idx] = 1.0 / (1.0 + np.exp(-h[hp_idx]))
-    y[~hp_idx] = np.exp(h[~hp_idx]) / (1.0 + np.exp(h[~hp_idx]))
-    return y.astype(np.float32)
+    tokens = set(vocabulary_tokens(mol_gen, mol2mol=mol2mol))
+    return frozenset(tokens | {f"%{token}" for token in tokens if token.isdigit() and len(token) == 2})
 
 
-def sigmoid(values, k, low, high):
+def find_unsupported_tokens(list_smiles, mol_gen, mol2mol="Mol2mol (high, medium, low similarities)"):
     """
-    Apply a sigmoid function to the input values.
+    Find all tokens of a list of SMILES strings that are not supported by a molecule generator.
+    The SMILES are split into tokens (see SMILES_TOKEN_REGEX) in one pass over the whole file, 
+    only the lines of files with unsupported tokens are checked one by one.
 
     Args:
-        values (array-like): Input values.
-        k (float): Scaling factor.
-        low (float): Lower bound.
-        high (float): Upper bound.
+        list_smiles (list): A list of SMILES strings to check.
+        mol_gen (str): The molecule generator (e.g., "Reinvent").
+        mol2mol (str, optional): The specific Mol2Mol mode. Defaults to "Mol2mol (high, medium, low similarities)".
 
     Returns:
-        np.ndarray: Transformed values with sigmoid applied.
+        list: Tuples of the line index and the list of unsupported tokens, for every line with unsupported tokens.
     """
-    values = np.array(values, dtype=np.float32)
-    x = values - (high + low) / 2
-    if (high - low) == 0:
-        k = 10.0 * k
-        transformed = hard_sigmoid(x, k)
-    else:
-        k = 10.0 * k / (high - low)
-        transformed = stable_sigmoid(x, k)
-    return transformed
+    vocabulary = vocabulary_set(mol_gen, mol2mol=mol2mol)
+    lines = [str(smi).replace("\n", " ") for smi in list_smiles]
+    unsupported = set(SMILES_TOKEN_REGEX.findall("\n".join(lines))) - vocabulary
+    if not unsupported:
+        return []
+    result = []
+    for line, smi in enumerate(lines):
+        tokens = SMILES_TOKEN_REGEX.findall(smi)
+        if not unsupported.isdisjoint(tokens):
+            result.append((line, [token for token in tokens if token not in vocabulary]))
+    return result
+
+
+def _unsupported_tokens_chunk(args):
+    """
+    Find the unsupported tokens of a chunk of SMILES strings (worker function of validate_smiles).
+
+    Args:
+        args (tuple): The SMILES of the chunk, the line index of the first SMILES, the molecule generator and the Mol2Mol mode.
+
+    Returns:
+        list: Tuples of the line index and the list of unsupported tokens.
+    """
+    smiles_chunk, offset, mol_gen, mol2mol = args
+    return [(offset + line, tokens) for line, tokens in find_unsupported_tokens(smiles_chunk, mol_gen, mol2mol=mol2mol)]
 
 
-def reverse_sigmoid(values, k, low, high):
+def validate_smiles(list_smiles, mol_gen, mol2mol="Mol2mol (high, medium, low similarities)", max_workers=MAX_WORKERS, chunk_size=50000):
     """
-    Apply a reverse sigmoid function to the input values.
+    Validate a list of SMILES strings against the vocabulary of a molecule generator. 
+    Large lists are split into chunks, which are validated on the shared process pool.
 
     Args:
-        values (array-like): Input values.
-        k (float): Scaling factor.
-        low (float): Lower bound.
-        high (float): Upper bound.
+        list_smiles (list): A list of SMILES strings to check.
+        mol_gen (str): The molecule generator (e.g., "Reinvent").
+        mol2mol (str, optional): The specific Mol2Mol mode. Defaults to "Mol2mol (high, medium, low similarities)".
+        max_workers (int, optional): Number of worker processes. Defaults to the number of CPUs.
+        chunk_size (int, optional): Number of SMILES validated per task. Defaults to 50000.
 
     Returns:
-        np.ndarray: Transformed values with reverse sigmoid applied.
+        dict: The validation report containing the number of SMILES ("num_smiles"), the lines with unsupported tokens 
+              ("unsupported", tuples of line index and tokens) and per unsupported token the number of occurrences and 
+              lines ("token_counts").
     """
-    values = np.array(values, dtype=np.float32)
-    x = values - (high + low) / 2
-    if (high - low) == 0:
-        k = 10.0 * k
-        transformed = hard_sigmoid(x, k)
+    list_smiles = list(list_smiles)
+    chunks = [(chunk, i * chunk_size, mol_gen, mol2mol) for i, chunk in enumerate(split_chunks(list_smiles, chunk_size))]
+    if len(chunks) > 1:
+        results = parallel_map(_unsupported_tokens_chunk, chunks, max_workers=max_workers, progress_text="Validating SMILES")
     else:
-        k = 10.0 * k / (high - low)
-        transformed = stable_sigmoid(x, k)
-    return 1.0 - transformed
+        results = [_unsupported_tokens_chunk(chunk) for chunk in chunks]
+    unsupported = [line for result in results for line in result]
+
+    token_counts = {}
+    for _, tokens in unsupported:
+        for token in tokens:
+            token_counts.setdefault(token, [0, 0])[0] += 1
+        for token in set(tokens):
+            token_counts[token][1] += 1
 
+    return {"num_smiles": len(list_smiles), "unsupported": unsupported, "token_counts": token_counts}
 
-def double_sigmoid(x: np.ndarray, x_left: float, x_right: float, k: float, k_left: float, k_right: float) -> np.ndarray:
+
+def validation_report(report, list_smiles, key):
     """
-    Compute double sigmoid based on stable sigmoid.
+    Show the validation report of a list of SMILES strings: the number of usable molecules, the unsupported tokens, 
+    the lines with unsupported tokens and a download button for the cleaned SMILES file (supported molecules only).
 
     Args:
-        x (np.ndarray):  Input array.
-        x_left (float):  Left sigmoid x value for which the output is 0.5. (low in previous implementation)
-        x_right (float): Right sigmoid x value for which the output is 0.5. (high in previous implementation)
-        k (float):       Common scaling factor. (coef_div in previous implementation)
-        k_left (float):  Scaling left factor. (coef_si in previous implementation)
-        k_right (float): Scaling right factor. (coef_se in previous implementation)
+        report (dict): The validation report (see validate_smiles).
+        list_smiles (list): The validated SMILES strings.
+        key (str): A unique key for Streamlit widgets.
 
     Returns:
-        np.ndarray: Transformed array with double sigmoid applied.
+        None
+    """
+    num_unsupported = len(report["unsupported"])
+    if num_unsupported == 0:
+        return
+
+    st.warning(f"""**Warning!!!**\n\n Non-supported tokens were found in **{num_unsupported}** of {report['num_smiles']} molecules 
+               (**{report['num_smiles'] - num_unsupported}** molecules can be used).
+               \n\n Either select the correct molecule generator **OR** correct your SMILES (or use the cleaned SMILES file).""")
+    with st.expander("Validation Report"):
+        token_table = pd.DataFrame([(token, counts[0], counts[1]) for token, counts in report["token_counts"].items()], 
+                                   columns=["Token", "Occurrences", "Molecules"]).sort_values(by="Molecules", ascending=False)
+        st.dataframe(token_table, hide_index=True)
+        # Lines with unsupported tokens (limited to the first 10000 lines)
+        lines_table = pd.DataFrame([(line + 1, list_smiles[line], ", ".join(dict.fromkeys(tokens))) for line, tokens in report["unsupported"][:10000]], 
+                                   columns=["Line", "SMILES", "Unsupported Tokens"])
+        st.dataframe(lines_table, hide_index=True)
+        if num_unsupported > 10000:
+            st.caption(f"Only the first 10000 of {num_unsupported} lines with unsupported tokens are shown.")
+
+    unsupported_lines = {line for line, _ in report["unsupported"]}
+    cleaned = "".join(f"{smi}\n" for line, smi in enumerate(list_smiles) if line not in unsupported_lines)
+    st.download_button(label="Download Cleaned SMILES File", data=cleaned, file_name="cleaned.smi", key=f"{key}_cleaned_smi", 
+                       help="SMILES file containing only the molecules compatible with the selected molecule generator.")
+
+
+def check_smiles(list_smiles, run_mode, mol_gen, mol2mol="Mol2mol (high, medium, low similarities)", key="check_smiles"):
     """
-    x_center = (x_right - x_left) / 2 + x_left
+    Check a list of SMILES strings for unsupported tokens based on the selected molecule generator.
+
+    Args:
+        list_smiles (list): A list of SMILES strings to check.
+        run_mode (str): The run mode (e.g., "Scoring").
+        mol_gen (str): The molecule generator (e.g., "Reinvent").
+        mol2mol (str, optional): The specific Mol2Mol mode. Defaults to "Mol2mol (high, medium, low similarities)".
+        key (str, optional): A unique key for Streamlit widgets. Defaults to "check_smiles".
 
-    xl = x[x < x_center] - x_left
-    xr = x[x >= x_center] - x_right
+    Returns:
+        dict: The validation report (see validate_smiles), or None for the scoring run mode.
+    """
+    if run_mode == "Scoring":
+        return None
 
-    if k == 0:
-        sigmoid_left = hard_sigmoid(xl, k_left)
-        sigmoid_right = 1 - hard_sigmoid(xr, k_right)
-    else:
-        k_left = k_left / k  
-        k_right = k_right / k 
-        sigmoid_left = stable_sigmoid(xl, k_left)
-        sigmoid_right = 1 - stable_sigmoid(xr, k_right)
+    list_smiles = list(list_smiles)
+    report = validate_smiles(list_smiles, mol_gen, mol2mol=mol2mol)
+    validation_report(report, list_smiles, key)
+    return report
 
-    d_sigmoid = np.zeros_like(x)
-    d_sigmoid[x < x_center] = sigmoid_left
-    d_sigmoid[x >= x_center] = sigmoid_right
-    return d_sigmoid
 
+#####################################
+##### Scoring Preview Functions ##### 
+#####################################
+# Scoring components computed locally with RDKit (physchem properties, drug-likeness)
+PREVIEW_COMPONENTS = ("SlogP", "MolecularWeight", "TPSA", "GraphLength", "NumAtomStereoCenters", "HBondAcceptors", "HBondDonors", 
+                      "NumRotBond", "Csp3", "numsp", "numsp2", "numsp3", "NumHeavyAtoms", "NumHeteroAtoms", "NumRings", 
+                      "NumAromaticRings", "NumAliphaticRings", "QED")
+# Transformers applied locally (see transform_values), components with other transformers are skipped
+PREVIEW_TRANSFORMERS = ("Sigmoid", "Reverse_Sigmoid", "Double_Sigmoid", "Step", "Left_Step", "Right_Step")
+PREVIEW_CHUNK_SIZE = 2000       # Number of molecules per task of the process pool
+PREVIEW_MAX_ROWS = 1000         # Number of molecules shown in the preview table
+
+
+@lru_cache(maxsize=1)
+def physchem_functions():
+    """
+    Return the RDKit functions computing the raw values of the preview components (imported once per process).
+    The hybridization counts (numsp, numsp2, numsp3) are computed together in _physchem_chunk.
 
-def step(values, low, high):
+    Returns:
+        dict: The functions of the components (component: function of a RDKit molecule).
+    """
+    from rdkit import Chem
+    from rdkit.Chem import Crippen, Descriptors, QED, rdMolDescriptors
+
+    return {
+        "SlogP": Crippen.MolLogP,
+        "MolecularWeight": Descriptors.MolWt,
+        "TPSA": rdMolDescriptors.CalcTPSA,
+        "GraphLength": lambda mol: float(Chem.GetDistanceMatrix(mol).max()),
+        "NumAtomStereoCenters": rdMolDescriptors.CalcNumAtomStereoCenters,
+        "HBondAcceptors": rdMolDescriptors.CalcNumHBA,
+        "HBondDonors": rdMolDescriptors.CalcNumHBD,
+        "NumRotBond": rdMolDescriptors.CalcNumRotatableBonds,
+        "Csp3": rdMolDescriptors.CalcFractionCSP3,
+        "NumHeavyAtoms": rdMolDescriptors.CalcNumHeavyAtoms,
+        "NumHeteroAtoms": rdMolDescriptors.CalcNumHeteroatoms,
+        "NumRings": rdMolDescriptors.CalcNumRings,
+        "NumAromaticRings": rdMolDescriptors.CalcNumAromaticRings,
+        "NumAliphaticRings": rdMolDescriptors.CalcNumAliphaticRings,
+        "QED": QED.qed,
+    }
+
+
+def _physchem_chunk(args):
     """
-    Apply a step function to the input values.
+    Compute the raw values of the preview components for a chunk of SMILES (worker function of the process pool).
 
     Args:
-        values (array-like): Input values.
-        low (float): Lower bound.
-        high (float): Upper bound.
+        args (tuple): The SMILES strings and the names of the components.
 
     Returns:
-        np.ndarray: Transformed values with step function applied.
+        np.ndarray: The raw values (molecules x components, float32), NaN for invalid SMILES.
     """
-    transformed = [1.0 if low <= x <= high else 0.0 for x in values]
-    return np.array(transformed, dtype=float)
+    from rdkit import Chem, RDLogger
+    RDLogger.DisableLog("rdApp.*")
+    smiles, components = args
+    hybridizations = {"numsp": Chem.rdchem.HybridizationType.SP, "numsp2": Chem.rdchem.HybridizationType.SP2, 
+                      "numsp3": Chem.rdchem.HybridizationType.SP3}
+    functions = [None if comp in hybridizations else physchem_functions()[comp] for comp in components]
+    count_hybridizations = any(function is None for function in functions)
+    values = np.full((len(smiles), len(components)), np.nan, dtype=np.float32)
+    for i, smi in enumerate(smiles):
+        mol = Chem.MolFromSmiles(smi)
+        if mol is None:
+            continue
+        # One pass over the atoms for all hybridization counts
+        counts = Counter(atom.GetHybridization() for atom in mol.GetAtoms()) if count_hybridizations else None
+        for j, function in enumerate(functions):
+            values[i, j] = counts[hybridizations[components[j]]] if function is None else function(mol)
+    return values
 
 
-def left_step(values, low):
+def compute_descriptors(smiles, components, max_workers=MAX_WORKERS, chunk_size=PREVIEW_CHUNK_SIZE, progress_text=None):
     """
-    Apply a left step function to the input values.
+    Compute the raw values of the preview components for a list of SMILES on the shared process pool.
 
     Args:
-        values (array-like): Input values.
-        low (float): Lower bound.
+        smiles (list): The SMILES strings.
+        components (list): The names of the components (see PREVIEW_COMPONENTS).
+        max_workers (int, optional): Number of worker processes. Defaults to the number of CPUs.
+        chunk_size (int, optional): Number of molecules per task. Defaults to PREVIEW_CHUNK_SIZE.
+        progress_text (str, optional): Text of the progress bar shown in the UI. Defaults to None.
 
     Returns:
-        np.ndarray: Transformed values with left step function applied.
+        np.ndarray: The raw values (molecules x components, float32), NaN for invalid SMILES.
     """
-    transformed = [1.0 if x <= low else 0.0 for x in values]
-    return np.array(transformed, dtype=float)
+    components = tuple(components)
+    chunks = [(chunk, components) for chunk in split_chunks(list(smiles), chunk_size)]
+    if not chunks:
+        return np.empty((0, len(components)), dtype=np.float32)
+    if len(chunks) == 1:
+        return _physchem_chunk(chunks[0])
+    return np.vstack(parallel_map(_physchem_chunk, chunks, max_workers=max_workers, progress_text=progress_text))
 
 
-def right_step(values, high):
+def transform_values(values, transform, out=None):
     """
-    Apply a right step function to the input values.
+    Apply the transformer of a scoring component to its raw values.
 
     Args:
-        values (array-like): Input values.
-        high (float): Upper bound.
+        values (np.ndarray): The raw values.
+        transform (dict): The transformer type and its parameters (see component_settings), None for no transformer.
+        out (np.ndarray, optional): Output array (float32, same shape as the values). Defaults to None (new array).
 
     Returns:
-        np.ndarray: Transformed values with right step function applied.
+        np.ndarray: The transformed values.
     """
-    transformed = [1.0 if x >= high else 0.0 for x in values]
-    return np.array(transformed, dtype=float)
\ No newline at end of file
+    values = np.asarray(values, dtype=np.float32)
+    if transform is None:
+        if out is None:
+            return values
+        np.copyto(out, values)
+        return out
+    trans_type = transform["type"]
+    if trans_type == "Sigmoid":
+        return sigmoid(values, transform["k"], transform["low"], transform["high"], out=out)
+    if trans_type == "Reverse_Sigmoid":
+        return reverse_sigmoid(values, transform["k"], transform["low"], transform["high"], out=out)
+    if trans_type == "Double_Sigmoid":
+        return double_sigmoid(values, transform["low"], transform["high"], transform["coef_div"], transform["coef_si"], transform["coef_se"], out=out)
+    if trans_type == "Step":
+        return step(values, transform["low"], transform["high"], out=out)
+    if trans_type == "Left_Step":
+        return left_step(values, transform["low"], out=out)
+    if trans_type == "Right_Step":
+        return right_step(values, transform["high"], out=out)
+    raise ValueError(f"Transformer not supported in the preview: {trans_type}")
+
+
+def component_settings(key, components):
+    """
+    Read the settings (weight and transformer) of the scoring components configured in scoring_components 
+    from the session state (the default values of the widgets are used for widgets not shown yet).
+
+    Args:
+        key (str): The key of the scoring components widgets (e.g., "RL" or "SL-S1").
+        components (list): The selected scoring components.
+
+    Returns:
+        list: The settings of each component (component, label, weight and transformer).
+    """
+    state = st.session_state
+    settings = []
+    for i, comp in enumerate(components):
+        i += 1
+        trans_key = f"{key}_{comp}_{i}"
+        defaults = transformers_def_param.get(comp, {})
+        transform = None
+        if state.get(f"{trans_key}_use_trans", True) and defaults:
+            transform = {
+                "type": state.get(f"{trans_key}_trans_type", defaults.get("default_transformer")),
+                "low": float(state.get(f"{trans_key}_trans_lower", defaults.get("low_value") or 0.0)),
+                "high": float(state.get(f"{trans_key}_trans_upper", defaults.get("high_value") or 0.0)),
+                "k": float(state.get(f"{trans_key}_trans_k", 0.5)) if (state.get("modus") == "Advanced") else 0.5,
+                "coef_div": float(state.get(f"{trans_key}_trans_div", 100.0)) if (state.get("modus") == "Advanced") else 100.0,
+                "coef_si": float(state.get(f"{trans_key}_trans_si", 10.0)) if (state.get("modus") == "Advanced") else 10.0,
+                "coef_se": float(state.get(f"{trans_key}_trans_se", 10.0)) if (state.get("modus") == "Advanced") else 10.0,
+            }
+        settings.append({"component": comp, "label": f"{i}) {comp}", "weight": float(state.get(f"{key}_{comp}_weight_{i}", 1.0)), 
+                         "transform": transform})
+    return settings
+
+
+def _canonical_chunk(smiles):
+    """
+    Canonicalize a chunk of SMILES (worker function of the process pool), None for invalid SMILES.
+    """
+    from rdkit import RDLogger
+    RDLogger.DisableLog("rdApp.*")
+    return [canonical_smiles(smi) for smi in smiles]
+
+
+def _save_array(path, array):
+    """
+    Save a NumPy array atomically (temporary file first, so readers never see partial arrays).
+    """
+    tmp_path = f"{path}.{os.getpid()}.tmp.npy"
+    np.save(tmp_path, array)
+    os.replace(tmp_path, path)
+
+
+class DescriptorCache:
+    """
+    Cache of the raw values of the preview components, keyed by canonical SMILES and component.
+    Each component is stored as one float32 column with a boolean mask of the computed rows 
+    (RDKit may return NaN as value) and the canonical SMILES as text file (row order), persisted in a folder of the user workspace. 
+    SMILES sets seen before (same SMILES in the same order) are mapped to the cache rows without RDKit, 
+    so re-scoring a set only gathers the cached columns. Only the last MAX_SETS SMILES sets are kept, 
+    the rows no remaining set refers to are removed once they are the majority of the rows (see compact).
+
+    Args:
+        cache_dir (str): Folder of the cache files.
+    """
+    MAX_SETS = 32       # Number of SMILES sets whose rows are kept (least recently used sets are removed)
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        os.makedirs(os.path.join(cache_dir, "sets"), exist_ok=True)
+        smiles_path = os.path.join(cache_dir, "smiles.txt")
+        self.smiles = []
+        if os.path.isfile(smiles_path):
+            with open(smiles_path, "r") as f:
+                self.smiles = f.read().splitlines()
+        self._rows = None        # canonical SMILES -> row (built when a new SMILES set is added)
+        self._columns = {}
+        self._computed = {}
+
+    def __len__(self):
+        return len(self.smiles)
+
+    def column(self, component):
+        """
+        Return the column of a component (float32, NaN for values not computed, see computed).
+        """
+        if component not in self._columns:
+            path = os.path.join(self.cache_dir, f"{component}.npy")
+            column = np.load(path) if os.path.isfile(path) else np.empty(0, dtype=np.float32)
+            self._columns[component] = column
+        column = self._columns[component]
+        if len(column) < len(self.smiles):
+            column = np.concatenate([column, np.full(len(self.smiles) - len(column), np.nan, dtype=np.float32)])
+            self._columns[component] = column
+        return column
+
+    def computed(self, component):
+        """
+        Return the mask of the computed rows of a component (bool, columns without mask are computed again).
+        """
+        if component not in self._computed:
+            path = os.path.join(self.cache_dir, f"{component}.computed.npy")
+            mask = np.load(path) if os.path.isfile(path) else np.empty(0, dtype=bool)
+            self._computed[component] = mask
+        mask = self._computed[component]
+        if len(mask) < len(self.smiles):
+            mask = np.concatenate([mask, np.zeros(len(self.smiles) - len(mask), dtype=bool)])
+            self._computed[component] = mask
+        return mask
+
+    def prune_sets(self):
+        """
+        Remove the least recently used SMILES sets (only the last MAX_SETS sets are kept) and compact the rows.
+
+        Returns:
+            bool: Whether the rows were compacted (the rows of the remaining sets changed).
+        """
+        sets_dir = os.path.join(self.cache_dir, "sets")
+        set_files = []
+        for entry in os.scandir(sets_dir):
+            try:
+                set_files.append((entry.stat().st_mtime, entry.path))
+            except FileNotFoundError:
+                pass
+        removed = sorted(set_files, reverse=True)[self.MAX_SETS:]
+        for _, path in removed:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        return self.compact() if removed else False
+
+    def compact(self):
+        """
+        Remove the rows no remaining SMILES set refers to, if they are the majority of the rows 
+        (so each row is moved a bounded number of times). The SMILES, the columns, the masks and 
+        the rows of the sets are rewritten, the last use of the sets is kept.
+
+        Returns:
+            bool: Whether the rows were compacted.
+        """
+        sets_dir = os.path.join(self.cache_dir, "sets")
+        set_rows = {}
+        for entry in os.scandir(sets_dir):
+            if entry.name.endswith(".npy") and not entry.name.endswith(".tmp.npy"):
+                set_rows[entry.path] = (np.load(entry.path), entry.stat())
+        used = np.zeros(len(self.smiles), dtype=bool)
+        for rows, _ in set_rows.values():
+            used[rows[rows >= 0]] = True
+        if used.sum() * 2 >= len(self.smiles):
+            return False
+
+        # Map the old rows to the new rows (the extra last entry maps -1 of invalid SMILES to -1)
+        keep = np.flatnonzero(used)
+        new_rows = np.full(len(self.smiles) + 1, -1, dtype=np.int64)
+        new_rows[keep] = np.arange(len(keep))
+        components = [name[:-len(".npy")] for name in os.listdir(self.cache_dir) 
+                      if name.endswith(".npy") and not name.endswith((".computed.npy", ".tmp.npy"))]
+        for comp in components:
+            _save_array(os.path.join(self.cache_dir, f"{comp}.npy"), self.column(comp)[keep])
+            _save_array(os.path.join(self.cache_dir, f"{comp}.computed.npy"), self.computed(comp)[keep])
+        self.smiles = [self.smiles[row] for row in keep]
+        smiles_path = os.path.join(self.cache_dir, "smiles.txt")
+        with open(f"{smiles_path}.{os.getpid()}.tmp", "w") as f:
+            f.write("".join(f"{smi}\n" for smi in self.smiles))
+        os.replace(f"{smiles_path}.{os.getpid()}.tmp", smiles_path)
+        for path, (rows, set_stat) in set_rows.items():
+            _save_array(path, new_rows[rows])
+            os.utime(path, ns=(set_stat.st_atime_ns, set_stat.st_mtime_ns))
+        self._rows = None
+        self._columns = {}
+        self._computed = {}
+        return True
+
+    def set_rows(self, smiles, max_workers=MAX_WORKERS, progress_text=None):
+        """
+        Return the cache rows of a SMILES set (-1 for invalid SMILES), new canonical SMILES are added to the cache.
+
+        Args:
+            smiles (list): The SMILES strings.
+            max_workers (int, optional): Number of worker processes. Defaults to the number of CPUs.
+            progress_text (str, optional): Text of the progress bar shown in the UI. Defaults to None.
+
+        Returns:
+            np.ndarray: The rows (int64).
+        """
+        digest = hashlib.sha256("\n".join(smiles).encode()).hexdigest()
+        set_path = os.path.join(self.cache_dir, "sets", f"{digest}.npy")
+        if os.path.isfile(set_path):
+            os.utime(set_path)      # last use of the set (see prune_sets)
+            return np.load(set_path)
+
+        chunks = split_chunks(list(smiles), PREVIEW_CHUNK_SIZE)
+        canonical = list(itertools.chain.from_iterable(
+            parallel_map(_canonical_chunk, chunks, max_workers=max_workers, progress_text=progress_text) if len(chunks) > 1 
+            else map(_canonical_chunk, chunks)))
+        if self._rows is None:
+            self._rows = {smi: row for row, smi in enumerate(self.smiles)}
+        new_smiles = []
+        rows = np.full(len(canonical), -1, dtype=np.int64)
+        for i, smi in enumerate(canonical):
+            if smi is None:
+                continue
+            row = self._rows.get(smi)
+            if row is None:
+                row = self._rows[smi] = len(self.smiles) + len(new_smiles)
+                new_smiles.append(smi)
+            rows[i] = row
+        if new_smiles:
+            self.smiles.extend(new_smiles)
+            with open(os.path.join(self.cache_dir, "smiles.txt"), "a") as f:
+                f.write("".join(f"{smi}\n" for smi in new_smiles))
+        _save_array(set_path, rows)
+        if self.prune_sets():
+            rows = np.load(set_path)
+        return rows
+
+    def descriptors(self, smiles, components, max_workers=MAX_WORKERS, progress_text=None):
+        """
+        Return the raw values of the components for a SMILES set, only missing values are computed with RDKit.
+
+        Args:
+            smiles (list): The SMILES strings.
+            components (list): The names of the components (see PREVIEW_COMPONENTS).
+            max_workers (int, optional): Number of worker processes. Defaults to the number of CPUs.
+            progress_text (str, optional): Text of the progress bar shown in the UI. Defaults to None.
+
+        Returns:
+            np.ndarray: The raw values (molecules x components, float32), NaN for invalid SMILES.
+        """
+        rows = self.set_rows(smiles, max_workers=max_workers, progress_text=progress_text)
+        valid_rows = np.unique(rows[rows >= 0])
+        missing = {comp: valid_rows[~self.computed(comp)[valid_rows]] for comp in dict.fromkeys(components)}
+        missing_rows = np.unique(np.concatenate([np.empty(0, dtype=np.int64)] + list(missing.values())))
+        if len(missing_rows):
+            missing_components = [comp for comp in missing if len(missing[comp])]
+            values = compute_descriptors([self.smiles[row] for row in missing_rows], missing_components, 
+                                         max_workers=max_workers, progress_text=progress_text)
+            for j, comp in enumerate(missing_components):
+                column = self.column(comp)
+                column[missing_rows] = values[:, j]
+                _save_array(os.path.join(self.cache_dir, f"{comp}.npy"), column)
+                mask = self.computed(comp)
+                mask[missing_rows] = True
+                _save_array(os.path.join(self.cache_dir, f"{comp}.computed.npy"), mask)
+
+        # Gather the cached columns (invalid SMILES -> NaN)
+        raw = np.full((len(rows), len(components)), np.nan, dtype=np.float32)
+        valid = rows >= 0
+        for j, comp in enumerate(components):
+            raw[valid, j] = self.column(comp)[rows[valid]]
+        return raw
+
+
+def descriptor_cache():
+    """
+    Return the descriptor cache of the user workspace (kept in the session state).
+
+    Returns:
+        DescriptorCache: The descriptor cache.
+    """
+    cache_dir = os.path.join(st.session_state["user_folder"], "descriptor_cache")
+    cache = st.session_state.get("descriptor_cache")
+    if (cache is None) or (cache.cache_dir != cache_dir) or not os.path.isdir(cache_dir):
+        cache = DescriptorCache(cache_dir)
+        st.session_state["descriptor_cache"] = cache
+    return cache
+
+
+def scoring_preview(smiles, settings, aggregation="geometric", max_workers=MAX_WORKERS, progress_text=None, cache=None):
+    """
+    Compute the scores of a set of molecules locally (CPU) with the components supported by the preview:
+    raw values with RDKit, transformers and the weighted mean of the transformed values.
+
+    Args:
+        smiles (list): The SMILES strings.
+        settings (list): The settings of the scoring components (see component_settings).
+        aggregation (str, optional): "geometric" or "arithmetic". Defaults to "geometric".
+        max_workers (int, optional): Number of worker processes. Defaults to the number of CPUs.
+        progress_text (str, optional): Text of the progress bar shown in the UI. Defaults to None.
+        cache (DescriptorCache, optional): The cache of the raw values. Defaults to None (no cache).
+
+    Returns:
+        tuple: The scores (DataFrame: SMILES, Score, raw and transformed value of each component) 
+               and the list of components not supported by the preview (component or transformer).
+    """
+    supported, skipped = [], []
+    for setting in settings:
+        transform = setting["transform"]
+        if setting["component"] not in PREVIEW_COMPONENTS:
+            skipped.append(setting["label"])
+        elif (transform is not None) and (transform["type"] not in PREVIEW_TRANSFORMERS):
+            skipped.append(f"{setting['label']} ({transform['type']} transformer)")
+        else:
+            supported.append(setting)
+    compute = compute_descriptors if cache is None else cache.descriptors
+    raw = compute(smiles, [setting["component"] for setting in supported], max_workers=max_workers, progress_text=progress_text)
+    transformed = np.empty_like(raw, order="F")     # contiguous columns, written in place by the transformers
+    for j, setting in enumerate(supported):
+        transform_values(raw[:, j], setting["transform"], out=transformed[:, j])
+    scores = aggregate(transformed, [setting["weight"] for setting in supported], aggregation)
+    valid = ~np.isnan(raw).any(axis=1) if raw.shape[1] else np.ones(len(raw), dtype=bool)
+    df = pd.DataFrame({"SMILES": list(smiles), "Valid": valid, "Score": np.where(valid, scores, 0.0).astype(np.float32)})
+    for j, setting in enumerate(supported):
+        df[f"{setting['label']} (raw)"] = raw[:, j]
+        df[setting["label"]] = transformed[:, j]
+    return df, skipped
+
+
+def read_smiles_upload(uploaded_file):
+    """
+    Read the SMILES of an uploaded SMILES file (first column of each line, empty lines are skipped).
+
+    Args:
+        uploaded_file (UploadedFile): The uploaded SMILES file.
+
+    Returns:
+        list: The SMILES strings.
+    """
+    lines = uploaded_file.getvalue().decode(errors="replace").splitlines()
+    return [line.split()[0] for line in lines if line.strip()]
+
+
+def scoring_preview_ui(key, components, aggregation="geometric"):
+    """
+    Preview the total score of the configured scoring components for an uploaded set of SMILES, 
+    computed locally on the CPU before running REINVENT.
+
+    Args:
+        key (str): The key of the scoring components widgets (e.g., "RL" or "SL-S1").
+        components (list): The selected scoring components.
+        aggregation (str, optional): "geometric" or "arithmetic". Defaults to "geometric".
+
+    Returns:
+        None
+    """
+    st.write(f"""Score a set of molecules locally with the selected components and transformers ({aggregation} mean). 
+                 Supported components: {", ".join(PREVIEW_COMPONENTS)}. 
+                 Supported transformers: {", ".join(PREVIEW_TRANSFORMERS)}.""")
+    smi_file = st.file_uploader("Upload SMILES File", type=["smi", "txt"], 
+                                help=f"SMILES file (.smi, one molecule per line) scored with the components of {key}.")
+    previews = st.session_state.setdefault("scoring_preview", {})
+    if smi_file and st.button("Compute Preview Scores", help=f"Compute the scores of the molecules with the components of {key}."):
+        start = time.perf_counter()
+        df, skipped = scoring_preview(read_smiles_upload(smi_file), component_settings(key, components), aggregation, 
+                                      progress_text="Computing scores", cache=descriptor_cache())
+        previews[key] = (df, skipped, time.perf_counter() - start)
+    if key not in previews:
+        return None
+
+    df, skipped, seconds = previews[key]
+    if skipped:
+        st.warning(f"Components not supported by the preview (not included in the score): {', '.join(skipped)}", icon="⚠️")
+    valid = df["Valid"]
+    st.write(f"**{len(df)}** molecules ({int((~valid).sum())} invalid) scored in **{seconds:.1f} s**.")
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Mean Score", f"{df.loc[valid, 'Score'].mean():.3f}" if valid.any() else "-")
+    col2.metric("Median Score", f"{df.loc[valid, 'Score'].median():.3f}" if valid.any() else "-")
+    col3.metric("Score > 0.5", f"{(df.loc[valid, 'Score'] > 0.5).mean():.1%}" if valid.any() else "-")
+    counts, edges = np.histogram(df.loc[valid, "Score"], bins=20, range=(0.0, 1.0))
+    st.bar_chart(pd.DataFrame({"Molecules": counts}, index=np.round((edges[:-1] + edges[1:]) / 2, 3)), x_label="Score", y_label="Molecules")
+    st.dataframe(df.sort_values("Score", ascending=False).head(PREVIEW_MAX_ROWS), hide_index=True)
+
+
+###############################
+##### Rescoring Functions ##### 
+###############################
+# Suffix of the raw value columns of the scoring components in the results summary ("<component> (raw)")
+RAW_SUFFIX = " (raw)"
+# Name of the column with the new total score in the re-scored results summary
+RESCORED_COLUMN = "Score (rescored)"
+# Number of bins of the score histograms (scores between 0 and 1)
+SCORE_BINS = 20
+
+
+def summary_components(columns):
+    """
+    Return the scoring components of a results summary: the columns of the transformed scores, 
+    which have a column of raw values next to them ("<component>" and "<component> (raw)").
+    Components used more than once are renamed by pandas ("<component>.1" and "<component> (raw).1").
+
+    Args:
+        columns (iterable): The column names of the results summary.
+
+    Returns:
+        list: The column names of the scoring components (in the order of the columns).
+    """
+    columns = list(columns)
+    names = set(columns)
+    components = []
+    for col in columns:
+        name, dot, number = col.rpartition(".")
+        if (f"{col}{RAW_SUFFIX}" in names) or (dot and number.isdigit() and f"{name}{RAW_SUFFIX}.{number}" in names):
+            components.append(col)
+    return components
+
+
+def rescore_summary(csv_file, weights, aggregation="geometric", output_file=None, chunksize=SUMMARY_CHUNK_SIZE, top=PREVIEW_MAX_ROWS):
+    """
+    Re-score a results summary of REINVENT (CSV) with new weights of the scoring components, without rerunning REINVENT.
+    The file is streamed in chunks (bounded memory): the transformed scores of each chunk are aggregated into the 
+    new total score, written to the output file and added to the aggregates (histograms and best molecules).
+
+    Args:
+        csv_file (str or UploadedFile): The path to the CSV file or the uploaded file.
+        weights (dict): The new weight of each scoring component (column name: weight).
+        aggregation (str, optional): "geometric" or "arithmetic" (or "<aggregation>_mean"). Defaults to "geometric".
+        output_file (str, optional): The CSV file for the results summary with the new total score. Defaults to None (not written).
+        chunksize (int, optional): The number of rows per chunk. Defaults to SUMMARY_CHUNK_SIZE.
+        top (int, optional): The number of best molecules (new total score) kept. Defaults to PREVIEW_MAX_ROWS.
+
+    Returns:
+        dict: The number of rows, the sum and histogram of the previous ("Score") and new total scores and the best molecules.
+    """
+    components = list(weights)
+    weight_values = [weights[comp] for comp in components]
+    result = {"rows": 0, "sums": {"Score": 0.0, RESCORED_COLUMN: 0.0}, 
+              "histograms": {"Score": np.zeros(SCORE_BINS, dtype=np.int64), RESCORED_COLUMN: np.zeros(SCORE_BINS, dtype=np.int64)}}
+    best = None
+    tmp_file = f"{output_file}.tmp" if output_file else None
+    try:
+        if hasattr(csv_file, "seek"):
+            csv_file.seek(0)
+        # Original dtypes (float64): the other columns are written unchanged to the output file
+        for chunk in pd.read_csv(csv_file, index_col=False, chunksize=chunksize):
+            missing = [comp for comp in components if comp not in chunk.columns]
+            if missing:
+                raise ValueError(f"Scoring components not found in the results summary: {', '.join(missing)}")
+            chunk[RESCORED_COLUMN] = aggregate(chunk[components].to_numpy(dtype=np.float64), weight_values, aggregation)
+            if tmp_file:
+                chunk.to_csv(tmp_file, mode="w" if result["rows"] == 0 else "a", header=(result["rows"] == 0), index=False)
+
+            result["rows"] += len(chunk)
+            for col in result["sums"]:
+                if col in chunk.columns:
+                    values = chunk[col].to_numpy(dtype=np.float64)
+                    result["sums"][col] += float(np.nansum(values))
+                    result["histograms"][col] += np.histogram(values, bins=SCORE_BINS, range=(0.0, 1.0))[0]
+            best = chunk if best is None else pd.concat([best, chunk])
+            best = best.nlargest(top, RESCORED_COLUMN)
+    except BaseException:
+        if tmp_file and os.path.exists(tmp_file):
+            os.remove(tmp_file)
+        raise
+    if tmp_file and os.path.exists(tmp_file):
+        os.replace(tmp_file, output_file)
+    result["best"] = best
+    return result
+
+
+def rescore_summary_ui(csv_file, cache_dir, key="rescore"):
+    """
+    Re-score an uploaded results summary with new weights of its scoring components and show the new total scores.
+
+    Args:
+        csv_file (UploadedFile): The uploaded results summary (CSV).
+        cache_dir (str): The folder for the re-scored results summary (e.g., the user folder).
+        key (str, optional): The prefix of the widget keys. Defaults to "rescore".
+
+    Returns:
+        None
+    """
+    csv_file.seek(0)
+    components = summary_components(pd.read_csv(csv_file, index_col=False, nrows=0).columns)
+    if not components:
+        st.info("No scoring components found in the results summary (columns with transformed and raw values).", icon="ℹ️")
+        return None
+
+    st.write("""Compute the total score of the molecules again from the transformed scores of the components, 
+                with new weights and aggregation (as REINVENT does), without rerunning REINVENT.""")
+    aggregation = st.selectbox("Aggregation", AGGREGATIONS, index=AGGREGATIONS.index("geometric"), key=f"{key}_aggregation", 
+                               format_func=lambda name: f"{name}_mean", help="Weighted mean of the transformed scores.")
+    cols = st.columns(min(3, len(components)))
+    weights = {comp: cols[i % len(cols)].number_input(comp, value=1.0, min_value=0.0, step=0.1, key=f"{key}_weight_{comp}") 
+               for i, comp in enumerate(components)}
+    if sum(weights.values()) <= 0:
+        st.warning("At least one scoring component needs a positive weight.", icon="⚠️")
+        return None
+
+    results = st.session_state.setdefault("summary_rescore", {})
+    # The upload is identified by its file_id (the script re-runs after every widget change), only hashed when re-scored
+    settings = (getattr(csv_file, "file_id", None) or csv_file.name, aggregation, tuple(weights.items()))
+    if st.button("Re-score Summary", help="Compute the new total scores of all rows of the results summary."):
+        output_file = os.path.join(cache_dir, f"rescored_{file_digest(csv_file)[:16]}.csv")
+        start = time.perf_counter()
+        with st.spinner("Re-scoring the results summary"):
+            try:
+                results[key] = (settings, rescore_summary(csv_file, weights, aggregation, output_file=output_file), 
+                                output_file, time.perf_counter() - start)
+            except ValueError as e:
+                st.error(f"The results summary could not be re-scored: {e}", icon="🚨")
+                results.pop(key, None)
+    if key not in results:
+        return None
+
+    settings_done, result, output_file, seconds = results[key]
+    if settings_done != settings:
+        st.info("The weights or the aggregation changed: re-score the summary to update the results.", icon="ℹ️")
+    rows = result["rows"]
+    st.write(f"**{rows}** rows re-scored in **{seconds:.1f} s**.")
+    col1, col2 = st.columns(2)
+    if "Score" in result["best"].columns:
+        col1.metric("Mean Score (REINVENT)", f"{result['sums']['Score'] / rows:.3f}" if rows else "-")
+    col2.metric("Mean Score (rescored)", f"{result['sums'][RESCORED_COLUMN] / rows:.3f}" if rows else "-")
+    edges = np.linspace(0.0, 1.0, SCORE_BINS + 1)
+    histograms = {col: counts for col, counts in result["histograms"].items() if counts.any()}
+    st.bar_chart(pd.DataFrame(histograms, index=np.round((edges[:-1] + edges[1:]) / 2, 3)), x_label="Score", y_label="Molecules", stack=False)
+    st.dataframe(result["best"], hide_index=True)
+    if os.path.exists(output_file):
+        with open(output_file, "rb") as f:
+            st.download_button("Download Re-scored Summary", data=f, file_name="results_summary_rescored.csv", mime="text/csv", 
+                               help="The results summary with the additional column of the new total score.")
@@ -0,0 +1,744 @@
+########################################
+############ Python Modules ############
+########################################
+import contextvars
+from collections.abc import Mapping
+from contextlib import contextmanager
+from functools import wraps
+from data import *
+
+
+##############################################################################################
+# REINVENT4 input files (TOML input file, bash run script) generated from the widget values
+# of the REINVENT UI (widget key: value, e.g. st.session_state or the values of a UI state).
+#
+# Plain functions without Streamlit: the UI pages call them with their session state and the
+# headless engine (engine.py) with the values of a UI state. Widget values that are missing are
+# replaced by the default value of the widget. Values that do not come from a widget (names of
+# uploaded files, SMILES read from an uploaded file, rows selected in a table) are passed as
+# uploads: a dictionary with the key of the widget whose value they replace.
+##############################################################################################
+# Default SMARTS patterns of the CustomAlerts scoring component (separated by 2 commas)
+CUSTOM_ALERTS_SMARTS = "[*;r8],,[*;r9],,[*;r10],,[*;r11],,[*;r12],,[*;r13],,[*;r14],,[*;r15],,[*;r16],,[*;r17],,[#8][#8],,[#6;+],,[#16][#16],,[#7;!n][S;!$(S(=O)=O)],,[#7;!n][#7;!n],,C#C,,C(=[O,S])[O,S],,[#7;!n][C;!$(C(=[O,N])[N,O])][#16;!s],,[#7;!n][C;!$(C(=[O,N])[N,O])][#7;!n],,[#7;!n][C;!$(C(=[O,N])[N,O])][#8;!o],,[#8;!o][C;!$(C(=[O,N])[N,O])][#16;!s],,[#8;!o][C;!$(C(=[O,N])[N,O])][#8;!o],,[#16;!s][C;!$(C(=[O,N])[N,O])][#16;!s]"
+
+# Default SMILES of the similarity scoring components (TanimotoSimilarity, MMP)
+REFERENCE_SMILES = "CC(=O)OC1=CC=CC=C1C(=O)O,,CC(=O)OC1=CC=CC=C1C(=O)O"
+
+# Default prior models of the molecule generators
+PRIOR_MODELS = {"Reinvent": "reinvent.prior", "LibInvent": "libinvent.prior", "LinkInvent": "linkinvent.prior"}
+
+
+#########################################
+########### Section Memoization #########
+#########################################
+# Cache of the TOML sections of the current session (see section_cache), None outside of section_cache
+_section_cache = contextvars.ContextVar("section_cache", default=None)
+_MISSING = object()     # Value of a key that is not in the widget values
+_KEYS = object()        # Marker of a section that reads the keys (or the number of keys) of the widget values
+
+
+class RecordingMapping(Mapping):
+    """
+    Read-only view of the widget values (or uploads) that records the keys a TOML section reads.
+
+    Args:
+        mapping (Mapping): The widget values or the uploads.
+    """
+    def __init__(self, mapping):
+        self.mapping = mapping
+        self.keys_read = {}     # keys in order of the first read
+
+    def __getitem__(self, key):
+        self.keys_read[key] = None
+        return self.mapping[key]
+
+    def __iter__(self):
+        self.keys_read[_KEYS] = None
+        return iter(self.mapping)
+
+    def __len__(self):
+        self.keys_read[_KEYS] = None
+        return len(self.mapping)
+
+
+def _read_values(mapping, keys):
+    """
+    Return the values of the keys a section read from the widget values (or uploads) and their types 
+    (True and 1 give different TOML lines).
+    """
+    values = [list(mapping) if key is _KEYS else mapping.get(key, _MISSING) for key in keys]
+    return values, list(map(type, values))
+
+
+def toml_section(func):
+    """
+    Memoize a TOML section (a pure function of the widget values) in the cache of section_cache.
+    The cache entry of a section (name and arguments other than the widget values and uploads) 
+    stores the keys the section read and their values: the section text is reused as long as 
+    these values did not change, otherwise the section is generated again (and the keys recorded).
+    Nested sections are recorded in the keys of the outer section.
+    """
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        cache = _section_cache.get()
+        if cache is None:
+            return func(*args, **kwargs)
+        # Widget values and uploads (Mapping arguments) are recorded, the other arguments are the key of the section
+        arguments = {**dict(enumerate(args)), **kwargs}
+        mappings = {name: arg for name, arg in arguments.items() if isinstance(arg, Mapping)}
+        key = (func.__name__,) + tuple((name, Mapping if name in mappings else arg) for name, arg in arguments.items())
+        cached = cache.get(key)
+        if (cached is not None) and all(_read_values(mappings[name], keys) == read for name, (keys, read) in cached[0].items()):
+            return cached[1]
+
+        arguments.update({name: RecordingMapping(mapping) for name, mapping in mappings.items()})
+        text = func(*[arguments[i] for i in range(len(args))], **{name: arguments[name] for name in kwargs})
+        reads = {}
+        for name, mapping in mappings.items():
+            keys = tuple(arguments[name].keys_read)
+            values, types = _read_values(mapping, keys)
+            # Lists are copied, so later changes of a list are detected
+            reads[name] = (keys, ([value.copy() if type(value) is list else value for value in values], types))
+        cache[key] = (reads, text)
+        return text
+    return wrapper
+
+
+@contextmanager
+def section_cache(cache):
+    """
+    Memoize the TOML sections (see toml_section) generated inside the block in a cache, 
+    e.g. the cache of a UI session (see functions.toml_sections).
+
+    Args:
+        cache (dict): The cache of the sections (None: the sections are not memoized).
+    """
+    token = _section_cache.set(cache)
+    try:
+        yield cache
+    finally:
+        _section_cache.reset(token)
+
+
+#########################################
+############ Helper Functions ###########
+#########################################
+def smiles_file_name(values, key, default, uploads):
+    """
+    Name of a SMILES file in the TOML input file: the name of the uploaded file,
+    otherwise the name entered in the text input with the .smi extension.
+
+    Args:
+        values (dict): The widget values.
+        key (str): The key of the text input with the name of the SMILES file.
+        default (str): The default name of the text input.
+        uploads (dict): The values of the uploaded files.
+
+    Returns:
+        str: The name of the SMILES file.
+    """
+    if key in uploads:
+        return uploads[key]
+    return values.get(key, default) + ".smi"
+
+
+def smarts_list(values, key, default, selected):
+    """
+    List of SMARTS patterns of a scoring component: the patterns entered in the text input
+    (separated by 2 commas) and the patterns selected in the table of SMARTS patterns.
+
+    Args:
+        values (dict): The widget values.
+        key (str): The key of the text input with the SMARTS patterns.
+        default (str): The default SMARTS patterns of the text input.
+        selected (list): The SMARTS patterns selected in the table (may be empty).
+
+    Returns:
+        str or list: The SMARTS patterns (a list if patterns were selected, otherwise its string representation).
+    """
+    smarts_text = values.get(key, default)
+    if selected:
+        return smarts_text.split(',,') + list(selected) if smarts_text != '' else list(selected)
+    return f"{[f'{smart}' for smart in smarts_text.split(',,')]}"
+
+
+def input_file_name(values):
+    """
+    Name of the TOML input file of the selected run mode (without extension).
+
+    Args:
+        values (dict): The widget values.
+
+    Returns:
+        str: The name of the TOML input file.
+    """
+    prefix = run_mode_prefix[values.get("run_mode", "Reinforcement Learning (RL)")]
+    return values.get(f"{prefix}_toml_file", f"{prefix}_input")
+
+
+#########################################
+########### Scoring Components ##########
+#########################################
+def component_header(component, stages=False):
+    """
+    Headers of a scoring component in the TOML input file.
+
+    Args:
+        component (str): The name of the scoring component.
+        stages (bool, optional): Whether the scoring component is for stages. Defaults to False.
+
+    Returns:
+        str: The headers.
+    """
+    table = "stage.scoring.component" if stages else "scoring.component"
+    return (f'# {component}: {scoring_component_entries[component]}\n'
+            f'[[{table}]]\n'
+            f'[{table}.{scoring_keys[component]}]\n'
+            f'[[{table}.{scoring_keys[component]}.endpoint]]\n')
+
+
+def transformer_toml(values, key, comp, low_value=0.0, high_value=10.0, default=None, advanced=False):
+    """
+    Transformer parameters of a scoring component.
+
+    Args:
+        values (dict): The widget values.
+        key (str): The key of the scoring component (e.g., "RL_SlogP_1").
+        comp (str): The name of the scoring component.
+        low_value (float, optional): The default lower threshold. Defaults to 0.
+        high_value (float, optional): The default upper threshold. Defaults to 10.
+        default (str, optional): The default transformer type. Defaults to None.
+        advanced (bool, optional): Whether the advanced parameters are set by the user. Defaults to False.
+
+    Returns:
+        str: The transformer parameters.
+    """
+    low_value = float(low_value) if low_value != None else low_value      # Convert to float if not None
+    high_value = float(high_value) if high_value != None else high_value  # Convert to float if not None
+    if not values.get(f"{key}_use_trans", True):
+        return '\n'
+
+    trans_type = values.get(f"{key}_trans_type", default)
+    if trans_type in ["Sigmoid", "Reverse_Sigmoid"]:
+        k_factor = values.get(f"{key}_trans_k", 0.5) if advanced else 0.5
+        return (f'transform.type = "{trans_type}"\n'
+                f'transform.low = {values.get(f"{key}_trans_lower", low_value)}\n'
+                f'transform.high = {values.get(f"{key}_trans_upper", high_value)}\n'
+                f'transform.k = {k_factor:.2f}\n\n')
+    elif trans_type == "Double_Sigmoid":
+        coef_div = values.get(f"{key}_trans_div", 100.0) if advanced else 100.0
+        coef_si = values.get(f"{key}_trans_si", 10.0) if advanced else 10.0
+        coef_se = values.get(f"{key}_trans_se", 10.0) if advanced else 10.0
+        return (f'transform.type = "{trans_type}"\n'
+                f'transform.low = {values.get(f"{key}_trans_lower", low_value)}\n'
+                f'transform.high = {values.get(f"{key}_trans_upper", high_value)}\n'
+                f'transform.coef_div = {coef_div:.2f}\n'
+                f'transform.coef_si = {coef_si:.2f}\n'
+                f'transform.coef_se = {coef_se:.2f}\n\n')
+    elif trans_type == "Step":
+        return (f'transform.type = "{trans_type}"\n'
+                f'transform.high = {values.get(f"{key}_trans_upper", high_value)}\n'
+                f'transform.low = {values.get(f"{key}_trans_lower", low_value)}\n\n')
+    elif trans_type == "Left_Step":
+        return (f'transform.type = "{trans_type}"\n'
+                f'transform.low = {values.get(f"{key}_trans_lower", low_value)}\n\n')
+    elif trans_type == "Right_Step":
+        return (f'transform.type = "{trans_type}"\n'
+                f'transform.high = {values.get(f"{key}_trans_upper", high_value)}\n\n')
+    elif trans_type == "Value_Mapping":
+        return ('transform.type = "value_mapping"\n'
+                f'[scoring.component.{comp}.endpoint.transform.mapping]\n'
+                f'{comp} = {values.get(f"{key}_trans_{comp}_threshold", high_value)}\n'
+                f'"No {comp}" = {values.get(f"{key}_trans_No_{comp}_threshold", low_value)}\n\n')
+    return ''
+
+
+@toml_section
+def component_toml(values, key, comp, i, stages=False, modus="Basic", uploads=None):
+    """
+    Parameters of the i-th scoring component.
+
+    Args:
+        values (dict): The widget values.
+        key (str): The key of the scoring function (e.g., "RL" or "SL-S1").
+        comp (str): The name of the scoring component.
+        i (int): The position of the scoring component (starting at 1).
+        stages (bool, optional): Whether the scoring component is for stages. Defaults to False.
+        modus (str, optional): The mode of the UI, either "Advanced" or "Basic". Defaults to "Basic".
+        uploads (dict, optional): The values of uploaded files and selected table rows. Defaults to None.
+
+    Returns:
+        str: The parameters of the scoring component.
+    """
+    uploads = uploads or {}
+    advanced = modus == "Advanced"
+    comp_key = f"{key}_{comp}"
+    text = component_header(comp, stages=stages)
+    text += f'name = "{values.get(f"{comp_key}_name_{i}", "ScoringComponent")}"\n'
+    text += f'weight = {float(values.get(f"{comp_key}_weight_{i}", 1.0)):.2f}\n'
+    transformer = True
+
+    ## Parameters of the scoring components
+    if comp == "PMI":
+        text += f'params.property = "{values.get(f"{comp_key}_prop_{i}", "npr1")}"\n'
+    elif comp == "CustomAlerts":
+        smarts_pattern = smarts_list(values, f"{comp_key}_smarts_{i}", CUSTOM_ALERTS_SMARTS, uploads.get(f"{comp_key}_smarts_table_{i}"))
+        text += f'params.smarts = {smarts_pattern}\n\n'
+        transformer = False
+    elif comp == "GroupCount":
+        text += f'params.smarts = "{values.get(f"{comp_key}_smarts_{i}", "[CX3]=[OX1]")}"\n'
+    elif comp == "MatchingSubstructure":
+        text += f'params.smarts = "{values.get(f"{comp_key}_smarts_{i}", "[CX3]=[OX1]")}"\n'
+        text += f'params.use_chirality = {values.get(f"{comp_key}_chirality_{i}", "false")}\n\n'
+        transformer = False
+    elif comp in ["TanimotoSimilarity", "MMP"]:
+        smiles_key = f"{comp_key}_smiles_{i}"
+        if values.get(f"{comp_key}_upload_{i}", False) and (smiles_key in uploads):
+            smiles_list = uploads[smiles_key]
+        else:
+            smiles_list = values.get(smiles_key, REFERENCE_SMILES).split(',,')
+        if comp == "TanimotoSimilarity":
+            text += f'params.smiles = {smiles_list}\n'
+            text += f'params.radius = {values.get(f"{comp_key}_radius_{i}", 1)}\n'
+            text += f'params.use_counts = {values.get(f"{comp_key}_counts_{i}", "true")}\n'
+            text += f'params.use_features = {values.get(f"{comp_key}_features_{i}", "true")}\n\n'
+            transformer = False
+        else:
+            text += f'params.reference_smiles = {smiles_list}\n'
+            text += f'params.num_of_cuts = {values.get(f"{comp_key}_num_of_cuts_{i}", 1)}\n'
+            text += f'params.max_variable_heavies = {values.get(f"{comp_key}_max_variable_heavies_{i}", 40)}\n'
+            text += f'params.max_variable_ratio = {values.get(f"{comp_key}_max_variable_ratio_{i}", 0.33)}\n'
+    elif comp == "ROCSSimilarity":
+        text += f'params.color_weight = {values.get(f"{comp_key}_color_weight_{i}", 0.5):.2f}\n'
+        text += f'params.shape_weight = {values.get(f"{comp_key}_shape_weight_{i}", 0.5):.2f}\n'
+        if advanced:
+            text += f'params.custom_cff = {values.get(f"{comp_key}_custom_cff_{i}", "path/to/ROCs/forcefield")}\n'
+        text += f'params.similarity_measure = "{values.get(f"{comp_key}_similarity_measure_{i}", "Tanimoto")}"\n'
+        text += f'params.max_stereocenters = {values.get(f"{comp_key}_max_stereocenters_{i}", 4)}\n'
+        text += f'params.ewindow = {values.get(f"{comp_key}_ewindow_{i}", 10)}\n'
+        text += f'params.maxconfs = {values.get(f"{comp_key}_maxconfs_{i}", 200)}\n'
+        rocs_key = f"{comp_key}_rocs_input_{i}"
+        text += f'params.rocs_input = "{uploads.get(rocs_key, values.get(rocs_key, "YOUR_ROCS_QUERY.sdf"))}"\n'
+    elif comp == "DockStream":
+        config_key = f"{comp_key}_config_path_{i}"
+        text += f'params.configuration_path = "{uploads.get(config_key, values.get(config_key, "./dockstream_config.json"))}"\n'
+        text += f'params.docker_script_path = "{values.get(f"{comp_key}_docker_path_{i}", "/apps/miniforge3/envs/DockerStream/docker.py")}"\n'
+        text += f'params.docker_python_path = "{values.get(f"{comp_key}_python_path_{i}", "/apps/anaconda/anaconda3/bin/python")}"\n'
+    elif comp == "AutoQSAR":
+        model_key = f"{comp_key}_model_name_{i}"
+        text += f'params.autoqsar_exec = "{values.get(f"{comp_key}_autoqsar_path_{i}", "/apps/schrodinger/advsuite2024-1/utilities/autoqsar")}"\n'
+        text += f'params.model_file = "{uploads.get(model_key, values.get(model_key, "autoqsar_model.qzip"))}"\n'
+        text += f'params.cache_dir = "{values.get(f"{comp_key}_cache_dir_{i}", "./")}"\n'
+        text += f'params.pred_col = "{values.get(f"{comp_key}_pred_col_{i}", "r_autoqsar_Pred_Y")}"\n'
+    elif comp == "DeepQSAR":
+        model_key = f"{comp_key}_model_name_{i}"
+        text += f'params.deepautoqsar_exec = "{values.get(f"{comp_key}_deepautoqsar_path_{i}", "/apps/schrodinger/advsuite2024-1/run")}"\n'
+        text += f'params.model_file = "{uploads.get(model_key, values.get(model_key, "deepqsar_model.qzip"))}"\n'
+        text += f'params.cache_dir = "{values.get(f"{comp_key}_cache_dir_{i}", "./")}"\n'
+    elif comp == "pADME":
+        padme_model = values.get(f"{comp_key}_padme_model_{i}", PADME_models[0])
+        text += f'params.property_name = "{padme_model}"\n'
+    elif comp == "ReactionFilter":
+        smarts_pattern = smarts_list(values, f"{comp_key}_reaction_smarts_{i}", "[F, Cl]", uploads.get(f"{comp_key}_smarts_table_{i}"))
+        text += f'params.type = "{values.get(f"{comp_key}_filter_type_{i}", "IdenticalMurckoScaffold")}"\n'
+        text += f'params.reaction_smarts = "{smarts_pattern}"\n\n'
+        transformer = False
+
+    ## Transformer of the scoring component
+    if transformer:
+        defaults = transformers_def_param[comp][padme_model] if comp == "pADME" else transformers_def_param[comp]
+        text += transformer_toml(values, f"{comp_key}_{i}", comp, low_value=defaults["low_value"], high_value=defaults["high_value"],
+                                 default=defaults["default_transformer"], advanced=advanced)
+    return text
+
+
+@toml_section
+def scoring_toml(values, key, stages=False, num_stage=None, modus="Basic", uploads=None, gen_scoring_file=False):
+    """
+    Scoring function of a run (or of a stand-alone scoring file): aggregation and scoring components,
+    or the scoring file the scoring components are read from.
+
+    Args:
+        values (dict): The widget values.
+        key (str): The key of the scoring function (e.g., "RL" or "SL-S1").
+        stages (bool, optional): Whether the scoring function is for stages. Defaults to False.
+        num_stage (int, optional): The stage number. Defaults to None.
+        modus (str, optional): The mode of the UI, either "Advanced" or "Basic". Defaults to "Basic".
+        uploads (dict, optional): The values of uploaded files and selected table rows. Defaults to None.
+        gen_scoring_file (bool, optional): Whether to generate a stand-alone scoring file (components only). Defaults to False.
+
+    Returns:
+        str: The scoring function.
+    """
+    uploads = uploads or {}
+    text = ''
+    if not gen_scoring_file:
+        scoring_weight = values.get(f"{key}_weight", "geometric")
+        run_parallel = values.get(f"{key}_parallel", "true") if modus == "Advanced" else "false"
+        table = "stage.scoring" if stages else "scoring"
+        if stages:
+            title = 'Scoring Components' if (num_stage == None) and not values.get(f"{key}_scoring_file", False) else f'Scoring Components (S{num_stage})'
+        else:
+            title = 'Scoring Components Parameters'
+        text += f'# {title}\n[{table}]\ntype = "{scoring_weight}_mean"\nparallel = {run_parallel}\n'
+
+        # Scoring components read from a stand-alone scoring file
+        if values.get(f"{key}_scoring_file", False):
+            filetype = values.get(f"{key}_scoring_filetype", "json")
+            filename = uploads.get(f"{key}_scoring_filename", values.get(f"{key}_scoring_filename", "scoring_file"))
+            return text + f'filename = "{filename}.{filetype}"\nfiletype = "{filetype}"\n\n'
+        text += '\n'
+
+    for i, comp in enumerate(values.get(f"{key}_scor_components", []), start=1):
+        text += component_toml(values, key, comp, i, stages=stages, modus=modus, uploads=uploads)
+    return text
+
+
+#########################################
+######## Run Mode Parameters ############
+#########################################
+@toml_section
+def general_options(values, prefix, run_type, modus, tb_logdir=None):
+    """
+    General options of a run (run type, GPU, TensorBoard logging directory and JSON file of the input).
+
+    Args:
+        values (dict): The widget values.
+        prefix (str): The prefix of the run mode (e.g., "RL").
+        run_type (str): The run type of REINVENT (e.g., "staged_learning").
+        modus (str): The mode of the UI, either "Advanced" or "Basic".
+        tb_logdir (str, optional): The default TensorBoard logging directory. Defaults to None (no logging directory).
+
+    Returns:
+        str: The general options.
+    """
+    use_cuda = values.get(f"{prefix}_use_cuda", "true") if modus == "Advanced" else "true"
+    text = f'# General {"Input" if prefix == "Scoring" else "Options"}\nrun_type = "{run_type}"\nuse_cuda = {use_cuda}\n'
+    if tb_logdir is not None:
+        text += f'tb_logdir = "{values.get(f"{prefix}_tb_dir", tb_logdir)}"\n'
+    return text + f'json_out_config = "{values.get(f"{prefix}_json_file", f"{prefix}_input")}.json"\n\n'
+
+
+def sample_strategy_toml(values, key):
+    """
+    Sampling strategy of the Mol2Mol generator.
+
+    Args:
+        values (dict): The widget values.
+        key (str): The key of the molecule generator (e.g., "RL_Mol2Mol").
+
+    Returns:
+        str: The sampling strategy.
+    """
+    sample_strategy = values.get(f"{key}_sample_strategy", "multinomial")
+    text = f'sample_strategy = "{sample_strategy}"\n'
+    if sample_strategy == "beamsearch":
+        return text + f'temperature = {values.get(f"{key}_temperature", 1.0)}\n\n'
+    return text + f'distance_threshold = {values.get(f"{key}_distance_threshold", 100)}\n\n'
+
+
+def model_file_name(values, key, model, uploads, ext_key="ext_model"):
+    """
+    Name of the model file of a molecule generator: the uploaded model (external model),
+    otherwise the prior model provided by REINVENT.
+
+    Args:
+        values (dict): The widget values.
+        key (str): The key of the molecule generator (e.g., "TL_Reinvent").
+        model (str): The name of the prior model (Mol2Mol models without .prior extension).
+        uploads (dict): The values of the uploaded files.
+        ext_key (str, optional): The key suffix of the toggle of the external model. Defaults to "ext_model".
+
+    Returns:
+        str: The name of the model file.
+    """
+    if values.get(f"{key}_{ext_key}", False):
+        return uploads.get(f"{key}_{ext_key}", model)
+    return model + ".prior" if key.endswith("Mol2Mol") else model
+
+
+def scoring_run_toml(values, modus="Basic", uploads=None):
+    """
+    TOML input file of the scoring run mode.
+    """
+    uploads = uploads or {}
+    text = "### REINVENT4 TOML input ###\n### Scoring Run Mode ###\n\n"
+    text += general_options(values, "Scoring", "scoring", modus)
+    text += '# Parameters for Calculation\n[parameters]\n'
+    text += f'smiles_file = "{smiles_file_name(values, "Scoring_smiles_file", "to_score", uploads)}"\n'
+    text += f'output_csv = "{values.get("Scoring_output_csv", "scored")}.csv"\n\n'
+    return text + scoring_toml(values, "Scoring", modus=modus, uploads=uploads)
+
+
+def sampling_toml(values, modus="Basic", uploads=None):
+    """
+    TOML input file of the sampling run mode.
+    """
+    uploads = uploads or {}
+    advanced = modus == "Advanced"
+    text = "### REINVENT4 TOML input ###\n### Sampling Run Mode ###\n\n"
+    text += general_options(values, "Sampling", "sampling", modus)
+    text += '[parameters]\n# Generic Parameters\n'
+    text += f'output_file = "{values.get("Sampling_output_csv", "sampling")}.csv"\n'
+    text += f'num_smiles = {values.get("Sampling_num_smiles", 100)}\n'
+    text += f'unique_molecules = {values.get("Sampling_unique_molecules", "true") if advanced else "true"}\n'
+    text += f'randomize_smiles = {values.get("Sampling_randomize_smiles", "true") if advanced else "true"}\n\n'
+
+    mol_gen = values.get("Sampling_mol_gen", "Reinvent")
+    key = f"Sampling_{mol_gen}"
+    model = values.get(f"{key}_model_type", "mol2mol_similarity") if mol_gen == "Mol2Mol" else PRIOR_MODELS[mol_gen]
+    text += f'# {mol_gen} Generator Parameters\n'
+    text += f'model_file = "{model_file_name(values, key, model, uploads)}"\n'
+    if mol_gen != "Reinvent":
+        default = {"LibInvent": "scaffold", "LinkInvent": "warhead", "Mol2Mol": "input_molecules"}[mol_gen]
+        text += f'smiles_file = "{smiles_file_name(values, f"{key}_smi_file", default, uploads)}"\n'
+        if mol_gen == "Mol2Mol":
+            text += sample_strategy_toml(values, key)
+    return text
+
+
+def transfer_learning_toml(values, modus="Basic", uploads=None):
+    """
+    TOML input file of the transfer learning (TL) run mode.
+    """
+    uploads = uploads or {}
+    text = "### REINVENT4 TOML input ###\n### Transfer Learning (TL) Run Mode ###\n\n"
+    text += general_options(values, "TL", "transfer_learning", modus, tb_logdir="TensoBoard_TL")
+    text += '[parameters]\n# TL Parameters\n'
+    text += f'num_epochs = {int(values.get("TL_num_epochs", 10))}\n'
+    text += f'save_every_n_epochs = {int(values.get("TL_save_epochs", 5))}\n'
+    text += f'batch_size = {int(values.get("TL_batch_size", 128))}\n'
+    text += f'num_refs = {int(values.get("TL_num_refs", 50))}\n'
+    text += f'sample_batch_size = {int(values.get("TL_sample_batch_size", 100))}\n\n'
+
+    mol_gen = values.get("TL_mol_gen", "Reinvent")
+    key = f"TL_{mol_gen}"
+    model = values.get(f"{key}_model_type", "mol2mol_similarity") if mol_gen == "Mol2Mol" else PRIOR_MODELS[mol_gen]
+    text += f'# {mol_gen} molecule generator\n'
+    text += f'input_model_file = "{model_file_name(values, key, model, uploads)}"\n'
+    text += f'smiles_file = "{smiles_file_name(values, f"{key}_smi_file", "input_molecules", uploads)}"\n'
+    text += f'output_model_file = "{values.get(f"{key}_output_model", f"TL_{mol_gen}")}.model"\n'
+    text += f'validation_smiles_file = "{smiles_file_name(values, f"{key}_validation_smiles", "validation_molecules", uploads)}"\n\n'
+    if mol_gen == "Mol2Mol":
+        text += '# Type of similarity and its parameters\n'
+        text += f'pairs.type = "{values.get(f"{key}_pairs_type", "Tanimoto")}"\n'
+        text += f'pairs.upper_threshold = {values.get(f"{key}_pairs_upper", 1.0)}\n'
+        text += f'pairs.lower_threshold = {values.get(f"{key}_pairs_lower", 0.7)}\n'
+        text += f'pairs.min_cardinality = {int(values.get(f"{key}_pairs_min", 1.0))}\n'
+        text += f'pairs.max_cardinality = {int(values.get(f"{key}_pairs_max", 199.0))}\n\n'
+    return text
+
+
+@toml_section
+def diversity_filter_toml(values, key, global_DF=True, num_stage=None):
+    """
+    Parameters of a diversity filter (global or of a stage).
+
+    Args:
+        values (dict): The widget values.
+        key (str): The key of the diversity filter (e.g., "SL_div_filter" or "SL_S1_div_filter").
+        global_DF (bool, optional): Whether the filter is global. Defaults to True.
+        num_stage (int, optional): The stage number. Defaults to None.
+
+    Returns:
+        str: The parameters of the diversity filter.
+    """
+    div_type = values.get(f"{key}_type", "IdenticalMurckoScaffold")
+    if global_DF:
+        text = '# Diversity Filter Parameters\n[diversity_filter]\n'
+    else:
+        text = f'# Diversity Filter Parameters (S{num_stage})\n[stage.diversity_filter]\n'
+    text += f'type = "{div_type}"\n'
+    text += f'bucket_size = {int(values.get(f"{key}_bucket", 25))}\n'
+    text += f'minscore = {float(values.get(f"{key}_minscore", 0.4))}\n'
+    if div_type == "ScaffoldSimilarity":
+        text += f'minsimilarity = {float(values.get(f"{key}_minsimilarity", 0.4))}\n'
+    elif div_type == "PenalizeSameSmiles":
+        penalty_key = f"{key}_penalty" if global_DF else f"{key}_penalty_multiplier"
+        text += f'penalty_multiplier = {float(values.get(penalty_key, 0.5))}\n'
+    return text + '\n'
+
+
+@toml_section
+def stage_toml(values, key, name_chk, num_stage=None):
+    """
+    Parameters of a stage (checkpoint file and termination criterion).
+
+    Args:
+        values (dict): The widget values.
+        key (str): The key of the stage (e.g., "RL" or "SL_S1").
+        name_chk (str): The default name of the generated model.
+        num_stage (int, optional): The stage number. Defaults to None.
+
+    Returns:
+        str: The parameters of the stage.
+    """
+    text = '# Stage Parameters\n' if num_stage == None else f'# Stage Parameters (S{num_stage})\n'
+    text += '[[stage]]\n'
+    text += f'chkpt_file = "{values.get(f"{key}_chk", name_chk)}.chkpt"\n'
+    text += f'termination = "{values.get(f"{key}_termination", "simple")}"\n'
+    text += f'max_score = {values.get(f"{key}_max_score", 0.6):.2f}\n'
+    text += f'min_steps = {values.get(f"{key}_min_steps", 10)}\n'
+    text += f'max_steps = {values.get(f"{key}_max_steps", 100)}\n\n'
+    return text
+
+
+def staged_learning_toml(values, prefix, modus="Basic", uploads=None):
+    """
+    TOML input file of the reinforcement learning (RL) and staged learning (SL) run modes.
+
+    Args:
+        values (dict): The widget values.
+        prefix (str): The prefix of the run mode ("RL" or "SL").
+        modus (str, optional): The mode of the UI, either "Advanced" or "Basic". Defaults to "Basic".
+        uploads (dict, optional): The values of uploaded files and selected table rows. Defaults to None.
+
+    Returns:
+        str: The TOML input file.
+    """
+    uploads = uploads or {}
+    advanced = modus == "Advanced"
+    title = {"RL": "Reinforcement Learning (RL)", "SL": "Staged Learning (SL)"}[prefix]
+    text = f"### REINVENT4 TOML input ###\n### {title} Run Mode ###\n\n"
+    text += general_options(values, prefix, "staged_learning", modus, tb_logdir=f"TensorBoard_{prefix}")
+    text += f'[parameters]\n# {prefix} Parameters\n'
+    text += f'summary_csv_prefix = "{values.get(f"{prefix}_summary_csv", f"summary_{prefix}")}"\n'
+    text += f'use_checkpoint = {values.get(f"{prefix}_use_checkpoint", "false")}\n'
+    text += f'batch_size = {int(values.get(f"{prefix}_batch_size", 128))}\n'
+    text += f'unique_sequences = {values.get(f"{prefix}_unique_sequences", "true") if advanced else "true"}\n'
+    text += f'randomize_smiles = {values.get(f"{prefix}_randomize_smiles", "true") if advanced else "true"}\n\n'
+
+    # Molecule generator
+    mol_gen = values.get(f"{prefix}_mol_gen", "Reinvent")
+    key = f"{prefix}_{mol_gen}"
+    model = values.get(f"{key}_model_type", "mol2mol_similarity") if mol_gen == "Mol2Mol" else PRIOR_MODELS[mol_gen]
+    text += f'# {mol_gen} Molecule Generator\n'
+    text += f'prior_file = "{model_file_name(values, key, model, uploads, ext_key="prior_model")}"\n'
+    text += f'agent_file = "{model_file_name(values, key, model, uploads, ext_key="agent_model")}"\n'
+    if mol_gen == "Reinvent":
+        text += '\n'
+        if values.get(f"{key}_inception", False):
+            text += '# Inception Parameters: guide RL in the initial phase\n[inception]\n'
+            text += f'smiles_file = "{smiles_file_name(values, f"{key}_smi_file", "inception_molecules", uploads)}"\n'
+            text += f'memory_size = {int(values.get(f"{key}_memory_size", 100))}\n'
+            text += f'sample_size = {int(values.get(f"{key}_sample_size", 10))}\n\n'
+    else:
+        default = {"LibInvent": "scaffolds", "LinkInvent": "warheads", "Mol2Mol": "input_molecules"}[mol_gen]
+        text += f'smiles_file = "{smiles_file_name(values, f"{key}_smi_file", default, uploads)}"\n'
+        text += sample_strategy_toml(values, key) if mol_gen == "Mol2Mol" else '\n'
+
+    # Learning strategy
+    text += '# Learning Strategy Parameters\n[learning_strategy]\n'
+    text += f'type = "{values.get(f"{prefix}_ls_type", "dap")}"\n'
+    text += f'sigma = {int(values.get(f"{prefix}_sigma", 128))}\n'
+    text += f'rate = {float(values.get(f"{prefix}_lr", 0.0001))}\n\n'
+
+    # Global diversity filter
+    if values.get(f"{prefix}_div_filter", False):
+        text += diversity_filter_toml(values, f"{prefix}_div_filter", global_DF=True)
+
+    # Stages with their diversity filter and scoring function
+    if prefix == "RL":
+        text += stage_toml(values, prefix, "RL_calc")
+        text += scoring_toml(values, prefix, modus=modus, uploads=uploads)
+    else:
+        for i in range(1, values.get("SL_num_stages", 2) + 1):
+            text += stage_toml(values, f"SL_S{i}", f"SL_calc_S{i}", num_stage=i)
+            if values.get(f"SL_S{i}_div_filter", False):
+                text += diversity_filter_toml(values, f"SL_S{i}_div_filter", global_DF=False, num_stage=i)
+            text += scoring_toml(values, f"SL-S{i}", stages=True, num_stage=i, modus=modus, uploads=uploads)
+    return text
+
+
+#########################################
+############## Input Files ##############
+#########################################
+def input_toml(values, uploads=None):
+    """
+    TOML input file of the run mode selected in the widget values.
+
+    Args:
+        values (dict): The widget values (key: value), e.g. st.session_state or the values of a UI state.
+        uploads (dict, optional): The values of uploaded files and selected table rows (key of the widget they replace: value),
+                                  e.g. the name of an uploaded SMILES file. Defaults to None.
+
+    Returns:
+        str: The TOML input file.
+    """
+    modus = values.get("modus", "Basic")
+    prefix = run_mode_prefix[values.get("run_mode", "Reinforcement Learning (RL)")]
+    if prefix == "Scoring":
+        return scoring_run_toml(values, modus=modus, uploads=uploads)
+    elif prefix == "Sampling":
+        return sampling_toml(values, modus=modus, uploads=uploads)
+    elif prefix == "TL":
+        return transfer_learning_toml(values, modus=modus, uploads=uploads)
+    return staged_learning_toml(values, prefix, modus=modus, uploads=uploads)
+
+
+def bash_script_text(values, key, num_shards=None):
+    """
+    Bash script running the calculation, optionally on an HPC cluster (SLURM).
+    For sharded calculations, the script runs one input file per shard (as SLURM job array on a cluster).
+
+    Args:
+        values (dict): The widget values.
+        key (str): The run mode (or its prefix) of the script.
+        num_shards (int, optional): The number of shards (see functions.scoring_shards). Defaults to None (no shards).
+
+    Returns:
+        str: The bash script, or None if the script is not enabled.
+    """
+    if not values.get(f"{key}_bash_script", False):
+        return None
+    inputfile_name = values.get(f"{key}_inputfile_name", f"{key}_input")
+    logfile_name = values.get(f"{key}_logfile_name", "logfile")
+    cluster_calc = values.get(f"{key}_cluster_calc", False)
+
+    if cluster_calc:
+        text = ("#!/bin/bash\n"
+                f'#SBATCH --job-name={values.get(f"{key}_job_name", "reinvent")}\n'
+                f'#SBATCH --partition={values.get(f"{key}_partition_name", "cdd_gpuq")}\n'
+                f'#SBATCH --nodes={values.get(f"{key}_num_nodes", 1)}\n'
+                f'#SBATCH --gpus-per-node={values.get(f"{key}_gpus_per_node", 1)}\n'
+                f'#SBATCH --time={values.get(f"{key}_time", "00-12:00:00")}\n')
+        if num_shards:
+            text += f"#SBATCH --array=1-{num_shards}\n"
+        text += "\n"
+    else:
+        text = "#!/bin/bash\n\n"
+
+    text += "# activate the conda environment where the reinvent4 package is installed\n"
+    text += f'conda activate {values.get(f"{key}_conda_env", "reinvent4")}\n\n'
+    if num_shards and cluster_calc:
+        width = shard_width(num_shards)
+        text += "# run the reinvent calculation of the shard of this array task\n"
+        text += f'SHARD=$(printf "%0{width}d" "$SLURM_ARRAY_TASK_ID")\n'
+        text += f"reinvent -l {logfile_name}_shard_$SHARD.log {inputfile_name}_shard_$SHARD.toml\n\n"
+        text += "# merge the shard results once all array tasks are done:\n"
+        text += f"# sbatch --dependency=afterok:<array job id> {SHARD_MERGE_SCRIPT}"
+    elif num_shards:
+        width = shard_width(num_shards)
+        text += "# run the reinvent calculations of all shards\n"
+        text += f'for SHARD in $(seq -f "%0{width}g" 1 {num_shards}); do\n'
+        text += f"    reinvent -l {logfile_name}_shard_$SHARD.log {inputfile_name}_shard_$SHARD.toml\n"
+        text += "done\n\n"
+        text += "# merge the shard results\n"
+        text += f"bash {SHARD_MERGE_SCRIPT}"
+    else:
+        text += "# run the reinvent calculation\n"
+        text += f"reinvent -l {logfile_name}.log {inputfile_name}.toml"
+    return text
+
+
+#########################################
+################ Shards #################
+#########################################
+SHARD_MERGE_SCRIPT = "merge_shards.sh"     # Script concatenating the output CSV files of the shards
+
+
+def shard_width(num_shards):
+    """
+    Number of digits of the shard indices in the file names (e.g., scored_shard_001.csv).
+    """
+    return max(3, len(str(num_shards)))
@@ -25,24 +25,22 @@ st.set_page_config(
             'About': "## REINVENT UI"}
 )
 
-### Create a unique sub-folder for each user in the temp_files folder 
+### Create a unique sub-folder (workspace) for each user in the temp_files folder 
 pwd = os.getcwd()                            # Path for Parent Working Directory (Dir: REINVENT Streamlit)
 BASE_DIR = os.path.join(pwd, "temp_files")   # Base directory for temporary files
-Path(BASE_DIR).mkdir(exist_ok=True)          # Create the base directory if it doesn't exist
-if "user_folder" not in st.session_state:
-    # Use the current time to create a unique identifier (formatted as User_YYYY-MM-DD-HH-MM-SS)
-    timestamp = datetime.now().strftime("%Y-%m-%d-%H-%M-%S")
-    user_folder = os.path.join(BASE_DIR, f"user_{timestamp}")
-    Path(user_folder).mkdir(exist_ok=True)
-    st.session_state.user_folder = user_folder
-else:
-    user_folder = st.session_state.user_folder
-
-### Clean temp_files sub-folders 
+user_folder = user_workspace(BASE_DIR)       # Unique user folder (formatted as user_YYYY-MM-DD-HH-MM-SS_<hex>)
+
+### Clean temp_files sub-folders (background thread)
 clean_temp_folder = True    # Whether to clean up folder (to save disk space) or not
 age_limit = 30              # Clean up folders that are older than a specific time frame (e.g., 30 day) 
+clean_interval = 3600       # Time between two clean ups in seconds (e.g., 1 hour)
+disk_quota = None           # Maximal size of all user folders in bytes, oldest folders are deleted first (None = no quota)
 if clean_temp_folder:
-    clean_folder(BASE_DIR, age_limit=age_limit)
+    start_janitor(BASE_DIR, interval=clean_interval, age_limit=age_limit, quota=disk_quota)
+    # In-memory scratch folders of the workspaces
+    scratch_root = get_workspace_manager(BASE_DIR).scratch_root
+    if scratch_root:
+        start_janitor(scratch_root, interval=clean_interval, age_limit=age_limit)
 
 ### To save the changes made in UI across a multi-page streamlit app 
 for key in st.session_state:
@@ -50,7 +48,7 @@ for key in st.session_state:
 
 ### Initialize the change_param_dict (to saves the UI state) for the different run modes
 if "change_param_dict" not in st.session_state:
-    st.session_state["change_param_dict"] = {state_dict_UI[run_mode][param]: True for run_mode in state_dict_UI.keys() for param in state_dict_UI[run_mode].keys()}
+    st.session_state["change_param_dict"] = init_change_param_dict()
 
 
 #########################
@@ -75,12 +73,12 @@ with st.sidebar:
     with load.popover("Load UI State"): 
         state = False
         state_dict = None
-        state_file = st.file_uploader("Upload UI State File", type=["json"], help="**JSON** file format is the only accepted format.")
+        state_file = st.file_uploader("Upload UI State File", type=["json", "gz"], help="**JSON** file format (optionally gzip compressed, .json.gz) is the only accepted format.")
         if state_file:
             state = True
             state_dict = load_state(state_file)
         else:
-            st.session_state["change_param_dict"] = {state_dict_UI[run_mode][param]: True for run_mode in state_dict_UI.keys() for param in state_dict_UI[run_mode].keys()}
+            st.session_state["change_param_dict"] = init_change_param_dict()
     ## User experience 
     modus = st.radio("Select Mode", ("Basic", "Advanced"), index=0, key="modus")
     modus = change_param(modus, st.session_state["change_param_dict"], state_dict, state, "modus")  # UI State
@@ -127,9 +125,10 @@ if run_mode == "Scoring":
                         sum or product, with user-defined weights determining the relative importance of each component.""")
 
     # Name of Toml input file 
-    toml_input = Path(st.session_state['user_folder']) / f"{toml_name}.toml"
-    if toml_input.exists():
-        toml_input.unlink() # Remove the file cross-platform
+    toml_input = Path(st.session_state['scratch_folder']) / f"{toml_name}.toml"
+
+    # Values of uploaded files used in the TOML input file (key of the widget they replace: value)
+    uploads = {}
 
     # Uploaded files 
     uploaded_files = {"TOML Input": toml_input, "Scoring SMILES": None}
@@ -137,47 +136,48 @@ if run_mode == "Scoring":
     # Needed files 
     needed_files = {"TOML Input": True, "Scoring SMILES": False}
 
-    # Titel 
-    write_show(f"\### REINVENT4 TOML input ###\n", toml_input, col2)
-    write_show(f"\### Scoring Run Mode ###\n", toml_input, col2, empty_line=True)
-
     # General options
     with col1.expander("**General Options**"):
-        write_show('\# General Input\n', toml_input, col2)
-        write_show('run_type = "scoring"\n', toml_input, col2)
         if modus == "Advanced":
             use_cuda = st.selectbox("Run on GPU?", ["true", "false"], index=0, key=f"{run_mode}_use_cuda")
             use_cuda = change_param(use_cuda, st.session_state["change_param_dict"], state_dict, state, f"{run_mode}_use_cuda")  # UI State
-            write_show(f'use_cuda = {use_cuda}\n', toml_input, col2)
-        else:
-            write_show(f'use_cuda = true\n', toml_input, col2)
         json_file = st.text_input("Name of the Json input file", value="Scoring_input", key=f"{run_mode}_json_file") 
         json_file = change_param(json_file, st.session_state["change_param_dict"], state_dict, state, f"{run_mode}_json_file")  # UI State
-        write_show(f'json_out_config = "{json_file}.json"\n', toml_input, col2, empty_line=True)
 
     # Run Mode Parameters
     with col1.expander("**Run Mode Parameters**"):
-        write_show('\# Parameters for Calculation\n', toml_input, col2)
-        write_show('[parameters]\n', toml_input, col2)
         smiles_name = st.text_input("Name of file with list of SMILES to score (.smi)", value="to_score", help="1 molecule per line", key=f"{run_mode}_smiles_file")
         smiles_name = change_param(smiles_name, st.session_state["change_param_dict"], state_dict, state, f"{run_mode}_smiles_file")  # UI State
         # Upload SMILES File 
         smi_path, smi_name = SMILES_file(run_mode, run_mode)
         if smi_path != None: 
             smiles_name = smi_name
+            uploads[f"{run_mode}_smiles_file"] = smiles_name
             uploaded_files["Scoring SMILES"] = smi_path
             needed_files["Scoring SMILES"] = True
         else:
             smiles_name += ".smi"
         output_csv = st.text_input(label="Name of output file (.csv)", value="scored", key=f"{run_mode}_output_csv")
         output_csv = change_param(output_csv, st.session_state["change_param_dict"], state_dict, state, f"{run_mode}_output_csv")  # UI State
-        write_show(f'smiles_file = "{smiles_name}"\n', toml_input, col2)
-        write_show(f'output_csv = "{output_csv}.csv"\n', toml_input, col2, empty_line=True)
+        # Shards: split the SMILES file into shards of balanced size (one TOML input file per shard, e.g. for a job array)
+        shards = st.toggle("Split into Shards", value=False, key=f"{run_mode}_shards", 
+                           help="Split the SMILES file into shards, each scored by its own TOML input file (e.g., as SLURM job array). A merge script concatenates the output files of the shards in order.")
+        shards = change_param(shards, st.session_state["change_param_dict"], state_dict, state, f"{run_mode}_shards")  # UI State
+        num_shards = None
+        if shards:
+            num_shards = st.number_input("Number of Shards", min_value=2, max_value=None, value=10, step=1, key=f"{run_mode}_num_shards")
+            num_shards = change_param(num_shards, st.session_state["change_param_dict"], state_dict, state, f"{run_mode}_num_shards")  # UI State
+            if smi_path == None:
+                st.warning("Upload the SMILES file to split it into shards.", icon="⚠️")
+                num_shards = None
+            elif count_lines(smi_path, max_lines=num_shards) < num_shards:
+                st.error(f"The SMILES file has less than {num_shards} lines (1 molecule per shard at least).", icon="🚨")
+                num_shards = None
     
     # Scoring Components
     with col1.expander("**Scoring Components Parameters**"):
-        scor_comp = scoring_components(toml_input, col2, state_dict, state, modus=modus, 
-                                       needed_files=needed_files, uploaded_files=uploaded_files, 
+        scor_comp = scoring_components(state_dict, state, modus=modus, 
+                                       needed_files=needed_files, uploaded_files=uploaded_files, uploads=uploads, 
                                        gen_scoring_file=False, key=run_mode)
         # Upload Scoring File 
         if scor_comp != None: 
@@ -190,7 +190,7 @@ if run_mode == "Scoring":
     # Additional options 
     with col1.expander("**Additional Options**"):
         # Bash File 
-        bash_name = bash_script(run_mode, state_dict, state)
+        bash_name = bash_script(run_mode, state_dict, state, num_shards=num_shards)
         if bash_name != None: 
             uploaded_files["Bash Run Script"] = bash_name
         else:
@@ -199,6 +199,20 @@ if run_mode == "Scoring":
             if bash_path.exists():
                 bash_path.unlink()  
 
+    # Write the TOML input file and show its preview 
+    toml_doc = TomlDocument(toml_input)
+    with section_cache(toml_sections()):
+        toml_doc.write(input_toml(st.session_state, uploads))
+    toml_doc.save()
+    toml_doc.show(col2)
+
+    # Shard files (SMILES and TOML input file of each shard, merge script) 
+    if num_shards:
+        shards_zip = scoring_shards(st.session_state, uploads, smi_path, num_shards, 
+                                    Path(st.session_state["user_folder"]) / f"{toml_name}_shards", toml_name)
+        col1.info(f"The SMILES file was split into **{num_shards}** shards (Shard Files).", icon="ℹ️")
+        uploaded_files["Shard Files"] = str(shards_zip)
+
     # Download Fles 
     col1.divider()
     col1.subheader("Download Files")
@@ -244,9 +258,10 @@ if run_mode == "Sampling":
                         instead of using "prior" or "agent," this mode simply uses "model_file".""")
 
     # Name of Toml input file 
-    toml_input = Path(st.session_state['user_folder']) / f"{toml_name}.toml"
-    if toml_input.exists():
-        toml_input.unlink() # Remove the file cross-platform
+    toml_input = Path(st.session_state['scratch_folder']) / f"{toml_name}.toml"
+
+    # Values of uploaded files used in the TOML input file (key of the widget they replace: value)
+    uploads = {}
 
     # Uploaded Files 
     uploaded_files = {"TOML Input": toml_input, "Model": None, "SMILES": None}
@@ -254,23 +269,13 @@ if run_mode == "Sampling":
     # Needed Files 
     needed_files = {"TOML Input": True, "Model": False}
 
-    # Titel 
-    write_show(f"\### REINVENT4 TOML input ###\n", toml_input, col2)
-    write_show(f"\### Sampling Run Mode ###\n", toml_input, col2, empty_line=True)
-
     # General Options
     with col1.expander("**General Options**"):
-        write_show('\# General Options\n', toml_input, col2)
-        write_show('run_type = "sampling"\n', toml_input, col2)
         if modus == "Advanced":
             use_cuda = st.selectbox("Run on GPU?", ["true", "false"], index=0, key=f"{run_mode}_use_cuda")
             use_cuda = change_param(use_cuda, st.session_state["change_param_dict"], state_dict, state, f"{run_mode}_use_cuda")  # UI State
-            write_show(f'use_cuda = {use_cuda}\n', toml_input, col2)
-        else:
-            write_show(f'use_cuda = true\n', toml_input, col2)
         json_file = st.text_input("Name of the Json input file", value="Sampling_input", key=f"{run_mode}_json_file")
         json_file = change_param(json_file, st.session_state["change_param_dict"], state_dict, state, f"{run_mode}_json_file")  # UI State
-        write_show(f'json_out_config = "{json_file}.json"\n', toml_input, col2, empty_line=True)
 
     # Generic Parameters
     with col1.expander("**Run Mode Parameters**"):
@@ -292,17 +297,10 @@ if run_mode == "Sampling":
         else:
             unique_molecules = "true"
             randomize_smiles = "true"
-        write_show('[parameters]\n', toml_input, col2)
-        write_show('\# Generic Parameters\n', toml_input, col2)
-        #write_show(f'tb_logdir = "{tb_logdir}"\n', toml_input, col2)
-        write_show(f'output_file = "{output_file}.csv"\n', toml_input, col2)
-        write_show(f'num_smiles = {num_smiles}\n', toml_input, col2)
-        write_show(f'unique_molecules = {unique_molecules}\n', toml_input, col2)
-        write_show(f'randomize_smiles = {randomize_smiles}\n', toml_input, col2, empty_line=True)
 
     # Molecule Generators
     with col1.expander("**Molecule Generator**"):
-        # mol_generator(toml_input, col2, state_dict, state, needed_files=needed_files, uploaded_files=uploaded_files, key=run_mode)
+        # mol_generator(toml_input, col2, state_dict, state, needed_files=needed_files, uploaded_files=uploaded_files, uploads=uploads, key=run_mode)
         mol_gen = st.selectbox("Type of Molecule Generator", ["Reinvent", "LibInvent", "LinkInvent", "Mol2Mol"], index=0, key=f"{run_mode}_mol_gen",
                             help="""The prior models provided by REINVENT are the default models, but other 
                                     models obtained by transfer learning (TL) or reinforcement learning (RL) could also be used.""")
@@ -319,6 +317,7 @@ if run_mode == "Sampling":
                                                 help="Upload another RL/TL model.")
                 if model_file:
                     model = model_file.name
+                    uploads[f"{run_mode}_{mol_gen}_ext_model"] = model
                     model_file = save_uploaded_file(model_file, Path(st.session_state["user_folder"]))
                     uploaded_files["Model"] = model_file
                     needed_files["Model"] = True
@@ -339,6 +338,7 @@ if run_mode == "Sampling":
                                                 help="Upload another RL/TL model.")
                     if model_file:
                         model = model_file.name
+                        uploads[f"{run_mode}_{mol_gen}_ext_model"] = model
                         model_file = save_uploaded_file(model_file, Path(st.session_state["user_folder"]))
                         uploaded_files["Model"] = model_file
                         needed_files["Model"] = True
@@ -355,6 +355,7 @@ if run_mode == "Sampling":
                 smi_path, smi_name = SMILES_file(f"{run_mode}_{mol_gen}", run_mode, mol_gen=mol_gen)
                 if smi_path != None: 
                     smiles_file = smi_name
+                    uploads[f"{run_mode}_{mol_gen}_smi_file"] = smiles_file
                     uploaded_files["SMILES"] = smi_path
                     needed_files["SMILES"] = True
                 else:
@@ -372,6 +373,7 @@ if run_mode == "Sampling":
                                                 help="Upload another RL/TL model.")
                     if model_file:
                         model = model_file.name
+                        uploads[f"{run_mode}_{mol_gen}_ext_model"] = model
                         model_file = save_uploaded_file(model_file, Path(st.session_state["user_folder"]))
                         uploaded_files["Model"] = model_file
                         needed_files["Model"] = True
@@ -388,6 +390,7 @@ if run_mode == "Sampling":
                 smi_path, smi_name = SMILES_file(f"{run_mode}_{mol_gen}", run_mode, mol_gen=mol_gen)
                 if smi_path != None: 
                     smiles_file = smi_name
+                    uploads[f"{run_mode}_{mol_gen}_smi_file"] = smiles_file
                     uploaded_files["SMILES"] = smi_path
                     needed_files["SMILES"] = True
                 else:
@@ -410,6 +413,7 @@ if run_mode == "Sampling":
                                                 help="Upload another RL/TL model.")
                     if model_file:
                         model = model_file.name
+                        uploads[f"{run_mode}_{mol_gen}_ext_model"] = model
                         model_file = save_uploaded_file(model_file, Path(st.session_state["user_folder"]))
                         uploaded_files["Model"] = model_file
                         needed_files["Model"] = True
@@ -425,6 +429,7 @@ if run_mode == "Sampling":
                 smi_path, smi_name = SMILES_file(f"{run_mode}_{mol_gen}", run_mode, mol_gen=mol_gen, mol2mol=mol2mol)
                 if smi_path != None: 
                     smiles_file = smi_name
+                    uploads[f"{run_mode}_{mol_gen}_smi_file"] = smiles_file
                     uploaded_files["SMILES"] = smi_path
                     needed_files["SMILES"] = True
                 else:
@@ -445,18 +450,6 @@ if run_mode == "Sampling":
                 else:
                    distance_threshold = st.number_input("Distance threshold", min_value=0, max_value=None, value=100, step=1, key=f"{run_mode}_{mol_gen}_distance_threshold")
                    distance_threshold = change_param(distance_threshold, st.session_state["change_param_dict"], state_dict, state, f"{run_mode}_{mol_gen}_distance_threshold")  # UI State
-                
-        # Write to the TOML input file 
-        write_show(f'\# {mol_gen} Generator Parameters\n', toml_input, col2)
-        write_show(f'model_file = "{model}"\n', toml_input, col2)
-        if mol_gen in ["LibInvent", "LinkInvent", "Mol2Mol"]:
-            write_show(f'smiles_file = "{smiles_file}"\n', toml_input, col2)
-            if mol_gen == "Mol2Mol":
-                write_show(f'sample_strategy = "{sample_strategy}"\n', toml_input, col2)
-                if sample_strategy == "beamsearch":
-                    write_show(f'temperature = {temperature}\n', toml_input, col2, empty_line=True)
-                else:
-                    write_show(f"distance_threshold = {distance_threshold}\n", toml_input, col2, empty_line=True)
 
     # Additional options 
     with col1.expander("**Additional Options**"):
@@ -470,6 +463,13 @@ if run_mode == "Sampling":
             if bash_path.exists():
                 bash_path.unlink()  
 
+    # Write the TOML input file and show its preview 
+    toml_doc = TomlDocument(toml_input)
+    with section_cache(toml_sections()):
+        toml_doc.write(input_toml(st.session_state, uploads))
+    toml_doc.save()
+    toml_doc.show(col2)
+
     # Download Fles 
     col1.divider()
     col1.subheader("Download Files")
@@ -515,9 +515,10 @@ if run_mode == "Transfer Learning (TL)":
                         that leave only a small portion of the molecule to be optimizable.""")
 
     # Name of Toml input file 
-    toml_input = Path(st.session_state['user_folder']) / f"{toml_name}.toml"
-    if toml_input.exists():
-        toml_input.unlink() # Remove the file cross-platform
+    toml_input = Path(st.session_state['scratch_folder']) / f"{toml_name}.toml"
+
+    # Values of uploaded files used in the TOML input file (key of the widget they replace: value)
+    uploads = {}
 
     # Uploaded Files 
     uploaded_files = {"TOML Input": toml_input, "Model": None, "SMILES": None, "Validation SMILES": None}
@@ -525,32 +526,18 @@ if run_mode == "Transfer Learning (TL)":
     # Needed Files 
     needed_files = {"TOML Input": True, "Model": False, "SMILES": False, "Validation SMILES": False} 
 
-    # Titel 
-    write_show(f"\### REINVENT4 TOML input ###\n", toml_input, col2)
-    write_show(f"\### Transfer Learning (TL) Run Mode ###\n", toml_input, col2, empty_line=True)
-
     # General Options
     with col1.expander("**General Options**"):
-        write_show('\# General Options\n', toml_input, col2)
-        write_show('run_type = "transfer_learning"\n', toml_input, col2)
         if modus == "Advanced":
             use_cuda = st.selectbox("Run on GPU?", ["true", "false"], index=0, key=f"{run_mode}_use_cuda")
             use_cuda = change_param(use_cuda, st.session_state["change_param_dict"], state_dict, state, f"{run_mode}_use_cuda")  # UI State
             #number_of_cpus = st.number_input(value=1, min_value=1, max_value=None, label="Number of CPUs for pair generation", step=1, f"{run_mode}_num_cpus")
             #number_of_cpus = change_param(number_of_cpus, st.session_state["change_param_dict"], state_dict, state, f"{run_mode}_num_cpus")  # UI State
-            write_show(f'use_cuda = {use_cuda}\n', toml_input, col2)
-            #write_show(f'number_of_cpus = {number_of_cpus}\n', toml_input, col2)
-        else:
-            write_show(f'use_cuda = true\n', toml_input, col2)
-            #write_show(f'number_of_cpus = 1\n', toml_input, col2)
         tb_dir = st.text_input("Name of the TensorBoard Logging Directory", value="TensoBoard_TL", key=f"{run_mode}_tb_dir")
         tb_dir = change_param(tb_dir, st.session_state["change_param_dict"], state_dict, state, f"{run_mode}_tb_dir")  # UI State
         json_file = st.text_input("Name of the Json input file", value="TL_input", key=f"{run_mode}_json_file")
         json_file = change_param(json_file, st.session_state["change_param_dict"], state_dict, state, f"{run_mode}_json_file")  # UI State
-        write_show(f'tb_logdir = "{tb_dir}"\n', toml_input, col2)
-        write_show(f'json_out_config = "{json_file}.json"\n', toml_input, col2, empty_line=True)
 
-    write_show('[parameters]\n', toml_input, col2, empty_line=False)
 
     # Parameters
     with col1.expander("**Run Mode Parameters**"):
@@ -566,13 +553,6 @@ if run_mode == "Transfer Learning (TL)":
         num_refs = change_param(num_refs, st.session_state["change_param_dict"], state_dict, state, f"{run_mode}_num_refs")  # UI State
         sample_batch_size = st.number_input("Number of sampled molecules to compute sample loss", min_value=0, max_value=None, value=100, step=1, key=f"{run_mode}_sample_batch_size")
         sample_batch_size = change_param(sample_batch_size, st.session_state["change_param_dict"], state_dict, state, f"{run_mode}_sample_batch_size")  # UI State
-        # Write to TOML input file
-        write_show('\# TL Parameters\n', toml_input, col2)
-        write_show(f'num_epochs = {int(num_epochs)}\n', toml_input, col2,)
-        write_show(f'save_every_n_epochs = {int(save_every_n_epochs)}\n', toml_input, col2,)
-        write_show(f'batch_size = {int(batch_size)}\n', toml_input, col2,)
-        write_show(f'num_refs = {int(num_refs)}\n', toml_input, col2,)
-        write_show(f'sample_batch_size = {int(sample_batch_size)}\n', toml_input, col2, empty_line=True)
 
     # Molecule Generator
     with col1.expander("**Molecule Generator**"):
@@ -589,6 +569,7 @@ if run_mode == "Transfer Learning (TL)":
                                                 help="Upload another RL/TL model.")
                 if model_file:
                     input_model_file = model_file.name
+                    uploads[f"{run_mode}_{mol_gen}_ext_model"] = input_model_file
                     model_file = save_uploaded_file(model_file, Path(st.session_state["user_folder"]))
                     uploaded_files["Model"] = model_file
                     needed_files["Model"] = True
@@ -604,6 +585,7 @@ if run_mode == "Transfer Learning (TL)":
             smi_path, smi_name = SMILES_file(f"{run_mode}_{mol_gen}", run_mode, mol_gen=mol_gen)
             if smi_path != None: 
                 smiles_file = smi_name
+                uploads[f"{run_mode}_{mol_gen}_smi_file"] = smiles_file
                 uploaded_files["SMILES"] = smi_path
                 needed_files["SMILES"] = True
             else:
@@ -621,6 +603,7 @@ if run_mode == "Transfer Learning (TL)":
                                               help="Upload another RL/TL model.")
                 if model_file:
                     input_model_file = model_file.name
+                    uploads[f"{run_mode}_{mol_gen}_ext_model"] = input_model_file
                     model_file = save_uploaded_file(model_file, Path(st.session_state["user_folder"]))
                     uploaded_files["Model"] = model_file
                     needed_files["Model"] = True
@@ -636,6 +619,7 @@ if run_mode == "Transfer Learning (TL)":
             smi_path, smi_name = SMILES_file(f"{run_mode}_{mol_gen}", run_mode, mol_gen=mol_gen)
             if smi_path != None: 
                 smiles_file = smi_name
+                uploads[f"{run_mode}_{mol_gen}_smi_file"] = smiles_file
                 uploaded_files["SMILES"] = smi_path
                 needed_files["SMILES"] = True
             else:
@@ -654,6 +638,7 @@ if run_mode == "Transfer Learning (TL)":
                                               help="Upload another RL/TL model.")
                 if model_file:
                     input_model_file = model_file.name
+                    uploads[f"{run_mode}_{mol_gen}_ext_model"] = input_model_file
                     model_file = save_uploaded_file(model_file, Path(st.session_state["user_folder"]))
                     uploaded_files["Model"] = model_file
                     needed_files["Model"] = True
@@ -668,6 +653,7 @@ if run_mode == "Transfer Learning (TL)":
             smi_path, smi_name = SMILES_file(f"{run_mode}_{mol_gen}", run_mode, mol_gen=mol_gen)
             if smi_path != None: 
                 smiles_file = smi_name
+                uploads[f"{run_mode}_{mol_gen}_smi_file"] = smiles_file
                 uploaded_files["SMILES"] = smi_path
                 needed_files["SMILES"] = True
             else:
@@ -690,6 +676,7 @@ if run_mode == "Transfer Learning (TL)":
                                                help="Upload another RL/TL model.")
                 if model_file:
                     input_model_file = model_file.name
+                    uploads[f"{run_mode}_{mol_gen}_ext_model"] = input_model_file
                     model_file = save_uploaded_file(model_file, Path(st.session_state["user_folder"]))
                     uploaded_files["Model"] = model_file
                     needed_files["Model"] = True
@@ -705,6 +692,7 @@ if run_mode == "Transfer Learning (TL)":
             smi_path, smi_name = SMILES_file(f"{run_mode}_{mol_gen}", run_mode, mol_gen=mol_gen, mol2mol=mol2mol)
             if smi_path != None: 
                 smiles_file = smi_name
+                uploads[f"{run_mode}_{mol_gen}_smi_file"] = smiles_file
                 uploaded_files["SMILES"] = smi_path
                 needed_files["SMILES"] = True
             else:
@@ -723,6 +711,7 @@ if run_mode == "Transfer Learning (TL)":
             smi_path, smi_name = SMILES_file(f"{run_mode}_{mol_gen}_validation", run_mode, title="Validation SMILES", mol_gen=mol_gen)
         if smi_path != None: 
             validation_smiles_file = smi_name
+            uploads[f"{run_mode}_{mol_gen}_validation_smiles"] = validation_smiles_file
             uploaded_files["Validation SMILES"] = smi_path
             needed_files["Validation SMILES"] = True
         else:
@@ -742,20 +731,6 @@ if run_mode == "Transfer Learning (TL)":
             pairs_max_cardinality = st.number_input("Maximum cardinality", min_value=1.0, max_value=None, value=199.0, step=1.0,
                                                     help="Maximum number of cmpds that can be compared with a certain one.", key=f"{run_mode}_{mol_gen}_pairs_max")
             pairs_max_cardinality = change_param(pairs_max_cardinality, st.session_state["change_param_dict"], state_dict, state, f"{run_mode}_{mol_gen}_pairs_max")  # UI State
-        
-        # Write to TOML input file 
-        write_show(f'\# {mol_gen} molecule generator\n', toml_input, col2)
-        write_show(f'input_model_file = "{input_model_file}"\n', toml_input, col2)
-        write_show(f'smiles_file = "{smiles_file}"\n', toml_input, col2)
-        write_show(f'output_model_file = "{output_model_file}.model"\n', toml_input, col2)
-        write_show(f'validation_smiles_file = "{validation_smiles_file}"\n', toml_input, col2, empty_line=True)
-        if mol_gen == "Mol2Mol":
-            write_show('\# Type of similarity and its parameters\n', toml_input, col2)
-            write_show(f'pairs.type = "{pairs_type}"\n', toml_input, col2)
-            write_show(f'pairs.upper_threshold = {pairs_upper_threshold}\n', toml_input, col2)
-            write_show(f'pairs.lower_threshold = {pairs_lower_threshold}\n', toml_input, col2)
-            write_show(f'pairs.min_cardinality = {int(pairs_min_cardinality)}\n', toml_input, col2)
-            write_show(f'pairs.max_cardinality = {int(pairs_max_cardinality)}\n', toml_input, col2, empty_line=True)
 
     # Additional options 
     with col1.expander("**Additional Options**"):
@@ -769,6 +744,13 @@ if run_mode == "Transfer Learning (TL)":
             if bash_path.exists():
                 bash_path.unlink()  
     
+    # Write the TOML input file and show its preview 
+    toml_doc = TomlDocument(toml_input)
+    with section_cache(toml_sections()):
+        toml_doc.write(input_toml(st.session_state, uploads))
+    toml_doc.save()
+    toml_doc.show(col2)
+
     # Download Fles 
     col1.divider()
     col1.subheader("Download Files")
@@ -813,37 +795,26 @@ if run_mode == "Reinforcement Learning (RL)":
                         model such that the generated molecules satisfies a predefined property profile.""")
 
     # Name of Toml input file 
-    toml_input = Path(st.session_state['user_folder']) / f"{toml_name}.toml"
-    if toml_input.exists():
-        toml_input.unlink() # Remove the file cross-platform
+    toml_input = Path(st.session_state['scratch_folder']) / f"{toml_name}.toml"
+
+    # Values of uploaded files used in the TOML input file (key of the widget they replace: value)
+    uploads = {}
 
     # Uploaded Files 
     uploaded_files = {"TOML Input": toml_input, "Prior Model": None, "Agent Model": None}
     # Needed Files 
     needed_files = {"TOML Input": True, "Prior Model": False, "Agent Model": False}
 
-    # Titel 
-    write_show(f"\### REINVENT4 TOML input ###\n", toml_input, col2)
-    write_show(f"\### Reinforcement Learning (RL) Run Mode ###\n", toml_input, col2, empty_line=True)
-    
     # General Options
     with col1.expander("**General Options**"):
-        write_show('\# General Options\n', toml_input, col2)
-        write_show('run_type = "staged_learning"\n', toml_input, col2)
         if modus == "Advanced":
             use_cuda = st.selectbox("Run on GPU?", ["true", "false"], index=0, key=f"{run_mode}_use_cuda")
             use_cuda = change_param(use_cuda, st.session_state["change_param_dict"], state_dict, state, f"{run_mode}_use_cuda")  # UI State
-            write_show(f'use_cuda = {use_cuda}\n', toml_input, col2)
-        else:
-            write_show(f'use_cuda = true\n', toml_input, col2)
         tb_dir = st.text_input("Name of the TensorBoard Logging Directory", value="TensorBoard_RL", key=f"{run_mode}_tb_dir")
         tb_dir = change_param(tb_dir, st.session_state["change_param_dict"], state_dict, state, f"{run_mode}_tb_dir")  # UI State
         json_file = st.text_input("Name of the Json input file", value="RL_input", key=f"{run_mode}_json_file")
         json_file = change_param(json_file, st.session_state["change_param_dict"], state_dict, state, f"{run_mode}_json_file")  # UI State
-        write_show(f'tb_logdir = "{tb_dir}"\n', toml_input, col2)
-        write_show(f'json_out_config = "{json_file}.json"\n', toml_input, col2, empty_line=True)
 
-    write_show('[parameters]\n', toml_input, col2, empty_line=False)
 
     # Run Mode Parameters
     with col1.expander("**Run Mode Parameters**"):
@@ -854,7 +825,7 @@ if run_mode == "Reinforcement Learning (RL)":
         use_checkpoint = change_param(use_checkpoint, st.session_state["change_param_dict"], state_dict, state, f"{run_mode}_use_checkpoint")  # UI State
         #purge_memories = st.selectbox("Purge all Diversity Filter Memories after each Stage?", ["true", "false"], index=0, key=f"{run_mode}_purge_memories")
         #purge_memories = change_param(purge_memories, st.session_state["change_param_dict"], state_dict, state, f"{run_mode}_purge_memories")  # UI State
-        batch_size = st.number_input("Number of molecules generated per run (epoch)", min_value=0, max_value=None, value=128, step=1)
+        batch_size = st.number_input("Number of molecules generated per run (epoch)", min_value=0, max_value=None, value=128, step=1, key=f"{run_mode}_batch_size")
         batch_size = change_param(batch_size, st.session_state["change_param_dict"], state_dict, state, f"{run_mode}_batch_size")  # UI State
         if modus == "Advanced":
             unique_sequences = st.selectbox("Canonicalize output SMILES and remove duplicates after each step (epoch)?", ["true", "false"], index=0,
@@ -866,13 +837,6 @@ if run_mode == "Reinforcement Learning (RL)":
         else:
             unique_sequences = "true"
             randomize_smiles = "true"
-        write_show('\# RL Parameters\n', toml_input, col2)
-        write_show(f'summary_csv_prefix = "{summary_csv_prefix}"\n', toml_input, col2)
-        write_show(f'use_checkpoint = {use_checkpoint}\n', toml_input, col2)
-        #write_show(f'purge_memories = {purge_memories}\n', toml_input, col2)
-        write_show(f'batch_size = {int(batch_size)}\n', toml_input, col2)
-        write_show(f'unique_sequences = {unique_sequences}\n', toml_input, col2)
-        write_show(f'randomize_smiles = {randomize_smiles}\n', toml_input, col2, empty_line=True)
     
     # Molecule Generator
     with col1.expander("**Molecule Generator**"):
@@ -891,6 +855,7 @@ if run_mode == "Reinforcement Learning (RL)":
                                                help="Upload another RL/TL model.")
                 if model_file:
                     prior_model = model_file.name
+                    uploads[f"{run_mode}_{mol_gen}_prior_model"] = prior_model
                     model_file = save_uploaded_file(model_file, Path(st.session_state["user_folder"]))
                     uploaded_files["Prior Model"] = model_file
                     needed_files["Prior Model"] = True
@@ -908,6 +873,7 @@ if run_mode == "Reinforcement Learning (RL)":
                                                help="Upload another RL/TL model.")
                 if model_file:
                     agent_model = model_file.name
+                    uploads[f"{run_mode}_{mol_gen}_agent_model"] = agent_model
                     model_file = save_uploaded_file(model_file, Path(st.session_state["user_folder"]))
                     if agent_model != prior_model:
                         uploaded_files["Agent Model"] = model_file
@@ -929,6 +895,7 @@ if run_mode == "Reinforcement Learning (RL)":
                 smi_path, smi_name = SMILES_file(f"{run_mode}_{mol_gen}_inception", run_mode, title="Inception SMILES", mol_gen=mol_gen)
                 if smi_path != None: 
                     smiles_file = smi_name
+                    uploads[f"{run_mode}_{mol_gen}_smi_file"] = smiles_file
                     uploaded_files["Inception SMILES"] = smi_path
                     needed_files["Inception SMILES"] = True
                 else:
@@ -956,6 +923,7 @@ if run_mode == "Reinforcement Learning (RL)":
                                                help="Upload another RL/TL model.")
                 if model_file:
                     prior_model = model_file.name
+                    uploads[f"{run_mode}_{mol_gen}_prior_model"] = prior_model
                     model_file = save_uploaded_file(model_file, Path(st.session_state["user_folder"]))
                     uploaded_files["Prior Model"] = model_file
                     needed_files["Prior Model"] = True
@@ -973,6 +941,7 @@ if run_mode == "Reinforcement Learning (RL)":
                                                help="Upload another RL/TL model.")
                 if model_file:
                     agent_model = model_file.name
+                    uploads[f"{run_mode}_{mol_gen}_agent_model"] = agent_model
                     model_file = save_uploaded_file(model_file, Path(st.session_state["user_folder"]))
                     if agent_model != prior_model:
                         uploaded_files["Agent Model"] = model_file
@@ -990,6 +959,7 @@ if run_mode == "Reinforcement Learning (RL)":
             needed_files[f"SMILES"] = False       
             if smi_path: 
                 smiles_file = smi_name
+                uploads[f"{run_mode}_{mol_gen}_smi_file"] = smiles_file
                 uploaded_files["SMILES"] = smi_path
                 needed_files["SMILES"] = True
             else:
@@ -1008,6 +978,7 @@ if run_mode == "Reinforcement Learning (RL)":
                                                help="Upload another RL/TL model.")
                 if model_file:
                     prior_model = model_file.name
+                    uploads[f"{run_mode}_{mol_gen}_prior_model"] = prior_model
                     model_file = save_uploaded_file(model_file, Path(st.session_state["user_folder"]))
                     uploaded_files["Prior Model"] = model_file
                     needed_files["Prior Model"] = True
@@ -1025,6 +996,7 @@ if run_mode == "Reinforcement Learning (RL)":
                                                help="Upload another RL/TL model.")
                 if model_file:
                     agent_model = model_file.name
+                    uploads[f"{run_mode}_{mol_gen}_agent_model"] = agent_model
                     model_file = save_uploaded_file(model_file, Path(st.session_state["user_folder"]))
                     if agent_model != prior_model:
                         uploaded_files["Agent Model"] = model_file
@@ -1043,6 +1015,7 @@ if run_mode == "Reinforcement Learning (RL)":
             needed_files[f"SMILES"] = False       
             if smi_path: 
                 smiles_file = smi_name
+                uploads[f"{run_mode}_{mol_gen}_smi_file"] = smiles_file
                 uploaded_files["SMILES"] = smi_path
                 needed_files["SMILES"] = True
             else:
@@ -1066,6 +1039,7 @@ if run_mode == "Reinforcement Learning (RL)":
                                                help="Upload another RL/TL model.")
                 if model_file:
                     prior_model = model_file.name
+                    uploads[f"{run_mode}_{mol_gen}_prior_model"] = prior_model
                     model_file = save_uploaded_file(model_file, Path(st.session_state["user_folder"]))
                     uploaded_files["Prior Model"] = model_file
                     needed_files["Prior Model"] = True
@@ -1083,6 +1057,7 @@ if run_mode == "Reinforcement Learning (RL)":
                                                help="Upload another RL/TL model.")
                 if model_file:
                     agent_model = model_file.name
+                    uploads[f"{run_mode}_{mol_gen}_agent_model"] = agent_model
                     model_file = save_uploaded_file(model_file, Path(st.session_state["user_folder"]))
                     if agent_model != prior_model:
                         uploaded_files["Agent Model"] = model_file
@@ -1099,6 +1074,7 @@ if run_mode == "Reinforcement Learning (RL)":
             needed_files[f"SMILES"] = False       
             if smi_path: 
                 smiles_file = smi_name
+                uploads[f"{run_mode}_{mol_gen}_smi_file"] = smiles_file
                 uploaded_files["SMILES"] = smi_path
                 needed_files["SMILES"] = True
             else:
@@ -1120,31 +1096,6 @@ if run_mode == "Reinforcement Learning (RL)":
             else:
                distance_threshold = st.number_input("Distance threshold", min_value=0, max_value=None, value=100, step=1, key=f"{run_mode}_{mol_gen}_distance_threshold")
                distance_threshold = change_param(distance_threshold, st.session_state["change_param_dict"], state_dict, state, f"{run_mode}_{mol_gen}_distance_threshold")  # UI State
-            
-        # Write to TOML input file 
-        write_show(f'\# {mol_gen} Molecule Generator\n', toml_input, col2)
-        if mol_gen == "Reinvent":
-            write_show(f'prior_file = "{prior_model}"\n', toml_input, col2)
-            write_show(f'agent_file = "{agent_model}"\n', toml_input, col2, empty_line=True)
-            if inception:
-                write_show('\# Inception Parameters: guide RL in the initial phase\n', toml_input, col2)
-                write_show('[inception]\n', toml_input, col2)
-                write_show(f'smiles_file = "{smiles_file}"\n', toml_input, col2)
-                write_show(f'memory_size = {int(memory_size)}\n', toml_input, col2)
-                write_show(f'sample_size = {int(sample_size)}\n', toml_input, col2, empty_line=True)
-        elif mol_gen in ["LinkInvent", "LibInvent"]:
-            write_show(f'prior_file = "{prior_model}"\n', toml_input, col2)
-            write_show(f'agent_file = "{agent_model}"\n', toml_input, col2)
-            write_show(f'smiles_file = "{smiles_file}"\n', toml_input, col2, empty_line=True)
-        elif mol_gen == "Mol2Mol":
-            write_show(f'prior_file = "{prior_model}"\n', toml_input, col2)
-            write_show(f'agent_file = "{agent_model}"\n', toml_input, col2)
-            write_show(f'smiles_file = "{smiles_file}"\n', toml_input, col2)
-            write_show(f'sample_strategy = "{sample_strategy}"\n', toml_input, col2)
-            if sample_strategy == "beamsearch":
-                write_show(f'temperature = {temperature}\n', toml_input, col2, empty_line=True)
-            else:
-                write_show(f"distance_threshold = {distance_threshold}\n", toml_input, col2, empty_line=True)
 
     # Learning Strategy
     with col1.expander("**Learning Strategy**"):
@@ -1158,18 +1109,13 @@ if run_mode == "Reinforcement Learning (RL)":
         sigma = change_param(sigma, st.session_state["change_param_dict"], state_dict, state, f"{run_mode}_sigma")  # UI State
         lr = st.number_input("Learning rate", min_value=0.0, max_value=None, value=0.0001, step=0.00001, format="%.5f", key=f"{run_mode}_lr")
         lr = change_param(lr, st.session_state["change_param_dict"], state_dict, state, f"{run_mode}_lr")  # UI State
-        write_show('\# Learning Strategy Parameters\n', toml_input, col2)
-        write_show('[learning_strategy]\n', toml_input, col2)
-        write_show(f'type = "{ls_type}"\n', toml_input, col2)
-        write_show(f'sigma = {int(sigma)}\n', toml_input, col2)
-        write_show(f'rate = {float(lr)}\n', toml_input, col2, empty_line=True)
 
     # Diversity Filter
     with col1.expander(f"**Diversity Filter**"):
         div_filter = st.toggle("Diversity Filter", value=False, key=f"{run_mode}_div_filter")
         div_filter = change_param(div_filter, st.session_state["change_param_dict"], state_dict, state, f"{run_mode}_div_filter")  # UI State
         if div_filter:
-            diversity_filter(col2, toml_input, state_dict, state, global_DF=True, num_stage=None, key=f"{run_mode}_div_filter")
+            diversity_filter(state_dict, state, global_DF=True, num_stage=None, key=f"{run_mode}_div_filter")
     
     # Stage Parameters
     with col1.expander("**Stage Parameters**"):
@@ -1188,17 +1134,10 @@ if run_mode == "Reinforcement Learning (RL)":
         min_steps = change_param(min_steps, st.session_state["change_param_dict"], state_dict, state, f"{run_mode}_min_steps")  # UI State
         max_steps = st.number_input("Maximum number of steps", min_value=0, max_value=None, value=100, step=1, key=f"{run_mode}_max_steps")
         max_steps = change_param(max_steps, st.session_state["change_param_dict"], state_dict, state, f"{run_mode}_max_steps")
-        write_show(f"\# Stage Parameters\n", toml_input, col2)
-        write_show(f"[[stage]]\n", toml_input, col2)
-        write_show(f'chkpt_file = "{name_chk}.chkpt"\n', toml_input, col2)
-        write_show(f'termination = "{termination_Criterion}"\n', toml_input, col2)
-        write_show(f"max_score = {max_score:.2f}\n", toml_input, col2)
-        write_show(f"min_steps = {min_steps}\n", toml_input, col2)
-        write_show(f"max_steps = {max_steps}\n", toml_input, col2, empty_line=True)
         # Scoring Components 
         st.write(f"**Scoring Components**")
-        scor_comp = scoring_components(toml_input, col2, state_dict, state, modus=modus, 
-                                       needed_files=needed_files, uploaded_files=uploaded_files, 
+        scor_comp = scoring_components(state_dict, state, modus=modus, 
+                                       needed_files=needed_files, uploaded_files=uploaded_files, uploads=uploads, 
                                        gen_scoring_file=False, key=run_mode)
         # Upload Scoring File 
         if scor_comp != None: 
@@ -1220,6 +1159,13 @@ if run_mode == "Reinforcement Learning (RL)":
             if bash_path.exists():
                 bash_path.unlink()  
     
+    # Write the TOML input file and show its preview 
+    toml_doc = TomlDocument(toml_input)
+    with section_cache(toml_sections()):
+        toml_doc.write(input_toml(st.session_state, uploads))
+    toml_doc.save()
+    toml_doc.show(col2)
+
     # Download Fles 
     col1.divider()
     col1.subheader("Download Files")
@@ -1265,37 +1211,26 @@ if run_mode == "Staged Learning (SL)":
                         score or the maximum number of steps is reached. In the latter case all stages will be terminated.""")
 
     # Name of Toml input file 
-    toml_input = Path(st.session_state['user_folder']) / f"{toml_name}.toml"
-    if toml_input.exists():
-        toml_input.unlink() # Remove the file cross-platform
+    toml_input = Path(st.session_state['scratch_folder']) / f"{toml_name}.toml"
+
+    # Values of uploaded files used in the TOML input file (key of the widget they replace: value)
+    uploads = {}
 
     # Uploaded Files 
     uploaded_files = {"TOML Input": toml_input, "Prior Model": None, "Agent Model": None}
     # Needed Files 
     needed_files = {"TOML Input": True, "Prior Model": False, "Agent Model": False}
 
-    # Titel 
-    write_show(f"\### REINVENT4 TOML input ###\n", toml_input, col2)
-    write_show(f"\### Staged Learning (SL) Run Mode ###\n", toml_input, col2, empty_line=True)
-    
     # General Options
     with col1.expander("**General Options**"):
-        write_show('\# General Options\n', toml_input, col2)
-        write_show('run_type = "staged_learning"\n', toml_input, col2)
         if modus == "Advanced":
             use_cuda = st.selectbox("Run on GPU?", ["true", "false"], index=0, key=f"{run_mode}_use_cuda")
             use_cuda = change_param(use_cuda, st.session_state["change_param_dict"], state_dict, state, f"{run_mode}_use_cuda")  # UI State
-            write_show(f'use_cuda = {use_cuda}\n', toml_input, col2)
-        else:
-            write_show(f'use_cuda = true\n', toml_input, col2)
         tb_dir = st.text_input("Name of the TensorBoard Logging Directory", value="TensorBoard_SL", key=f"{run_mode}_tb_dir")
         tb_dir = change_param(tb_dir, st.session_state["change_param_dict"], state_dict, state, f"{run_mode}_tb_dir")  # UI State
         json_file = st.text_input("Name of the Json input file", value="SL_input", key=f"{run_mode}_json_file")
         json_file = change_param(json_file, st.session_state["change_param_dict"], state_dict, state, f"{run_mode}_json_file")  # UI State
-        write_show(f'tb_logdir = "{tb_dir}"\n', toml_input, col2)
-        write_show(f'json_out_config = "{json_file}.json"\n', toml_input, col2, empty_line=True)
 
-    write_show('[parameters]\n', toml_input, col2, empty_line=False)
 
     # Run Mode Parameters
     with col1.expander("**Run Mode Parameters**"):
@@ -1306,7 +1241,7 @@ if run_mode == "Staged Learning (SL)":
         use_checkpoint = change_param(use_checkpoint, st.session_state["change_param_dict"], state_dict, state, f"{run_mode}_use_checkpoint")  # UI State
         #purge_memories = st.selectbox("Purge all Diversity Filter Memories after each Stage?", ["true", "false"], index=0, key=f"{run_mode}_purge_memories")
         #purge_memories = change_param(purge_memories, st.session_state["change_param_dict"], state_dict, state, f"{run_mode}_purge_memories")  # UI State
-        batch_size = st.number_input("Number of molecules generated per run (epoch)", min_value=0, max_value=None, value=128, step=1)
+        batch_size = st.number_input("Number of molecules generated per run (epoch)", min_value=0, max_value=None, value=128, step=1, key=f"{run_mode}_batch_size")
         batch_size = change_param(batch_size, st.session_state["change_param_dict"], state_dict, state, f"{run_mode}_batch_size")  # UI State
         if modus == "Advanced":
             unique_sequences = st.selectbox("Canonicalize output SMILES and remove duplicates after each step (epoch)?", ["true", "false"], index=0,
@@ -1318,13 +1253,6 @@ if run_mode == "Staged Learning (SL)":
         else:
             unique_sequences = "true"
             randomize_smiles = "true"
-        write_show('\# SL Parameters\n', toml_input, col2)
-        write_show(f'summary_csv_prefix = "{summary_csv_prefix}"\n', toml_input, col2)
-        write_show(f'use_checkpoint = {use_checkpoint}\n', toml_input, col2)
-        #write_show(f'purge_memories = {purge_memories}\n', toml_input, col2)
-        write_show(f'batch_size = {int(batch_size)}\n', toml_input, col2)
-        write_show(f'unique_sequences = {unique_sequences}\n', toml_input, col2)
-        write_show(f'randomize_smiles = {randomize_smiles}\n', toml_input, col2, empty_line=True)
     
     # Molecule Generator
     with col1.expander("**Molecule Generator**"):
@@ -1343,6 +1271,7 @@ if run_mode == "Staged Learning (SL)":
                                                help="Upload another RL/TL model.")
                 if model_file:
                     prior_model = model_file.name
+                    uploads[f"{run_mode}_{mol_gen}_prior_model"] = prior_model
                     model_file = save_uploaded_file(model_file, Path(st.session_state["user_folder"]))
                     uploaded_files["Prior Model"] = model_file
                     needed_files["Prior Model"] = True
@@ -1360,6 +1289,7 @@ if run_mode == "Staged Learning (SL)":
                                                help="Upload another RL/TL model.")
                 if model_file:
                     agent_model = model_file.name
+                    uploads[f"{run_mode}_{mol_gen}_agent_model"] = agent_model
                     model_file = save_uploaded_file(model_file, Path(st.session_state["user_folder"]))
                     if agent_model != prior_model:
                         uploaded_files["Agent Model"] = model_file
@@ -1381,6 +1311,7 @@ if run_mode == "Staged Learning (SL)":
                 smi_path, smi_name = SMILES_file(f"{run_mode}_{mol_gen}_inception", run_mode, title="Inception SMILES", mol_gen=mol_gen)
                 if smi_path != None: 
                     smiles_file = smi_name
+                    uploads[f"{run_mode}_{mol_gen}_smi_file"] = smiles_file
                     uploaded_files["Inception SMILES"] = smi_path
                     needed_files["Inception SMILES"] = True
                 else:
@@ -1408,6 +1339,7 @@ if run_mode == "Staged Learning (SL)":
                                                help="Upload another RL/TL model.")
                 if model_file:
                     prior_model = model_file.name
+                    uploads[f"{run_mode}_{mol_gen}_prior_model"] = prior_model
                     model_file = save_uploaded_file(model_file, Path(st.session_state["user_folder"]))
                     uploaded_files["Prior Model"] = model_file
                     needed_files["Prior Model"] = True
@@ -1425,6 +1357,7 @@ if run_mode == "Staged Learning (SL)":
                                                help="Upload another RL/TL model.")
                 if model_file:
                     agent_model = model_file.name
+                    uploads[f"{run_mode}_{mol_gen}_agent_model"] = agent_model
                     model_file = save_uploaded_file(model_file, Path(st.session_state["user_folder"]))
                     if agent_model != prior_model:
                         uploaded_files["Agent Model"] = model_file
@@ -1442,6 +1375,7 @@ if run_mode == "Staged Learning (SL)":
             needed_files[f"SMILES"] = False       
             if smi_path: 
                 smiles_file = smi_name
+                uploads[f"{run_mode}_{mol_gen}_smi_file"] = smiles_file
                 uploaded_files["SMILES"] = smi_path
                 needed_files["SMILES"] = True
             else:
@@ -1460,6 +1394,7 @@ if run_mode == "Staged Learning (SL)":
                                                help="Upload another RL/TL model.")
                 if model_file:
                     prior_model = model_file.name
+                    uploads[f"{run_mode}_{mol_gen}_prior_model"] = prior_model
                     model_file = save_uploaded_file(model_file, Path(st.session_state["user_folder"]))
                     uploaded_files["Prior Model"] = model_file
                     needed_files["Prior Model"] = True
@@ -1477,6 +1412,7 @@ if run_mode == "Staged Learning (SL)":
                                                help="Upload another RL/TL model.")
                 if model_file:
                     agent_model = model_file.name
+                    uploads[f"{run_mode}_{mol_gen}_agent_model"] = agent_model
                     model_file = save_uploaded_file(model_file, Path(st.session_state["user_folder"]))
                     if agent_model != prior_model:
                         uploaded_files["Agent Model"] = model_file
@@ -1495,6 +1431,7 @@ if run_mode == "Staged Learning (SL)":
             needed_files[f"SMILES"] = False       
             if smi_path: 
                 smiles_file = smi_name
+                uploads[f"{run_mode}_{mol_gen}_smi_file"] = smiles_file
                 uploaded_files["SMILES"] = smi_path
                 needed_files["SMILES"] = True
             else:
@@ -1518,6 +1455,7 @@ if run_mode == "Staged Learning (SL)":
                                                help="Upload another RL/TL model.")
                 if model_file:
                     prior_model = model_file.name
+                    uploads[f"{run_mode}_{mol_gen}_prior_model"] = prior_model
                     model_file = save_uploaded_file(model_file, Path(st.session_state["user_folder"]))
                     uploaded_files["Prior Model"] = model_file
                     needed_files["Prior Model"] = True
@@ -1535,6 +1473,7 @@ if run_mode == "Staged Learning (SL)":
                                                help="Upload another RL/TL model.")
                 if model_file:
                     agent_model = model_file.name
+                    uploads[f"{run_mode}_{mol_gen}_agent_model"] = agent_model
                     model_file = save_uploaded_file(model_file, Path(st.session_state["user_folder"]))
                     if agent_model != prior_model:
                         uploaded_files["Agent Model"] = model_file
@@ -1551,6 +1490,7 @@ if run_mode == "Staged Learning (SL)":
             needed_files[f"SMILES"] = False       
             if smi_path: 
                 smiles_file = smi_name
+                uploads[f"{run_mode}_{mol_gen}_smi_file"] = smiles_file
                 uploaded_files["SMILES"] = smi_path
                 needed_files["SMILES"] = True
             else:
@@ -1572,31 +1512,6 @@ if run_mode == "Staged Learning (SL)":
             else:
                distance_threshold = st.number_input("Distance threshold", min_value=0, max_value=None, value=100, step=1, key=f"{run_mode}_{mol_gen}_distance_threshold")
                distance_threshold = change_param(distance_threshold, st.session_state["change_param_dict"], state_dict, state, f"{run_mode}_{mol_gen}_distance_threshold")  # UI State
-            
-        # Write to TOML input file 
-        write_show(f'\# {mol_gen} Molecule Generator\n', toml_input, col2)
-        if mol_gen == "Reinvent":
-            write_show(f'prior_file = "{prior_model}"\n', toml_input, col2)
-            write_show(f'agent_file = "{agent_model}"\n', toml_input, col2, empty_line=True)
-            if inception:
-                write_show('\# Inception Parameters: guide RL in the initial phase\n', toml_input, col2)
-                write_show('[inception]\n', toml_input, col2)
-                write_show(f'smiles_file = "{smiles_file}"\n', toml_input, col2)
-                write_show(f'memory_size = {int(memory_size)}\n', toml_input, col2)
-                write_show(f'sample_size = {int(sample_size)}\n', toml_input, col2, empty_line=True)
-        elif mol_gen in ["LinkInvent", "LibInvent"]:
-            write_show(f'prior_file = "{prior_model}"\n', toml_input, col2)
-            write_show(f'agent_file = "{agent_model}"\n', toml_input, col2)
-            write_show(f'smiles_file = "{smiles_file}"\n', toml_input, col2, empty_line=True)
-        elif mol_gen == "Mol2Mol":
-            write_show(f'prior_file = "{prior_model}"\n', toml_input, col2)
-            write_show(f'agent_file = "{agent_model}"\n', toml_input, col2)
-            write_show(f'smiles_file = "{smiles_file}"\n', toml_input, col2)
-            write_show(f'sample_strategy = "{sample_strategy}"\n', toml_input, col2)
-            if sample_strategy == "beamsearch":
-                write_show(f'temperature = {temperature}\n', toml_input, col2, empty_line=True)
-            else:
-                write_show(f"distance_threshold = {distance_threshold}\n", toml_input, col2, empty_line=True)
 
     # Learning Strategy
     with col1.expander("**Learning Strategy**"):
@@ -1610,11 +1525,6 @@ if run_mode == "Staged Learning (SL)":
         sigma = change_param(sigma, st.session_state["change_param_dict"], state_dict, state, f"{run_mode}_sigma")  # UI State
         lr = st.number_input("Learning rate", min_value=0.0, max_value=None, value=0.0001, step=0.00001, format="%.5f", key=f"{run_mode}_lr")
         lr = change_param(lr, st.session_state["change_param_dict"], state_dict, state, f"{run_mode}_lr")  # UI State
-        write_show('\# Learning Strategy Parameters\n', toml_input, col2)
-        write_show('[learning_strategy]\n', toml_input, col2)
-        write_show(f'type = "{ls_type}"\n', toml_input, col2)
-        write_show(f'sigma = {int(sigma)}\n', toml_input, col2)
-        write_show(f'rate = {float(lr)}\n', toml_input, col2, empty_line=True)
 
     # Diversity Filter
     with col1.expander(f"**Global Diversity Filter**"):
@@ -1622,16 +1532,16 @@ if run_mode == "Staged Learning (SL)":
                                help="A global diversity filter would overwrite all separate diversity filters!")
         div_filter_global = change_param(div_filter_global, st.session_state["change_param_dict"], state_dict, state, f"{run_mode}_div_filter")  # UI State
         if div_filter_global:
-            diversity_filter(col2, toml_input, state_dict, state, global_DF=True, num_stage=None, key=f"{run_mode}_div_filter")
+            diversity_filter(state_dict, state, global_DF=True, num_stage=None, key=f"{run_mode}_div_filter")
     
     # Stage Parameters
     for i in range(1, num_stages+1):
         ## Add default values for the scoring components to the reset dictionary
-        state_dict_reset[st.session_state["run_mode"]][f"{run_mode}_S{i}_chk"] = {"key": f"{run_mode}_S{i}_chk", "value": f"SL_calc_S{i}"}        # reset value
-        #state_dict_reset[st.session_state["run_mode"]][f"{run_mode}_S{i}_termination"] = {"key": f"{run_mode}_S{i}_termination", "value": "simple"}         # reset value
-        state_dict_reset[st.session_state["run_mode"]][f"{run_mode}_S{i}_max_score"] = {"key": f"{run_mode}_S{i}_max_score", "value": 0.6}  # reset value
-        state_dict_reset[st.session_state["run_mode"]][f"{run_mode}_S{i}_min_steps"] = {"key": f"{run_mode}_S{i}_min_steps", "value": 10}  # reset value
-        state_dict_reset[st.session_state["run_mode"]][f"{run_mode}_S{i}_max_steps"] = {"key": f"{run_mode}_S{i}_max_steps", "value": 100}  # reset value
+        session_dict_reset()[f"{run_mode}_S{i}_chk"] = {"key": f"{run_mode}_S{i}_chk", "value": f"SL_calc_S{i}"}        # reset value
+        #session_dict_reset()[f"{run_mode}_S{i}_termination"] = {"key": f"{run_mode}_S{i}_termination", "value": "simple"}         # reset value
+        session_dict_reset()[f"{run_mode}_S{i}_max_score"] = {"key": f"{run_mode}_S{i}_max_score", "value": 0.6}  # reset value
+        session_dict_reset()[f"{run_mode}_S{i}_min_steps"] = {"key": f"{run_mode}_S{i}_min_steps", "value": 10}  # reset value
+        session_dict_reset()[f"{run_mode}_S{i}_max_steps"] = {"key": f"{run_mode}_S{i}_max_steps", "value": 100}  # reset value
 
         with col1.expander(f"**Stage {i} Parameters**"):           
             # Genral Stage Parameters 
@@ -1649,13 +1559,6 @@ if run_mode == "Staged Learning (SL)":
             min_steps = change_param(min_steps, st.session_state["change_param_dict"], state_dict, state, f"{run_mode}_S{i}_min_steps", add_key=True)  # UI State
             max_steps = st.number_input("Maximum number of steps", min_value=0, max_value=None, value=100, step=1, key=f"{run_mode}_S{i}_max_steps")
             max_steps = change_param(max_steps, st.session_state["change_param_dict"], state_dict, state, f"{run_mode}_S{i}_max_steps", add_key=True)
-            write_show(f"\# Stage Parameters (S{i})\n", toml_input, col2)
-            write_show(f"[[stage]]\n", toml_input, col2)
-            write_show(f'chkpt_file = "{name_chk}.chkpt"\n', toml_input, col2)
-            write_show(f'termination = "{termination_Criterion}"\n', toml_input, col2)
-            write_show(f"max_score = {max_score:.2f}\n", toml_input, col2)
-            write_show(f"min_steps = {min_steps}\n", toml_input, col2)
-            write_show(f"max_steps = {max_steps}\n", toml_input, col2, empty_line=True)
 
             # Diversity Filter  
             st.write(f"**Diversity Filter (S{i})**")
@@ -1663,13 +1566,13 @@ if run_mode == "Staged Learning (SL)":
                                           help="A global diversity filter would overwrite all these separate diversity filters!")
             div_filter = change_param(div_filter, st.session_state["change_param_dict"], state_dict, state, f"{run_mode}_S{i}_div_filter", add_key=True)  # UI State
             if div_filter:
-                diversity_filter(col2, toml_input, state_dict, state, global_DF=False, 
+                diversity_filter(state_dict, state, global_DF=False, 
                                  num_stage=i, key=f"{run_mode}_S{i}_div_filter")
 
             # Scoring Components 
             st.write(f"**Scoring Components (S{i})**")
-            scor_comp = scoring_components(toml_input, col2, state_dict, state, stages=True, num_stage=i, 
-                                           modus=modus, needed_files=needed_files, uploaded_files=uploaded_files, 
+            scor_comp = scoring_components(state_dict, state, stages=True, num_stage=i, 
+                                           modus=modus, needed_files=needed_files, uploaded_files=uploaded_files, uploads=uploads, 
                                            gen_scoring_file=False, key=f"{run_mode}-S{i}")
             # Upload Scoring File 
             if scor_comp != None: 
@@ -1691,6 +1594,13 @@ if run_mode == "Staged Learning (SL)":
             if bash_path.exists():
                 bash_path.unlink()  
 
+    # Write the TOML input file and show its preview 
+    toml_doc = TomlDocument(toml_input)
+    with section_cache(toml_sections()):
+        toml_doc.write(input_toml(st.session_state, uploads))
+    toml_doc.save()
+    toml_doc.show(col2)
+
     # Download Fles 
     col1.divider()
     col1.subheader("Download Files")
@@ -1726,10 +1636,17 @@ if run_mode == "Staged Learning (SL)":
 # (At the end of the script --> to account for any changes in st.session_state dict after re-running the script)
 with save.popover("Save UI State"): 
     UI_state_name = st.text_input("Name of UI State File (Json)", value="reinvent_UI_state", key="UI_state_name")
-    UI_state_data = save_state(dict(st.session_state), UI_state_name+".json")
+    UI_state_gzip = st.toggle("Compress (gzip)", value=False, key="UI_state_gzip", help="Save the UI state as compressed JSON file (.json.gz).")
+    UI_state_file = UI_state_name + (".json.gz" if UI_state_gzip else ".json")
+    UI_state_data = save_state(dict(st.session_state), UI_state_file, compress=UI_state_gzip)
     st.download_button(
         label="Download UI State File", 
         data=UI_state_data, 
-        file_name=f"{UI_state_name}.json", 
-        help=f"{UI_state_name}.json"
-        )
\ No newline at end of file
+        file_name=UI_state_file, 
+        mime="application/gzip" if UI_state_gzip else "application/json",
+        help=UI_state_file
+        )
+## Parameter Sweep: generate the input files of a parameter sweep (grid or Latin hypercube) with one SLURM job array script. 
+# (At the end of the script --> the sweep is based on the complete UI state)
+with st.sidebar.expander("Parameter Sweep"):
+    parameter_sweep(run_mode, uploads=uploads)
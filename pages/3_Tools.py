@@ -3,17 +3,14 @@
 ######################
 import streamlit as st
 import os 
-import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
-import requests
-from PIL import Image 
 from io import BytesIO
 from pathlib import Path
-import toml 
 import json 
 from functions import *
 from data import * 
+# requests, PIL and toml are imported where they are used, matplotlib only when a plot is drawn (transformer_plot)
 
 
 ###########################
@@ -31,18 +28,10 @@ st.set_page_config(
             'About': "## REINVENT UI"}
 )
 
-### Create a unique sub-folder for each user in the temp_files folder 
+### Create a unique sub-folder (workspace) for each user in the temp_files folder 
 pwd = os.getcwd()                            # Path for Parent Working Directory (Dir: reinvent4)
 BASE_DIR = os.path.join(pwd, "temp_files")   # Base directory for temporary files
-Path(BASE_DIR).mkdir(exist_ok=True)          # Create the base directory if it doesn't exist
-if "user_folder" not in st.session_state:
-    # Use the current time to create a unique identifier (formatted as YYYY-MM-DD-HH-MM-SS)
-    timestamp = datetime.now().strftime("%Y-%m-%d-%H-%M-%S")
-    user_folder = os.path.join(BASE_DIR, f"user_{timestamp}")
-    Path(user_folder).mkdir(exist_ok=True)
-    st.session_state.user_folder = user_folder
-else:
-    user_folder = st.session_state.user_folder
+user_folder = user_workspace(BASE_DIR)       # Unique user folder (formatted as user_YYYY-MM-DD-HH-MM-SS_<hex>)
 
 ### To save the changes made in UI across a multi-page streamlit app 
 for key in st.session_state:
@@ -130,21 +119,32 @@ with scoring_file:
     scoring_json_f = f"{st.session_state['user_folder']}/{scoring_file_name}.json"
     if os.path.exists(scoring_json_f):
         os.remove(scoring_json_f)
-    scoring_toml_f = os.path.join(Path(st.session_state["user_folder"]), f"{scoring_file_name}.toml")  
+    scoring_toml_f = os.path.join(Path(st.session_state["scratch_folder"]), f"{scoring_file_name}.toml")  
     if os.path.exists(scoring_toml_f):
         os.remove(scoring_toml_f)
+    # Values of uploaded files used in the scoring file (key of the widget they replace: value)
+    uploads = {}
     
     with col1:
         with st.expander("**Scoring Components**"):
             # Select scoring components
-            scor_comp = scoring_components(scoring_toml_f, col2, None, None, modus=modus, needed_files=None, 
-                                           uploaded_files=None, gen_scoring_file=True, 
-                                           key="scoring")
+            scor_comp = scoring_components(None, None, modus=modus, needed_files=None, uploaded_files=None, 
+                                           uploads=uploads, gen_scoring_file=True, key="scoring")
+        # Write the scoring file (if components were selected) and show its preview 
+        with section_cache(toml_sections()):
+            scoring_text = scoring_toml(st.session_state, "scoring", modus=modus, uploads=uploads, gen_scoring_file=True)
+        if scoring_text:
+            scoring_doc = TomlDocument(scoring_toml_f)
+            scoring_doc.write(scoring_text)
+            scoring_doc.save()
+            scoring_doc.show(col2)
+
         # Check if file was created 
         if os.path.exists(scoring_toml_f):
             # Convert TOML file into JSON file 
             if format == "JSON":
                 # Open temp TOML file and read it's content 
+                import toml
                 with open(scoring_toml_f, "r") as source:
                     toml_content = toml.loads(source.read())
                 # remove TOML file 
@@ -201,19 +201,10 @@ with transformer:
         #     st.write(f"K = {(10 * k):.2f}, B = {(high+low)/2:.2f}")
 
     with col2:
-        fig = plt.figure(figsize=(4, 3))
         x = np.linspace(values_min, values_max, 100)  # Define the range of x-values
         y = sigmoid(x, k, low, high) # Calculate the sigmoid values
-        plt.plot(x, y)  # Plot the graph
-        plt.xlabel("x") # Add X-label
-        plt.ylabel("f(x)") # Add Y-label
-        plt.title("Sigmoid Function") # Add title
-        plt.xlim([values_min-(0.1 * values_max), values_max+(0.1 * values_max)]) # Set limits slightly bigger than range of function
-        if k != 0.0:
-          plt.vlines(center, 0.0, 1.0, color="red", linestyles="--", label="Center of Sigmoid") # draw a vertical line at the center of the sigmoid function 
-        plt.grid(True) # Grid
-        plt.legend(loc="upper left", prop={'size': 7})
-        st.pyplot(fig=fig) # Show the plot
+        plot = transformer_plot(x, y, "Sigmoid Function", figsize=(4, 3), xlim=(values_min-(0.1 * values_max), values_max+(0.1 * values_max)), center=center if k != 0.0 else None, center_label="Center of Sigmoid", legend_loc="upper left")
+        st.image(plot, use_container_width=True) # Show the plot
 
 
   elif transformer_type == "Reverse Sigmoid":
@@ -233,19 +224,10 @@ with transformer:
         #     st.write(f"K = {(10 * k):.2f}, B = {(high+low)/2:.2f}")
 
     with col2:
-        fig = plt.figure(figsize=(4, 3))
         x = np.linspace(values_min, values_max, 100)  # Define the range of x-values
         y = reverse_sigmoid(x, k, low, high) # Calculate the reverse sigmoid values 
-        plt.plot(x, y) # Plot the graph
-        plt.xlabel("x") # Add X-label
-        plt.ylabel("f(x)") # Add Y-label
-        plt.title("Reverse Sigmoid Function") # Add title
-        plt.xlim([values_min-(0.1 * values_max), values_max+(0.1 * values_max)]) # Set limits slightly bigger than range of function
-        if k != 0.0:
-          plt.vlines(center, 0.0, 1.0, color="red", linestyles="--", label="Center of Reverse Sigmoid") # draw a vertical line at the center of the sigmoid function 
-        plt.grid(True) # Grid
-        plt.legend(loc="upper right", prop={'size': 7})
-        st.pyplot(fig=fig) # Show the plot
+        plot = transformer_plot(x, y, "Reverse Sigmoid Function", figsize=(4, 3), xlim=(values_min-(0.1 * values_max), values_max+(0.1 * values_max)), center=center if k != 0.0 else None, center_label="Center of Reverse Sigmoid", legend_loc="upper right")
+        st.image(plot, use_container_width=True) # Show the plot
 
 
   elif transformer_type == "Double Sigmoid":
@@ -262,16 +244,10 @@ with transformer:
         k_high = st.number_input("Scaling Right Factor ($k_r$)", min_value=None, max_value=None, value=1.0, step=0.1)
 
     with col2:
-        fig = plt.figure(figsize=(4, 4))
         x = np.linspace(values_min, values_max, 100)  # Define the range of x-values
         y = double_sigmoid(x, low, high, k, k_low, k_high) # Calculate the double sigmoid values
-        plt.plot(x, y) # Plot the graph
-        plt.xlabel("x") # Add X-label
-        plt.ylabel("f(x)") # Add Y-label
-        plt.title("Double Sigmoid Function") # Add title
-        plt.xlim([values_min-(0.1 * values_max), values_max+(0.1 * values_max)]) # Set limits slightly bigger than range of function
-        plt.grid(True) # Grid
-        st.pyplot(fig=fig) # Show the plot
+        plot = transformer_plot(x, y, "Double Sigmoid Function", figsize=(4, 4), xlim=(values_min-(0.1 * values_max), values_max+(0.1 * values_max)))
+        st.image(plot, use_container_width=True) # Show the plot
 
 
   elif transformer_type == "Right Step":
@@ -285,16 +261,10 @@ with transformer:
         low = st.slider("Select Threshold", values_min, values_max, center)
 
     with col2:
-        fig = plt.figure(figsize=(4, 3))
-        x = np.linspace(values_min, values_max, 100) # Define the range of x-values
+        x = np.linspace(values_min, values_max, 100)  # Define the range of x-values
         y = right_step(x, low) # Calculate the right step values
-        plt.plot(x, y) # Plot the graph
-        plt.xlabel("x") # Add X-label 
-        plt.ylabel("f(x)") # Add Y-label
-        plt.title("Right Step Function") # Add title
-        plt.xlim([values_min-(0.1 * values_max), values_max+(0.1 * values_max)]) # Set limits slightly bigger than range of function
-        plt.grid(True) # Grid
-        st.pyplot(fig=fig) # Show the plot
+        plot = transformer_plot(x, y, "Right Step Function", figsize=(4, 3), xlim=(values_min-(0.1 * values_max), values_max+(0.1 * values_max)))
+        st.image(plot, use_container_width=True) # Show the plot
     
 
   elif transformer_type == "Left Step":
@@ -308,16 +278,10 @@ with transformer:
         low = st.slider("Select Threshold", values_min, values_max, center)
 
     with col2:
-        fig = plt.figure(figsize=(4, 3))
-        x = np.linspace(values_min, values_max, 100) # Define the range of x-values
+        x = np.linspace(values_min, values_max, 100)  # Define the range of x-values
         y = left_step(x, low) # Calculate the left step values
-        plt.plot(x, y) # Plot the graph
-        plt.xlabel("x") # Add X-label 
-        plt.ylabel("f(x)") # Add Y-label
-        plt.title("Left Step Function") # Add title
-        plt.xlim([values_min-(0.1 * values_max), values_max+(0.1 * values_max)]) # Set limits slightly bigger than range of function
-        plt.grid(True) # Grid
-        st.pyplot(fig=fig) # Show the plot
+        plot = transformer_plot(x, y, "Left Step Function", figsize=(4, 3), xlim=(values_min-(0.1 * values_max), values_max+(0.1 * values_max)))
+        st.image(plot, use_container_width=True) # Show the plot
 
 
   elif transformer_type == "Step":
@@ -331,16 +295,10 @@ with transformer:
         low, high = st.slider("Select Thresholds", values_min, values_max, (((values_min + center) /2), ((values_max + center) /2)))
 
     with col2:
-        fig = plt.figure(figsize=(4, 3))
-        x = np.linspace(values_min, values_max, 100) # Define the range of x-values
+        x = np.linspace(values_min, values_max, 100)  # Define the range of x-values
         y = step(x, low, high) # Calculate the step values
-        plt.plot(x, y)  # Plot the graph
-        plt.xlabel("x") # Add X-label 
-        plt.ylabel("f(x)") # Add Y-label
-        plt.title("Step Function") # Add title
-        plt.xlim([values_min-(0.1 * values_max), values_max+(0.1 * values_max)]) # Set limits slightly bigger than range of function
-        plt.grid(True) # Grid
-        st.pyplot(fig=fig) # Show the plot
+        plot = transformer_plot(x, y, "Step Function", figsize=(4, 3), xlim=(values_min-(0.1 * values_max), values_max+(0.1 * values_max)))
+        st.image(plot, use_container_width=True) # Show the plot
     
 
 ###########################
@@ -385,6 +343,8 @@ if smarts_viewer:
         api_url = f"""
                 https://smarts.plus/smartsview/download_rest?smarts={user_smarts};filetype=png;vmode={vis_mode_dic[vis_mode]};vbonds=0;textdesc=1;depsymbols=1;smartsheading=0;trim=1;labels={show_labels};detectarom=1;smileslikearom=1;
                 """
+        import requests
+        from PIL import Image 
         response = requests.get(api_url, verify=True)
 
         if response.status_code == 200: 
@@ -22,6 +22,10 @@ st.set_page_config(
             'About': "## REINVENT UI"}
 )
 
+### Create a unique sub-folder (workspace) for each user in the temp_files folder 
+BASE_DIR = os.path.join(pwd, "temp_files")   # Base directory for temporary files
+user_folder = user_workspace(BASE_DIR)       # Unique user folder (formatted as user_YYYY-MM-DD-HH-MM-SS_<hex>)
+
 ### To save the changes made in UI across a multi-page streamlit app 
 for key in st.session_state:
     st.session_state[key] = st.session_state[key]
@@ -79,11 +83,11 @@ with mols:
     if smi_file:
         file_name = smi_file.name
         if (".sdf" in file_name): 
-                smi_file = convert_sdf_smi(smi_file)
+                smi_file = convert_sdf_smi(smi_file, smi_file=os.path.join(user_folder, f"{Path(file_name).stem}.smi"))
                 
         if smi_type == "Basic": 
             df = pd.read_csv(smi_file, names=["SMILES"], header=None)
-            df["Structure"] = df["SMILES"].apply(smi_to_png)
+            df = add_structure_columns(df, {"SMILES": "Structure"})
             st.write(f"Number of molecules contained in the SMILES file: **{len(df['SMILES'])}**.")
             cols = st.multiselect(label="Select Columns", options=list(df.columns), default=list(df.columns), placeholder="Choose columns...", 
                             help="Choose the columns you want to have in your table.") 
@@ -104,8 +108,7 @@ with mols:
             df["Warhead1 SMILES"] = warheads1
             df["Warhead2 SMILES"] = warheads2
             #df["Structure"] = df["SMILES"].apply(smi_to_png)
-            df["Warhead1 Structure"] = df["Warhead1 SMILES"].apply(smi_to_png)
-            df["Warhead2 Structure"] = df["Warhead2 SMILES"].apply(smi_to_png)
+            df = add_structure_columns(df, {"Warhead1 SMILES": "Warhead1 Structure", "Warhead2 SMILES": "Warhead2 Structure"})
             st.write(f"Number of molecules contained in the SMILES file: **{len(df['SMILES'])}**.", key="write")
             cols = st.multiselect(label="Select Columns", options=list(df.columns), default=list(df.columns), placeholder="Choose columns...", 
                             help="Choose the columns you want to have in your table.") 
@@ -127,78 +130,51 @@ with results:
     csv_file = st.file_uploader("Upload Summary File", type=["csv"],  
                                 help="Upload the the results summary file of the REINVENT calculation (CSV is the **ONLY** accepted format).")
     if csv_file != None: 
+        prepare = None
+        sort_by = None
         
         # Scoring & Sampling (Reinvent)
         if (run_mode == "Scoring") or (run_mode == "Sampling" and mol_gen == "Reinvent"):
-            df = pd.read_csv(csv_file, index_col=False)
-            df["Structure"] = df["SMILES"].apply(smi_to_png)
-            cols = st.multiselect(label="Select Columns", options=list(df.columns), default=list(df.columns), placeholder="Choose columns...", 
-                                    help="Choose the columns you want to have in your table.") 
-            st.dataframe(df[cols], column_config={"Structure": st.column_config.ImageColumn(width="medium")})
+            structure_cols = {"SMILES": "Structure"}
         
         # Sampling (LinkInvent, LibInvent, Mol2Mol)
         elif run_mode == "Sampling":
             # LibInvent
             if mol_gen == "LibInvent":
-                df = pd.read_csv(csv_file)
-                df["Structure"] = df["SMILES"].apply(smi_to_png)
-                df["Scaffold Structure"] = df["Scaffold"].apply(smi_to_png)
-                df["R-groups Structure"] = df["R-groups"].apply(smi_to_png)
-                cols = st.multiselect(label="Select Columns", options=list(df.columns), default=list(df.columns), placeholder="Choose columns...", 
-                                        help="Choose the columns you want to have in your table.") 
-                st.dataframe(df[cols], column_config={"Structure": st.column_config.ImageColumn(width="medium"), "Scaffold Structure": st.column_config.ImageColumn(width="medium"), 
-                                                      "R-groups Structure": st.column_config.ImageColumn(width="medium")})
+                structure_cols = {"SMILES": "Structure", "Scaffold": "Scaffold Structure", "R-groups": "R-groups Structure"}
                 
             # LinkInvent
             elif mol_gen == "LinkInvent":
-                df = pd.read_csv(csv_file)
-                warheads_modified = []
-                for smi in df["Warheads"]:
-                    warheads_modified.append(smi.replace("(*)", "[*]").replace("|*", "|[*]"))
-                warheads1 = []
-                warheads2 = []
-                for smi in df["Warheads"]:
-                    wh1, wh2 = smi.split("|")
-                    warheads1.append(wh1)
-                    warheads2.append(wh2)
-                df["Warheads"] = warheads_modified
-                df["Warhead1"] = warheads1
-                df["Warhead2"] = warheads2
-                df["Structure"] = df["SMILES"].apply(smi_to_png)
-                df["Warhead1 Structure"] = df["Warhead1"].apply(smi_to_png)
-                df["Linker Structure"] = df["Linker"].apply(smi_to_png)
-                df["Warhead2 Structure"] = df["Warhead2"].apply(smi_to_png)
-                cols = st.multiselect(label="Select Columns", options=list(df.columns), default=list(df.columns), placeholder="Choose columns...", 
-                                        help="Choose the columns you want to have in your table.") 
-                st.dataframe(df[cols], column_config={"Structure": st.column_config.ImageColumn(width="medium"), "Warhead1 Structure": st.column_config.ImageColumn(width="medium"), 
-                                                      "Linker Structure": st.column_config.ImageColumn(width="medium"), "Warhead2 Structure": st.column_config.ImageColumn(width="medium")})
+                prepare = split_warheads
+                structure_cols = {"SMILES": "Structure", "Warhead1": "Warhead1 Structure", "Linker": "Linker Structure", 
+                                  "Warhead2": "Warhead2 Structure"}
             
             # Mol2Mol
             elif mol_gen == "Mol2Mol":
-                df = pd.read_csv(csv_file)
-                df["Structure"] = df["SMILES"].apply(smi_to_png)
-                df["Input Structure"] = df["Input_SMILES"].apply(smi_to_png)
-                df.sort_values(by=["Input_SMILES"], ascending=[True], inplace=True)
-                cols = st.multiselect(label="Select Columns", options=list(df.columns), default=list(df.columns), placeholder="Choose columns...", 
-                                        help="Choose the columns you want to have in your table.") 
-                st.dataframe(df[cols], column_config={"Structure": st.column_config.ImageColumn(width="medium"), "Input Structure": st.column_config.ImageColumn(width="medium")})
+                sort_by = "Input_SMILES"
+                structure_cols = {"SMILES": "Structure", "Input_SMILES": "Input Structure"}
 
         # Transfer Learning (TL)
         elif run_mode == "Transfer Learning (TL)":
             # Mol2Mol
             if mol_gen == "Mol2Mol":
-                df = pd.read_csv(csv_file)
-                df["Source_Mol"] = df["Source_Mol"].apply(smi_to_png)
-                df["Target_Mol"] = df["Target_Mol"].apply(smi_to_png)
-                df.sort_values(by=["Target_Mol"], ascending=[True], inplace=True)
-                cols = st.multiselect(label="Select Columns", options=list(df.columns), default=list(df.columns), placeholder="Choose columns...", 
-                                        help="Choose the columns you want to have in your table.") 
-                st.dataframe(df[cols], column_config={"Source_Mol": st.column_config.ImageColumn(width="medium"), "Target_Mol": st.column_config.ImageColumn(width="medium")})
+                sort_by = "Target_Mol"
+                structure_cols = {"Source_Mol": "Source_Mol", "Target_Mol": "Target_Mol"}
+            else:
+                structure_cols = None
 
         # Reinforcement Learning/Staged Learning (RL/SL) 
         elif run_mode == "Reinforcement Learning/Staged Learning (RL/SL)":
-            df = pd.read_csv(csv_file)
-            df["Structure"] = df["SMILES"].apply(smi_to_png)
-            cols = st.multiselect(label="Select Columns", options=list(df.columns), default=list(df.columns), placeholder="Choose columns...", 
-                                    help="Choose the columns you want to have in your table.") 
-            st.dataframe(df[cols], column_config={"Structure": st.column_config.ImageColumn(width="medium")})
\ No newline at end of file
+            structure_cols = {"SMILES": "Structure"}
+
+        if structure_cols is not None:
+            # Parse the summary once (cached in the user folder) and read only the needed columns
+            data, aggregates = load_summary(csv_file, user_folder, prepare=prepare)
+            summary_info(aggregates)
+            structure_table(data, structure_cols, key="results", sort_by=sort_by)
+            export_parquet(data)
+
+        # Re-score the molecules with new weights of the scoring components (RL/SL & Scoring)
+        if run_mode in ["Scoring", "Reinforcement Learning/Staged Learning (RL/SL)"]:
+            with st.expander("Re-score with New Weights"):
+                rescore_summary_ui(csv_file, user_folder)
@@ -0,0 +1,26 @@
+########################################
+############ Python Modules ############
+########################################
+import importlib.util
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]    # Directory of the Streamlit app (Welcome.py)
+sys.path.insert(0, str(ROOT))
+
+
+#########################################
+############### Fixtures ################
+#########################################
+@pytest.fixture(scope="session")
+def legacy():
+    """
+    The reference implementations of benchmarks/transforms.py (loaded from its path, 
+    the name benchmarks may be taken by an installed package).
+    """
+    spec = importlib.util.spec_from_file_location("legacy_transforms", ROOT / "benchmarks" / "transforms.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
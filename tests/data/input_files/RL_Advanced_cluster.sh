@@ -0,0 +1,12 @@
+#!/bin/bash
+#SBATCH --job-name=reinvent
+#SBATCH --partition=t2
+#SBATCH --nodes=258
+#SBATCH --gpus-per-node=1
+#SBATCH --time=
+
+# activate the conda environment where the reinvent4 package is installed
+conda activate reinvent4
+
+# run the reinvent calculation
+reinvent -l t68.log .toml
\ No newline at end of file
@@ -0,0 +1,12 @@
+#!/bin/bash
+#SBATCH --job-name=reinvent
+#SBATCH --partition=t53
+#SBATCH --nodes=1
+#SBATCH --gpus-per-node=102
+#SBATCH --time=
+
+# activate the conda environment where the reinvent4 package is installed
+conda activate reinvent4
+
+# run the reinvent calculation
+reinvent -l t69.log RL_input.toml
\ No newline at end of file
@@ -0,0 +1,12 @@
+#!/bin/bash
+#SBATCH --job-name=t72
+#SBATCH --partition=
+#SBATCH --nodes=39
+#SBATCH --gpus-per-node=161
+#SBATCH --time=00-12:00:00
+
+# activate the conda environment where the reinvent4 package is installed
+conda activate reinvent4
+
+# run the reinvent calculation
+reinvent -l logfile.log SL_input.toml
\ No newline at end of file
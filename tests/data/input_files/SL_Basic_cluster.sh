@@ -0,0 +1,12 @@
+#!/bin/bash
+#SBATCH --job-name=reinvent
+#SBATCH --partition=t25
+#SBATCH --nodes=1
+#SBATCH --gpus-per-node=240
+#SBATCH --time=00-12:00:00
+
+# activate the conda environment where the reinvent4 package is installed
+conda activate t11
+
+# run the reinvent calculation
+reinvent -l logfile.log t21.toml
\ No newline at end of file
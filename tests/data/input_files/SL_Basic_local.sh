@@ -0,0 +1,7 @@
+#!/bin/bash
+
+# activate the conda environment where the reinvent4 package is installed
+conda activate reinvent4
+
+# run the reinvent calculation
+reinvent -l logfile.log SL_input.toml
\ No newline at end of file
@@ -0,0 +1,12 @@
+#!/bin/bash
+#SBATCH --job-name=
+#SBATCH --partition=t34
+#SBATCH --nodes=140
+#SBATCH --gpus-per-node=298
+#SBATCH --time=
+
+# activate the conda environment where the reinvent4 package is installed
+conda activate t44
+
+# run the reinvent calculation
+reinvent -l t58.log Sampling_input.toml
\ No newline at end of file
@@ -0,0 +1,7 @@
+#!/bin/bash
+
+# activate the conda environment where the reinvent4 package is installed
+conda activate 
+
+# run the reinvent calculation
+reinvent -l .log t44.toml
\ No newline at end of file
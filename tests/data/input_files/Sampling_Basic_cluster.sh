@@ -0,0 +1,12 @@
+#!/bin/bash
+#SBATCH --job-name=reinvent
+#SBATCH --partition=
+#SBATCH --nodes=180
+#SBATCH --gpus-per-node=42
+#SBATCH --time=
+
+# activate the conda environment where the reinvent4 package is installed
+conda activate reinvent4
+
+# run the reinvent calculation
+reinvent -l logfile.log Sampling_input.toml
\ No newline at end of file
@@ -0,0 +1,7 @@
+#!/bin/bash
+
+# activate the conda environment where the reinvent4 package is installed
+conda activate t64
+
+# run the reinvent calculation
+reinvent -l logfile.log Sampling_input.toml
\ No newline at end of file
@@ -0,0 +1,12 @@
+#!/bin/bash
+#SBATCH --job-name=t96
+#SBATCH --partition=
+#SBATCH --nodes=1
+#SBATCH --gpus-per-node=97
+#SBATCH --time=t55
+
+# activate the conda environment where the reinvent4 package is installed
+conda activate 
+
+# run the reinvent calculation
+reinvent -l .log Scoring_input.toml
\ No newline at end of file
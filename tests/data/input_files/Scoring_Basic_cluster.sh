@@ -0,0 +1,12 @@
+#!/bin/bash
+#SBATCH --job-name=t83
+#SBATCH --partition=cdd_gpuq
+#SBATCH --nodes=6
+#SBATCH --gpus-per-node=138
+#SBATCH --time=
+
+# activate the conda environment where the reinvent4 package is installed
+conda activate 
+
+# run the reinvent calculation
+reinvent -l .log t25.toml
\ No newline at end of file
@@ -0,0 +1,12 @@
+#!/bin/bash
+#SBATCH --job-name=t59
+#SBATCH --partition=cdd_gpuq
+#SBATCH --nodes=38
+#SBATCH --gpus-per-node=1
+#SBATCH --time=t26
+
+# activate the conda environment where the reinvent4 package is installed
+conda activate reinvent4
+
+# run the reinvent calculation
+reinvent -l t65.log TL_input.toml
\ No newline at end of file
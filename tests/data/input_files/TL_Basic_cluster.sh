@@ -0,0 +1,12 @@
+#!/bin/bash
+#SBATCH --job-name=
+#SBATCH --partition=
+#SBATCH --nodes=1
+#SBATCH --gpus-per-node=1
+#SBATCH --time=00-12:00:00
+
+# activate the conda environment where the reinvent4 package is installed
+conda activate t15
+
+# run the reinvent calculation
+reinvent -l t67.log t94.toml
\ No newline at end of file
@@ -0,0 +1,7 @@
+#!/bin/bash
+
+# activate the conda environment where the reinvent4 package is installed
+conda activate t66
+
+# run the reinvent calculation
+reinvent -l t45.log .toml
\ No newline at end of file
@@ -0,0 +1,109 @@
+########################################
+############ Python Modules ############
+########################################
+import csv
+import json
+import os
+import zipfile
+
+import pytest
+
+import engine
+from data import state_defaults
+from input_files import input_toml
+
+
+#########################################
+########### Parameter Sweeps ############
+#########################################
+BASE_VALUES = {"run_mode": "Reinforcement Learning (RL)", "RL_batch_size": 64}
+
+
+def read_manifest(path):
+    with open(path, newline="") as f:
+        return list(csv.DictReader(f))
+
+
+def test_sweep_values():
+    assert engine.sweep_values([64, 128]) == [64, 128]
+    assert engine.sweep_values({"min": 1, "max": 3, "num": 3}) == [1, 2, 3]
+    assert engine.sweep_values({"min": 1e-5, "max": 1e-3, "num": 3, "log": True}) == pytest.approx([1e-5, 1e-4, 1e-3])
+
+
+def test_latin_hypercube():
+    points = engine.parameter_grid({"RL_batch_size": {"min": 10, "max": 110}, "RL_sigma": [1.0, 2.0, 3.0, 4.0]}, 
+                                   method="lhs", n_samples=4, seed=3)
+    assert len(points) == 4
+    # One sample per stratum of each parameter
+    assert sorted((point["RL_batch_size"] - 10) // 25 for point in points) == [0, 1, 2, 3]
+    assert sorted(point["RL_sigma"] for point in points) == [1.0, 2.0, 3.0, 4.0]
+    assert points == engine.parameter_grid({"RL_batch_size": {"min": 10, "max": 110}, "RL_sigma": [1.0, 2.0, 3.0, 4.0]}, 
+                                           method="lhs", n_samples=4, seed=3)
+
+
+def test_build_sweep(tmp_path):
+    grid = {"RL_batch_size": [32, 128], "RL_toml_file": ["first", "second"]}
+    sweep = engine.build_sweep(BASE_VALUES, grid, str(tmp_path / "sweep"), slurm={"job_name": "test", "max_parallel": 2}, 
+                               zip_file=str(tmp_path / "sweep.zip"), max_workers=1)
+    assert [result["error"] for result in sweep["results"]] == [None] * 4
+
+    manifest = read_manifest(sweep["manifest"])
+    assert [(row["folder"], row["status"], row["toml_file"], row["RL_batch_size"]) for row in manifest] == [
+        ("run_0001", "ok", "first.toml", "32"), ("run_0002", "ok", "second.toml", "32"),
+        ("run_0003", "ok", "first.toml", "128"), ("run_0004", "ok", "second.toml", "128")]
+
+    # Input files generated with the same code as the UI (missing widget values from the default UI state)
+    for row in manifest:
+        folder = tmp_path / "sweep" / row["folder"]
+        values = {**BASE_VALUES, "RL_batch_size": int(row["RL_batch_size"]), "RL_toml_file": row["toml_file"][:-5]}
+        assert (folder / row["toml_file"]).read_text() == input_toml({**state_defaults, **values})
+        assert json.loads((folder / engine.UI_STATE_FILE).read_text()) == {"schema_version": engine.UI_STATE_SCHEMA_VERSION, 
+                                                                           "values": values}
+        assert f"batch_size = {row['RL_batch_size']}" in (folder / row["toml_file"]).read_text()
+
+    # One TOML input file per array task
+    script = open(sweep["script"]).read()
+    assert "#SBATCH --array=1-4%2" in script
+    assert "#SBATCH --job-name=test" in script
+    for row in manifest:
+        assert f'[{row["array_index"]}]="{row["toml_file"]}"' in script
+    assert "*.toml" not in script
+
+    with zipfile.ZipFile(sweep["zip"]) as zip_file:
+        names = set(zip_file.namelist())
+    assert {"sweep/manifest.csv", "sweep/run_sweep.sh", "sweep/run_0004/second.toml"} <= names
+
+
+def test_build_sweep_workers(tmp_path):
+    """
+    The worker processes (spawn) generate the same input files as the calling process.
+    """
+    grid = {"RL_batch_size": {"min": 16, "max": 256, "num": 5}}
+    serial = engine.build_sweep(BASE_VALUES, grid, str(tmp_path / "serial"), max_workers=1)
+    parallel = engine.build_sweep(BASE_VALUES, grid, str(tmp_path / "parallel"), max_workers=2)
+    assert len(serial["results"]) == 5
+    for result_serial, result_parallel in zip(serial["results"], parallel["results"]):
+        assert [os.path.basename(file) for file in result_serial["files"]] == [os.path.basename(file) for file in result_parallel["files"]]
+        for file_serial, file_parallel in zip(result_serial["files"], result_parallel["files"]):
+            assert open(file_serial).read() == open(file_parallel).read()
+
+
+def test_build_sweep_error(tmp_path):
+    """
+    Runs whose input files can not be generated are marked in the manifest and left out of the SLURM script.
+    """
+    grid = [{"RL_batch_size": 64}, {"run_mode": "Unknown"}, {"RL_batch_size": 256}]
+    sweep = engine.build_sweep(BASE_VALUES, grid, str(tmp_path / "sweep"), slurm={}, max_workers=1)
+    assert [result["error"] is None for result in sweep["results"]] == [True, False, True]
+    assert [row["status"] for row in read_manifest(sweep["manifest"])] == ["ok", "error", "ok"]
+    assert "#SBATCH --array=1,3\n" in open(sweep["script"]).read()
+
+
+def test_main(tmp_path):
+    state_file = tmp_path / "state.json"
+    state_file.write_text(json.dumps({"schema_version": engine.UI_STATE_SCHEMA_VERSION, "values": BASE_VALUES}))
+    grid_file = tmp_path / "grid.json"
+    grid_file.write_text(json.dumps({"RL_batch_size": [8, 16]}))
+    assert engine.main([str(state_file), "-o", str(tmp_path / "out"), "-g", str(grid_file), "-w", "1", "--slurm", "--zip"]) == 0
+    assert (tmp_path / "out" / "run_0002" / "RL_input.toml").is_file()
+    assert (tmp_path / "out.zip").is_file()
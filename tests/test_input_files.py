@@ -0,0 +1,84 @@
+########################################
+############ Python Modules ############
+########################################
+import json
+from pathlib import Path
+
+import pytest
+
+from data import run_mode_prefix, state_defaults
+from input_files import bash_script_text, input_toml, scoring_toml, section_cache
+
+
+#########################################
+########## Baseline Input Files #########
+#########################################
+# Known-good input files of each run mode (Basic and Advanced, local and cluster run script),
+# generated from the UI states <case>.json by the widget code of the UI (run headless) before input_files.py
+DATA_DIR = Path(__file__).resolve().parent / "data" / "input_files"
+CASES = sorted(path.stem for path in DATA_DIR.glob("*.json"))
+
+
+def load_case(case):
+    """
+    Return the widget values (missing values from the default UI state), the prefix of the run mode,
+    the baseline TOML input file and the baseline run script of a case.
+    """
+    with open(DATA_DIR / f"{case}.json") as f:
+        values = {**state_defaults, **json.load(f)}
+    prefix = run_mode_prefix[values.get("run_mode", "Reinforcement Learning (RL)")]
+    return values, prefix, (DATA_DIR / f"{case}.toml").read_text(), (DATA_DIR / f"{case}.sh").read_text()
+
+
+def test_cases():
+    assert {case.rsplit("_", 2)[0] for case in CASES} == {"RL", "SL", "TL", "Sampling", "Scoring"}
+    assert {case.split("_")[-2] for case in CASES} == {"Basic", "Advanced"}
+
+
+@pytest.mark.parametrize("case", CASES)
+def test_input_toml(case):
+    values, _, toml, _ = load_case(case)
+    assert input_toml(values) == toml
+
+
+@pytest.mark.parametrize("case", [case for case in CASES if case.startswith(("RL", "SL", "Scoring"))])
+def test_scoring_toml(case):
+    values, prefix, toml, _ = load_case(case)
+    modus = values.get("modus", "Basic")
+    if prefix == "SL":
+        stages = [scoring_toml(values, f"SL-S{i}", stages=True, num_stage=i, modus=modus)
+                  for i in range(1, values.get("SL_num_stages", 2) + 1)]
+        assert all(stage in toml for stage in stages)
+        assert toml.endswith(stages[-1])
+    else:
+        assert toml.endswith(scoring_toml(values, prefix, modus=modus))
+
+
+@pytest.mark.parametrize("case", CASES)
+def test_bash_script_text(case):
+    values, prefix, _, script = load_case(case)
+    assert bash_script_text(values, prefix) == script
+    assert bash_script_text({**values, f"{prefix}_bash_script": False}, prefix) is None
+
+
+#########################################
+########## Section Memoization ##########
+#########################################
+def test_section_cache():
+    """
+    The memoized sections give the baseline input files (one cache for all cases) and are generated again if a value they read changed.
+    """
+    cache = {}
+    for _ in range(2):
+        for case in CASES:
+            values, _, toml, _ = load_case(case)
+            with section_cache(cache):
+                assert input_toml(values) == toml
+    assert any(key[0] == "component_toml" for key in cache)
+
+    values, _, toml, _ = load_case("RL_Basic_local")
+    with section_cache(cache):
+        assert input_toml({**values, "RL_max_steps": 50}) == toml.replace("max_steps = 100\n", "max_steps = 50\n")
+        assert "min_steps = True\n" in input_toml({**values, "RL_min_steps": True})
+        assert "min_steps = 1\n" in input_toml({**values, "RL_min_steps": 1})
+        assert input_toml(values) == toml
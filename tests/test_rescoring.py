@@ -0,0 +1,182 @@
+########################################
+############ Python Modules ############
+########################################
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import functions
+from transforms import aggregate
+
+
+#########################################
+######## Re-scoring of Summaries ########
+#########################################
+@pytest.fixture
+def summary_csv(tmp_path):
+    """
+    Results summary of REINVENT with 2 scoring components (transformed and raw values), a NaN and a zero score.
+    """
+    rng = np.random.default_rng(1)
+    n = 1003
+    df = pd.DataFrame({"SMILES": [f"C{'C' * (i % 7)}O" for i in range(n)], "Score": rng.uniform(0.0, 1.0, n),
+                       "QED": rng.uniform(0.0, 1.0, n), "QED (raw)": rng.uniform(0.0, 1.0, n),
+                       "TPSA": rng.uniform(0.0, 1.0, n), "TPSA (raw)": rng.uniform(0.0, 150.0, n), "step": np.arange(n)})
+    df.loc[3, "QED"] = np.nan
+    df.loc[5, "TPSA"] = 0.0
+    path = tmp_path / "summary.csv"
+    df.to_csv(path, index=False)
+    return path, df
+
+
+def test_summary_components():
+    assert functions.summary_components(["SMILES", "Score", "QED", "QED (raw)", "TPSA (raw)", "TPSA", "step"]) == ["QED", "TPSA"]
+
+
+def test_summary_components_duplicates(tmp_path):
+    """
+    Components used twice in the scoring function get duplicate column names, renamed by pandas.
+    """
+    path = tmp_path / "summary.csv"
+    path.write_text("SMILES,Score,QED,QED (raw),Tanimoto 0.5,Tanimoto 0.5 (raw),QED,QED (raw),step\n"
+                    "CCO,0.5,0.2,0.4,0.9,0.9,0.8,0.4,1\n")
+    columns = pd.read_csv(path, nrows=0).columns
+    components = functions.summary_components(columns)
+    assert components == ["QED", "Tanimoto 0.5", "QED.1"]
+    result = functions.rescore_summary(str(path), {comp: 1.0 for comp in components}, "arithmetic")
+    assert result["best"][functions.RESCORED_COLUMN].iloc[0] == pytest.approx((0.2 + 0.9 + 0.8) / 3)
+
+
+@pytest.mark.parametrize("aggregation", ["geometric", "arithmetic_mean"])
+def test_rescore_summary_chunks(tmp_path, summary_csv, aggregation):
+    """
+    Streaming the summary in chunks gives the same results as a single chunk (and as aggregating the whole table).
+    """
+    path, df = summary_csv
+    weights = {"QED": 2.0, "TPSA": 0.5}
+    expected = aggregate(df[list(weights)].to_numpy(), list(weights.values()), aggregation)
+    results = []
+    for chunksize in (len(df) + 1, 100, 7):
+        output_file = tmp_path / f"rescored_{chunksize}.csv"
+        result = functions.rescore_summary(str(path), weights, aggregation, output_file=str(output_file), chunksize=chunksize, top=10)
+        rescored = pd.read_csv(output_file)
+        assert list(rescored.columns) == list(df.columns) + [functions.RESCORED_COLUMN]
+        np.testing.assert_allclose(rescored[functions.RESCORED_COLUMN], expected, rtol=1e-6)
+        pd.testing.assert_frame_equal(rescored[df.columns], df)
+        results.append(result)
+
+    for result in results:
+        assert result["rows"] == len(df)
+        assert result["sums"]["Score"] == pytest.approx(df["Score"].sum())
+        assert result["sums"][functions.RESCORED_COLUMN] == pytest.approx(float(expected.sum()), rel=1e-5)
+        np.testing.assert_array_equal(result["histograms"][functions.RESCORED_COLUMN], results[0]["histograms"][functions.RESCORED_COLUMN])
+        assert result["histograms"]["Score"].sum() == len(df)
+        assert list(result["best"]["step"]) == list(results[0]["best"]["step"])
+        assert len(result["best"]) == 10
+        np.testing.assert_allclose(result["best"][functions.RESCORED_COLUMN], np.sort(expected)[::-1][:10], rtol=1e-6)
+
+
+def test_rescore_summary_missing_component(tmp_path, summary_csv):
+    path, _ = summary_csv
+    output_file = tmp_path / "rescored.csv"
+    with pytest.raises(ValueError):
+        functions.rescore_summary(str(path), {"QED": 1.0, "SlogP": 1.0}, output_file=str(output_file), chunksize=100)
+    assert not os.path.exists(output_file)
+    assert not os.path.exists(f"{output_file}.tmp")
+
+
+#########################################
+########### Descriptor Cache ############
+#########################################
+@pytest.fixture
+def fake_descriptors(monkeypatch):
+    """
+    Replace the RDKit descriptors by the length of the SMILES and component name (NaN for SMILES with N), recording each call.
+    """
+    calls = []
+
+    def compute_descriptors(smiles, components, max_workers=None, progress_text=None):
+        calls.append((list(smiles), list(components)))
+        values = np.array([[np.nan if "N" in smi else len(smi) + len(comp) for comp in components] for smi in smiles], 
+                          dtype=np.float32)
+        return values.reshape(len(smiles), len(components))
+
+    monkeypatch.setattr(functions, "compute_descriptors", compute_descriptors)
+    monkeypatch.setattr(functions, "canonical_smiles", lambda smi: None if smi == "invalid" else smi)
+    return calls
+
+
+def test_descriptor_cache(tmp_path, fake_descriptors):
+    cache = functions.DescriptorCache(str(tmp_path / "cache"))
+    raw = cache.descriptors(["CCO", "invalid", "CN", "CCO"], ["QED", "TPSA"], max_workers=1)
+    np.testing.assert_array_equal(raw, [[6, 7], [np.nan, np.nan], [np.nan, np.nan], [6, 7]])
+    assert fake_descriptors == [(["CCO", "CN"], ["QED", "TPSA"])]
+
+    # Cached values (also NaN values of valid SMILES) are not computed again, only the missing rows and components
+    raw = cache.descriptors(["CN", "CCCO", "CCO"], ["TPSA", "SlogP"], max_workers=1)
+    np.testing.assert_array_equal(raw, [[np.nan, np.nan], [8, 9], [7, 8]])
+    assert fake_descriptors[1:] == [(["CCO", "CN", "CCCO"], ["TPSA", "SlogP"])]
+    raw = cache.descriptors(["CN", "CCO"], ["SlogP", "TPSA"], max_workers=1)
+    np.testing.assert_array_equal(raw, [[np.nan, np.nan], [8, 7]])
+    assert len(fake_descriptors) == 2
+
+    # Persisted in the cache folder
+    cache = functions.DescriptorCache(str(tmp_path / "cache"))
+    fake_descriptors.clear()
+    np.testing.assert_array_equal(cache.descriptors(["CCCO", "CN"], ["QED", "TPSA", "SlogP"], max_workers=1), 
+                                  [[7, 8, 9], [np.nan, np.nan, np.nan]])
+    assert fake_descriptors == [(["CCCO"], ["QED"])]
+
+
+def test_descriptor_cache_prunes_sets(tmp_path, fake_descriptors, monkeypatch):
+    """
+    Only the rows of the last MAX_SETS SMILES sets are kept, a cache hit refreshes its set.
+    """
+    monkeypatch.setattr(functions.DescriptorCache, "MAX_SETS", 3)
+    cache = functions.DescriptorCache(str(tmp_path / "cache"))
+    sets_dir = tmp_path / "cache" / "sets"
+
+    def add_set(smiles):
+        for path in sets_dir.iterdir():     # the previous sets are older (mtime resolution of the file system)
+            os.utime(path, (path.stat().st_mtime - 10, path.stat().st_mtime - 10))
+        before = set(sets_dir.iterdir())
+        cache.descriptors(smiles, ["QED"], max_workers=1)
+        return (set(sets_dir.iterdir()) - before).pop() if set(sets_dir.iterdir()) - before else None
+
+    set_a, set_b, set_c = add_set(["C"]), add_set(["CC"]), add_set(["CCC"])
+    assert add_set(["C"]) is None           # cache hit: set A is the last used set
+    set_d = add_set(["CCCC"])
+    assert set(sets_dir.iterdir()) == {set_a, set_c, set_d}
+    assert len(cache) == 4
+
+
+def test_descriptor_cache_compacts_rows(tmp_path, fake_descriptors, monkeypatch):
+    """
+    The rows no remaining SMILES set refers to are removed once they are the majority of the rows.
+    """
+    monkeypatch.setattr(functions.DescriptorCache, "MAX_SETS", 1)
+    cache = functions.DescriptorCache(str(tmp_path / "cache"))
+    cache.descriptors(["C", "CC", "CCC"], ["QED"], max_workers=1)
+    set_path = next((tmp_path / "cache" / "sets").iterdir())
+    os.utime(set_path, (set_path.stat().st_mtime - 10, set_path.stat().st_mtime - 10))
+    # Removing the first set leaves 2 of 4 rows in use: no compaction yet
+    raw = cache.descriptors(["invalid", "CCCC", "CC"], ["QED", "TPSA"], max_workers=1)
+    np.testing.assert_array_equal(raw, [[np.nan, np.nan], [7, 8], [5, 6]])
+    assert len(cache) == 4
+
+    # Removing the second set leaves 1 of 5 rows in use
+    set_path = next((tmp_path / "cache" / "sets").iterdir())
+    os.utime(set_path, (set_path.stat().st_mtime - 10, set_path.stat().st_mtime - 10))
+    raw = cache.descriptors(["CCCCC"], ["QED"], max_workers=1)
+    assert len(cache) == 1
+    assert (tmp_path / "cache" / "smiles.txt").read_text() == "CCCCC\n"
+    np.testing.assert_array_equal(raw, [[8]])
+
+    # The compacted columns, masks and sets are persisted
+    cache = functions.DescriptorCache(str(tmp_path / "cache"))
+    fake_descriptors.clear()
+    np.testing.assert_array_equal(cache.descriptors(["CCCCC"], ["QED"], max_workers=1), [[8]])
+    assert fake_descriptors == []
+    assert [np.load(path).tolist() for path in (tmp_path / "cache" / "sets").iterdir()] == [[0]]
@@ -0,0 +1,161 @@
+########################################
+############ Python Modules ############
+########################################
+import warnings
+
+import numpy as np
+import pytest
+
+import transforms
+
+
+#########################################
+############# Transformers ##############
+#########################################
+# Raw values of a scoring component, including NaN (failed calculation) and ±inf
+VALUES = np.array([-np.inf, -1e30, -1e6, -3.0, 0.0, 1.5, 2.0, 3.0, 3.5, 5.0, 20.0, 80.0, 100.0, 140.0, 250.0, 1e6, 1e30, 
+                   np.inf, np.nan], dtype=np.float32)
+
+# Transformer name: (legacy function name, vectorized function, parameters)
+CASES = {
+    "sigmoid": ("legacy_sigmoid", transforms.sigmoid, [(0.5, 200.0, 500.0), (0.5, 2.0, 2.0), (-0.3, 1.0, 5.0)]),
+    "reverse_sigmoid": ("legacy_reverse_sigmoid", transforms.reverse_sigmoid, [(0.5, 2.0, 5.0), (0.5, 3.0, 3.0)]),
+    "double_sigmoid": ("legacy_double_sigmoid", transforms.double_sigmoid, [(20.0, 140.0, 100.0, 10.0, 10.0)]),
+    "step": ("legacy_step", transforms.step, [(1.0, 5.0)]),
+    "left_step": ("legacy_left_step", transforms.left_step, [(3.0,)]),
+    "right_step": ("legacy_right_step", transforms.right_step, [(3.0,)]),
+}
+PARAMS = [(name, params) for name, (_, _, param_list) in CASES.items() for params in param_list]
+
+
+def legacy_result(legacy, name, values, params):
+    """
+    Result of the legacy transformer (which warns for overflows and NaN).
+    """
+    with np.errstate(all="ignore"):
+        return getattr(legacy, CASES[name][0])(values.copy(), *params)
+
+
+@pytest.mark.parametrize("name, params", PARAMS)
+def test_matches_legacy(legacy, name, params):
+    expected = legacy_result(legacy, name, VALUES, params)
+    result = CASES[name][1](VALUES, *params)
+    assert result.dtype == np.float32
+    np.testing.assert_allclose(result, expected, atol=1e-6, equal_nan=True)
+
+
+@pytest.mark.parametrize("name, params", PARAMS)
+def test_no_warnings(name, params):
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        CASES[name][1](VALUES, *params)
+
+
+@pytest.mark.parametrize("name, params", PARAMS)
+def test_out_aliasing(legacy, name, params):
+    """
+    The output array may be the input array (in-place transformation) or a separate array.
+    """
+    func = CASES[name][1]
+    expected = func(VALUES, *params)
+    out = np.full(VALUES.shape, -1.0, dtype=np.float32)
+    assert func(VALUES, *params, out=out) is out
+    np.testing.assert_array_equal(out, expected)
+    values = VALUES.copy()
+    assert func(values, *params, out=values) is values
+    np.testing.assert_array_equal(values, expected)
+
+
+@pytest.mark.parametrize("name, params", PARAMS)
+def test_float64_and_2d_input(name, params):
+    func = CASES[name][1]
+    expected = func(VALUES, *params)
+    np.testing.assert_array_equal(func(VALUES.astype(np.float64), *params), expected)
+    np.testing.assert_array_equal(func(np.tile(VALUES, (3, 1)), *params), np.tile(expected, (3, 1)))
+
+
+@pytest.mark.parametrize("k", [100.0, 0.0, -5.0])
+@pytest.mark.parametrize("k_left", [10.0, 0.0, -10.0])
+@pytest.mark.parametrize("k_right", [10.0, 0.0, -10.0])
+def test_double_sigmoid_scaling_factors(legacy, k, k_left, k_right):
+    """
+    All signs of the scaling factors, the legacy code gives NaN for inf * 0 (k_left or k_right = 0), here 0.
+    """
+    params = (20.0, 140.0, k, k_left, k_right)
+    expected = legacy_result(legacy, "double_sigmoid", VALUES, params)
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        result = transforms.double_sigmoid(VALUES, *params)
+    np.testing.assert_allclose(result, np.nan_to_num(expected, nan=0.0), atol=1e-6)
+
+
+def test_double_sigmoid_inf():
+    """
+    ±inf on a rising side of the double sigmoid gives 1 (limit of the sigmoid), not 0.
+    """
+    result = transforms.double_sigmoid(np.array([-np.inf, np.inf], dtype=np.float32), 20.0, 140.0, 100.0, -10.0, -10.0)
+    np.testing.assert_array_equal(result, [1.0, 1.0])
+
+
+def test_double_sigmoid_blocks(legacy):
+    """
+    Values spanning several blocks of the double sigmoid (scratch buffers reused between blocks).
+    """
+    values = np.random.default_rng(0).uniform(-50.0, 250.0, 3 * transforms.BLOCK_SIZE + 7).astype(np.float32)
+    params = CASES["double_sigmoid"][2][0]
+    np.testing.assert_allclose(transforms.double_sigmoid(values, *params), 
+                               legacy_result(legacy, "double_sigmoid", values, params), atol=1e-6)
+
+
+def test_out_wrong_dtype():
+    with pytest.raises(ValueError):
+        transforms.sigmoid(VALUES, 0.5, 1.0, 5.0, out=np.empty(VALUES.shape, dtype=np.float64))
+
+
+#########################################
+############# Aggregation ###############
+#########################################
+def test_aggregate_means():
+    scores = np.array([[0.5, 0.8], [1.0, 0.25]], dtype=np.float32)
+    weights = [1.0, 3.0]
+    np.testing.assert_allclose(transforms.aggregate(scores, weights, "arithmetic"), [(0.5 + 3 * 0.8) / 4, (1.0 + 3 * 0.25) / 4], rtol=1e-6)
+    np.testing.assert_allclose(transforms.aggregate(scores, weights, "geometric_mean"), 
+                               [(0.5 * 0.8 ** 3) ** 0.25, (1.0 * 0.25 ** 3) ** 0.25], rtol=1e-6)
+
+
+def test_aggregate_zero_score():
+    scores = np.array([[0.0, 0.8], [-0.1, 0.8]])
+    np.testing.assert_array_equal(transforms.aggregate(scores, [1.0, 1.0], "geometric"), [0.0, 0.0])
+    np.testing.assert_allclose(transforms.aggregate(scores, [1.0, 1.0], "arithmetic"), [0.4, 0.35], rtol=1e-6)
+
+
+def test_aggregate_nan():
+    """
+    Missing scores (NaN) are left out together with their weight, no score at all gives 0.
+    """
+    scores = np.array([[np.nan, 0.64], [np.nan, np.nan]])
+    for aggregation in transforms.AGGREGATIONS:
+        np.testing.assert_allclose(transforms.aggregate(scores, [1.0, 1.0], aggregation), [0.64, 0.0], rtol=1e-6)
+
+
+def test_aggregate_zero_weight():
+    """
+    Components with a weight of 0 are ignored (also a score of 0 or NaN), all weights 0 gives 0.
+    """
+    scores = np.array([[0.0, 0.5], [np.nan, 0.5]])
+    for aggregation in transforms.AGGREGATIONS:
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            np.testing.assert_allclose(transforms.aggregate(scores, [0.0, 2.0], aggregation), [0.5, 0.5], rtol=1e-6)
+            np.testing.assert_array_equal(transforms.aggregate(scores, [0.0, 0.0], aggregation), [0.0, 0.0])
+
+
+def test_aggregate_invalid():
+    with pytest.raises(ValueError):
+        transforms.aggregate(np.ones((2, 2)), [1.0, -1.0])
+    with pytest.raises(ValueError):
+        transforms.aggregate(np.ones((2, 2)), [1.0])
+    with pytest.raises(ValueError):
+        transforms.aggregate(np.ones(2), [1.0])
+    with pytest.raises(ValueError):
+        transforms.aggregation_type("harmonic_mean")
@@ -0,0 +1,341 @@
+########################################
+############ Python Modules ############
+########################################
+import numpy as np
+
+
+##############################################################################################
+# Transformer functions used in the REINVENT4 (V4.0).
+# Source: (https://github.com/MolecularAI/REINVENT4/blob/main/reinvent/scoring/transforms/)
+#
+# Vectorized NumPy implementations with a common interface: array-like in, float32 array out.
+# The optional out argument is a float32 array of the same shape that receives the result
+# (no output allocation); it may be the input array itself (in-place transformation).
+# The sigmoid kernels are chains of in-place ufuncs on the output array (no temporaries), the
+# double sigmoid evaluates a single mask per block of values with small scratch buffers, and
+# float64 inputs are read directly (no float32 copy of the input).
+##############################################################################################
+# Number of values per block of the double sigmoid (scratch buffers of 64 kB)
+BLOCK_SIZE = 16384
+
+
+def _prepare(values, out=None):
+    """
+    Return the input values as floating point array (no copy for float32 and float64 arrays) and the output array.
+
+    Args:
+        values (array-like): Input values.
+        out (np.ndarray, optional): Output array (float32, same shape as the values). Defaults to None (new array).
+
+    Returns:
+        tuple: The input values and the output array.
+    """
+    values = np.asarray(values)
+    if values.dtype.kind != "f":
+        values = values.astype(np.float32)
+    if out is None:
+        out = np.empty(values.shape, dtype=np.float32)
+    elif (out.dtype != np.float32) or (out.shape != values.shape):
+        raise ValueError(f"out must be a float32 array of shape {values.shape}, got {out.dtype} {out.shape}")
+    return values, out
+
+
+def _logistic(h, scale, out):
+    """
+    Apply the logistic function 1 / (1 + exp(-scale * h)) with in-place operations on the output array.
+    For large negative scale * h, exp overflows to inf and the result is 0 (the exact value is below 1e-38).
+
+    Args:
+        h (np.ndarray): Input values (may be the output array).
+        scale (float): Scaling factor.
+        out (np.ndarray): Output array (float32).
+
+    Returns:
+        np.ndarray: The output array.
+    """
+    np.multiply(h, np.float32(-scale), out=out)
+    with np.errstate(over="ignore"):
+        np.exp(out, out=out)
+    np.add(out, np.float32(1.0), out=out)
+    return np.reciprocal(out, out=out)
+
+
+def hard_sigmoid(x: np.ndarray, k: float, out: np.ndarray = None) -> np.ndarray:
+    """
+    Apply a hard sigmoid function to the input array.
+
+    Args:
+        x (np.ndarray): Input array.
+        k (float): Scaling factor.
+        out (np.ndarray, optional): Output array (float32, may be x). Defaults to None.
+
+    Returns:
+        np.ndarray: Transformed array with hard sigmoid applied.
+    """
+    x, out = _prepare(x, out)
+    # k * x > 0 without the temporary array k * x
+    if k > 0:
+        np.greater(x, 0.0, out=out)
+    elif k < 0:
+        np.less(x, 0.0, out=out)
+    else:
+        out.fill(0.0)
+    return out
+
+
+def stable_sigmoid(x: np.ndarray, k: float, base_10: bool = True, out: np.ndarray = None) -> np.ndarray:
+    """
+    Apply a stable sigmoid function to the input array.
+
+    Args:
+        x (np.ndarray): Input array.
+        k (float): Scaling factor.
+        base_10 (bool): Whether to use base 10 for the logarithm. Defaults to True.
+        out (np.ndarray, optional): Output array (float32, may be x). Defaults to None.
+
+    Returns:
+        np.ndarray: Transformed array with stable sigmoid applied.
+    """
+    x, out = _prepare(x, out)
+    return _logistic(x, k * np.log(10) if base_10 else k, out)
+
+
+def sigmoid(values, k, low, high, out=None):
+    """
+    Apply a sigmoid function to the input values.
+
+    Args:
+        values (array-like): Input values.
+        k (float): Scaling factor.
+        low (float): Lower bound.
+        high (float): Upper bound.
+        out (np.ndarray, optional): Output array (float32, may be values). Defaults to None.
+
+    Returns:
+        np.ndarray: Transformed values with sigmoid applied.
+    """
+    values, out = _prepare(values, out)
+    np.subtract(values, (high + low) / 2, out=out)
+    if (high - low) == 0:
+        return hard_sigmoid(out, 10.0 * k, out=out)
+    return _logistic(out, 10.0 * k / (high - low) * np.log(10), out)
+
+
+def reverse_sigmoid(values, k, low, high, out=None):
+    """
+    Apply a reverse sigmoid function to the input values.
+
+    Args:
+        values (array-like): Input values.
+        k (float): Scaling factor.
+        low (float): Lower bound.
+        high (float): Upper bound.
+        out (np.ndarray, optional): Output array (float32, may be values). Defaults to None.
+
+    Returns:
+        np.ndarray: Transformed values with reverse sigmoid applied.
+    """
+    values, out = _prepare(values, out)
+    np.subtract(values, (high + low) / 2, out=out)
+    if (high - low) == 0:
+        hard_sigmoid(out, 10.0 * k, out=out)
+        return np.subtract(np.float32(1.0), out, out=out)
+    # 1 - 1 / (1 + exp(-h)) = 1 / (1 + exp(h)): no subtraction (and no cancellation for large h)
+    return _logistic(out, -10.0 * k / (high - low) * np.log(10), out)
+
+
+def double_sigmoid(x: np.ndarray, x_left: float, x_right: float, k: float, k_left: float, k_right: float,
+                   out: np.ndarray = None) -> np.ndarray:
+    """
+    Compute double sigmoid based on stable sigmoid.
+
+    Args:
+        x (np.ndarray):  Input array.
+        x_left (float):  Left sigmoid x value for which the output is 0.5. (low in previous implementation)
+        x_right (float): Right sigmoid x value for which the output is 0.5. (high in previous implementation)
+        k (float):       Common scaling factor. (coef_div in previous implementation)
+        k_left (float):  Scaling left factor. (coef_si in previous implementation)
+        k_right (float): Scaling right factor. (coef_se in previous implementation)
+        out (np.ndarray, optional): Output array (float32, may be x). Defaults to None.
+
+    Returns:
+        np.ndarray: Transformed array with double sigmoid applied.
+    """
+    x, out = _prepare(x, out)
+    x_center = (x_right - x_left) / 2 + x_left
+    c_left = np.float32(k_left / k * np.log(10)) if k != 0 else None
+    c_right = np.float32(k_right / k * np.log(10)) if k != 0 else None
+
+    # Blocks of rows with scratch buffers kept in the CPU cache: both sides are computed with plain
+    # ufuncs and a single mask per block selects the left or right sigmoid
+    x_rows, out_rows = np.atleast_1d(x), np.atleast_1d(out)
+    rows = max(1, BLOCK_SIZE // max(1, x_rows[0].size)) if len(x_rows) else 1
+    shape = (min(rows, len(x_rows)),) + x_rows.shape[1:]
+    mask = np.empty(shape, dtype=bool)
+    left, right = (np.empty(shape, dtype=np.float32) for _ in range(2))
+    for start in range(0, len(x_rows), rows):
+        x_block, out_block = x_rows[start:start + rows], out_rows[start:start + rows]
+        n = len(x_block)
+        m, l, r = mask[:n], left[:n], right[:n]
+        np.less(x_block, x_center, out=m)    # NaN is on the right side
+        if k == 0:
+            # Left: k_left * (x - x_left) > 0, right: 1 - (k_right * (x - x_right) > 0) (1.0 for k_right = 0)
+            if k_left == 0:
+                l.fill(0.0)
+            else:
+                (np.greater if k_left > 0 else np.less)(x_block, x_left, out=l)
+            if k_right == 0:
+                np.greater_equal(x_block, -np.inf, out=r)
+            else:
+                (np.less_equal if k_right > 0 else np.greater_equal)(x_block, x_right, out=r)
+        else:
+            # Exponent z of the logistic 1 / (1 + exp(z)):
+            # left z = -c_left * (x - x_left), right z = c_right * (x - x_right) (1 - sigmoid)
+            # (overflows give the exact limit, inf * 0 = NaN for k_left or k_right = 0 as in the legacy code)
+            with np.errstate(over="ignore", invalid="ignore"):
+                np.subtract(x_block, x_left, out=l)
+                np.multiply(l, -c_left, out=l)
+                np.subtract(x_block, x_right, out=r)
+                np.multiply(r, c_right, out=r)
+        # Select the left or right side (written after reading x_block, out may be x), 
+        # a blend l * w + r * (1 - w) would give inf * 0 = NaN for the infinite exponents of ±inf
+        np.copyto(out_block, r)
+        np.copyto(out_block, l, where=m)
+
+    if k == 0:
+        return out
+    with np.errstate(over="ignore", invalid="ignore"):
+        np.exp(out, out=out)
+    np.add(out, np.float32(1.0), out=out)
+    np.reciprocal(out, out=out)
+    return np.fmax(out, 0.0, out=out)      # NaN to 0.0
+
+
+def step(values, low, high, out=None):
+    """
+    Apply a step function to the input values.
+
+    Args:
+        values (array-like): Input values.
+        low (float): Lower bound.
+        high (float): Upper bound.
+        out (np.ndarray, optional): Output array (float32, may be values). Defaults to None.
+
+    Returns:
+        np.ndarray: Transformed values with step function applied.
+    """
+    values, out = _prepare(values, out)
+    below_high = np.less_equal(values, high)    # one boolean temporary (values may be overwritten by out)
+    np.greater_equal(values, low, out=out)
+    np.multiply(out, below_high, out=out)
+    return out
+
+
+def left_step(values, low, out=None):
+    """
+    Apply a left step function to the input values.
+
+    Args:
+        values (array-like): Input values.
+        low (float): Lower bound.
+        out (np.ndarray, optional): Output array (float32, may be values). Defaults to None.
+
+    Returns:
+        np.ndarray: Transformed values with left step function applied.
+    """
+    values, out = _prepare(values, out)
+    return np.less_equal(values, low, out=out)
+
+
+def right_step(values, high, out=None):
+    """
+    Apply a right step function to the input values.
+
+    Args:
+        values (array-like): Input values.
+        high (float): Upper bound.
+        out (np.ndarray, optional): Output array (float32, may be values). Defaults to None.
+
+    Returns:
+        np.ndarray: Transformed values with right step function applied.
+    """
+    values, out = _prepare(values, out)
+    return np.greater_equal(values, high, out=out)
+
+
+##############################################################################################
+# Aggregation functions used in the REINVENT4 (V4.0).
+# Source: (https://github.com/MolecularAI/REINVENT4/blob/main/reinvent/scoring/aggregators.py)
+#
+# The total score is the weighted arithmetic or geometric mean of the transformed component
+# scores (type = "arithmetic_mean" or "geometric_mean" in the TOML file). Missing scores (NaN)
+# are left out together with their weight; a molecule without any score gets a total score of 0.
+# Rows are independent, so large tables are aggregated chunk by chunk in bounded memory
+# (see functions.rescore_summary).
+##############################################################################################
+AGGREGATIONS = ("arithmetic", "geometric")
+
+
+def aggregation_type(aggregation):
+    """
+    Return the aggregation function of a TOML type ("arithmetic_mean" or "geometric_mean").
+
+    Args:
+        aggregation (str): The aggregation type, with or without the "_mean" suffix.
+
+    Returns:
+        str: "arithmetic" or "geometric".
+    """
+    name = str(aggregation).strip().lower().removesuffix("_mean")
+    if name not in AGGREGATIONS:
+        raise ValueError(f"Aggregation not supported: {aggregation} (arithmetic_mean or geometric_mean)")
+    return name
+
+
+def aggregate(scores, weights, aggregation="geometric", out=None):
+    """
+    Aggregate the transformed scores of the components into the total score of each molecule.
+    For the geometric mean, a score of 0 (or below) of a component with a positive weight gives a total score of 0, 
+    while components with a weight of 0 are ignored (0 ** 0 = 1).
+
+    Args:
+        scores (array-like): The transformed scores (molecules x components).
+        weights (array-like): The weights of the components (non-negative).
+        aggregation (str, optional): "arithmetic" or "geometric" (or the TOML type "<aggregation>_mean"). Defaults to "geometric".
+        out (np.ndarray, optional): Output array (float32, one value per molecule). Defaults to None (new array).
+
+    Returns:
+        np.ndarray: The total scores of the molecules (float32).
+    """
+    aggregation = aggregation_type(aggregation)
+    scores = np.asarray(scores)
+    if scores.ndim != 2:
+        raise ValueError(f"scores must be a matrix (molecules x components), got shape {scores.shape}")
+    weights = np.asarray(weights, dtype=np.float64)
+    if (weights.shape != scores.shape[1:]) or (weights < 0).any():
+        raise ValueError(f"weights must be {scores.shape[1]} non-negative values, got {weights.tolist()}")
+    if out is None:
+        out = np.empty(len(scores), dtype=np.float32)
+    elif (out.dtype != np.float32) or (out.shape != (len(scores),)):
+        raise ValueError(f"out must be a float32 array of shape {(len(scores),)}, got {out.dtype} {out.shape}")
+
+    # Components with a weight of 0 do not contribute (and 0 * log(0) would be NaN)
+    used = weights > 0
+    scores, weights = scores[:, used], weights[used]
+    valid = ~np.isnan(scores)
+    total_weight = valid @ weights
+    if aggregation == "arithmetic":
+        weighted = np.where(valid, scores, 0.0) @ weights
+    else:
+        with np.errstate(divide="ignore"):
+            logs = np.log(np.where(valid, np.maximum(scores, 0.0), 1.0))
+        # -inf (score of 0) stays -inf in the sum: exp(-inf) = 0
+        weighted = (logs * weights).sum(axis=1)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        np.divide(weighted, total_weight, out=weighted)
+    if aggregation == "geometric":
+        np.exp(weighted, out=weighted)
+    weighted[total_weight == 0] = 0.0
+    np.copyto(out, weighted, casting="same_kind")
+    return out